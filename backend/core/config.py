@@ -40,6 +40,18 @@ class Settings(BaseSettings):
     TELEGRAM_BOT_TOKEN: str
     TELEGRAM_CHAT_ID: str
 
+    # --- Live scanner session recording ---
+    # Optional: when set, every live scanner session is written to a
+    # replayable log in this directory (services.live_scanner_recording).
+    LIVE_SCANNER_RECORD_DIR: Optional[Path] = None
+
+    # --- Streaming quotes (services.quote_board) ---
+    # Seconds an unused quote line stays subscribed before it is cancelled.
+    QUOTE_IDLE_TTL_SECONDS: float = 30.0
+    # Oldest last tick (seconds) an order may be priced from; staler
+    # quotes wait for the next tick and are rejected if none arrives.
+    QUOTE_MAX_AGE_SECONDS: float = 10.0
+
 
     @field_validator("TARGET_SCRIPT_PATH")
     @classmethod
@@ -8,6 +8,11 @@ startup cleanly.
 Shutdown runs in reverse dependency order:
   - watchdog first (it holds a running task)
   - live scanner (needs IB alive to unsubscribe cleanly)
+  - volume profiles (cancels the nightly build)
+  - quote board (same: cancels its streaming lines)
+  - IB state mirror (stops its reconcile task)
+  - lockout hub (cancels its expiry timer)
+  - executions ledger (flushes queued fills while the pool is open)
   - database (nothing else needs it after this point)
   - IB last (everything downstream of it is already stopped)
 """
@@ -17,12 +22,21 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from core.risk_manager_config import risk_settings
+from core.startup.broker_setup import wire_broker
 from core.startup.ibkr import connect_ib, disconnect_ib
 from core.startup.database import init_database, ensure_schema, close_database
+from core.startup.contract_registry_setup import wire_contract_registry
+from core.startup.bar_store_setup import wire_bar_store
+from core.startup.volume_profiles_setup import wire_volume_profiles, stop_volume_profiles
+from core.startup.quote_board_setup import wire_quote_board, close_quote_board
+from core.startup.ib_state_setup import wire_ib_state, stop_ib_state
+from core.startup.trades_engine_setup import wire_trades_engine, stop_trades_engine
+from core.startup.lockout_hub_setup import wire_lockout_hub, close_lockout_hub
 from core.startup.order_tracker_setup import wire_order_tracker
 from core.startup.openrisk_hub_setup import wire_openrisk_hub
 from core.startup.pending_approvals_hub_setup import wire_pending_approvals_hub
 from core.startup.live_scanner import start_live_scanner, stop_live_scanner
+from core.startup.realtime_setup import wire_realtime
 from core.startup.streamer_watchdog import (
     start_streamer_watchdog,
     stop_streamer_watchdog,
@@ -34,13 +48,22 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
+        wire_broker(app)
         await connect_ib(app)
         await init_database(app)
         await ensure_schema(app)
+        await wire_contract_registry(app)
+        await wire_bar_store(app)
+        wire_quote_board(app)
+        await wire_ib_state(app)
+        await wire_volume_profiles(app)
+        await wire_trades_engine(app)
+        await wire_lockout_hub(app)
         await wire_order_tracker(app)
         await wire_openrisk_hub(app)
         await wire_pending_approvals_hub(app)
         await start_live_scanner(app)   # non-fatal on failure
+        wire_realtime(app)
         start_streamer_watchdog(app)
     except Exception:
         logger.exception("Startup failed")
@@ -53,6 +76,11 @@ async def lifespan(app: FastAPI):
     try:
         await stop_streamer_watchdog(app)
         await stop_live_scanner(app)
+        await stop_volume_profiles(app)
+        close_quote_board(app)
+        await stop_ib_state(app)
+        close_lockout_hub(app)
+        await stop_trades_engine(app)
         await close_database(app)
         disconnect_ib(app)
     except Exception:
@@ -0,0 +1,27 @@
+"""BarStore wiring.
+
+Attaches the DB pool to the intraday bar store the batch scanner reads
+through, and prunes stored bars past BAR_RETENTION_DAYS. Pruning is
+best-effort -- a failure only leaves old rows in place -- so it's
+logged, not raised.
+
+Must run AFTER ensure_schema (needs app.state.db_pool and the
+intraday_bars tables).
+"""
+import logging
+
+from fastapi import FastAPI
+
+from services.bar_store import BAR_RETENTION_DAYS, bar_store
+
+logger = logging.getLogger(__name__)
+
+
+async def wire_bar_store(app: FastAPI) -> None:
+    bar_store.set_db_pool(app.state.db_pool)
+    app.state.bar_store = bar_store
+    try:
+        await bar_store.prune()
+    except Exception:
+        logger.exception("BarStore prune failed")
+    logger.info("BarStore ready (retention %d days)", BAR_RETENTION_DAYS)
@@ -0,0 +1,21 @@
+"""Pub/sub broker lifecycle.
+
+Binds the process-wide broker (helpers.broker) to the FastAPI loop so
+publishes from sync endpoints running in the threadpool (e.g. the
+streamer-status POSTs) hop onto the loop instead of touching subscriber
+queues from another thread. Runs first: every hub publishes through it.
+"""
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from helpers.broker import broker
+
+logger = logging.getLogger(__name__)
+
+
+def wire_broker(app: FastAPI) -> None:
+    broker.bind_loop(asyncio.get_running_loop())
+    app.state.broker = broker
+    logger.info("Broker bound (%d topics declared)", len(broker.stats()))
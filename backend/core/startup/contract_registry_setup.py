@@ -0,0 +1,50 @@
+"""ContractRegistry wiring.
+
+Attaches the DB pool, loads every persisted contract, then warms the
+cache with what the app is about to touch anyway:
+  - contracts IB already hands us qualified (positions, open orders) are
+    remembered for free;
+  - watchlist symbols not yet known are qualified in one batched call.
+
+Warming is best-effort — a failure here only means the first order for
+a symbol pays one qualification round trip, so it's logged, not raised.
+
+Must run AFTER connect_ib and ensure_schema (needs app.state.ib,
+app.state.db_pool and the contracts table).
+"""
+import logging
+
+from fastapi import FastAPI
+
+from db.watchlist import list_watchlist
+from services.contracts import contract_registry
+
+logger = logging.getLogger(__name__)
+
+
+async def wire_contract_registry(app: FastAPI) -> None:
+    ib = app.state.ib
+    db_pool = app.state.db_pool
+
+    contract_registry.set_db_pool(db_pool)
+    app.state.contract_registry = contract_registry
+
+    try:
+        loaded = await contract_registry.load()
+        logger.info("ContractRegistry loaded %d contract(s) from DB", loaded)
+    except Exception:
+        logger.exception("ContractRegistry DB load failed; starting empty")
+
+    try:
+        for pos in ib.positions():
+            contract_registry.remember(pos.contract)
+        for trade in ib.openTrades():
+            contract_registry.remember(trade.contract)
+
+        async with db_pool.acquire() as conn:
+            watchlist = await list_watchlist(conn)
+        await contract_registry.resolve_many(ib, [w["symbol"] for w in watchlist])
+    except Exception:
+        logger.exception("ContractRegistry warm-up failed")
+
+    logger.info("ContractRegistry ready (%d contract(s))", len(contract_registry))
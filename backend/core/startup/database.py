@@ -22,6 +22,10 @@ from db.exits import create_exit_requests_table
 from db.watchlist import create_watchlist_tables
 from db.order_log import create_order_log_table
 from db.daily_summary import create_daily_summary_tables
+from db.contracts import create_contracts_table
+from db.executions import create_executions_table
+from db.bars import create_bars_tables
+from db.volume_profiles import create_volume_profiles_table
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +53,10 @@ async def ensure_schema(app: FastAPI) -> None:
         await create_watchlist_tables(conn)
         await create_order_log_table(conn)
         await create_daily_summary_tables(conn)
+        await create_contracts_table(conn)
+        await create_executions_table(conn)
+        await create_bars_tables(conn)
+        await create_volume_profiles_table(conn)
 
 
 async def close_database(app: FastAPI) -> None:
@@ -0,0 +1,33 @@
+"""IbStateMirror lifecycle.
+
+Binds the portfolio state mirror to IB's push events, seeds it with one
+round trip each for positions, open orders and the account summary, and
+starts its background open-order reconcile. From then on IbClient reads
+are answered from memory. Must run AFTER connect_ib; stop_ib_state must
+run BEFORE disconnect_ib.
+"""
+import logging
+
+from fastapi import FastAPI
+
+from services.portfolio.ib_state import ib_state
+
+logger = logging.getLogger(__name__)
+
+
+async def wire_ib_state(app: FastAPI) -> None:
+    ib_state.bind(app.state.ib)
+    await ib_state.seed()
+    ib_state.start()
+    app.state.ib_state = ib_state
+
+
+async def stop_ib_state(app: FastAPI) -> None:
+    mirror = getattr(app.state, "ib_state", None)
+    if mirror is None:
+        return
+    try:
+        await mirror.stop()
+        logger.info("IbStateMirror stopped")
+    except Exception:
+        logger.exception("Error stopping IbStateMirror")
@@ -1,21 +1,30 @@
 """LiveScannerManager lifecycle.
 
-Spins up the streaming scanner manager (gap up/down via IB
-ScannerSubscription). Non-fatal: if the scanner fails to start, the rest
-of the API stays up and the Live Scanner page just shows disconnected.
+Spins up the streaming scanner manager (every LIVE_SCANS preset via IB
+ScannerSubscription, market data through the quote board -- so this must
+run after wire_quote_board). Non-fatal: if the scanner fails to start,
+the rest of the API stays up and the Live Scanner page just shows
+disconnected. With settings.LIVE_SCANNER_RECORD_DIR set, the session is
+recorded there for later replay.
 """
 import logging
 
 from fastapi import FastAPI
 
+from core.config import settings
+from helpers.scanner_presets import LIVE_SCANS
 from services.live_scanner import LiveScannerManager
+from services.live_scanner_recording import SessionRecorder
 
 logger = logging.getLogger(__name__)
 
 
 async def start_live_scanner(app: FastAPI) -> None:
     try:
-        live_mgr = LiveScannerManager(app.state.ib)
+        recorder = None
+        if settings.LIVE_SCANNER_RECORD_DIR:
+            recorder = SessionRecorder.create(settings.LIVE_SCANNER_RECORD_DIR, LIVE_SCANS)
+        live_mgr = LiveScannerManager(app.state.ib, recorder=recorder)
         await live_mgr.start()
         app.state.live_scanner_manager = live_mgr
         logger.info("LiveScannerManager started")
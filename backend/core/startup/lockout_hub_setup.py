@@ -0,0 +1,30 @@
+"""LockoutHub wiring.
+
+Instantiates the hub (once), binds it to the running loop and to the
+TradesEngine's fill listener, and stashes it on ``app.state`` for the
+SSE endpoint. bind() takes the initial evaluation, so a lockout that is
+already active at startup has its expiry timer armed immediately.
+
+Must run AFTER wire_trades_engine.
+"""
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from services.portfolio.lockout_hub import LockoutHub
+
+logger = logging.getLogger(__name__)
+
+
+async def wire_lockout_hub(app: FastAPI) -> None:
+    hub = LockoutHub(engine=app.state.trades_engine)
+    hub.bind(asyncio.get_running_loop())
+    app.state.lockout_hub = hub
+    logger.info("LockoutHub wired to TradesEngine")
+
+
+def close_lockout_hub(app: FastAPI) -> None:
+    hub = getattr(app.state, "lockout_hub", None)
+    if hub is not None:
+        hub.close()
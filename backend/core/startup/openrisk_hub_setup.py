@@ -1,18 +1,21 @@
 """OpenRiskHub wiring.
 
 Instantiates the hub (once, module-level) and wires it to every event that
-should trigger a rebuild:
-  - IB execDetailsEvent  → a fill landed
-  - IB openOrderEvent    → an order was placed / modified
-  - IB accountValueEvent → NetLiquidation moved (allocation column drifts)
+should trigger a recompute. Each handler marks only the symbol the event
+is about, so the debounced recompute touches just those rows:
+  - IB execDetailsEvent / positionEvent → a fill landed, size moved
+  - IB openOrderEvent / orderStatusEvent → an order was placed / modified
+    / cancelled
+  - IB accountValueEvent → NetLiquidation moved (allocation column, all rows)
   - OrderTracker fill handler → belt-and-braces for the fill path (goes
-    through the same debounced notify)
+    through the same debounce)
 
 Exit-request arm / disarm is triggered separately from the exits router
 after the DB mutation commits.
 
-Must run AFTER connect_ib, init_database, and wire_order_tracker (needs
-app.state.ib, app.state.db_pool, app.state.order_tracker).
+Must run AFTER connect_ib, init_database, wire_ib_state (its handlers
+must update the mirror before ours read it) and wire_order_tracker
+(needs app.state.ib, app.state.db_pool, app.state.order_tracker).
 """
 import asyncio
 import logging
@@ -33,16 +36,18 @@ async def wire_openrisk_hub(app: FastAPI) -> None:
     hub.bind_loop(asyncio.get_running_loop())
 
     # ib_async fires these events synchronously from the socket callback.
-    # notify() is safe from sync context — it just schedules a debounced
-    # rebuild on the bound loop.
-    ib.execDetailsEvent += hub.notify
-    ib.openOrderEvent += hub.notify
-    ib.accountValueEvent += hub.notify
+    # The handlers are safe from sync context — they mark a symbol dirty
+    # and schedule a debounced recompute on the bound loop.
+    ib.execDetailsEvent += hub.on_exec
+    ib.positionEvent += hub.on_position
+    ib.openOrderEvent += hub.on_order
+    ib.orderStatusEvent += hub.on_order
+    ib.accountValueEvent += hub.on_account_value
 
     # OrderTracker's fill handler is redundant with execDetailsEvent but
     # cheap (both feed the same debounce) and covers the case where the
     # execDetailsEvent binding somehow misses.
-    tracker.add_fill_handler(lambda _snap: hub.notify())
+    tracker.add_fill_handler(lambda snap: hub.notify_symbol(snap.get("symbol")))
 
     app.state.openrisk_hub = hub
     logger.info("OpenRiskHub wired to IB events + OrderTracker")
@@ -0,0 +1,33 @@
+"""QuoteBoard lifecycle.
+
+Binds the process-wide streaming quote board to the IB connection so
+IbClient.get_bid_ask_price serves quotes from shared, ref-counted lines
+instead of a subscribe/cancel round trip per call. Must run AFTER
+connect_ib; close_quote_board must run BEFORE disconnect_ib so the
+lines are cancelled on a live socket.
+"""
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from services.quote_board import quote_board
+
+logger = logging.getLogger(__name__)
+
+
+def wire_quote_board(app: FastAPI) -> None:
+    quote_board.bind(app.state.ib, asyncio.get_running_loop())
+    app.state.quote_board = quote_board
+    logger.info("QuoteBoard bound (idle TTL %.0fs)", quote_board.idle_ttl)
+
+
+def close_quote_board(app: FastAPI) -> None:
+    board = getattr(app.state, "quote_board", None)
+    if board is None:
+        return
+    try:
+        board.close()
+        logger.info("QuoteBoard closed")
+    except Exception:
+        logger.exception("Error closing QuoteBoard")
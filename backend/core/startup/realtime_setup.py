@@ -0,0 +1,86 @@
+"""Multiplexed realtime stream wiring.
+
+Builds the topic table behind GET /api/stream from the hubs already on
+app.state: each entry says how to subscribe through the owning hub and
+what snapshot a new subscriber starts from (the same first message the
+per-feed SSE endpoints send). Must run AFTER every hub is wired and the
+live scanner has been started.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+
+from helpers.broker import Subscription, broker
+from helpers.events import SSEEvent, StreamerStatusStore
+from services.live_scanner import TOPIC as SCANNER_TOPIC
+from services.realtime import RealtimeMux, TopicSource
+
+logger = logging.getLogger(__name__)
+
+
+def _hub_source(hub: Any, snapshot) -> TopicSource:
+    async def subscribe(after: Optional[str]) -> Subscription:
+        return hub.subscribe(after=after)
+
+    async def unsubscribe(sub: Subscription) -> None:
+        hub.unsubscribe(sub)
+
+    return TopicSource(subscribe, unsubscribe, snapshot)
+
+
+def _build_sources(app: FastAPI) -> Dict[str, TopicSource]:
+    state = app.state
+    tracker = state.order_tracker
+    openrisk = state.openrisk_hub
+    approvals = state.pending_approvals_hub
+    lockout = state.lockout_hub
+
+    async def orders_snapshot() -> List[Any]:
+        return [{"type": "snapshot", "orders": tracker.snapshot()}]
+
+    async def openrisk_snapshot() -> List[Any]:
+        return [await openrisk.snapshot_now()]
+
+    async def approvals_snapshot() -> List[Any]:
+        return [approvals.snapshot_now()]
+
+    async def lockout_snapshot() -> List[Any]:
+        return [lockout.snapshot_now()]
+
+    async def streamer_snapshot() -> List[Any]:
+        return [StreamerStatusStore.current()]
+
+    async def no_snapshot() -> List[Any]:
+        return []
+
+    sources = {
+        "orders": _hub_source(tracker, orders_snapshot),
+        "openrisk": _hub_source(openrisk, openrisk_snapshot),
+        "pending_approvals": _hub_source(approvals, approvals_snapshot),
+        "lockout": _hub_source(lockout, lockout_snapshot),
+        "streamer_status": _hub_source(StreamerStatusStore, streamer_snapshot),
+        "alarms": _hub_source(SSEEvent, no_snapshot),
+    }
+
+    # The scanner may have failed to start (non-fatal); the topic is still
+    # offered so a client asking for it doesn't lose its other topics --
+    # it just stays quiet.
+    async def scanner_subscribe(after: Optional[str]) -> Subscription:
+        return broker.subscribe(SCANNER_TOPIC, after=after)
+
+    async def scanner_unsubscribe(sub: Subscription) -> None:
+        broker.unsubscribe(sub)
+
+    async def scanner_snapshot() -> List[Any]:
+        mgr = getattr(state, "live_scanner_manager", None)
+        return list(mgr.current_snapshot()) if mgr is not None else []
+
+    sources["live_scanner"] = TopicSource(scanner_subscribe, scanner_unsubscribe, scanner_snapshot)
+    return sources
+
+
+def wire_realtime(app: FastAPI) -> None:
+    mux = RealtimeMux(_build_sources(app))
+    app.state.realtime = mux
+    logger.info("Realtime stream wired (topics: %s)", ", ".join(sorted(mux.sources)))
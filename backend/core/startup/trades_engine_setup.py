@@ -0,0 +1,50 @@
+"""TradesEngine wiring.
+
+Attaches the executions ledger, hydrates today's fills from Postgres,
+then binds the engine to IB: the fills ib_async synced at connect are
+reconciled on top (anything the DB didn't have yet is written back) and
+execDetailsEvent keeps it current. Finally registers the engine as the
+source for build_today_snapshot. Must run AFTER connect_ib and
+ensure_schema; stop_trades_engine must run BEFORE close_database so the
+last batch of fills is flushed.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from fastapi import FastAPI
+
+from services.portfolio.trades.executions_ledger import TIMEZONE, executions_ledger
+from services.portfolio.trades.trades_engine import trades_engine
+from services.portfolio.trades.trades_snapshot import set_trades_engine
+
+logger = logging.getLogger(__name__)
+
+
+async def wire_trades_engine(app: FastAPI) -> None:
+    executions_ledger.set_db_pool(app.state.db_pool)
+    executions_ledger.bind_loop(asyncio.get_running_loop())
+
+    try:
+        persisted = await executions_ledger.load_day(datetime.now(TIMEZONE).date())
+        trades_engine.hydrate(persisted)
+        logger.info("TradesEngine hydrated %d fill(s) from executions", len(persisted))
+    except Exception:
+        logger.exception("TradesEngine hydrate from DB failed; IB fills only")
+
+    trades_engine.set_ledger(executions_ledger)
+    trades_engine.bind(app.state.ib)
+    set_trades_engine(trades_engine)
+    app.state.trades_engine = trades_engine
+    app.state.executions_ledger = executions_ledger
+
+
+async def stop_trades_engine(app: FastAPI) -> None:
+    ledger = getattr(app.state, "executions_ledger", None)
+    if ledger is None:
+        return
+    try:
+        await ledger.close()
+        logger.info("Executions ledger flushed")
+    except Exception:
+        logger.exception("Error flushing executions ledger")
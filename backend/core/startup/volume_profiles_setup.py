@@ -0,0 +1,41 @@
+"""VolumeProfiles wiring.
+
+Attaches the DB pool to the volume-profile cache both scanners read
+RVOL from, drops profiles of past sessions, warms the cache with the
+stored ones (today's, and tomorrow's if the nightly build already ran)
+and starts the nightly build. Pruning and loading are best-effort -- a
+failure only means profiles get rebuilt on first use -- so they're
+logged, not raised.
+
+Must run AFTER ensure_schema (needs app.state.db_pool and the
+volume_profiles table) and wire_ib_state (the build universe includes
+held positions).
+"""
+import logging
+
+from fastapi import FastAPI
+
+from services.volume_profiles import NIGHTLY_BUILD_TIME, volume_profiles
+
+logger = logging.getLogger(__name__)
+
+
+async def wire_volume_profiles(app: FastAPI) -> None:
+    volume_profiles.set_db_pool(app.state.db_pool)
+    app.state.volume_profiles = volume_profiles
+    loaded = 0
+    try:
+        await volume_profiles.prune()
+        loaded = await volume_profiles.load()
+    except Exception:
+        logger.exception("VolumeProfiles load failed")
+    volume_profiles.start_nightly(app.state.ib)
+    logger.info(
+        "VolumeProfiles ready (%d stored, nightly build %s ET)",
+        loaded, NIGHTLY_BUILD_TIME.strftime("%H:%M"),
+    )
+
+
+async def stop_volume_profiles(app: FastAPI) -> None:
+    await volume_profiles.stop()
+    logger.info("VolumeProfiles stopped")
@@ -0,0 +1,162 @@
+"""
+Intraday bar warehouse persistence.
+
+The batch scanner needs several days of intraday bars per symbol, and all
+but the last few minutes of them never change during a session. They
+are kept here so services.bar_store only asks IB for what is newer than
+the stored coverage, across restarts too.
+
+    intraday_bars
+      con_id    BIGINT               -- IB's contract id
+      bar_size  TEXT                 -- IB barSizeSetting, e.g. "2 mins"
+      ts        TIMESTAMPTZ          -- bar start
+      open, high, low, close, volume DOUBLE PRECISION
+      PRIMARY KEY (con_id, bar_size, ts)
+
+    intraday_bar_coverage
+      con_id        BIGINT
+      bar_size      TEXT
+      covered_from  TIMESTAMPTZ      -- the stored bars are complete
+      covered_to    TIMESTAMPTZ      --   over [covered_from, covered_to]
+      PRIMARY KEY (con_id, bar_size)
+
+Bars are upserted (the newest bar is re-fetched while it is still
+forming) and pruned past a retention horizon.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import asyncpg
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+async def create_bars_tables(db_conn: asyncpg.Connection) -> None:
+    """Idempotent table creation. Called once at startup."""
+    await db_conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS intraday_bars (
+            con_id    BIGINT NOT NULL,
+            bar_size  TEXT NOT NULL,
+            ts        TIMESTAMPTZ NOT NULL,
+            open      DOUBLE PRECISION NOT NULL,
+            high      DOUBLE PRECISION NOT NULL,
+            low       DOUBLE PRECISION NOT NULL,
+            close     DOUBLE PRECISION NOT NULL,
+            volume    DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (con_id, bar_size, ts)
+        );
+        """
+    )
+    await db_conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS intraday_bar_coverage (
+            con_id        BIGINT NOT NULL,
+            bar_size      TEXT NOT NULL,
+            covered_from  TIMESTAMPTZ NOT NULL,
+            covered_to    TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (con_id, bar_size)
+        );
+        """
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+async def fetch_coverage(
+    db_conn: asyncpg.Connection, con_id: int, bar_size: str,
+) -> Optional[Tuple[datetime, datetime]]:
+    """(covered_from, covered_to) for one series, or None if never stored."""
+    row = await db_conn.fetchrow(
+        """
+        SELECT covered_from, covered_to
+        FROM intraday_bar_coverage
+        WHERE con_id = $1 AND bar_size = $2
+        """,
+        con_id, bar_size,
+    )
+    return (row["covered_from"], row["covered_to"]) if row else None
+
+
+async def fetch_bars(
+    db_conn: asyncpg.Connection, con_id: int, bar_size: str, since: datetime,
+) -> List[Dict]:
+    """Stored bars of one series from `since` on, oldest first."""
+    rows = await db_conn.fetch(
+        """
+        SELECT ts, open, high, low, close, volume
+        FROM intraday_bars
+        WHERE con_id = $1 AND bar_size = $2 AND ts >= $3
+        ORDER BY ts
+        """,
+        con_id, bar_size, since,
+    )
+    return [dict(r) for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+async def store_bars(
+    db_conn: asyncpg.Connection,
+    con_id: int,
+    bar_size: str,
+    bars: Iterable[Dict],
+    covered_from: datetime,
+    covered_to: datetime,
+) -> None:
+    """Upsert a batch of bars and the series' new coverage, atomically."""
+    records = [
+        (con_id, bar_size, b["ts"], b["open"], b["high"], b["low"], b["close"], b["volume"])
+        for b in bars
+    ]
+    async with db_conn.transaction():
+        if records:
+            await db_conn.executemany(
+                """
+                INSERT INTO intraday_bars (
+                    con_id, bar_size, ts, open, high, low, close, volume
+                )
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                ON CONFLICT (con_id, bar_size, ts) DO UPDATE SET
+                    open   = EXCLUDED.open,
+                    high   = EXCLUDED.high,
+                    low    = EXCLUDED.low,
+                    close  = EXCLUDED.close,
+                    volume = EXCLUDED.volume;
+                """,
+                records,
+            )
+        await db_conn.execute(
+            """
+            INSERT INTO intraday_bar_coverage (con_id, bar_size, covered_from, covered_to)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (con_id, bar_size) DO UPDATE SET
+                covered_from = EXCLUDED.covered_from,
+                covered_to   = EXCLUDED.covered_to;
+            """,
+            con_id, bar_size, covered_from, covered_to,
+        )
+
+
+async def prune_bars(db_conn: asyncpg.Connection, before: datetime) -> None:
+    """Drop bars older than `before` and pull coverage starts up to it."""
+    async with db_conn.transaction():
+        await db_conn.execute("DELETE FROM intraday_bars WHERE ts < $1", before)
+        await db_conn.execute(
+            "DELETE FROM intraday_bar_coverage WHERE covered_to < $1", before,
+        )
+        await db_conn.execute(
+            """
+            UPDATE intraday_bar_coverage SET covered_from = $1
+            WHERE covered_from < $1
+            """,
+            before,
+        )
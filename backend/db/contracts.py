@@ -0,0 +1,105 @@
+"""
+Contract registry persistence.
+
+Every IB order, quote and historical request needs a qualified Contract
+(one with a conId). Qualifying is an IB round trip, so the resolved
+contracts are cached in memory by services.contracts.ContractRegistry and
+mirrored here so a restart doesn't have to re-qualify every symbol.
+
+    contracts
+      symbol            TEXT    -- stored uppercase
+      sec_type          TEXT    -- STK | CFD
+      exchange          TEXT    -- routing exchange, normally SMART
+      currency          TEXT
+      con_id            BIGINT  -- IB's contract id
+      primary_exchange  TEXT
+      local_symbol      TEXT
+      trading_class     TEXT
+      updated           TIMESTAMPTZ
+      PRIMARY KEY (symbol, sec_type, exchange, currency)
+
+Rows are upserted, never truncated -- a conId is stable for the life of
+a listing, so old rows stay valid across sessions.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+import asyncpg
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+async def create_contracts_table(db_conn: asyncpg.Connection) -> None:
+    """Idempotent table creation. Called once at startup."""
+    await db_conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS contracts (
+            symbol            TEXT NOT NULL,
+            sec_type          TEXT NOT NULL,
+            exchange          TEXT NOT NULL,
+            currency          TEXT NOT NULL,
+            con_id            BIGINT NOT NULL,
+            primary_exchange  TEXT NOT NULL DEFAULT '',
+            local_symbol      TEXT NOT NULL DEFAULT '',
+            trading_class     TEXT NOT NULL DEFAULT '',
+            updated           TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (symbol, sec_type, exchange, currency)
+        );
+        """
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+async def fetch_all_contracts(db_conn: asyncpg.Connection) -> List[Dict]:
+    """Every stored contract. The table is small (one row per symbol ever
+    traded or scanned), so the registry loads it whole at startup."""
+    rows = await db_conn.fetch(
+        """
+        SELECT symbol, sec_type, exchange, currency, con_id,
+               primary_exchange, local_symbol, trading_class
+        FROM contracts
+        """
+    )
+    return [dict(r) for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+async def upsert_contracts(db_conn: asyncpg.Connection, rows: Iterable[Dict]) -> None:
+    """Insert or refresh a batch of resolved contracts in one round trip."""
+    records = [
+        (
+            r["symbol"], r["sec_type"], r["exchange"], r["currency"],
+            int(r["con_id"]),
+            r.get("primary_exchange") or "",
+            r.get("local_symbol") or "",
+            r.get("trading_class") or "",
+        )
+        for r in rows
+    ]
+    if not records:
+        return
+    await db_conn.executemany(
+        """
+        INSERT INTO contracts (
+            symbol, sec_type, exchange, currency, con_id,
+            primary_exchange, local_symbol, trading_class
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT (symbol, sec_type, exchange, currency) DO UPDATE SET
+            con_id           = EXCLUDED.con_id,
+            primary_exchange = EXCLUDED.primary_exchange,
+            local_symbol     = EXCLUDED.local_symbol,
+            trading_class    = EXCLUDED.trading_class,
+            updated          = NOW();
+        """,
+        records,
+    )
@@ -0,0 +1,141 @@
+"""
+Executions ledger persistence.
+
+IB's reqExecutions only reaches back over the current session, and every
+trade-log / lockout / entry-attempt view used to be rebuilt from it. The
+TradesEngine now writes every fill it folds in to this table (batched,
+deduplicated on execId), so:
+
+  - a restart hydrates today's TradesSnapshot from here without IB;
+  - trade-log history over weeks or months is an indexed range scan.
+
+    executions
+      exec_id    TEXT PRIMARY KEY     -- IB execId, unique per execution
+      perm_id    BIGINT               -- IB permId of the parent order
+      symbol     TEXT                 -- uppercase
+      con_id     BIGINT
+      sec_type   TEXT
+      action     TEXT                 -- BOT | SLD
+      quantity   DOUBLE PRECISION
+      price      DOUBLE PRECISION
+      time       TIMESTAMPTZ          -- execution time
+      exchange   TEXT
+      INDEX (symbol, time), INDEX (time)
+
+Never truncated -- this is the permanent fill history.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import asyncpg
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+async def create_executions_table(db_conn: asyncpg.Connection) -> None:
+    """Idempotent table + index creation. Called once at startup."""
+    await db_conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS executions (
+            exec_id   TEXT PRIMARY KEY,
+            perm_id   BIGINT NOT NULL DEFAULT 0,
+            symbol    TEXT NOT NULL,
+            con_id    BIGINT NOT NULL DEFAULT 0,
+            sec_type  TEXT NOT NULL DEFAULT '',
+            action    TEXT NOT NULL,
+            quantity  DOUBLE PRECISION NOT NULL,
+            price     DOUBLE PRECISION NOT NULL,
+            time      TIMESTAMPTZ NOT NULL,
+            exchange  TEXT NOT NULL DEFAULT ''
+        );
+        """
+    )
+    await db_conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_executions_symbol_time
+            ON executions (symbol, time);
+        """
+    )
+    await db_conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_executions_time
+            ON executions (time);
+        """
+    )
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+async def insert_executions(db_conn: asyncpg.Connection, rows: Iterable[Dict]) -> None:
+    """
+    Bulk insert in one round trip. Rows already present (same exec_id) are
+    skipped, so replaying the day's fills after a restart is harmless.
+    """
+    records = [
+        (
+            r["exec_id"], int(r.get("perm_id") or 0), r["symbol"].upper(),
+            int(r.get("con_id") or 0), r.get("sec_type") or "",
+            r["action"], float(r["quantity"]), float(r["price"]),
+            r["time"], r.get("exchange") or "",
+        )
+        for r in rows
+        if r.get("exec_id")
+    ]
+    if not records:
+        return
+    await db_conn.executemany(
+        """
+        INSERT INTO executions (
+            exec_id, perm_id, symbol, con_id, sec_type,
+            action, quantity, price, time, exchange
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+        ON CONFLICT (exec_id) DO NOTHING;
+        """,
+        records,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+async def fetch_executions(
+    db_conn: asyncpg.Connection,
+    start: datetime,
+    end: datetime,
+    symbol: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Executions with start <= time < end, oldest first. With `symbol` the
+    (symbol, time) index serves the scan directly.
+    """
+    if symbol:
+        rows = await db_conn.fetch(
+            """
+            SELECT exec_id, perm_id, symbol, con_id, sec_type,
+                   action, quantity, price, time, exchange
+            FROM executions
+            WHERE symbol = $1 AND time >= $2 AND time < $3
+            ORDER BY time ASC, exec_id ASC;
+            """,
+            symbol.upper(), start, end,
+        )
+    else:
+        rows = await db_conn.fetch(
+            """
+            SELECT exec_id, perm_id, symbol, con_id, sec_type,
+                   action, quantity, price, time, exchange
+            FROM executions
+            WHERE time >= $1 AND time < $2
+            ORDER BY time ASC, exec_id ASC;
+            """,
+            start, end,
+        )
+    return [dict(r) for r in rows]
@@ -0,0 +1,89 @@
+"""
+Time-of-day volume profile persistence.
+
+One row per symbol per ET session: the average volume of each 5-minute
+bin of the 04:00-20:00 ET session over the lookback days, plus the
+daily ATR, as built by services.volume_profiles. The nightly job writes
+the next session's profiles here, so a restart during the day serves
+RVOL straight from this table instead of re-downloading the history.
+
+    volume_profiles
+      symbol      TEXT
+      day         DATE                   -- ET session the profile is for
+      bin_volume  BYTEA                  -- float32[N_BINS], little-endian
+      atr         DOUBLE PRECISION NULL  -- regular-session ATR, if known
+      built_at    TIMESTAMPTZ DEFAULT NOW()
+      PRIMARY KEY (symbol, day)
+
+Profiles for past sessions are pruned at startup.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, List
+
+import asyncpg
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+async def create_volume_profiles_table(db_conn: asyncpg.Connection) -> None:
+    """Idempotent table creation. Called once at startup."""
+    await db_conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS volume_profiles (
+            symbol      TEXT NOT NULL,
+            day         DATE NOT NULL,
+            bin_volume  BYTEA NOT NULL,
+            atr         DOUBLE PRECISION,
+            built_at    TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (symbol, day)
+        );
+        """
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+async def fetch_volume_profiles(db_conn: asyncpg.Connection, since: date) -> List[Dict]:
+    """Every stored profile for the session `since` or later."""
+    rows = await db_conn.fetch(
+        """
+        SELECT symbol, day, bin_volume, atr
+        FROM volume_profiles
+        WHERE day >= $1
+        """,
+        since,
+    )
+    return [dict(r) for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+async def store_volume_profiles(db_conn: asyncpg.Connection, profiles: Iterable[Dict]) -> None:
+    """Upsert a batch of profiles (symbol, day, bin_volume, atr)."""
+    records = [(p["symbol"], p["day"], p["bin_volume"], p["atr"]) for p in profiles]
+    if not records:
+        return
+    await db_conn.executemany(
+        """
+        INSERT INTO volume_profiles (symbol, day, bin_volume, atr)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (symbol, day) DO UPDATE SET
+            bin_volume = EXCLUDED.bin_volume,
+            atr        = EXCLUDED.atr,
+            built_at   = NOW();
+        """,
+        records,
+    )
+
+
+async def prune_volume_profiles(db_conn: asyncpg.Connection, before: date) -> None:
+    """Drop profiles for sessions before `before`."""
+    await db_conn.execute("DELETE FROM volume_profiles WHERE day < $1", before)
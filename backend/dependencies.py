@@ -6,6 +6,8 @@ import asyncpg
 from services.portfolio.order_tracker import OrderTracker
 from services.portfolio.openrisk_hub import OpenRiskHub
 from services.portfolio.pending_approvals_hub import PendingApprovalsHub
+from services.portfolio.lockout_hub import LockoutHub
+from services.realtime import RealtimeMux
 
 
 # --- IBKR dependency ---
@@ -34,6 +36,20 @@ def get_pending_approvals_hub(request: Request) -> PendingApprovalsHub:
     return hub
 
 
+# --- Lockout hub dependency ---
+# Push-based lockout state for the banner. See services.portfolio.lockout_hub.
+def get_lockout_hub(request: Request) -> LockoutHub:
+    hub: LockoutHub = request.app.state.lockout_hub
+    return hub
+
+
+# --- Realtime stream dependency ---
+# One multiplexed SSE connection for every browser feed. See services.realtime.
+def get_realtime(request: Request) -> RealtimeMux:
+    mux: RealtimeMux = request.app.state.realtime
+    return mux
+
+
 # --- Database dependency ---
 async def get_db_conn(request: Request) -> AsyncGenerator[asyncpg.Connection, None]:
     pool: asyncpg.Pool = request.app.state.db_pool
@@ -0,0 +1,551 @@
+"""
+In-process pub/sub broker shared by every SSE hub.
+
+Each hub used to carry its own fan-out loop with its own slow-consumer
+rule -- drop the oldest message, drop the whole client, or (for the
+streamer status and alarms) an unbounded deque. The broker replaces all
+of them with one implementation:
+
+  - named topics, one bounded queue per subscriber;
+  - a per-topic delivery policy:
+      CONFLATE  latest-value per key (`key(msg)`, default one key). A
+                newer message replaces the queued one for the same key,
+                so a slow tab only ever holds the newest state. For
+                snapshot-style topics.
+      LOSSLESS  every message in order. For event topics.
+    On overflow (more queued messages, or CONFLATE keys, than `maxsize`)
+    the subscriber's backlog is replaced by `resync()` (a full snapshot)
+    when the topic has one, else the subscriber is closed and its SSE
+    stream ends -- the browser reconnects and gets a fresh snapshot.
+    Nothing is silently skipped under either policy.
+  - optional `retain`: messages published while nobody is subscribed
+    are held (bounded) and handed to the next subscriber;
+  - per-topic metrics: queue depth, drops, conflations, resyncs,
+    disconnects, and fan-out latency (publish -> subscriber dequeue).
+
+publish() never blocks and never awaits, so it is safe from ib_async's
+sync callbacks; from a non-loop thread (sync FastAPI endpoints run in a
+threadpool) it hops onto the bound loop with call_soon_threadsafe.
+
+Subscription.get() behaves like asyncio.Queue.get(), so SSE generators
+keep their `asyncio.wait_for(sub.get(), 15.0)` keepalive loop; it raises
+SubscriptionClosed once the broker has closed the subscriber.
+
+Serialize once: every published message travels in one Envelope shared
+by all of the topic's subscribers. SSE generators read
+`(await sub.get_envelope()).frame` (a ready `data: ...\n\n` byte frame)
+or `.data` (the JSON text, for sse_starlette), and the envelope encodes
+on first access and caches -- so N tabs cost one encode, not N. Encoding
+uses orjson when installed (it ships with fastapi[all]) and the stdlib
+json module otherwise; pydantic models go through model_dump_json(),
+and a message with a to_json() method renders itself (the live scanner's
+frames, spliced from per-row JSON it already holds).
+Per-topic encode count / bytes / time are part of stats().
+
+Resume: every published message gets the next id of its topic, written
+as the SSE `id:` field (`<epoch>:<n>`, epoch = this process, so ids from
+before a restart are never mistaken for current ones). Each topic keeps
+a bounded replay ring of its latest envelopes. subscribe(name, after=id)
+with the client's Last-Event-ID queues just the messages after it and
+sets `sub.resumed`; when the gap is off the end of the ring, doesn't fit
+the subscriber's queue, or the id is from another epoch, `resumed` stays
+False and the caller sends a full snapshot instead, stamped with
+Subscription.snapshot_cursor() (which also drops anything queued that
+the snapshot already covers).
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+CONFLATE = "conflate"
+LOSSLESS = "lossless"
+
+# Default per-subscriber queue bound.
+DEFAULT_MAXSIZE = 64
+
+# Smoothing factor for the fan-out latency moving average.
+LATENCY_EWMA_ALPHA = 0.1
+
+# Default per-topic replay ring length (messages kept for resume).
+REPLAY_RING = 256
+
+# CONFLATE queue key of a resync snapshot (never equal to a message key).
+_RESYNC_KEY = object()
+
+# Event-id prefix for this process; see module docstring.
+EPOCH = uuid.uuid4().hex[:8]
+
+
+def format_event_id(n: int) -> str:
+    return f"{EPOCH}:{n}"
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[int]:
+    """Sequence number of a Last-Event-ID from this process, else None."""
+    if not event_id:
+        return None
+    epoch, _, n = event_id.strip().partition(":")
+    if epoch != EPOCH or not n.isdigit():
+        return None
+    return int(n)
+
+
+def encode_json(msg: Any) -> bytes:
+    """Compact UTF-8 JSON for one SSE payload."""
+    render = getattr(msg, "to_json", None)
+    if render is not None:
+        return render()
+    if hasattr(msg, "model_dump_json"):
+        return msg.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(msg, default=str)
+    return json.dumps(msg, separators=(",", ":"), default=str).encode()
+
+
+def sse_frame(
+    msg: Any, event: Optional[str] = None, event_id: Optional[str] = None,
+) -> bytes:
+    """One `data: <json>\n\n` frame (prefixed `event: <name>` / `id: <id>`
+    when given), for payloads sent outside a topic (per-client snapshots)."""
+    head = b"event: " + event.encode() + b"\n" if event else b""
+    if event_id:
+        head += b"id: " + event_id.encode() + b"\n"
+    return head + b"data: " + encode_json(msg) + b"\n\n"
+
+
+PING_FRAME = sse_frame({"type": "ping"})
+
+
+class SubscriptionClosed(Exception):
+    """The broker closed this subscriber (overflow, no resync)."""
+
+
+class _TopicStats:
+
+    __slots__ = ("published", "delivered", "dropped", "conflated", "resyncs",
+                 "disconnects", "latency_avg", "latency_max",
+                 "encodes", "encoded_bytes", "encode_total", "encode_max",
+                 "resumes", "resume_misses")
+
+    def __init__(self) -> None:
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.resyncs = 0
+        self.disconnects = 0
+        self.latency_avg = 0.0
+        self.latency_max = 0.0
+        self.encodes = 0
+        self.encoded_bytes = 0
+        self.encode_total = 0.0
+        self.encode_max = 0.0
+        self.resumes = 0
+        self.resume_misses = 0
+
+    def observe_latency(self, seconds: float) -> None:
+        self.delivered += 1
+        if self.delivered == 1:
+            self.latency_avg = seconds
+        else:
+            self.latency_avg += LATENCY_EWMA_ALPHA * (seconds - self.latency_avg)
+        if seconds > self.latency_max:
+            self.latency_max = seconds
+
+    def observe_encode(self, seconds: float, size: int) -> None:
+        self.encodes += 1
+        self.encoded_bytes += size
+        self.encode_total += seconds
+        if seconds > self.encode_max:
+            self.encode_max = seconds
+
+
+class Envelope:
+    """One published message, shared by every subscriber queue it lands
+    in. The JSON encode happens at most once, on first access."""
+
+    __slots__ = ("msg", "ts", "id", "_topic", "_json", "_data", "_frame", "_tagged")
+
+    def __init__(self, msg: Any, ts: float, topic: "Topic", id: int) -> None:
+        self.msg = msg
+        self.ts = ts
+        self.id = id
+        self._topic = topic
+        self._json: Optional[bytes] = None
+        self._data: Optional[str] = None
+        self._frame: Optional[bytes] = None
+        self._tagged: Optional[bytes] = None
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            t0 = time.perf_counter()
+            self._json = encode_json(self.msg)
+            self._topic.stats.observe_encode(time.perf_counter() - t0, len(self._json))
+        return self._json
+
+    @property
+    def data(self) -> str:
+        """JSON text, for sse_starlette's `{"data": ...}` events."""
+        if self._data is None:
+            self._data = self.json.decode()
+        return self._data
+
+    @property
+    def event_id(self) -> str:
+        """SSE `id:` value (also what sse_starlette events take as "id")."""
+        return format_event_id(self.id)
+
+    @property
+    def frame(self) -> bytes:
+        """Complete SSE frame, for StreamingResponse generators."""
+        if self._frame is None:
+            self._frame = (
+                b"id: " + self.event_id.encode() + b"\ndata: " + self.json + b"\n\n"
+            )
+        return self._frame
+
+    @property
+    def tagged(self) -> bytes:
+        """SSE frame with `event: <topic>`, for the multiplexed stream."""
+        if self._tagged is None:
+            self._tagged = b"event: " + self._topic.name.encode() + b"\n" + self.frame
+        return self._tagged
+
+
+class Topic:
+    """Configuration + subscribers + metrics for one named topic."""
+
+    def __init__(
+        self,
+        name: str,
+        policy: str = LOSSLESS,
+        maxsize: int = DEFAULT_MAXSIZE,
+        key: Optional[Callable[[Any], Any]] = None,
+        resync: Optional[Callable[[], Any]] = None,
+        retain: int = 0,
+        replay: int = REPLAY_RING,
+    ) -> None:
+        if policy not in (CONFLATE, LOSSLESS):
+            raise ValueError(f"Unknown broker policy {policy!r}")
+        self.name = name
+        self.policy = policy
+        self.maxsize = max(1, maxsize)
+        self.key = key
+        self.resync = resync
+        self.retain = retain
+        self.subscribers: List[Subscription] = []
+        self.retained: Deque[Envelope] = deque(maxlen=retain or None)
+        self.seq = 0
+        self.ring: Deque[Envelope] = deque(maxlen=max(0, replay))
+        self.stats = _TopicStats()
+        # resync() envelope for the current seq, shared by every subscriber
+        # that overflows before the next publish.
+        self._resync_env: Optional[Envelope] = None
+
+    def resync_envelope(self, ts: float) -> Envelope:
+        """The resync() snapshot as of the latest message: built and
+        encoded once per seq, however many subscribers overflow on it."""
+        env = self._resync_env
+        if env is None or env.id != self.seq:
+            env = self._resync_env = Envelope(self.resync(), ts, self, self.seq)
+        return env
+
+    def replay_after(self, n: int) -> Optional[List[Envelope]]:
+        """Envelopes with id > n, or None if the ring no longer has them
+        all (or they might not fit one subscriber queue)."""
+        missed = self.seq - n
+        if missed < 0:
+            return None
+        if missed == 0:
+            return []
+        if missed > len(self.ring) or missed > self.maxsize:
+            return None
+        return list(itertools.islice(reversed(self.ring), missed))[::-1]
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        depths = [s.depth() for s in self.subscribers]
+        st = self.stats
+        return {
+            "policy": self.policy,
+            "subscribers": len(self.subscribers),
+            "queue_depth_max": max(depths, default=0),
+            "queue_depth_total": sum(depths),
+            "retained": len(self.retained),
+            "last_id": self.seq,
+            "replay_ring": len(self.ring),
+            "resumes": st.resumes,
+            "resume_misses": st.resume_misses,
+            "published": st.published,
+            "delivered": st.delivered,
+            "dropped": st.dropped,
+            "conflated": st.conflated,
+            "resyncs": st.resyncs,
+            "disconnects": st.disconnects,
+            "latency_ms_avg": round(st.latency_avg * 1000, 3),
+            "latency_ms_max": round(st.latency_max * 1000, 3),
+            "encodes": st.encodes,
+            "encoded_bytes": st.encoded_bytes,
+            "encode_ms_avg": round(st.encode_total / st.encodes * 1000, 4) if st.encodes else 0.0,
+            "encode_ms_max": round(st.encode_max * 1000, 4),
+        }
+
+
+class Subscription:
+    """One subscriber's bounded queue on one topic."""
+
+    __slots__ = ("topic", "closed", "resumed", "_items", "_wakeup")
+
+    def __init__(self, topic: Topic) -> None:
+        self.topic = topic
+        self.closed = False
+        # True when subscribe(after=...) replayed the gap; the caller then
+        # skips its snapshot.
+        self.resumed = False
+        # LOSSLESS: deque of Envelope. CONFLATE: OrderedDict key -> Envelope.
+        self._items: Any = OrderedDict() if topic.policy == CONFLATE else deque()
+        self._wakeup = asyncio.Event()
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def _offer(self, env: Envelope) -> None:
+        topic = self.topic
+        if topic.policy == CONFLATE:
+            k = topic.key(env.msg) if topic.key is not None else None
+            if k in self._items:
+                topic.stats.conflated += 1
+                self._items[k] = env
+            else:
+                if len(self._items) >= topic.maxsize:
+                    self._overflow(env.ts)
+                    return
+                self._items[k] = env
+        else:
+            if len(self._items) >= topic.maxsize:
+                self._overflow(env.ts)
+                return
+            self._items.append(env)
+        self._wakeup.set()
+
+    def _overflow(self, ts: float) -> None:
+        topic = self.topic
+        topic.stats.dropped += len(self._items) + 1
+        self._items.clear()
+        if topic.resync is not None:
+            try:
+                env = topic.resync_envelope(ts)
+                if topic.policy == CONFLATE:
+                    self._items[_RESYNC_KEY] = env
+                else:
+                    self._items.append(env)
+                topic.stats.resyncs += 1
+                self._wakeup.set()
+                return
+            except Exception:
+                logger.exception("Broker resync for %s failed", topic.name)
+        logger.warning("Broker: closing slow subscriber on %s", topic.name)
+        topic.stats.disconnects += 1
+        self.close()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    def snapshot_cursor(self) -> str:
+        """Call right after building a snapshot: drops what it already
+        covers from the queue and returns the id to stamp on it."""
+        n = self.topic.seq
+        self.skip_through(n)
+        return format_event_id(n)
+
+    def skip_through(self, n: int) -> None:
+        """Drop queued messages with id <= n (already in a snapshot)."""
+        if self.topic.policy == CONFLATE:
+            for k in [k for k, env in self._items.items() if env.id <= n]:
+                del self._items[k]
+        else:
+            while self._items and self._items[0].id <= n:
+                self._items.popleft()
+
+    def get_envelope_nowait(self) -> Envelope:
+        if not self._items:
+            if self.closed:
+                raise SubscriptionClosed(self.topic.name)
+            raise asyncio.QueueEmpty
+        if self.topic.policy == CONFLATE:
+            _, env = self._items.popitem(last=False)
+        else:
+            env = self._items.popleft()
+        self.topic.stats.observe_latency(time.monotonic() - env.ts)
+        return env
+
+    async def get_envelope(self) -> Envelope:
+        """Next envelope; waits if none. Cancellation-safe."""
+        while True:
+            if self._items or self.closed:
+                return self.get_envelope_nowait()
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    def get_nowait(self) -> Any:
+        return self.get_envelope_nowait().msg
+
+    async def get(self) -> Any:
+        """Next message; waits if none. Cancellation-safe."""
+        return (await self.get_envelope()).msg
+
+
+class Broker:
+    """
+    Public surface:
+      - topic(name, policy, maxsize, key, resync, retain, replay)
+                                     : declare / reconfigure
+      - subscribe(name, after=None) / unsubscribe(sub)
+      - cursor(name)                 : event id of the latest message
+      - publish(name, msg)
+      - subscriber_count(name)
+      - topic_stats(name) / stats()
+    """
+
+    def __init__(self) -> None:
+        self._topics: Dict[str, Topic] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def topic(
+        self,
+        name: str,
+        policy: str = LOSSLESS,
+        maxsize: int = DEFAULT_MAXSIZE,
+        key: Optional[Callable[[Any], Any]] = None,
+        resync: Optional[Callable[[], Any]] = None,
+        retain: int = 0,
+        replay: int = REPLAY_RING,
+    ) -> Topic:
+        """Declare a topic. Re-declaring updates its config in place, so
+        a hub re-created in tests keeps the same subscribers, ids and
+        replay ring."""
+        existing = self._topics.get(name)
+        if existing is None:
+            existing = self._topics[name] = Topic(
+                name, policy, maxsize, key, resync, retain, replay,
+            )
+            return existing
+        existing.policy, existing.maxsize = policy, max(1, maxsize)
+        existing.key, existing.resync, existing.retain = key, resync, retain
+        existing._resync_env = None
+        if existing.ring.maxlen != max(0, replay):
+            existing.ring = deque(existing.ring, maxlen=max(0, replay))
+        return existing
+
+    def _get(self, name: str) -> Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = Topic(name)
+        return topic
+
+    def subscribe(self, name: str, after: Optional[str] = None) -> Subscription:
+        """New subscriber. `after` is a Last-Event-ID: when the ring still
+        covers everything since it, those messages are queued first and
+        `sub.resumed` is set. Replay and registration happen in one step,
+        so nothing published in between is missed or doubled."""
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        topic = self._get(name)
+        sub = Subscription(topic)
+        if after is not None:
+            n = parse_event_id(after)
+            missed = topic.replay_after(n) if n is not None else None
+            if missed is None:
+                topic.stats.resume_misses += 1
+            else:
+                topic.stats.resumes += 1
+                sub.resumed = True
+                for env in missed:
+                    sub._offer(env)
+                # Retained messages are in the ring too; already replayed.
+                topic.retained.clear()
+        topic.subscribers.append(sub)
+        while topic.retained:
+            sub._offer(topic.retained.popleft())
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        try:
+            sub.topic.subscribers.remove(sub)
+        except ValueError:
+            pass
+        sub.close()
+
+    def cursor(self, name: str) -> str:
+        """Event id of the topic's latest message -- stamp it on a
+        snapshot so a reconnect resumes from there."""
+        return format_event_id(self._get(name).seq)
+
+    def subscriber_count(self, name: str) -> int:
+        topic = self._topics.get(name)
+        return len(topic.subscribers) if topic is not None else 0
+
+    def publish(self, name: str, msg: Any) -> None:
+        """Fan `msg` out to every subscriber of `name`. Never blocks."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self._publish, name, msg)
+                return
+        self._publish(name, msg)
+
+    def _publish(self, name: str, msg: Any) -> None:
+        topic = self._get(name)
+        topic.stats.published += 1
+        topic.seq += 1
+        env = Envelope(msg, time.monotonic(), topic, topic.seq)
+        topic.ring.append(env)
+        if not topic.subscribers:
+            if topic.retain:
+                if len(topic.retained) == topic.retained.maxlen:
+                    topic.stats.dropped += 1
+                topic.retained.append(env)
+            return
+        for sub in list(topic.subscribers):
+            sub._offer(env)
+            if sub.closed:
+                self.unsubscribe(sub)
+
+    def topic_stats(self, name: str) -> Dict[str, Any]:
+        topic = self._topics.get(name)
+        return topic.snapshot_stats() if topic is not None else {}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: t.snapshot_stats() for name, t in self._topics.items()}
+
+
+# Module-level singleton -- one broker per process.
+broker = Broker()
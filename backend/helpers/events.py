@@ -1,48 +1,63 @@
 """
 Lightweight in-process pub/sub for SSE streams.
 
-Each class is a process-local queue (or store) that an HTTP handler can write
-into and an SSE generator can drain. They are deliberately simple - no
-external broker, no persistence; the assumption is that there is one backend
-worker and the stream is best-effort.
+Each class is a process-local store that an HTTP handler can write into
+and an SSE generator can drain, both backed by a topic on the in-process
+broker (helpers.broker). No external broker, no persistence; the
+assumption is that there is one backend worker.
 
 Two flavours live here:
 
-- ``SSEEvent``           -- legacy alarms queue, kept as-is so the existing
-                            /api/alarms/* endpoints keep working.
+- ``SSEEvent``           -- alarms, on the LOSSLESS "alarms" topic. Every
+                            connected client sees every alarm; alarms
+                            emitted while nobody is connected are retained
+                            (bounded) for the next one to connect.
 - ``StreamerStatusStore``-- heartbeat + status tracker for the streamer
                             process. The streamer pings POST
                             /api/streamer-status/heartbeat at a fixed cadence;
                             a backend watchdog flips the status to "offline"
                             when no heartbeat lands inside the threshold.
-                            Status transitions are pushed to subscribers.
+                            Status transitions are pushed to subscribers
+                            on the CONFLATE "streamer_status" topic.
 """
 
 from __future__ import annotations
 
 import time
-from collections import deque
-from typing import Deque, Optional
+from typing import Optional
 
+from helpers.broker import CONFLATE, LOSSLESS, Subscription, broker
 
-class SSEEvent:
-    """Alarms queue (existing - kept for backwards compatibility)."""
 
-    EVENTS: Deque = deque()
+ALARMS_TOPIC = "alarms"
+STREAMER_STATUS_TOPIC = "streamer_status"
+
+# Alarms held for the next client while no stream is connected.
+ALARMS_RETAIN = 256
+
+broker.topic(ALARMS_TOPIC, policy=LOSSLESS, maxsize=64, retain=ALARMS_RETAIN)
+broker.topic(STREAMER_STATUS_TOPIC, policy=CONFLATE, maxsize=1)
+
+
+class SSEEvent:
+    """Alarms fan-out (same add_event / count surface as before)."""
 
     @staticmethod
     def add_event(event) -> None:
-        SSEEvent.EVENTS.append(event)
+        broker.publish(ALARMS_TOPIC, event)
+
+    @staticmethod
+    def subscribe(after: Optional[str] = None) -> Subscription:
+        return broker.subscribe(ALARMS_TOPIC, after=after)
 
     @staticmethod
-    def get_event():
-        if len(SSEEvent.EVENTS) > 0:
-            return SSEEvent.EVENTS.popleft()
-        return None
+    def unsubscribe(sub: Subscription) -> None:
+        broker.unsubscribe(sub)
 
     @staticmethod
     def count() -> int:
-        return len(SSEEvent.EVENTS)
+        """Alarms waiting for a client to connect."""
+        return broker.topic_stats(ALARMS_TOPIC).get("retained", 0)
 
 
 class StreamerStatusStore:
@@ -56,16 +71,13 @@ class StreamerStatusStore:
     (so closing the cmd window is detected). The streamer also fires
     /stop on a clean exit as a fast-path notification.
 
-    Status transitions are pushed onto a queue consumed by the SSE
-    generator at GET /api/streamer-status/stream.
+    Status transitions are published on the broker and consumed by the
+    SSE generator at GET /api/streamer-status/stream.
     """
 
     _status: str = "offline"  # "running" | "offline" | "error"
     _last_transition_ts: float = 0.0
     _pid: Optional[int] = None
-    # One queue per connected SSE client. Transitions are broadcast to every
-    # subscriber so multiple tabs / components stay in sync.
-    _subscribers: list = []
 
     @staticmethod
     def mark_running(pid: Optional[int] = None) -> dict:
@@ -98,18 +110,15 @@ class StreamerStatusStore:
         }
 
     @staticmethod
-    def subscribe() -> Deque[dict]:
-        """Create a new per-client queue. Caller must unsubscribe on close."""
-        q: Deque[dict] = deque()
-        StreamerStatusStore._subscribers.append(q)
-        return q
+    def subscribe(after: Optional[str] = None) -> Subscription:
+        """New per-client subscription. Caller must unsubscribe on close.
+        Every connected client (sidebar, watchlist panel, other tabs) gets
+        each transition; a slow one keeps only the newest."""
+        return broker.subscribe(STREAMER_STATUS_TOPIC, after=after)
 
     @staticmethod
-    def unsubscribe(q: Deque[dict]) -> None:
-        try:
-            StreamerStatusStore._subscribers.remove(q)
-        except ValueError:
-            pass
+    def unsubscribe(sub: Subscription) -> None:
+        broker.unsubscribe(sub)
 
     # -- internal helpers --------------------------------------------------
     @staticmethod
@@ -121,5 +130,4 @@ class StreamerStatusStore:
             "pid": StreamerStatusStore._pid,
             "last_transition_ts": StreamerStatusStore._last_transition_ts,
         }
-        for q in StreamerStatusStore._subscribers:
-            q.append(evt)
+        broker.publish(STREAMER_STATUS_TOPIC, evt)
@@ -73,3 +73,15 @@ SCANNER_PRESETS = {
         "stockTypeFilter": "CORP",
     },
 }
+
+
+# Scans the live scanner runs at once: table name ("side" on the wire) ->
+# preset above. Any SCANNER_PRESETS entry works; each costs one IB scanner
+# subscription, and their symbols share the live scanner's market-data
+# line budget (LIVE_SCANNER_MAX_LINES).
+LIVE_SCANS = {
+    "up": "live_gap_up_scan",
+    "down": "live_gap_down_scan",
+    "hot": "high_activity_scan",
+    "smallcaps": "high_activity_smallcaps_scan",
+}
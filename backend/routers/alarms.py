@@ -3,6 +3,7 @@ from typing import List
 from services.alarms import  AlarmResponse, get_alarms
 from dependencies import get_db_conn
 from helpers.events import SSEEvent
+from helpers.broker import SubscriptionClosed
 from sse_starlette.sse import EventSourceResponse
 import asyncio
 
@@ -31,27 +32,34 @@ async def new_event(event: AlarmResponse):
 @router.get("/stream")
 async def stream_events(request: Request):
 
+    # Last-Event-ID: replay the alarms missed while reconnecting.
+    sub = SSEEvent.subscribe(after=request.headers.get("last-event-id"))
+
     async def event_generator():
-        while True:
-            if await request.is_disconnected():
-                print("SSE Disconnected")
-                break
-
-            sse_event = SSEEvent.get_event()
-
-            if sse_event:
-                yield {
-                    "event": "message",
-                    "data": sse_event.model_dump_json(),
-                }
-            else:
-                #  HEARTBEAT (VERY IMPORTANT)
-                yield {
-                    "event": "ping",
-                    "data": "keep-alive",
-                }
-
-            await asyncio.sleep(1)
+        try:
+            while True:
+                if await request.is_disconnected():
+                    print("SSE Disconnected")
+                    break
+
+                try:
+                    env = await asyncio.wait_for(sub.get_envelope(), timeout=15.0)
+                    yield {
+                        "event": "message",
+                        "id": env.event_id,
+                        "data": env.data,
+                    }
+                except asyncio.TimeoutError:
+                    #  HEARTBEAT (VERY IMPORTANT)
+                    yield {
+                        "event": "ping",
+                        "data": "keep-alive",
+                    }
+        except SubscriptionClosed:
+            # Fell behind the lossless alarms topic; the client reconnects.
+            pass
+        finally:
+            SSEEvent.unsubscribe(sub)
 
     return EventSourceResponse(event_generator())
 
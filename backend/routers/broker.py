@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from helpers.broker import broker
+
+
+router = APIRouter(
+    prefix="/api/broker",
+    tags=["Broker"]
+)
+
+
+@router.get("/stats")
+async def broker_stats() -> dict:
+    """
+    Per-topic pub/sub metrics: subscribers, queue depth (max / total),
+    published / delivered / dropped / conflated counts, resyncs and
+    slow-consumer disconnects, fan-out latency (publish -> dequeue,
+    EWMA and max, in ms), and JSON encode count / bytes / time (one
+    encode per published message, however many clients). See
+    helpers.broker.
+    """
+    return broker.stats()
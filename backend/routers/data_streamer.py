@@ -51,46 +51,40 @@ async def stream_streamer_status(request: Request):
     """
     SSE stream of status transitions. We send the current snapshot on
     connect so a fresh client paints the dot immediately, then push one
-    event per state change. Each connection has its own subscription
-    queue so multiple clients (sidebar, watchlist panel, other tabs)
-    all see every transition.
+    event per state change. Each connection has its own broker
+    subscription so multiple clients (sidebar, watchlist panel, other
+    tabs) all see every transition, pushed as it happens rather than
+    picked up by a 1s poll.
     """
 
-    q = StreamerStatusStore.subscribe()
-    initial_sent = False
+    sub = StreamerStatusStore.subscribe(after=request.headers.get("last-event-id"))
 
     async def event_generator():
-        nonlocal initial_sent
         try:
+            if not sub.resumed:
+                snapshot = StreamerStatusStore.current()
+                yield {
+                    "event": "message",
+                    "id": sub.snapshot_cursor(),
+                    "data": __dumps(snapshot),
+                }
             while True:
                 if await request.is_disconnected():
                     break
-
-                if not initial_sent:
-                    snapshot = StreamerStatusStore.current()
-                    initial_sent = True
-                    yield {
-                        "event": "message",
-                        "data": __dumps(snapshot),
-                    }
-                    await asyncio.sleep(1)
-                    continue
-
-                if q:
-                    evt = q.popleft()
+                try:
+                    env = await asyncio.wait_for(sub.get_envelope(), timeout=15.0)
                     yield {
                         "event": "message",
-                        "data": __dumps(evt),
+                        "id": env.event_id,
+                        "data": env.data,
                     }
-                else:
+                except asyncio.TimeoutError:
                     yield {
                         "event": "ping",
                         "data": "keep-alive",
                     }
-
-                await asyncio.sleep(1)
         finally:
-            StreamerStatusStore.unsubscribe(q)
+            StreamerStatusStore.unsubscribe(sub)
 
     return EventSourceResponse(event_generator())
 
@@ -63,7 +63,7 @@ async def update_exit(
             trim_percentage=float(request.trim_percentage),
         )
         # Exit-strategies column on the open-risk table just changed.
-        hub.notify()
+        hub.notify_exits(request.symbol)
         return result
 
     except Exception as e:
@@ -88,7 +88,7 @@ async def reconcile_exits(
     try:
         client = IbClient(ib)
         result = await reconcile_exit_requests_with_positions(client, db_conn)
-        hub.notify()
+        hub.notify_exits()
         return result
     except Exception as e:
         raise HTTPException(
@@ -115,7 +115,7 @@ async def delete_exit(
                     f"strategy='{strategy}'."
                 ),
             )
-        hub.notify()
+        hub.notify_exits(symbol)
         return result
     except HTTPException:
         raise
@@ -17,6 +17,8 @@ import logging
 from fastapi import APIRouter, HTTPException, Request
 from sse_starlette.sse import EventSourceResponse
 
+from helpers.broker import SubscriptionClosed
+from schemas.api_schemas import LiveScannerUpdate
 from services.live_scanner import LiveScannerManager
 
 logger = logging.getLogger(__name__)
@@ -45,38 +47,51 @@ async def status(request: Request) -> dict:
     return _get_manager(request).status()
 
 
-@router.get("/stream")
+@router.get(
+    "/stream",
+    responses={200: {
+        "model": LiveScannerUpdate,
+        "description": "text/event-stream; each `update` event's data is one LiveScannerUpdate.",
+    }},
+)
 async def stream(request: Request):
     """Server-Sent Events stream of LiveScannerUpdate.
 
     Each event payload is a JSON LiveScannerUpdate. The client should
-    keep two pieces of state — gap-up rows and gap-down rows — and
-    replace whichever side comes in.
+    keep two pieces of state — gap-up rows and gap-down rows — replace a
+    side on a "snapshot" and upsert / drop rows on a "delta". A reconnect
+    with Last-Event-ID gets only the updates it missed while the replay
+    ring still has them.
     """
     mgr = _get_manager(request)
-    queue = await mgr.hub.add()
+    queue = await mgr.hub.add(after=request.headers.get("last-event-id"))
 
     async def event_generator():
         try:
             # Bootstrap: emit current snapshots immediately so the
             # client doesn't have to wait for the next IB push.
-            for snap in mgr.current_snapshot():
-                yield {"event": "update", "data": snap.model_dump_json()}
+            if not queue.resumed:
+                snaps = mgr.current_snapshot()
+                cursor = queue.snapshot_cursor()
+                for snap in snaps:
+                    yield {"event": "update", "id": cursor, "data": snap.to_json().decode()}
 
             while True:
                 if await request.is_disconnected():
                     logger.info("LiveScanner SSE: client disconnect detected")
                     break
                 try:
-                    update = await asyncio.wait_for(queue.get(), timeout=15.0)
-                    yield {
-                        "event": "update",
-                        "data": update.model_dump_json(),
-                    }
+                    env = await asyncio.wait_for(queue.get_envelope(), timeout=15.0)
+                    # Encoded once per update, shared by every client.
+                    yield {"event": "update", "id": env.event_id, "data": env.data}
                 except asyncio.TimeoutError:
                     # Heartbeat — keeps proxies/browsers from killing the
                     # connection during quiet periods.
                     yield {"event": "ping", "data": "keep-alive"}
+        except SubscriptionClosed:
+            # Fell a whole queue behind; ending the stream makes the
+            # browser reconnect and resume or re-snapshot.
+            logger.info("LiveScanner SSE client closed by broker (slow consumer)")
         finally:
             await mgr.hub.remove(queue)
 
@@ -1,14 +1,15 @@
 import asyncio
-import json
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
-from typing import List
+from helpers.broker import PING_FRAME, SubscriptionClosed, sse_frame
+from datetime import date
+from typing import List, Optional
 from services.portfolio.ib_client import IbClient, OrderNotFoundError
 from services.portfolio.order_tracker import OrderTracker
 from services.portfolio.flows.entry import process_entry_request, place_approved_entry
-from services.portfolio.trades.trade_log import build_trade_log
+from services.portfolio.trades.trade_log import build_trade_log, build_trade_log_history
 from services.portfolio.entry_attempts import build_entry_attempts
 from services.portfolio.risk_limits import build_lockout_status
 from services.portfolio.flows.add import process_add_request
@@ -16,6 +17,7 @@ from services.portfolio.flows.exit import process_automatic_exit
 from services.portfolio.flows.open_risk import process_openrisktable
 from services.portfolio.openrisk_hub import OpenRiskHub
 from services.portfolio.pending_approvals_hub import PendingApprovalsHub
+from services.portfolio.lockout_hub import LockoutHub
 from db.order_log import fetch_order_log
 
 
@@ -25,6 +27,7 @@ from dependencies import (
     get_order_tracker,
     get_openrisk_hub,
     get_pending_approvals_hub,
+    get_lockout_hub,
 )
 
 from schemas.api_schemas import (
@@ -40,6 +43,7 @@ from schemas.api_schemas import (
     CancelOrderResult,
     OrderLogEntry,
     TradeLogResponse,
+    TradeLogHistoryResponse,
     LockoutStatusResponse,
     ApprovalDecisionRequest,
 )
@@ -121,6 +125,52 @@ async def get_lockout_status(ib=Depends(get_ib)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/lockout-status/stream")
+async def stream_lockout_status(
+    hub: LockoutHub = Depends(get_lockout_hub),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events stream of the lockout banner state. On connect we
+    send the current status; afterwards a new one is pushed only when it
+    changes -- a loss-closing fill lands, or the cooldown_until timer
+    fires. See services.portfolio.lockout_hub.
+
+    Event shapes:
+      data: {"type": "snapshot", "status": LockoutStatus}
+      data: {"type": "ping"}                                       (every 15s)
+    """
+    q = hub.subscribe(after=last_event_id)
+
+    async def event_gen():
+        try:
+            if not q.resumed:
+                snapshot = hub.snapshot_now()
+                yield sse_frame(snapshot, event_id=q.snapshot_cursor())
+
+            while True:
+                try:
+                    env = await asyncio.wait_for(q.get_envelope(), timeout=15.0)
+                    yield env.frame
+                except asyncio.TimeoutError:
+                    yield PING_FRAME
+        except asyncio.CancelledError:
+            logger.debug("Lockout SSE client disconnected")
+            raise
+        finally:
+            hub.unsubscribe(q)
+
+    return StreamingResponse(
+        event_gen(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.post("/entry-request", response_model=EntryRequestResponse)
 async def entry_request(
     payload: EntryRequest,
@@ -150,6 +200,7 @@ async def entry_request(
 @router.get("/entry-request/pending/stream")
 async def stream_pending_approvals(
     approvals_hub: PendingApprovalsHub = Depends(get_pending_approvals_hub),
+    last_event_id: Optional[str] = Header(None),
 ):
     """
     Server-Sent Events stream of pending automatic-entry approvals.
@@ -166,18 +217,24 @@ async def stream_pending_approvals(
       data: {"type": "remove",    "approval_id": "..."}
       data: {"type": "ping"}                                       (every 15s)
     """
-    q = approvals_hub.subscribe()
+    q = approvals_hub.subscribe(after=last_event_id)
 
     async def event_gen():
         try:
-            yield "data: " + json.dumps(approvals_hub.snapshot_now()) + "\n\n"
+            if not q.resumed:
+                snapshot = approvals_hub.snapshot_now()
+                yield sse_frame(snapshot, event_id=q.snapshot_cursor())
 
             while True:
                 try:
-                    msg = await asyncio.wait_for(q.get(), timeout=15.0)
-                    yield "data: " + json.dumps(msg) + "\n\n"
+                    env = await asyncio.wait_for(q.get_envelope(), timeout=15.0)
+                    yield env.frame
                 except asyncio.TimeoutError:
-                    yield "data: " + json.dumps({"type": "ping"}) + "\n\n"
+                    yield PING_FRAME
+        except SubscriptionClosed:
+            # Fell too far behind a lossless topic; ending the stream
+            # makes the browser reconnect and re-snapshot.
+            logger.info("Pending-approvals SSE client closed by broker (slow consumer)")
         except asyncio.CancelledError:
             logger.debug("Pending-approvals SSE client disconnected")
             raise
@@ -316,6 +373,26 @@ async def get_trade_log(ib=Depends(get_ib)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/trade-log/history", response_model=TradeLogHistoryResponse)
+async def get_trade_log_history(
+    start: date,
+    end: date | None = None,
+    symbol: str | None = None,
+):
+    """
+    Trade log over local days start..end (inclusive, default: start only),
+    served from the Postgres executions ledger -- no IB call.
+    """
+    try:
+        history = await build_trade_log_history(start, end or start, symbol=symbol)
+        return TradeLogHistoryResponse(**asdict(history))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("trade-log history failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/order-log", response_model=List[OrderLogEntry])
 async def get_order_log(
     limit: int = 2000,
@@ -331,33 +408,39 @@ async def get_order_log(
 
 
 @router.get("/order-status/stream")
-async def stream_order_status(tracker: OrderTracker = Depends(get_order_tracker)):
+async def stream_order_status(
+    tracker: OrderTracker = Depends(get_order_tracker),
+    last_event_id: Optional[str] = Header(None),
+):
     """
     Server-Sent Events stream. On connect we send the current snapshot,
     then push one event per orderStatus / openOrder / error update.
+    Every event carries an `id:`; a reconnect with Last-Event-ID gets just
+    the updates it missed while the broker's replay ring still holds
+    them, and a fresh snapshot otherwise.
 
     Event shapes:
       data: {"type": "snapshot", "orders": [...]}
       data: {"type": "update",   "order":  {...}}
       data: {"type": "ping"}                          (every 15s keepalive)
     """
-    q = tracker.subscribe()
+    q = tracker.subscribe(after=last_event_id)
 
     async def event_gen():
         try:
-            # Initial snapshot so the client paints immediately.
-            yield "data: " + json.dumps({
-                "type": "snapshot",
-                "orders": tracker.snapshot(),
-            }) + "\n\n"
+            # Initial snapshot so the client paints immediately -- unless
+            # this is a resume and the missed updates are already queued.
+            if not q.resumed:
+                snapshot = {"type": "snapshot", "orders": tracker.snapshot()}
+                yield sse_frame(snapshot, event_id=q.snapshot_cursor())
 
             while True:
                 try:
-                    msg = await asyncio.wait_for(q.get(), timeout=15.0)
-                    yield "data: " + json.dumps(msg) + "\n\n"
+                    env = await asyncio.wait_for(q.get_envelope(), timeout=15.0)
+                    yield env.frame
                 except asyncio.TimeoutError:
                     # Keepalive so proxies don't drop the connection.
-                    yield "data: " + json.dumps({"type": "ping"}) + "\n\n"
+                    yield PING_FRAME
         except asyncio.CancelledError:
             logger.debug("SSE client disconnected")
             raise
@@ -428,37 +511,54 @@ async def get_open_risk_table(ib=Depends(get_ib), db_conn=Depends(get_db_conn)):
         )
 
 
+@router.get("/open-risk-table/stats")
+async def open_risk_table_stats(hub: OpenRiskHub = Depends(get_openrisk_hub)) -> dict:
+    """OpenRiskHub trigger / rebuild counters (see OpenRiskHub.stats)."""
+    return hub.stats()
+
+
 @router.get("/open-risk-table/stream")
 async def stream_open_risk_table(
     hub: OpenRiskHub = Depends(get_openrisk_hub),
+    last_event_id: Optional[str] = Header(None),
 ):
     """
     Server-Sent Events stream of the open-risk table. On connect we send
-    the current snapshot, then push a new snapshot whenever anything that
-    could change the table happens (fills, order updates, NetLiq shifts,
-    exit-request arm/disarm). See services.portfolio.openrisk_hub for the
-    trigger wiring and debounce logic.
+    the current snapshot, then push a patch of just the changed rows
+    whenever anything that could change the table happens (fills, order
+    updates, NetLiq shifts, exit-request arm/disarm). See
+    services.portfolio.openrisk_hub for the trigger wiring, debounce
+    logic and seq rules. A reconnect with Last-Event-ID resumes from the
+    broker's replay ring (missed patches only) when it still covers the
+    gap, else gets a fresh snapshot.
 
     Event shapes:
-      data: {"type": "snapshot", "rows": [OpenPosition, ...]}
+      data: {"type": "snapshot", "seq": N, "rows": [OpenPosition, ...]}
+      data: {"type": "patch",    "seq": N, "rows": [OpenPosition, ...],
+             "removed": [symbol, ...]}
       data: {"type": "ping"}                                      (every 15s)
     """
-    q = hub.subscribe()
+    q = hub.subscribe(after=last_event_id)
 
     async def event_gen():
         try:
             # Initial snapshot so the client paints immediately without
             # waiting for the next event.
-            initial = await hub.snapshot_now()
-            yield "data: " + json.dumps(initial, default=str) + "\n\n"
+            if not q.resumed:
+                initial = await hub.snapshot_now()
+                yield sse_frame(initial, event_id=q.snapshot_cursor())
 
             while True:
                 try:
-                    msg = await asyncio.wait_for(q.get(), timeout=15.0)
-                    yield "data: " + json.dumps(msg, default=str) + "\n\n"
+                    env = await asyncio.wait_for(q.get_envelope(), timeout=15.0)
+                    yield env.frame
                 except asyncio.TimeoutError:
                     # Keepalive so proxies don't drop the connection.
-                    yield "data: " + json.dumps({"type": "ping"}) + "\n\n"
+                    yield PING_FRAME
+        except SubscriptionClosed:
+            # Fell too far behind a lossless topic; ending the stream
+            # makes the browser reconnect and re-snapshot.
+            logger.info("Open-risk SSE client closed by broker (slow consumer)")
         except asyncio.CancelledError:
             logger.debug("Open-risk SSE client disconnected")
             raise
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from dependencies import get_ib
 from typing import Optional,List,Dict
+from sse_starlette.sse import EventSourceResponse
 from schemas.api_schemas import ScannerResponse, NewsItem
-from services.scanner import run_scanner_logic
+from services.scanner import get_preset, run_scanner_logic, stream_scanner_logic
+from services.historical_data import historical_data
+from services.volume_profiles import volume_profiles
 import yfinance as yf
 import feedparser
 
 from datetime import datetime, timezone, timedelta
 
+import json
 import logging
 logger = logging.getLogger(__name__)
 
@@ -34,6 +38,66 @@ async def run_scanner(preset_name: str,ib=Depends(get_ib)):
         raise HTTPException(status_code=500, detail="Scanner execution failed")
 
 
+@router.get(
+    "/stream",
+    responses={200: {
+        "model": List[ScannerResponse],
+        "description": (
+            "text/event-stream: one `scan` event (the ranked symbols), a `row` "
+            "event per ScannerResponse as each symbol is processed, then `done` "
+            "with every row in rank order (or `error`)."
+        ),
+    }},
+)
+async def stream_scanner(preset_name: str, ib=Depends(get_ib)):
+    """The scanner as Server-Sent Events: rows show up as soon as each
+    symbol's bars are in instead of after the slowest one."""
+    try:
+        get_preset(preset_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_generator():
+        events = stream_scanner_logic(preset_name=preset_name, ib=ib)
+        try:
+            async for event, payload in events:
+                if event == "row":
+                    data = payload.model_dump_json()
+                elif event == "done":
+                    data = "[" + ",".join(row.model_dump_json() for row in payload) + "]"
+                else:
+                    data = json.dumps(payload)
+                yield {"event": event, "data": data}
+        except Exception:
+            logger.exception("Scanner stream failed")
+            yield {"event": "error", "data": json.dumps({"detail": "Scanner execution failed"})}
+        finally:
+            await events.aclose()
+
+    return EventSourceResponse(event_generator())
+
+
+# Time-of-day volume profiles behind both scanners' RVOL. Built nightly;
+# the rebuild runs the same job now, in the background (today's session
+# until 20:00 ET, the next one after).
+@router.get("/volume-profiles")
+async def volume_profile_status():
+    return volume_profiles.stats()
+
+
+@router.post("/volume-profiles/rebuild", status_code=202)
+async def rebuild_volume_profiles(ib=Depends(get_ib)):
+    started = volume_profiles.start_rebuild(ib)
+    return {"started": started, **volume_profiles.stats()}
+
+
+# Pacing of every IB historical-data request (scans, profile builds,
+# enrichment): queue depth, tokens left, wait times per priority.
+@router.get("/historical-data")
+async def historical_data_status():
+    return historical_data.stats()
+
+
 
 
 
@@ -0,0 +1,128 @@
+"""
+Multiplexed realtime stream (see services.realtime).
+
+  GET  /api/stream?topics=orders,openrisk  -> one SSE connection, frames
+       [&resume=orders=<id>,...]               tagged `event: <topic>`,
+                                               resuming per topic
+  POST /api/stream/{cid}                   -> subscribe / unsubscribe /
+                                               resync topics on it
+  GET  /api/stream/stats                   -> open connections + topics
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from dependencies import get_realtime
+from helpers.broker import PING_FRAME, sse_frame
+from services.realtime import RealtimeMux
+
+logger = logging.getLogger(__name__)
+
+
+class StreamControl(BaseModel):
+    subscribe: List[str] = []
+    unsubscribe: List[str] = []
+    resync: List[str] = []
+
+
+router = APIRouter(
+    prefix="/api/stream",
+    tags=["Realtime"]
+)
+
+
+def _parse_topics(raw: str) -> List[str]:
+    return [t.strip() for t in raw.split(",") if t.strip()]
+
+
+def _parse_resume(raw: str) -> Dict[str, str]:
+    """`orders=<id>,openrisk=<id>` -> {topic: last event id}."""
+    out: Dict[str, str] = {}
+    for part in _parse_topics(raw):
+        topic, _, event_id = part.partition("=")
+        if event_id:
+            out[topic] = event_id
+    return out
+
+
+def _check_topics(mux: RealtimeMux, topics: List[str]) -> None:
+    unknown = mux.unknown(topics)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+
+
+@router.get("")
+async def stream(
+    topics: str = Query("", description="Comma-separated topic names"),
+    resume: str = Query("", description="Comma-separated topic=last_event_id"),
+    mux: RealtimeMux = Depends(get_realtime),
+):
+    """
+    Event shapes:
+      event: hello     data: {"cid": str, "topics": [str, ...]}
+      event: <topic>   id: <event id>
+                       data: <that topic's payload; snapshot first unless
+                              resumed from `resume`>
+      event: topic_error
+                       data: {"type": "error", "topic": str, "detail": str}
+                             (that topic's feed failed; a fresh snapshot
+                              follows once it recovers)
+      data: {"type": "ping"}                                   (every 15s)
+    """
+    names = _parse_topics(topics)
+    _check_topics(mux, names)
+    conn = mux.open(names, _parse_resume(resume))
+
+    async def event_gen():
+        try:
+            yield sse_frame({"cid": conn.cid, "topics": conn.topics}, event="hello")
+            while True:
+                try:
+                    yield await asyncio.wait_for(conn.next_frame(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    # One keepalive for every topic on the connection.
+                    yield PING_FRAME
+        except asyncio.CancelledError:
+            logger.debug("Realtime SSE client disconnected")
+            raise
+        finally:
+            await mux.close(conn)
+
+    return StreamingResponse(
+        event_gen(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/stats")
+async def stream_stats(mux: RealtimeMux = Depends(get_realtime)) -> dict:
+    return mux.stats()
+
+
+@router.post("/{cid}")
+async def stream_control(
+    cid: str,
+    payload: StreamControl,
+    mux: RealtimeMux = Depends(get_realtime),
+) -> dict:
+    """Change a live connection's topics. `resync` restarts a topic
+    (fresh snapshot on the same connection) without touching the rest."""
+    conn = mux.get(cid)
+    if conn is None:
+        raise HTTPException(status_code=404, detail="Unknown stream connection")
+    _check_topics(mux, payload.subscribe + payload.resync)
+    await conn.drop(payload.unsubscribe)
+    conn.add(payload.subscribe)
+    await conn.resync(payload.resync)
+    return {"cid": conn.cid, "topics": conn.topics}
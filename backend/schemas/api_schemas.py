@@ -115,6 +115,11 @@ class OpenPosition(BaseModel):
     auxprice: float
     position: float
     openrisk: float
+    # Live columns, streamed by OpenRiskHub from the quote board. None
+    # until the symbol's first usable tick (and always on the plain GET).
+    last: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    r_multiple: Optional[float] = None
 
 
 
@@ -390,6 +395,27 @@ class TradeLogResponse(BaseModel):
     symbol_count: int = 0
 
 
+# One flat-to-flat cycle from the executions ledger
+class CompletedTradeRow(BaseModel):
+    symbol: str
+    entry_time: datetime
+    exit_time: datetime
+    entry_price: float
+    exit_price: float
+    quantity: float
+    pnl: float
+    is_loss: bool
+
+
+class TradeLogHistoryResponse(BaseModel):
+    start: date
+    end: date
+    rows: List[TradeLogRow]
+    trades: List[CompletedTradeRow]
+    realized_pnl: float = 0.0
+    symbol_count: int = 0
+
+
 # Entry attempts stats row (per-symbol per-day count for the UI table)
 class EntryAttemptsRow(BaseModel):
     symbol: str
@@ -410,9 +436,9 @@ class EntryAttemptsResponse(BaseModel):
 # Scanner response
 
 # ---------------- Live Scanner (streaming) ----------------
-# A single qualifying ticker row in the live scanner. Phase-1 ("light")
-# columns only -- heavy enrichment (Bid/Ask, IV, MarketCap, RVOL, RelATR)
-# is deferred to a later phase.
+# A single qualifying ticker row in the live scanner. rvol / rel_atr come
+# from services.live_enrichment and stay None until the symbol's daily
+# baseline has been built. IV and MarketCap are not wired.
 class LiveScannerRow(BaseModel):
     symbol: str
     rank: int                          # rank inside the IB scan result
@@ -420,15 +446,24 @@ class LiveScannerRow(BaseModel):
     change: Optional[float] = None     # absolute $ change vs previous close
     change_percent: Optional[float] = None  # percent gap (signed)
     volume: Optional[int] = None       # cumulative session volume
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    spread: Optional[float] = None     # ask - bid, $
+    rvol: Optional[float] = None       # volume vs average by this time of day
+    rel_atr: Optional[float] = None    # today's high-low range / 14-day ATR
     time_added: str                    # ISO-8601 timestamp when first seen
 
 
 # Wire message pushed over SSE. side tells the frontend which table
-# this update belongs to. rows is the *full current snapshot* for that
-# side so the client can simply replace its state on receive.
+# this update belongs to. A "snapshot" carries every row for that side
+# (replace state on receive); a "delta" carries only the rows that
+# changed since the previous frame (upsert by symbol) plus the symbols
+# that left the scan (drop).
 class LiveScannerUpdate(BaseModel):
     side: str                          # "up" or "down"
+    kind: str = "snapshot"             # "snapshot" | "delta"
     rows: List[LiveScannerRow]
+    removed: List[str] = []            # delta only: symbols to drop
     connected: bool                    # IB connection status at time of push
     ts: float                          # epoch seconds
 
@@ -0,0 +1,152 @@
+"""
+Benchmark: live scanner render loop + broker fan-out, replayed offline.
+
+Replays a recorded live scanner session (services.live_scanner_recording)
+through a real LiveScannerManager and quote board, with N SSE-style
+clients draining the broker topic, and prints throughput and broker
+latency. No gateway needed. Without a recording, a synthetic session is
+written to a temp file first: SYMBOLS names over every LIVE_SCANS scan,
+rankings reshuffled every SCAN_EVERY ticks. At max speed, ticks for a
+symbol whose line is still opening are dropped (as IB would not have
+sent them yet); "ticks applied" counts the rest.
+
+Run from backend/:
+
+    python scripts/bench_live_scanner_replay.py                   # synthetic
+    python scripts/bench_live_scanner_replay.py session.lsr       # recorded
+    python scripts/bench_live_scanner_replay.py --speed 10 --clients 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+import services.live_scanner as live_scanner_mod  # noqa: E402
+from helpers.broker import broker  # noqa: E402
+from helpers.scanner_presets import LIVE_SCANS  # noqa: E402
+from services.live_scanner import TOPIC, LiveScannerManager  # noqa: E402
+from services.live_scanner_recording import ReplayIB, SessionRecorder  # noqa: E402
+from services.quote_board import QuoteBoard  # noqa: E402
+
+SYMBOLS = [f"R{i:03d}" for i in range(200)]
+SCAN_SIZE = 50
+SCAN_EVERY = 500
+TICKS = 200_000
+
+
+def synth_session(path: Path, ticks: int = TICKS, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    recorder = SessionRecorder(path, LIVE_SCANS)
+    con_ids = {sym: 10_000 + i for i, sym in enumerate(SYMBOLS)}
+    prices = {sym: rng.uniform(2, 50) for sym in SYMBOLS}
+    volumes = dict.fromkeys(SYMBOLS, 0.0)
+    ranked: list[str] = []
+    for i in range(ticks):
+        if i % SCAN_EVERY == 0:
+            ranked = []
+            for side in LIVE_SCANS:
+                names = rng.sample(SYMBOLS, SCAN_SIZE)
+                ranked.extend(names)
+                recorder.scan(side, [
+                    SimpleNamespace(
+                        rank=rank,
+                        contractDetails=SimpleNamespace(
+                            contract=SimpleNamespace(symbol=sym, conId=con_ids[sym])),
+                    )
+                    for rank, sym in enumerate(names)
+                ])
+        sym = rng.choice(ranked)
+        prices[sym] *= 1 + rng.uniform(-0.002, 0.002)
+        volumes[sym] += rng.choice((100, 200, 500))
+        p = prices[sym]
+        recorder.tick(sym, SimpleNamespace(
+            contract=SimpleNamespace(conId=con_ids[sym]),
+            last=p, close=p / 1.1, bid=p - 0.01, ask=p + 0.01,
+            high=p * 1.05, low=p * 0.95, volume=volumes[sym],
+        ))
+    recorder.close()
+
+
+async def drain(sub, counts: list) -> None:
+    while True:
+        env = await sub.get_envelope()
+        counts[0] += 1
+        counts[1] += len(env.frame)
+
+
+async def run(path: Path, speed: float, clients: int, frame_hz: float) -> None:
+    ib = ReplayIB(path)
+    board = QuoteBoard()
+    board.bind(ib)
+    live_scanner_mod.quote_board = board
+
+    mgr = LiveScannerManager(ib, frame_hz=frame_hz, scans=ib.meta["scans"])
+    subs = [broker.subscribe(TOPIC) for _ in range(clients)]
+    counts = [[0, 0] for _ in subs]
+    tasks = [asyncio.create_task(drain(s, c)) for s, c in zip(subs, counts)]
+
+    await mgr.start()
+    start = time.perf_counter()
+    await ib.run(speed)
+    await asyncio.sleep(2.0 / frame_hz)     # last frames out
+    elapsed = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+    await mgr.stop()
+    board.close()
+
+    st = mgr.status()
+    bst = broker.topic_stats(TOPIC)
+    frames = sum(c[0] for c in counts)
+    print(
+        f"{ib.replayed:>9,} records in {elapsed:6.2f} s  "
+        f"({ib.replayed / elapsed:>10,.0f}/s, speed {speed or 'max'})\n"
+        f"  ticks applied {st['ticks_received']:,}   lines {st['lines']}/{st['max_lines']}   "
+        f"evictions {st['evictions']:,}\n"
+        f"  frames sent {st['frames_sent']:,}   rows sent {st['rows_sent']:,}   "
+        f"({st['rows_sent'] / max(st['frames_sent'], 1):.1f} rows/frame)\n"
+        f"  {clients} clients: {frames:,} frames, {sum(c[1] for c in counts) / 1e6:.1f} MB delivered\n"
+        f"  broker latency avg {bst.get('latency_ms_avg', 0)} ms  max {bst.get('latency_ms_max', 0)} ms   "
+        f"encode avg {bst.get('encode_ms_avg', 0)} ms  ({bst.get('encodes', 0):,} encodes)   "
+        f"disconnects {bst.get('disconnects', 0)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("recording", nargs="?", help=".lsr session file (default: synthetic)")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = realtime, 0 = max")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--frame-hz", type=float, default=live_scanner_mod.SCANNER_FRAME_HZ)
+    parser.add_argument("--ticks", type=int, default=TICKS, help="synthetic session size")
+    args = parser.parse_args()
+    # Replay carries no history, so every enrichment request "fails".
+    logging.getLogger("services.live_enrichment").setLevel(logging.ERROR)
+
+    if args.recording:
+        asyncio.run(run(Path(args.recording), args.speed, args.clients, args.frame_hz))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "synthetic.lsr"
+        synth_session(path, args.ticks)
+        print(f"synthetic session: {args.ticks:,} ticks, {path.stat().st_size / 1e6:.1f} MB")
+        asyncio.run(run(path, args.speed, args.clients, args.frame_hz))
+
+
+if __name__ == "__main__":
+    main()
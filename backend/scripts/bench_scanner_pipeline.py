@@ -0,0 +1,411 @@
+"""
+Benchmark: the original scanner pipeline (dict bars, row at a time,
+reproduced below as compute_datapipeline_rows) vs compute_datapipeline
+(one columnar frame).
+
+Generates N symbols x 5 past days + today of 2-minute bars -- BARS_PER_DAY
+consecutive bars from 11:00 Helsinki plus the 22:58 anchor bar, a few
+percent dropped at random -- checks both pipelines return identical
+ScannerResponses and prints timings. The row pipeline is timed from dict
+bars (what handle_incoming_bars_intraday produced), the columnar one
+from BarColumns (what the bar store returns), each including its own
+frame building.
+
+Run from backend/:
+
+    python scripts/bench_scanner_pipeline.py              # 50, 500, 5000
+    python scripts/bench_scanner_pipeline.py 200 --bars-per-day 240
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from time import perf_counter
+from typing import DefaultDict, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+from schemas.api_schemas import ScannerResponse  # noqa: E402
+from services.bar_store import Bar, BarColumns  # noqa: E402
+from services.scanner import compute_datapipeline  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+# ---- Reference: the row-at-a-time pipeline compute_datapipeline replaced ----
+
+@dataclass
+class IncomingBar:
+    date: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    average: Optional[float] = None
+    barCount: Optional[int] = None
+
+def handle_incoming_bars_intraday(bars: List[IncomingBar], symbol: str, time_zone: str = "Europe/Helsinki") -> List[dict]:
+
+    tz = ZoneInfo(time_zone)
+    
+    return [
+        {
+            "symbol": symbol,
+            "date": bar.date.astimezone(tz).date().isoformat(),
+            "time": bar.date.astimezone(tz).time().isoformat(),
+            "open": bar.open,
+            "high": bar.high,
+            "low": bar.low,
+            "close": bar.close,
+            "volume": bar.volume
+        }
+        for bar in bars
+    ]
+
+# Tällä haetaan ankkurihinta changen laskemiselle kun markkina ei vielä ole auki
+def get_yesterday_anchorprice(past_bars) -> List[Dict[str, str]]:
+    result = []
+
+    # Iterate through each symbol in past5days
+    for symbol, bars in past_bars.items():
+        # Filter out bars where Time is '23:00:00'
+        relevant_bars = [bar for bar in bars if bar.get('time') == '22:58:00']
+        
+        if relevant_bars:
+            # Find the most recent date by comparing the Date values
+            most_recent_bar = max(relevant_bars, key=lambda b: datetime.strptime(b['date'], '%Y-%m-%d').date())
+
+            result.append({
+                'symbol': most_recent_bar.get('symbol'),
+                'date': most_recent_bar.get('date'),
+                'time': most_recent_bar.get('time'),
+                'anchorprice': most_recent_bar.get('close')
+            })
+
+    return result
+
+def get_today_anchorprice(today_bars) -> List[Dict[str, str]]:
+    result = []
+
+    # Iterate through each symbol in today's bars
+    for symbol, bars in today_bars.items():
+        # Filter bars where Time is '16:30:00' and Date is today
+        relevant_bars = [bar for bar in bars if bar.get('time') == '11:00:00']
+        
+        if relevant_bars:
+            # Since we are filtering by '16:30:00', we can just take the first (or only) bar
+            most_recent_bar = relevant_bars[0]
+
+            result.append({
+                'symbol': most_recent_bar.get('symbol'),
+                'date': most_recent_bar.get('date'),
+                'time': most_recent_bar.get('time'),
+                'anchorprice': most_recent_bar.get('open')
+            })
+
+    return result
+
+
+# Calculations
+
+def calculate_percentage_change(rvol_df: pd.DataFrame, close_prices_df: pd.DataFrame) -> pd.DataFrame:
+
+    # Merge the rvol_df with the close_prices_df based on 'Symbol'
+    merged_df = pd.merge(rvol_df, close_prices_df, on='symbol', how='left')
+
+    # Rename columns to remove the '_x' suffix and use the correct names
+    merged_df.rename(columns={
+        'date_x': 'date',    # Rename 'Date_x' to 'Date'
+        'time_x': 'time',    # Rename 'Time_x' to 'Time'
+        'close_x': 'close'   # Rename 'Close_x' to 'Close'
+    }, inplace=True)
+
+    # Calculate the percentage change in close prices
+    merged_df['change'] = ((merged_df['close'] - merged_df['anchorprice']) / merged_df['anchorprice']) * 100
+
+    # Round the percentage change to 2 decimal places
+    merged_df['change'] = merged_df['change'].round(2)
+
+    return merged_df
+
+def calculate_avg_volume_model(past_bars: Dict[str, List[dict]]) -> List[dict]:
+
+    # Flatten grouped bars
+    all_data = []
+    for bars in past_bars.values():
+        all_data.extend(bars)
+
+    df = pd.DataFrame(all_data)
+
+    # Compute average volume per symbol per time
+    avg_volume_df = (
+        df.groupby(['symbol', 'time'], as_index=False)['volume']
+        .mean()
+        .rename(columns={'volume': 'avgvolume'})
+    )
+
+    avg_volume_df['avgvolume'] = avg_volume_df['avgvolume'].round(2)
+
+    # Convert back to bars
+    avg_volume_bars = avg_volume_df.to_dict(orient="records")
+
+    return avg_volume_bars
+
+def calculate_rvol(today_df: pd.DataFrame, avg_volume_df: pd.DataFrame) -> pd.DataFrame:
+
+    # Merge today's bars with historical average volume
+    df = today_df.merge(avg_volume_df, on=['symbol', 'time'], how='left')
+
+    # Prepare empty list for processed data
+    processed_list = []
+
+    # Calculate cumulative sums and Rvol per symbol
+    for symbol, group in df.groupby('symbol', sort=False):
+        group = group.sort_values('time').copy()  # ensure proper time order
+        group['cumvolume'] = group['volume'].cumsum()
+        group['cumavgvolume'] = group['avgvolume'].cumsum()
+        group['rvol'] = np.where(
+            (group['cumavgvolume'] == 0) | group['cumavgvolume'].isna(),
+            0.0,
+            group['cumvolume'] / group['cumavgvolume']
+        )
+        group['rvol'] = group['rvol'].round(2)
+        processed_list.append(group)
+
+    # Combine all symbols back
+    result_df = pd.concat(processed_list, ignore_index=True)
+    return result_df
+
+# Data pipeline
+def group_dataset_by_symbol(dataset: List[dict]) -> DefaultDict[str, list]:
+
+    symbol_groups: DefaultDict[str, list] = defaultdict(list)
+
+    for row in dataset:
+        symbol_groups[row["symbol"]].extend(row.get("intraday_bars") or [])
+
+    return symbol_groups
+
+def split_symbol_groups(symbol_groups: DefaultDict[str, list]) -> Tuple[DefaultDict[str, list], DefaultDict[str, list]]:
+    
+    today_str = datetime.today().strftime("%Y-%m-%d")
+
+    today_bars: DefaultDict[str, list] = defaultdict(list)
+    past_bars: DefaultDict[str, list] = defaultdict(list)
+
+    for symbol, bars in symbol_groups.items():
+        # Sort bars by date and time
+        bars_sorted = sorted(bars, key=lambda b: (b.get("date"), b.get("time")))
+
+        # Split today's vs historical
+        for bar in bars_sorted:
+            if bar.get("date") == today_str:
+                today_bars[symbol].append(bar)
+            else:
+                past_bars[symbol].append(bar)
+
+    return today_bars, past_bars
+
+def filter_bars_by_time(today_bars: DefaultDict[str, list]) -> DefaultDict[str, list]:
+    
+    cutoff_time: str = "11:00:00"
+    
+    filtered_bars: DefaultDict[str, list] = defaultdict(list)
+
+    for symbol, bars in today_bars.items():
+        for bar in bars:
+            if bar.get("time") >= cutoff_time:
+                filtered_bars[symbol].append(bar)
+
+    return filtered_bars
+
+def filter_avgvolume_list(bars: List[Dict]) -> List[Dict]:
+    
+    cutoff_time = "11:00:00"
+
+    return [
+        bar
+        for bar in bars
+        if bar.get("time") >= cutoff_time
+    ]
+
+def bars_to_dataframe(today_bars: DefaultDict[str, list]) -> pd.DataFrame:
+    """Flatten symbol->bars dictionary into a pandas DataFrame."""
+    
+    all_bars = [
+        bar
+        for bars in today_bars.values()
+        for bar in bars
+    ]
+
+    return pd.DataFrame(all_bars)
+
+def return_last_row_per_symbol(df: pd.DataFrame) -> List[ScannerResponse]:
+
+    if df.empty:
+        return []
+
+    # Group by 'symbol' and take the last row for each group
+    last_rows = df.groupby('symbol', as_index=False).last()
+
+    # Convert each row to a ScannerResponse instance
+    responses = [
+        ScannerResponse(
+            symbol=row['symbol'],
+            date=row['date'],
+            time=row['time'],
+            open=row['open'],
+            high=row['high'],
+            low=row['low'],
+            close=row['close'],
+            volume=int(row['volume']),
+            rvol=float(row['rvol']),
+            change=float(row['change'])
+        )
+        for _, row in last_rows.iterrows()
+    ]
+
+    return responses
+
+async def compute_datapipeline_rows(dataset: List[dict]) -> List[ScannerResponse]:
+    """
+    The original row-at-a-time pipeline, over dict bars
+    (handle_incoming_bars_intraday(columns.bars(), symbol)).
+    """
+
+    # Step 1: Group rows by symbol
+    symbol_groups = group_dataset_by_symbol(dataset = dataset)
+
+    # Step 2: Split into today and past bars
+    today_bars, past_bars = split_symbol_groups(symbol_groups)
+
+    # Step 3: Filter today bars to start from 11:00
+    today_bars = filter_bars_by_time(today_bars)
+
+    # Step 4: Calculate average volume using historical data
+    avg_volume_bars = calculate_avg_volume_model(past_bars)
+
+    # Step 5: Filter avg volume bars starting from 11:00
+    avg_volume_bars = filter_avgvolume_list(avg_volume_bars)
+
+    if not today_bars or not avg_volume_bars:
+        logger.warning("No data bars data coming in")
+        return [] 
+
+
+    current_time = datetime.now().time()
+    market_open = time(hour=16, minute=30)
+
+    if current_time < market_open:
+        # before 16:30 → use yesterday's close
+        close_prices = get_yesterday_anchorprice(past_bars)
+    else:
+        # 16:30 or later → use today's close
+        close_prices = get_today_anchorprice(today_bars)
+
+    # Step 6 — Convert bars → pandas
+    today_df = bars_to_dataframe(today_bars)
+    avg_volume_df = pd.DataFrame(avg_volume_bars)
+    close_prices_df = pd.DataFrame(close_prices)
+
+    # Step 4: Calculate RVol for today's bars
+    today_rvol_df = calculate_rvol(today_df, avg_volume_df)
+
+
+    change_df = calculate_percentage_change(today_rvol_df,close_prices_df)
+    # ScannerResponse made here
+    last_rows_responses = return_last_row_per_symbol(change_df)
+
+
+    return last_rows_responses
+
+
+# ---- Benchmark -------------------------------------------------------------
+
+SIZES = (50, 500, 5000)
+BARS_PER_DAY = 60
+HELSINKI = ZoneInfo("Europe/Helsinki")
+
+
+def synth_dataset(n: int, bars_per_day: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    today = datetime.today().date()
+    dataset = []
+    for i in range(n):
+        bars = []
+        price = rng.uniform(2, 80)
+        for back in range(5, -1, -1):
+            day = today - timedelta(days=back)
+            start = datetime(day.year, day.month, day.day, 11, 0, tzinfo=HELSINKI)
+            stamps = [start + timedelta(minutes=2 * k) for k in range(bars_per_day)]
+            stamps.append(datetime(day.year, day.month, day.day, 22, 58, tzinfo=HELSINKI))
+            for t in stamps:
+                if rng.random() < 0.03:
+                    continue
+                price *= 1 + rng.uniform(-0.004, 0.004)
+                bars.append(Bar(t, price, price * 1.002, price * 0.998, price,
+                                float(rng.randint(0, 20_000))))
+        dataset.append({"rank": i, "symbol": f"S{i:04d}", "intraday_bars": BarColumns.from_bars(bars)})
+    return dataset
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        out = asyncio.run(fn())
+        best = min(best, perf_counter() - start)
+    return out, best
+
+
+def run(n: int, bars_per_day: int) -> None:
+    columnar = synth_dataset(n, bars_per_day)
+    rows = [
+        {**row, "intraday_bars": handle_incoming_bars_intraday(row["intraday_bars"].bars(), row["symbol"])}
+        for row in columnar
+    ]
+    n_bars = sum(len(row["intraday_bars"]) for row in columnar)
+
+    repeat = 3 if n <= 500 else 1       # best of 3 where it's cheap
+    want, t_rows = timed(lambda rows=rows: compute_datapipeline_rows(rows), repeat)
+    del rows
+    got, t_vec = timed(lambda: compute_datapipeline(columnar), repeat)
+
+    same = [w.model_dump() for w in want] == [g.model_dump() for g in got]
+    status = "identical" if same else "MISMATCH"
+    print(
+        f"{n:>6,} symbols {n_bars:>10,} bars  "
+        f"rows {t_rows * 1e3:9.1f} ms   columnar {t_vec * 1e3:8.1f} ms   "
+        f"x{t_rows / t_vec:5.1f}   {status}"
+    )
+    if not same:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sizes", nargs="*", type=int, help="symbol counts (default: 50 500 5000)")
+    parser.add_argument("--bars-per-day", type=int, default=BARS_PER_DAY)
+    args = parser.parse_args()
+    for n in args.sizes or SIZES:
+        run(n, args.bars_per_day)
+
+
+if __name__ == "__main__":
+    main()
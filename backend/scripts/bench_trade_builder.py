@@ -0,0 +1,127 @@
+"""
+Benchmark: trade_builder (per-fill Python) vs trade_builder_vec (NumPy).
+
+Generates N synthetic fills spread over 500 symbols -- entries, adds,
+partial trims and full exits, so cycles are 2-6 fills like real ones --
+plus one symbol scaling in and out for N fills in a single cycle (the
+worst case for anything that loops per position-in-cycle), checks both
+builders produce identical completed trades, and prints timings. The vectorized builder is timed twice: from Fill objects (what
+a caller holding Fills pays) and from prebuilt columns (what a caller
+reading arrays straight from the executions table pays).
+
+Run from backend/:
+
+    python scripts/bench_trade_builder.py            # 1k, 100k, 1M
+    python scripts/bench_trade_builder.py 10000      # custom sizes
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+from services.portfolio.ib_client import Fill  # noqa: E402
+from services.portfolio.trades.trade_builder import build_completed_trades  # noqa: E402
+from services.portfolio.trades.trade_builder_vec import (  # noqa: E402
+    FillColumns,
+    build_completed_trades_vec,
+)
+from services.portfolio.trades.trades_snapshot import _group_fills_by_symbol  # noqa: E402
+
+SIZES = (1_000, 100_000, 1_000_000)
+SYMBOLS = [f"S{i:03d}" for i in range(500)]
+T0 = datetime(2025, 1, 2, 14, 30, tzinfo=timezone.utc)
+
+
+def synth_fills(n: int, seed: int = 42) -> list[Fill]:
+    rng = random.Random(seed)
+    nets = dict.fromkeys(SYMBOLS, 0)
+    fills: list[Fill] = []
+    t = T0
+    for i in range(n):
+        sym = rng.choice(SYMBOLS)
+        net = nets[sym]
+        if net == 0:
+            qty = rng.choice((50, 100, 200))
+            action = rng.choice(("BOT", "SLD"))
+        elif rng.random() < 0.25:                     # add
+            qty = rng.choice((50, 100))
+            action = "BOT" if net > 0 else "SLD"
+        else:                                         # trim or exit
+            qty = abs(net) if rng.random() < 0.6 else rng.randint(1, abs(net))
+            action = "SLD" if net > 0 else "BOT"
+        nets[sym] = net + (qty if action == "BOT" else -qty)
+        t += timedelta(milliseconds=rng.randint(1, 4000))
+        fills.append(Fill(
+            tradeid=i, symbol=sym, conid=0, sectype="STK", action=action,
+            quantity=float(qty), price=round(rng.uniform(5, 200), 2),
+            time=t, exchange="SMART", execid=str(i),
+        ))
+    return fills
+
+
+def synth_one_cycle(n: int, seed: int = 42) -> list[Fill]:
+    """N fills of one symbol that only returns to flat on the last one."""
+    rng = random.Random(seed)
+    fills: list[Fill] = []
+    net = 0
+    t = T0
+    for i in range(n - 1):
+        action = "SLD" if net > 100 and rng.random() < 0.5 else "BOT"
+        net += 100 if action == "BOT" else -100
+        t += timedelta(milliseconds=rng.randint(1, 4000))
+        fills.append(Fill(
+            tradeid=i, symbol="LONG", conid=0, sectype="STK", action=action,
+            quantity=100.0, price=round(rng.uniform(5, 200), 2),
+            time=t, exchange="SMART", execid=str(i),
+        ))
+    fills.append(Fill(
+        tradeid=n, symbol="LONG", conid=0, sectype="STK", action="SLD",
+        quantity=float(net), price=100.0, time=t + timedelta(seconds=1),
+        exchange="SMART", execid=str(n),
+    ))
+    return fills
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def run(n: int, label: str, fills: list[Fill]) -> None:
+    grouped = _group_fills_by_symbol(fills)
+
+    want, t_py = timed(lambda: build_completed_trades(grouped))
+    cols, t_cols = timed(lambda: FillColumns.from_fills_by_symbol(grouped))
+    got, t_vec = timed(lambda: build_completed_trades_vec(cols))
+
+    ok = got == want
+    status = "identical" if ok else "MISMATCH"
+    print(
+        f"{n:>9,} fills {label:<10} {len(want):>8,} trades  "
+        f"python {t_py * 1e3:9.1f} ms   "
+        f"vec {t_vec * 1e3:8.1f} ms (+{t_cols * 1e3:7.1f} ms columns)   "
+        f"x{t_py / t_vec:5.1f}   {status}"
+    )
+    if not ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    for n in sizes:
+        run(n, "500 sym", synth_fills(n))
+        run(n, "one cycle", synth_one_cycle(n))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ latest_fill_for_symbol bug fix, TradeLog / EntryAttempts dataclasses.
 from __future__ import annotations
 
 import asyncio
+import json
 import os
 import sys
 import traceback
@@ -34,6 +35,7 @@ import pytz  # noqa: E402
 
 from services.portfolio.ib_client import Fill  # noqa: E402
 from services.portfolio.trades.trades_snapshot import (  # noqa: E402
+    _group_fills_by_symbol,
     _latest_fill_time,
     SNAPSHOT_TTL_SECONDS,
     SymbolTradeStats,
@@ -47,6 +49,28 @@ from services.portfolio.trades.trade_builder import (  # noqa: E402
     build_completed_trades,
     count_entries_from_fills,
 )
+from services.portfolio.trades.trade_builder_vec import (  # noqa: E402
+    FillColumns,
+    build_completed_trades_vec,
+    count_entries_vec,
+)
+from services.portfolio.trades.trades_engine import (  # noqa: E402
+    TIMEZONE as ENGINE_TZ,
+    TradesEngine,
+)
+from services.portfolio.trades import trades_snapshot as _snapshot_mod  # noqa: E402
+from helpers.broker import (  # noqa: E402
+    CONFLATE,
+    LOSSLESS,
+    Broker,
+    SubscriptionClosed,
+    format_event_id,
+)
+from services.portfolio.lockout_hub import LockoutHub  # noqa: E402
+from services import realtime as _realtime_mod  # noqa: E402
+from services.realtime import RealtimeMux, TopicSource  # noqa: E402
+from services.portfolio.openrisk_hub import OpenRiskHub  # noqa: E402
+from core.risk_manager_config import risk_settings  # noqa: E402
 from services.portfolio.trades.trade_log import (  # noqa: E402
     TradeLog,
     TradeLogEntry,
@@ -582,6 +606,1974 @@ def test_snapshot_cache(r: Runner):
     r.check("distinct clients don't collide on the cache", check_distinct_clients_dont_collide)
 
 
+def test_vectorized_builder(r: Runner):
+    section("trade_builder_vec: identical to trade_builder")
+
+    def parity(fills_by_symbol):
+        eq(build_completed_trades_vec(FillColumns.from_fills_by_symbol(fills_by_symbol)),
+           build_completed_trades(fills_by_symbol), hint="(trade_builder_vec must match trade_builder)")
+
+    cases = {
+        "long win": [("BOT", 100, 10.0, 60), ("SLD", 100, 11.0, 30)],
+        "long loss": [("BOT", 100, 10.0, 60), ("SLD", 100, 9.5, 30)],
+        "short": [("SLD", 100, 10.0, 60), ("BOT", 100, 9.0, 30)],
+        "add + full exit": [("BOT", 100, 10.0, 60), ("BOT", 100, 10.5, 50), ("SLD", 200, 11.0, 30)],
+        "open position": [("BOT", 100, 10.0, 60)],
+        "two cycles": [("BOT", 100, 10.0, 90), ("SLD", 100, 11.0, 70),
+                       ("BOT", 100, 12.0, 50), ("SLD", 100, 13.0, 30)],
+        "flip through zero": [("BOT", 100, 10.0, 60), ("SLD", 200, 11.0, 30)],
+    }
+
+    def check_cases():
+        for spec in cases.values():
+            parity({"AAPL": [fill("AAPL", a, q, p, minutes_ago=m) for a, q, p, m in spec]})
+        parity({
+            sym: [fill(sym, a, q, p, minutes_ago=m) for a, q, p, m in spec]
+            for sym, spec in zip(("AAPL", "MSFT", "TSLA"), cases.values())
+        })
+    r.check("completed-trades cases, singly and across symbols", check_cases)
+
+    def check_scratch_sign():
+        # Scratch trade whose float pnl lands a hair off zero: the sign
+        # (is_loss) must come out exactly as in the Python loop.
+        # Short in at an average of 10.22, covered at 10.22: pnl is
+        # -1.1e-13, which rounds to -0.0 yet counts as a loss.
+        fills = {"AAPL": [
+            fill("AAPL", "SLD", 60, 10.1, minutes_ago=60),
+            fill("AAPL", "SLD", 40, 10.4, minutes_ago=50),
+            fill("AAPL", "BOT", 35, 10.22, minutes_ago=40),
+            fill("AAPL", "BOT", 65, 10.22, minutes_ago=30),
+        ]}
+        want = build_completed_trades(fills)
+        assert want[0]["pnl"] == 0 and want[0]["is_loss"], "fixture must be a noisy scratch"
+        parity(fills)
+    r.check("scratch trade: same pnl bits and is_loss", check_scratch_sign)
+
+    def check_long_cycle():
+        # 300 buys, then one sell of the lot at its exact average price.
+        # The running total makes pnl exactly 0.0; a pairwise
+        # (reduceat-style) sum of the same buys makes it -3.5e-10 and
+        # flips is_loss.
+        import random
+        rng = random.Random(4)
+        legs = [(rng.choice((10, 25, 37, 50)), round(rng.uniform(5, 200), 2)) for _ in range(300)]
+        cost = 0.0
+        for q, p in legs:
+            cost += q * p
+        total = sum(q for q, _ in legs)
+        fills = [fill("AAPL", "BOT", q, p, minutes_ago=900 - i) for i, (q, p) in enumerate(legs)]
+        fills.append(fill("AAPL", "SLD", total, cost / total, minutes_ago=200))
+        eq(build_completed_trades({"AAPL": fills})[0]["is_loss"], False, hint="(fixture)")
+        parity({"AAPL": fills})
+    r.check("300-fill cycle: same running-sum rounding", check_long_cycle)
+
+    def check_random_sets():
+        import random
+        rng = random.Random(7)
+        for _ in range(200):
+            fills, nets = [], {}
+            for i in range(rng.randint(0, 120)):
+                sym = rng.choice("ABCD")
+                net = nets.get(sym, 0)
+                if net and rng.random() < 0.5:
+                    action = "SLD" if net > 0 else "BOT"
+                    qty = abs(net) if rng.random() < 0.6 else rng.randint(1, abs(net))
+                else:
+                    action = rng.choice(["BOT", "SLD", "BUY", "?"])
+                    qty = rng.choice([1, 50, 100, 0.5])
+                sign = {"BOT": 1, "BUY": 1, "SLD": -1}.get(action, 0)
+                nets[sym] = net + sign * int(qty)
+                fills.append(fill(sym, action, qty, round(rng.uniform(5, 15), 2),
+                                  minutes_ago=rng.randint(0, 300)))
+            # fill() keys tradeid on (symbol, action, minutes_ago); only
+            # times matter here, and duplicates exercise the tie order.
+            grouped = _group_fills_by_symbol(fills)
+            eq(build_completed_trades_vec(FillColumns.from_fills(fills)),
+               build_completed_trades(grouped))
+            want_counts = {
+                s: n for s, f in grouped.items()
+                if (n := count_entries_from_fills(f)) > 0
+            }
+            eq(count_entries_vec(FillColumns.from_fills(fills)), want_counts)
+    r.check("200 random multi-symbol fill sets", check_random_sets)
+
+
+def test_trades_engine(r: Runner):
+    section("TradesEngine: incremental fold")
+
+    # Engine keeps only today's fills (settings.TIMEZONE), so anchor to
+    # noon today there rather than BASE (or now, which is yesterday for
+    # the first seconds_ago after midnight).
+    noon = datetime.now(ENGINE_TZ).replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def efill(symbol, action, qty, price, seconds_ago, execid):
+        return Fill(
+            tradeid=0, symbol=symbol, conid=1, sectype="STK", action=action,
+            quantity=qty, price=price,
+            time=noon - timedelta(seconds=seconds_ago),
+            exchange="SMART", execid=execid,
+        )
+
+    def sample():
+        return [
+            efill("AAPL", "BOT", 100, 10.0, 90, "e1"),
+            efill("MSFT", "SLD", 10, 300.0, 80, "e2"),
+            efill("AAPL", "BOT", 100, 10.5, 70, "e3"),
+            efill("AAPL", "SLD", 200, 10.2, 60, "e4"),
+            efill("MSFT", "BOT", 10, 301.0, 50, "e5"),
+            efill("AAPL", "BOT", 50, 11.0, 40, "e6"),
+        ]
+
+    def batch_snapshot(fills):
+        return asyncio.run(build_today_snapshot(StubIbClient(fills)))
+
+    def check_matches_batch():
+        fills = sample()
+        engine = TradesEngine()
+        for f in fills:          # one fill per event, like execDetailsEvent
+            engine.ingest([f])
+        got, want = engine.snapshot(), batch_snapshot(fills)
+        eq(got.completed_trades, want.completed_trades)
+        eq(got.entry_counts, want.entry_counts)
+        eq(got.realized_pnl_by_symbol, want.realized_pnl_by_symbol)
+        eq(got.realized_pnl, want.realized_pnl)
+        eq(got.consecutive_losses(), want.consecutive_losses())
+        eq(engine.loss_streak, want.consecutive_losses())
+        eq(got.position_opened_at("AAPL"), want.position_opened_at("AAPL"))
+    r.check("fill-by-fill fold matches batch snapshot", check_matches_batch)
+
+    def check_out_of_order():
+        fills = sample()
+        engine = TradesEngine()
+        engine.ingest(reversed(fills))
+        assert engine.check_consistency(), "rebuild after out-of-order fill"
+        eq(engine.snapshot().completed_trades, batch_snapshot(fills).completed_trades)
+    r.check("out-of-order fills rebuild to the batch result", check_out_of_order)
+
+    def check_dedupe_and_cache():
+        fills = sample()
+        engine = TradesEngine()
+        eq(engine.ingest(fills), len(fills))
+        s1 = engine.snapshot()
+        eq(engine.ingest(fills[:3]), 0, hint="same execIds are dropped")
+        assert engine.snapshot() is s1, "no new fill -> same snapshot instance"
+        engine.ingest([efill("TSLA", "BOT", 1, 200.0, 5, "e7")])
+        s2 = engine.snapshot()
+        assert s2 is not s1 and "TSLA" in s2.fills_by_symbol
+        assert "TSLA" not in s1.fills_by_symbol, "old snapshot stays immutable"
+    r.check("execId dedupe; snapshot cached per version", check_dedupe_and_cache)
+
+    def check_routing():
+        class StubIb:
+            class wrapper:      # ib_async's fill store, empty here
+                fills = {}
+
+        class Client(StubIbClient):
+            def __init__(self, ib):
+                super().__init__([])
+                self.ib = ib
+
+        ib = StubIb()
+        engine = TradesEngine()
+        engine._ib = ib
+        engine.ingest(sample())
+        _snapshot_mod.set_trades_engine(engine)
+        try:
+            client = Client(ib)
+            snap = asyncio.run(build_today_snapshot(client))
+            eq(client.trades_calls, 0, hint="engine path makes no IB call")
+            assert snap is engine.snapshot()
+            other = Client(StubIb())
+            asyncio.run(build_today_snapshot(other))
+            eq(other.trades_calls, 1, hint="foreign IB falls back to fetch")
+        finally:
+            _snapshot_mod.set_trades_engine(None)
+    r.check("build_today_snapshot routes to the bound engine", check_routing)
+
+
+def test_executions_ledger(r: Runner):
+    section("Executions ledger: batched writes, history from the DB")
+
+    from contextlib import asynccontextmanager
+    from dataclasses import replace
+    from datetime import timezone as _tz
+
+    from db.executions import insert_executions
+    from services.portfolio.trades import executions_ledger as ledger_mod
+    from services.portfolio.trades.executions_ledger import (
+        ExecutionsLedger,
+        day_bounds,
+        executions_ledger,
+        fill_to_row,
+        row_to_fill,
+    )
+    from services.portfolio.trades.trade_log import build_trade_log_history
+
+    COLUMNS = ("exec_id", "perm_id", "symbol", "con_id", "sec_type",
+               "action", "quantity", "price", "time", "exchange")
+
+    class StubConn:
+        """The executions table in a dict: inserts honour ON CONFLICT
+        (exec_id) DO NOTHING, times come back in UTC like asyncpg's."""
+        def __init__(self):
+            self.table = {}
+            self.batches = 0
+
+        async def executemany(self, query, records):
+            assert "ON CONFLICT (exec_id) DO NOTHING" in query
+            self.batches += 1
+            for rec in records:
+                row = dict(zip(COLUMNS, rec))
+                row["time"] = row["time"].astimezone(_tz.utc)
+                self.table.setdefault(row["exec_id"], row)
+
+        async def fetch(self, query, *args):
+            symbol, (start, end) = (args[0], args[1:]) if len(args) == 3 else (None, args)
+            rows = [
+                r for r in self.table.values()
+                if start <= r["time"] < end and (symbol is None or r["symbol"] == symbol)
+            ]
+            return sorted(rows, key=lambda r: (r["time"], r["exec_id"]))
+
+    class StubPool:
+        def __init__(self):
+            self.conn = StubConn()
+
+        @asynccontextmanager
+        async def acquire(self):
+            yield self.conn
+
+    # Noon today in the engine's zone, not BASE: TradesEngine keeps only
+    # fills dated today in settings.TIMEZONE, and BASE's New York date
+    # differs from it for part of the night.
+    noon = datetime.now(ENGINE_TZ).replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def xfill(symbol, action, qty, price, minutes_ago, execid):
+        return replace(fill(symbol, action, qty, price), execid=execid,
+                       time=noon - timedelta(minutes=minutes_ago))
+
+    def bound_ledger():
+        ledger, pool = ExecutionsLedger(), StubPool()
+        ledger.set_db_pool(pool)
+        ledger.bind_loop(asyncio.get_running_loop())
+        return ledger, pool.conn
+
+    def check_row_mapping():
+        async def run():
+            f = xfill("AAPL", "BOT", 100, 10.25, 30, "0001f4e8.6543.01.01")
+            row = fill_to_row(f)
+            eq((row["exec_id"], row["perm_id"], row["con_id"], row["sec_type"]),
+               (f.execid, f.tradeid, f.conid, "STK"))
+            conn = StubConn()
+            await insert_executions(conn, [row, {**row, "exec_id": ""}])
+            eq(list(conn.table), [f.execid], hint="rows without an execId are skipped")
+            back = row_to_fill(conn.table[f.execid])
+            eq(back, f, hint="round trip through the table")
+            eq(back.time.tzinfo.zone, ledger_mod.TIMEZONE.zone, hint="read back in local time")
+
+        asyncio.run(run())
+    r.check("fill <-> ledger row mapping round-trips", check_row_mapping)
+
+    def check_duplicates():
+        async def run():
+            ledger, conn = bound_ledger()
+            engine = TradesEngine()
+            engine.set_ledger(ledger)
+            first = xfill("AAPL", "BOT", 100, 10.0, 30, "e1")
+            engine.ingest([first])
+            engine.ingest([first, replace(first, price=99.0)])   # IB re-sends e1
+            eq(len(ledger._pending), 1, hint="engine queues each execId once")
+
+            # A restart replays fills the table already holds.
+            await ledger.flush()
+            ledger.enqueue([replace(first, price=99.0), xfill("AAPL", "SLD", 100, 11.0, 20, "e2")])
+            await ledger.close()
+            eq(sorted(conn.table), ["e1", "e2"])
+            eq(conn.table["e1"]["price"], 10.0, hint="the stored row wins")
+
+        asyncio.run(run())
+    r.check("duplicate execId is written once", check_duplicates)
+
+    def check_shutdown_flush():
+        async def run():
+            ledger, conn = bound_ledger()
+            ledger.enqueue([xfill("AAPL", "BOT", 100, 10.0, 30, "s1")])
+            ledger.enqueue([xfill("AAPL", "SLD", 100, 10.5, 20, "s2")])
+            eq(conn.batches, 0, hint="coalescing timer not yet fired")
+            await ledger.close()
+            eq((sorted(conn.table), conn.batches), (["s1", "s2"], 1),
+               hint="close() writes the queue in one batch")
+            await asyncio.sleep(ledger_mod.FLUSH_DELAY_SECONDS + 0.1)
+            eq(conn.batches, 1, hint="cancelled timer never fires")
+
+        asyncio.run(run())
+    r.check("shutdown flush writes queued fills", check_shutdown_flush)
+
+    def check_history():
+        fills = [
+            xfill("AAPL", "BOT", 100, 10.0, 180, "h1"),
+            xfill("MSFT", "SLD", 10, 300.0, 170, "h2"),
+            xfill("AAPL", "BOT", 100, 10.5, 160, "h3"),
+            xfill("AAPL", "SLD", 200, 10.2, 150, "h4"),
+            xfill("MSFT", "BOT", 10, 301.0, 60, "h5"),
+            xfill("AAPL", "BOT", 50, 11.0, 30, "h6"),
+            xfill("TSLA", "BOT", 5, 200.0, 20, "h7"),
+            xfill("TSLA", "SLD", 5, 201.0, 10, "h8"),
+        ]
+        day = noon.date()
+        stale = replace(fills[0], execid="old", time=day_bounds(day - timedelta(days=3))[0])
+
+        async def run():
+            pool = StubPool()
+            await insert_executions(pool.conn, [fill_to_row(f) for f in [stale, *fills]])
+            saved = executions_ledger._db_pool
+            executions_ledger.set_db_pool(pool)
+            try:
+                history = await build_trade_log_history(day - timedelta(days=1), day)
+                only_tsla = await build_trade_log_history(day, day, symbol="tsla")
+            finally:
+                executions_ledger.set_db_pool(saved)
+            return history, only_tsla, await build_trade_log(StubIbClient(fills))
+
+        history, only_tsla, live = asyncio.run(run())
+        eq(history.trades, build_completed_trades(_group_fills_by_symbol(fills)),
+           hint="same cycles as the live builder")
+        eq(history.rows, live.rows, hint="same per-symbol rows")
+        approx(history.realized_pnl, live.realized_pnl)
+        eq([t["symbol"] for t in only_tsla.trades], ["TSLA"])
+    r.check("build_trade_log_history groups DB rows like the live log", check_history)
+
+
+def test_lockout_hub(r: Runner):
+    section("LockoutHub: push on loss fill, timer-driven unlock")
+
+    def check_push_and_expiry():
+        # One loss whose MAX_ENTRY_FREQUENCY_MINUTES cooldown ends ~0.3s
+        # from now (assumes CONSECUTIVE_LOSS_TIER1_COUNT > 1, so only the
+        # post-loss cooldown applies).
+        threshold = timedelta(minutes=risk_settings.MAX_ENTRY_FREQUENCY_MINUTES)
+        exit_time = datetime.now(ENGINE_TZ) - threshold + timedelta(seconds=0.3)
+
+        def lfill(action, price, t, execid, symbol="AAPL"):
+            return Fill(
+                tradeid=0, symbol=symbol, conid=1, sectype="STK", action=action,
+                quantity=100, price=price, time=t, exchange="SMART", execid=execid,
+            )
+
+        async def run():
+            engine = TradesEngine()
+            hub = LockoutHub(engine)
+            hub.bind(asyncio.get_running_loop())
+            q = hub.subscribe()
+            eq(hub.snapshot_now()["status"]["locked"], False)
+
+            engine.ingest([
+                lfill("BOT", 10.0, exit_time - timedelta(seconds=5), "l1"),
+                lfill("SLD", 9.0, exit_time, "l2"),
+            ])
+            msg = await asyncio.wait_for(q.get(), 1.0)
+            eq(msg["status"]["locked"], True, hint="loss fill pushes a lock")
+            eq(msg["status"]["streak"], 1)
+            assert hub._expiry is not None, "expiry timer armed"
+
+            engine.ingest([lfill("BOT", 5.0, exit_time, "l3", symbol="MSFT")])
+            await asyncio.sleep(0.05)
+            assert q.empty(), "a fill that doesn't change the state pushes nothing"
+
+            msg = await asyncio.wait_for(q.get(), 2.0)
+            eq(msg["status"]["locked"], False, hint="timer fires the unlock")
+            assert hub._expiry is None
+            hub.close()
+            hub.unsubscribe(q)
+
+        asyncio.run(run())
+    r.check("lock pushed on fill; unlock pushed at cooldown_until", check_push_and_expiry)
+
+
+def test_openrisk_hub(r: Runner):
+    section("OpenRiskHub: per-symbol patches")
+
+    from ib_async import AccountValue, Contract, Order, OrderStatus, Trade
+    from ib_async import Position as IbPosition
+
+    def pos(symbol, qty, avg):
+        return IbPosition("DU1", Contract(symbol=symbol, secType="STK"), qty, avg)
+
+    def stp(symbol, aux):
+        return Trade(
+            contract=Contract(symbol=symbol, secType="STK"),
+            order=Order(permId=1, orderType="STP", action="SELL", auxPrice=aux),
+            orderStatus=OrderStatus(status="Submitted"),
+        )
+
+    class StubIb:
+        def __init__(self):
+            self.positions = [pos("AAPL", 100, 10.0), pos("MSFT", 10, 300.0)]
+            self.trades = [stp("AAPL", 9.5)]
+            self.netliq = "100000"
+
+        async def reqPositionsAsync(self):
+            return list(self.positions)
+
+        async def reqAllOpenOrdersAsync(self):
+            return list(self.trades)
+
+        async def accountSummaryAsync(self):
+            return [AccountValue("DU1", "NetLiquidation", self.netliq, "USD", "")]
+
+    class StubPool:
+        fetches = 0
+
+        def acquire(self):
+            pool = self
+
+            class Conn:
+                async def __aenter__(self):
+                    return self
+
+                async def __aexit__(self, *exc):
+                    return False
+
+                async def fetch(self, _sql, symbols):
+                    pool.fetches += 1
+                    return [{"symbol": "AAPL", "strategy": "ema9"}] if "AAPL" in symbols else []
+            return Conn()
+
+    def check_patches():
+        async def run():
+            ib, pool = StubIb(), StubPool()
+            hub = OpenRiskHub(ib=ib, db_pool=pool)
+            hub.bind_loop(asyncio.get_running_loop())
+            q = hub.subscribe()
+
+            snap = await hub.snapshot_now()
+            eq(snap["type"], "snapshot")
+            eq([row["symbol"] for row in snap["rows"]], ["AAPL", "MSFT"])
+            eq(snap["rows"][0]["exit_strategies"], ["ema9"])
+            seq = snap["seq"]
+
+            async def next_msg():
+                # Generous: the adaptive rate cap may space recomputes out.
+                return await asyncio.wait_for(q.get(), 5.0)
+
+            ib.trades[0].order.auxPrice = 9.8
+            hub.on_order(ib.trades[0])
+            msg = await next_msg()
+            eq((msg["type"], msg["seq"]), ("patch", seq + 1))
+            eq([row["symbol"] for row in msg["rows"]], ["AAPL"], hint="only the touched row")
+            eq(msg["rows"][0]["auxprice"], 9.8)
+            eq(pool.fetches, 1, hint="cached strategies, no DB read")
+
+            hub.on_position(pos("MSFT", 10, 300.0))
+            await asyncio.sleep(0.6)
+            assert q.empty(), "unchanged row -> no patch"
+
+            ib.positions = ib.positions[:1]
+            hub.on_position(pos("MSFT", 0, 0.0))
+            msg = await next_msg()
+            eq((msg["seq"], msg["rows"], msg["removed"]), (seq + 2, [], ["MSFT"]))
+
+            ib.netliq = "50000"
+            hub.on_account_value(AccountValue("DU1", "NetLiquidation", "50000", "USD", ""))
+            msg = await next_msg()
+            eq(msg["rows"][0]["allocation"], 2.0, hint="allocation follows NetLiq")
+
+            # Filtered before scheduling: other tags, repeats, non-stop orders.
+            before = hub.stats()
+            hub.on_account_value(AccountValue("DU1", "BuyingPower", "1", "USD", ""))
+            hub.on_account_value(AccountValue("DU1", "NetLiquidation", "50000", "USD", ""))
+            lmt = stp("AAPL", 0.0)
+            lmt.order.orderType = "LMT"
+            hub.on_order(lmt)
+            hub.on_position(pos("AAPL", 100, 10.0))
+            hub.on_position(pos("AAPL", 100, 10.0))
+            after = hub.stats()
+            eq(after["triggers_received"] - before["triggers_received"], 5)
+            eq(after["triggers_dropped"] - before["triggers_dropped"], 4)
+            eq(after["patches_sent"], 3)
+
+            hub.unsubscribe(q)
+
+        asyncio.run(run())
+    r.check("patches carry only changed rows, in seq order; filters count drops", check_patches)
+
+    def check_live_frames():
+        class FakeTicker:
+            def __init__(self, price):
+                self.price = price
+
+            def marketPrice(self):
+                return self.price
+
+        async def run():
+            ib = StubIb()
+            hub = OpenRiskHub(ib=ib, db_pool=StubPool(), frame_hz=10.0)
+            hub.bind_loop(asyncio.get_running_loop())
+            q = hub.subscribe()
+            seq = (await hub.snapshot_now())["seq"]
+
+            # Stand in for the quote-board line _watch would attach.
+            ticker = FakeTicker(10.2)
+            hub._tickers["AAPL"] = ticker
+            for price in (10.2, 10.3, 10.4, 10.45):     # a burst inside one frame
+                ticker.price = price
+                hub._on_tick("AAPL")
+            msg = await asyncio.wait_for(q.get(), 1.0)
+            eq((msg["type"], msg["seq"]), ("patch", seq + 1))
+            row = msg["rows"][0]
+            eq((row["last"], row["unrealized_pnl"], row["r_multiple"]), (10.45, 45.0, 0.9),
+               hint="100 sh, cost 10.0, stop 9.5 -> 1R = $50")
+            await asyncio.sleep(0.3)
+            assert q.empty(), "burst conflated into one frame"
+            eq(hub.stats()["live_frames"], 1)
+
+            hub._on_tick("AAPL")                        # same price again
+            await asyncio.sleep(0.3)
+            assert q.empty(), "unchanged live values -> no patch"
+            hub._tickers.clear()
+            hub.unsubscribe(q)
+
+        asyncio.run(run())
+    r.check("live PnL / R conflated to one patch per frame", check_live_frames)
+
+
+def test_broker(r: Runner):
+    section("Broker: conflation, lossless overflow, retain, metrics")
+
+    def check_conflate():
+        async def run():
+            b = Broker()
+            b.topic("t", policy=CONFLATE, maxsize=2, key=lambda m: m["k"])
+            sub = b.subscribe("t")
+            for i in range(5):
+                b.publish("t", {"k": "a", "v": i})
+            b.publish("t", {"k": "b", "v": 0})
+            eq([await sub.get() for _ in range(2)], [{"k": "a", "v": 4}, {"k": "b", "v": 0}])
+            assert sub.empty()
+            st = b.stats()["t"]
+            eq((st["published"], st["conflated"], st["dropped"], st["delivered"]), (6, 4, 0, 2))
+
+            # A third key while two are queued: no key is evicted; the
+            # subscriber is closed so it re-snapshots.
+            b.publish("t", {"k": "a", "v": 5})
+            b.publish("t", {"k": "b", "v": 1})
+            b.publish("t", {"k": "c", "v": 0})
+            assert sub.closed and sub.empty()
+            try:
+                await sub.get()
+                raise AssertionError("closed subscriber should raise")
+            except SubscriptionClosed:
+                pass
+            eq(b.subscriber_count("t"), 0)
+            st = b.stats()["t"]
+            eq((st["dropped"], st["disconnects"]), (3, 1))
+
+        asyncio.run(run())
+    r.check("CONFLATE keeps newest per key; key overflow closes, never evicts", check_conflate)
+
+    def check_conflate_resync():
+        async def run():
+            b = Broker()
+            b.topic("t", policy=CONFLATE, maxsize=2, key=lambda m: m["k"],
+                    resync=lambda: {"snapshot": True})
+            sub = b.subscribe("t")
+            for k in "abc":
+                b.publish("t", {"k": k})
+            b.publish("t", {"k": "a", "v": 1})
+            env = await sub.get_envelope()
+            eq((env.msg, env.id), ({"snapshot": True}, 3), hint="backlog replaced by resync")
+            eq(await sub.get(), {"k": "a", "v": 1}, hint="later updates follow it")
+            assert sub.empty() and not sub.closed
+            eq(b.stats()["t"]["resyncs"], 1)
+
+        asyncio.run(run())
+    r.check("CONFLATE key overflow resyncs when the topic has a hook", check_conflate_resync)
+
+    def check_lossless():
+        async def run():
+            b = Broker()
+            b.topic("ev", policy=LOSSLESS, maxsize=3)
+            b.topic("snap", policy=LOSSLESS, maxsize=3, resync=lambda: "FULL")
+            ev, snap = b.subscribe("ev"), b.subscribe("snap")
+            for i in range(3):
+                b.publish("ev", i)
+                b.publish("snap", i)
+            eq(await ev.get(), 0, hint="lossless keeps order")
+            b.publish("ev", 3)
+            b.publish("ev", 4)      # overflow, no resync -> closed
+            b.publish("snap", 3)    # overflow -> backlog replaced by resync
+            eq(b.subscriber_count("ev"), 0)
+            try:
+                ev.get_nowait()
+                raise AssertionError("closed subscriber should raise")
+            except SubscriptionClosed:
+                pass
+            eq(await snap.get(), "FULL")
+            assert snap.empty()
+            eq(b.stats()["ev"]["disconnects"], 1)
+            eq(b.stats()["snap"]["resyncs"], 1)
+
+        asyncio.run(run())
+    r.check("LOSSLESS overflow resyncs or closes, never skips", check_lossless)
+
+    def check_resync_shared():
+        async def run():
+            calls = []
+            b = Broker()
+            b.topic("snap", policy=LOSSLESS, maxsize=1,
+                    resync=lambda: calls.append(1) or {"full": len(calls)})
+            s1, s2 = b.subscribe("snap"), b.subscribe("snap")
+            b.publish("snap", 0)
+            b.publish("snap", 1)    # both overflow on seq 2
+            e1, e2 = s1.get_envelope_nowait(), s2.get_envelope_nowait()
+            assert e1 is e2, "one resync envelope per seq"
+            eq((len(calls), e1.msg, e1.id), (1, {"full": 1}, 2))
+            eq(e1.tagged, e2.tagged)
+            eq(b.stats()["snap"]["encodes"], 1, hint="resync encoded once")
+            b.publish("snap", 2)
+            b.publish("snap", 3)    # next seq -> fresh snapshot
+            eq((s1.get_nowait(), len(calls)), ({"full": 2}, 2))
+
+        asyncio.run(run())
+    r.check("resync snapshot built and encoded once per seq", check_resync_shared)
+
+    def check_retain():
+        async def run():
+            b = Broker()
+            b.topic("alarms", policy=LOSSLESS, retain=2)
+            for i in range(3):
+                b.publish("alarms", i)
+            eq(b.stats()["alarms"]["retained"], 2)
+            s1, s2 = b.subscribe("alarms"), b.subscribe("alarms")
+            eq([s1.get_nowait(), s1.get_nowait()], [1, 2], hint="retained go to first subscriber")
+            assert s2.empty()
+            b.publish("alarms", 3)
+            eq((s1.get_nowait(), s2.get_nowait()), (3, 3), hint="live messages fan out")
+
+        asyncio.run(run())
+    r.check("retained messages handed to the next subscriber", check_retain)
+
+    def check_encode_once():
+        async def run():
+            b = Broker()
+            b.topic("t", policy=LOSSLESS)
+            subs = [b.subscribe("t") for _ in range(3)]
+            b.publish("t", {"type": "patch", "rows": [{"symbol": "AAPL", "x": 1.5}]})
+            envs = [await s.get_envelope() for s in subs]
+            frames = [e.frame for e in envs]
+            assert all(f is frames[0] for f in frames), "one frame object shared"
+            assert frames[0].startswith(b"id: ") and frames[0].endswith(b"}\n\n")
+            eq(json.loads(envs[1].data), {"type": "patch", "rows": [{"symbol": "AAPL", "x": 1.5}]})
+            st = b.stats()["t"]
+            eq((st["encodes"], st["delivered"]), (1, 3))
+            assert st["encoded_bytes"] == len(envs[0].json)
+
+        asyncio.run(run())
+    r.check("payload encoded once and shared across subscribers", check_encode_once)
+
+    def check_resume():
+        async def run():
+            b = Broker()
+            b.topic("ev", policy=LOSSLESS, maxsize=4, replay=3)
+            sub = b.subscribe("ev")
+            for i in range(2):
+                b.publish("ev", i)
+            last = (await sub.get_envelope()).event_id
+            b.unsubscribe(sub)
+            b.publish("ev", 2)
+
+            back = b.subscribe("ev", after=last)
+            assert back.resumed
+            eq([back.get_nowait(), back.get_nowait()], [1, 2], hint="only the missed deltas")
+            assert back.empty()
+            b.unsubscribe(back)
+
+            for i in range(3, 6):
+                b.publish("ev", i)
+            miss = b.subscribe("ev", after=last)
+            assert not miss.resumed, "gap larger than the ring -> snapshot"
+            assert miss.empty()
+            assert not b.subscribe("ev", after="otherepoch:1").resumed
+            cursor = miss.snapshot_cursor()
+            eq(cursor, format_event_id(6))
+            st = b.stats()["ev"]
+            eq((st["resumes"], st["resume_misses"]), (1, 2))
+
+        asyncio.run(run())
+    r.check("Last-Event-ID replays the missed deltas, else snapshot", check_resume)
+
+
+def test_contract_registry(r: Runner):
+    section("ContractRegistry: single-flight, batch, startup warm-up")
+
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+
+    from ib_async import Stock
+
+    from core.startup.contract_registry_setup import wire_contract_registry
+    from services.contracts import ContractRegistry, contract_registry
+
+    CON_IDS = {"AAPL": 265598, "MSFT": 272093, "TSLA": 76792991}
+
+    class StubIb:
+        """qualifyContractsAsync fills conIds in place like IB does;
+        NOPE never qualifies."""
+        def __init__(self, positions=()):
+            self.calls = []
+            self._positions = list(positions)
+
+        async def qualifyContractsAsync(self, *contracts):
+            self.calls.append([c.symbol for c in contracts])
+            await asyncio.sleep(0.01)
+            for c in contracts:
+                if c.symbol in CON_IDS:
+                    c.conId, c.primaryExchange = CON_IDS[c.symbol], "NASDAQ"
+            return [c if c.conId else None for c in contracts]
+
+        def positions(self):
+            return self._positions
+
+        def openTrades(self):
+            return []
+
+    def check_single_flight():
+        async def run():
+            reg, ib = ContractRegistry(), StubIb()
+            got = await asyncio.gather(*(reg.resolve(ib, sym) for sym in ("AAPL", "aapl", " AAPL ")))
+            eq(ib.calls, [["AAPL"]], hint="concurrent misses share one IB call")
+            assert got[0] is got[1] is got[2]
+            assert await reg.resolve(ib, "AAPL") is got[0]
+            eq(len(ib.calls), 1, hint="then served from memory")
+
+            for _ in range(2):
+                try:
+                    await reg.resolve(ib, "NOPE")
+                except ValueError:
+                    pass
+                else:
+                    raise AssertionError("unqualifiable symbol must raise")
+            eq(ib.calls[1:], [["NOPE"], ["NOPE"]], hint="failures are not cached")
+
+        asyncio.run(run())
+    r.check("resolve: concurrent misses share one qualification", check_single_flight)
+
+    def check_batch():
+        async def run():
+            reg, ib = ContractRegistry(), StubIb()
+            aapl = await reg.resolve(ib, "AAPL")
+            got = await reg.resolve_many(ib, ["AAPL", "msft", "MSFT", "tsla", "NOPE", ""])
+            eq(ib.calls[1:], [["MSFT", "TSLA", "NOPE"]], hint="misses only, deduped, one call")
+            eq(sorted(got), ["AAPL", "MSFT", "TSLA"])
+            assert got["AAPL"] is aapl
+            eq(reg.con_id("TSLA"), CON_IDS["TSLA"])
+
+        asyncio.run(run())
+    r.check("resolve_many: one IB call for every miss", check_batch)
+
+    def check_warm_up():
+        class StubConn:
+            def __init__(self):
+                self.written = []
+
+            async def fetch(self, query, *args):
+                if "FROM watchlist" in query:
+                    return [{"id": 1, "symbol": "MSFT", "strategies": [], "created_at": None}]
+                return []
+
+            async def executemany(self, query, records):
+                self.written.extend(records)
+
+        conn = StubConn()
+
+        class StubPool:
+            @asynccontextmanager
+            async def acquire(self):
+                yield conn
+
+        async def run():
+            held = Stock("AAPL", "NASDAQ", "USD", conId=CON_IDS["AAPL"])
+            ib = StubIb(positions=[SimpleNamespace(contract=held)])
+            app = SimpleNamespace(state=SimpleNamespace(ib=ib, db_pool=StubPool()))
+            await wire_contract_registry(app)
+            await asyncio.sleep(0)   # let the fire-and-forget upserts land
+
+            eq(ib.calls, [["MSFT"]], hint="only the watchlist symbol is qualified")
+            aapl = await contract_registry.resolve(ib, "AAPL")
+            eq(len(ib.calls), 1, hint="held symbol resolves without IB")
+            eq((aapl.conId, aapl.exchange, aapl.primaryExchange),
+               (CON_IDS["AAPL"], "SMART", "NASDAQ"))
+            eq(held.exchange, "NASDAQ", hint="the position's own contract is untouched")
+            eq(sorted((rec[0], rec[2]) for rec in conn.written),
+               [("AAPL", "NASDAQ"), ("AAPL", "SMART"), ("MSFT", "SMART")])
+
+        saved = (dict(contract_registry._by_key), contract_registry._db_pool)
+        try:
+            contract_registry._by_key.clear()
+            asyncio.run(run())
+        finally:
+            contract_registry._by_key.clear()
+            contract_registry._by_key.update(saved[0])
+            contract_registry._db_pool = saved[1]
+    r.check("warm-up: listing-exchange position found by resolve()", check_warm_up)
+
+
+def test_ib_state(r: Runner):
+    section("IbStateMirror: event-kept positions / orders, IbClient reads")
+
+    from eventkit import Event
+    from ib_async import Order, OrderStatus, Stock, Trade
+    from ib_async import Position as IbPosition
+
+    import services.portfolio.ib_client as ib_client_mod
+    from services.portfolio.ib_client import IbClient
+    from services.portfolio.ib_state import IbStateMirror
+
+    AAPL = Stock("AAPL", "SMART", "USD", conId=265598)
+    MSFT = Stock("MSFT", "SMART", "USD", conId=272093)
+
+    class StubIb:
+        """Events the mirror binds to, plus counted round trips that
+        answer with whatever the test puts in `positions` / `trades`."""
+        def __init__(self):
+            for name in ("positionEvent", "newOrderEvent", "openOrderEvent",
+                         "orderStatusEvent", "accountValueEvent", "accountSummaryEvent"):
+                setattr(self, name, Event(name))
+            self.positions, self.trades, self.calls = [], [], []
+
+        async def reqPositionsAsync(self):
+            self.calls.append("positions")
+            return list(self.positions)
+
+        async def reqAllOpenOrdersAsync(self):
+            self.calls.append("orders")
+            return list(self.trades)
+
+        async def accountSummaryAsync(self):
+            self.calls.append("account")
+            return []
+
+    def trade(contract, order_type, perm_id=0, order_id=1, status="Submitted"):
+        return Trade(
+            contract=contract,
+            order=Order(action="SELL", totalQuantity=100, orderType=order_type,
+                        auxPrice=9.5, orderId=order_id, clientId=1, permId=perm_id),
+            orderStatus=OrderStatus(status=status),
+        )
+
+    def position(contract, qty, account="DU1"):
+        return IbPosition(account, contract, qty, 10.0)
+
+    def seeded(run):
+        async def wrapped():
+            ib = StubIb()
+            mirror = IbStateMirror(reconcile_seconds=0)
+            mirror.bind(ib)
+            await mirror.seed()
+            ib.calls.clear()
+            saved = ib_client_mod.ib_state
+            ib_client_mod.ib_state = mirror
+            try:
+                await run(ib, mirror)
+            finally:
+                ib_client_mod.ib_state = saved
+        return lambda: asyncio.run(wrapped())
+
+    async def re_key(ib, mirror):
+        t = trade(AAPL, "STP", order_id=7)
+        ib.newOrderEvent.emit(t)
+        eq((mirror.trade_by_perm_id(777), len(mirror.open_trades())), (None, 1))
+        t.order.permId = 777
+        ib.openOrderEvent.emit(t)
+        assert mirror.trade_by_perm_id(777) is t
+        eq((mirror.open_trades(), mirror.trades_for("aapl")), ([t], [t]),
+           hint="re-keyed in place, not duplicated")
+        version = mirror.version
+        t.orderStatus.status = "Filled"
+        ib.orderStatusEvent.emit(t)
+        eq((mirror.open_trades(), mirror.trades_for("AAPL"), mirror.trade_by_perm_id(777)),
+           ([], [], None), hint="terminal status drops it from every index")
+        assert mirror.version > version
+        eq(ib.calls, [], hint="no IB round trips")
+    r.check("order re-keyed on permId; terminal status drops it", seeded(re_key))
+
+    async def by_symbol(ib, mirror):
+        a1, a2, m = position(AAPL, 100), position(AAPL, -50, "DU2"), position(MSFT, 10)
+        for p in (a1, a2, m):
+            ib.positionEvent.emit(p)
+        stp, mkt = trade(AAPL, "STP", 1), trade(MSFT, "MKT", 2, order_id=2)
+        ib.openOrderEvent.emit(stp)
+        ib.openOrderEvent.emit(mkt)
+        eq((mirror.positions_for("aapl"), mirror.positions_for("MSFT")), ([a1, a2], [m]))
+        eq((mirror.trades_for("AAPL"), mirror.trades_for("MSFT")), ([stp], [mkt]))
+        ib.positionEvent.emit(position(AAPL, 0))
+        eq((mirror.positions_for("AAPL"), len(mirror.positions())), ([a2], 2),
+           hint="zero position leaves the index")
+
+        client = IbClient(ib)
+        eq((await client.get_position_by_symbol("AAPL")).position, -50)
+        eq((await client.get_stp_order_by_symbol("AAPL")).orderid, 1)
+        eq(await client.get_mkt_order_by_symbol("AAPL"), None)
+        eq(ib.calls, [], hint="by-symbol reads are dict lookups")
+    r.check("positions / orders indexed by symbol", seeded(by_symbol))
+
+    async def refresh(ib, mirror):
+        stale = trade(AAPL, "STP", 1)
+        ib.openOrderEvent.emit(stale)
+        ib.positionEvent.emit(position(AAPL, 100))
+        # Another client moved the stop and trimmed the position; IB
+        # never pushed it to us.
+        fresh = trade(AAPL, "STP", 2, order_id=9)
+        ib.trades, ib.positions = [fresh], [position(AAPL, 40)]
+
+        client = IbClient(ib)
+        eq((await client.get_stp_order_by_symbol("AAPL")).orderid, 1)
+        eq(ib.calls, [])
+        eq((await client.get_stp_order_by_symbol("AAPL", refresh=True)).orderid, 2)
+        eq((await client.get_position_by_symbol("AAPL", refresh=True)).position, 40)
+        eq(ib.calls, ["orders", "positions"])
+        eq((mirror.trade_by_perm_id(1), mirror.trade_by_perm_id(2)), (None, fresh),
+           hint="refresh re-seeds the mirror")
+    r.check("refresh=True forces one round trip and re-seeds", seeded(refresh))
+
+    async def fallback(ib, mirror):
+        known, from_tws = trade(AAPL, "STP", 11), trade(MSFT, "STP", 12, order_id=0)
+        ib.openOrderEvent.emit(known)
+        ib.trades = [known, from_tws]
+        client = IbClient(ib)
+        assert await client._find_open_trade(11) is known
+        eq(ib.calls, [], hint="mirror hit")
+        assert await client._find_open_trade(12) is from_tws
+        eq(await client._find_open_trade(13), None)
+        eq(ib.calls, ["orders", "orders"], hint="a miss asks IB once")
+    r.check("_find_open_trade falls back to IB on a mirror miss", seeded(fallback))
+
+
+def test_quote_board(r: Runner):
+    section("QuoteBoard: ref-counted lines, idle linger")
+
+    from ib_async import Ticker
+
+    from services.contracts import contract_registry
+    from services.quote_board import QuoteBoard
+
+    TTL = 0.05
+
+    class StubIb:
+        def __init__(self):
+            self.opened = []
+            self.cancelled = []
+
+        async def qualifyContractsAsync(self, *contracts):
+            for c in contracts:
+                c.conId = 7000 + len(c.symbol)
+            return list(contracts)
+
+        def reqMktData(self, contract, *_args):
+            self.opened.append(contract.symbol)
+            return Ticker(contract=contract)
+
+        def cancelMktData(self, contract):
+            self.cancelled.append(contract.symbol)
+
+    def with_board(run):
+        async def wrapped():
+            ib = StubIb()
+            board = QuoteBoard(idle_ttl=TTL)
+            board.bind(ib)
+            try:
+                await run(board, ib)
+            finally:
+                board.close()
+
+        def check():
+            saved = dict(contract_registry._by_key)
+            try:
+                asyncio.run(wrapped())
+            finally:
+                contract_registry._by_key.clear()
+                contract_registry._by_key.update(saved)
+        return check
+
+    async def ref_counting(board, ib):
+        tickers = await asyncio.gather(*(board.acquire(s) for s in ("QBA", "qba", " QBA")))
+        assert tickers[0] is tickers[1] is tickers[2]
+        eq(ib.opened, ["QBA"], hint="three holders, one line")
+        eq(board.stats()["QBA"]["refs"], 3)
+        board.release("QBA")
+        board.release("QBA")
+        eq((ib.cancelled, board.stats()["QBA"]["refs"]), ([], 1), hint="still held once")
+        board.release("QBA", linger=False)
+        eq(ib.cancelled, ["QBA"], hint="last holder out cancels the line")
+        eq(board.stats(), {})
+        board.release("QBA")   # unmatched release is a no-op
+        await board.acquire("QBA")
+        eq(ib.opened, ["QBA", "QBA"], hint="next acquire re-subscribes")
+        board.release("QBA", linger=False)
+    r.check("acquire/release share one line; last release cancels it", with_board(ref_counting))
+
+    async def linger(board, ib):
+        await board.acquire("QBL")
+        board.release("QBL")
+        await asyncio.sleep(TTL / 2)
+        eq((ib.cancelled, board.stats()["QBL"]["refs"]), ([], 0), hint="lingers for the TTL")
+        await board.acquire("QBL")
+        eq(ib.opened, ["QBL"], hint="re-acquire inside the TTL reuses the line")
+        board.release("QBL")
+        await asyncio.sleep(TTL * 3)
+        eq((ib.cancelled, board.stats()), (["QBL"], {}), hint="cancelled once the TTL lapses")
+    r.check("release(linger) keeps the line open for the idle TTL", with_board(linger))
+
+    async def quotes(board, ib):
+        async def tick_soon():
+            await asyncio.sleep(0.01)
+            ticker = (await board.acquire("QBQ"))
+            ticker.bid, ticker.ask = 10.0, 10.02
+            ticker.updateEvent.emit(ticker)
+            board.release("QBQ")
+
+        feeder = asyncio.ensure_future(tick_soon())
+        quote = await board.get_quote("QBQ", timeout=1.0)
+        await feeder
+        eq((quote.bid, quote.ask), (10.0, 10.02), hint="waits for the first tick")
+        eq((board.peek("QBQ").bid, ib.opened), (10.0, ["QBQ"]), hint="then served from the line")
+        board._lines["QBQ"].ts -= 10
+        try:
+            await board.get_quote("QBQ", max_age=1.0, timeout=0.02)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a stale quote must be rejected")
+    r.check("get_quote waits for a tick, then rejects stale quotes", with_board(quotes))
+
+    def check_settings():
+        from core.config import settings
+        from services.quote_board import quote_board
+        eq(quote_board.idle_ttl, settings.QUOTE_IDLE_TTL_SECONDS)
+        assert settings.QUOTE_MAX_AGE_SECONDS > 0
+    r.check("singleton idle TTL and order max_age come from settings", check_settings)
+
+
+def test_live_scanner(r: Runner):
+    section("Live scanner: dirty rows, capped frame rate, shared lines")
+
+    from types import SimpleNamespace
+
+    from ib_async import Contract, Ticker
+
+    import services.live_scanner as live_scanner_mod
+    from helpers.broker import broker
+    from services.contracts import contract_registry
+    from services.live_scanner import TOPIC as SCANNER_TOPIC, LiveScannerManager
+    from services.quote_board import QuoteBoard
+    from schemas.api_schemas import LiveScannerRow, LiveScannerUpdate
+
+    UP_ONLY = {"up": "live_gap_up_scan"}
+
+    class StubIb:
+        def isConnected(self):
+            return True
+
+    def tick(price, volume=1000):
+        return SimpleNamespace(last=price, close=10.0, volume=volume)
+
+    def parse(frame):
+        # Frames render their own JSON; it must still be a LiveScannerUpdate.
+        return LiveScannerUpdate.model_validate_json(frame.to_json())
+
+    def drain(sub):
+        out = []
+        while not sub.empty():
+            out.append(parse(sub.get_nowait()))
+        return out
+
+    def check_deltas():
+        async def run():
+            mgr = LiveScannerManager(StubIb(), scans=UP_ONLY)
+            up = mgr.sides["up"]
+            up.ranks = {"AAA": 0, "BBB": 1}
+            mgr._tickers = {"AAA": tick(11.0), "BBB": tick(12.0)}
+            sub = broker.subscribe(SCANNER_TOPIC)
+            try:
+                for sym in up.ranks:
+                    mgr._mark(up, sym)
+                await mgr._flush_side(up)
+                (first,) = drain(sub)
+                eq((first.kind, sorted(row.symbol for row in first.rows)), ("delta", ["AAA", "BBB"]))
+
+                # A burst of ticks, only one of which moved a value.
+                for _ in range(100):
+                    mgr._mark(up, "AAA")
+                mgr._tickers["BBB"] = tick(12.5)
+                mgr._mark(up, "BBB")
+                await mgr._flush_side(up)
+                (second,) = drain(sub)
+                eq([(row.symbol, row.price) for row in second.rows], [("BBB", 12.5)],
+                   hint="only the changed row")
+
+                mgr._mark(up, "AAA")
+                await mgr._flush_side(up)
+                eq(drain(sub), [], hint="no frame when nothing changed")
+
+                del up.ranks["AAA"]
+                mgr._mark(up, "AAA")
+                await mgr._flush_side(up)
+                (third,) = drain(sub)
+                eq((third.rows, third.removed), ([], ["AAA"]))
+                (snap_up,) = map(parse, mgr.current_snapshot())
+                eq((snap_up.kind, [row.symbol for row in snap_up.rows]), ("snapshot", ["BBB"]))
+
+                # Rows update in place and render the same JSON the model would.
+                row = up.sent["BBB"]
+                eq(row.json, LiveScannerRow(**{
+                    f: getattr(row, f) for f in LiveScannerRow.model_fields
+                }).model_dump_json().encode(), hint="row JSON matches the schema")
+                mgr._tickers["BBB"] = tick(12.75)
+                mgr._mark(up, "BBB")
+                await mgr._flush_side(up)
+                eq((up.sent["BBB"] is row, row.price, [r.price for r in drain(sub)[0].rows]),
+                   (True, 12.75, [12.75]))
+            finally:
+                broker.unsubscribe(sub)
+
+        asyncio.run(run())
+    r.check("frames carry only changed rows + removals", check_deltas)
+
+    def check_untick_row():
+        async def run():
+            mgr = LiveScannerManager(StubIb(), scans=UP_ONLY)
+            up = mgr.sides["up"]
+            up.ranks = {"NEW": 0}
+            nan = float("nan")
+            mgr._tickers = {"NEW": SimpleNamespace(last=nan, close=nan, volume=nan, bid=nan, ask=nan)}
+            sub = broker.subscribe(SCANNER_TOPIC)
+            try:
+                mgr._mark(up, "NEW")
+                await mgr._flush_side(up)
+                (first,) = drain(sub)
+                eq([(row.symbol, row.rank, row.price) for row in first.rows], [("NEW", 0, None)],
+                   hint="a rank-0 row with no tick yet still goes out")
+                (snap_up,) = map(parse, mgr.current_snapshot())
+                eq([row.symbol for row in snap_up.rows], ["NEW"])
+            finally:
+                broker.unsubscribe(sub)
+
+        asyncio.run(run())
+    r.check("rank-0 row before its first tick: sent, snapshot parses", check_untick_row)
+
+    def check_frame_rate():
+        async def run():
+            mgr = LiveScannerManager(StubIb(), frame_hz=10.0, scans=UP_ONLY)
+            up = mgr.sides["up"]
+            up.ranks = {"AAA": 0}
+            sub = broker.subscribe(SCANNER_TOPIC)
+            task = asyncio.create_task(mgr._render_loop(up))
+            try:
+                for i in range(50):
+                    mgr._tickers["AAA"] = tick(11.0 + i / 100)
+                    mgr._mark(up, "AAA")
+                await asyncio.sleep(0.02)
+                eq(len(drain(sub)), 1, hint="a burst of ticks is one frame")
+                mgr._tickers["AAA"] = tick(13.0)
+                mgr._mark(up, "AAA")
+                await asyncio.sleep(0.02)
+                eq(len(drain(sub)), 0, hint="held until the frame interval passes")
+                await asyncio.sleep(0.12)
+                frames = drain(sub)
+                eq([row.price for f in frames for row in f.rows], [13.0])
+                eq(mgr.status()["frames_sent"], 2)
+            finally:
+                task.cancel()
+                broker.unsubscribe(sub)
+
+        asyncio.run(run())
+    r.check("render loop emits at most frame_hz frames a second", check_frame_rate)
+
+    class ScanIb(StubIb):
+        def __init__(self):
+            self.qualify_calls = []
+            self.mktdata = []
+
+        async def qualifyContractsAsync(self, *contracts):
+            self.qualify_calls.append(sorted(c.symbol for c in contracts))
+            await asyncio.sleep(0.01)
+            for i, c in enumerate(contracts):
+                c.conId = 9000 + i
+            return list(contracts)
+
+        def reqMktData(self, contract, *_args):
+            self.mktdata.append(contract.symbol)
+            return Ticker(contract=contract)
+
+        def cancelMktData(self, contract):
+            self.mktdata.remove(contract.symbol)
+
+    def item(rank, symbol, con_id=0):
+        # Scan results carry the listing exchange, not SMART.
+        contract = Contract(symbol=symbol, secType="STK", exchange="NASDAQ", conId=con_id)
+        return SimpleNamespace(rank=rank, contractDetails=SimpleNamespace(contract=contract))
+
+    def with_board(run):
+        # A private quote board bound to the stub IB, so the shared
+        # singleton stays untouched for the other tests.
+        async def wrapped(ib):
+            saved = live_scanner_mod.quote_board
+            board = QuoteBoard()
+            board.bind(ib)
+            live_scanner_mod.quote_board = board
+            try:
+                await run(ib)
+            finally:
+                board.close()
+                live_scanner_mod.quote_board = saved
+        return lambda: asyncio.run(wrapped(ScanIb()))
+
+    async def scan_update(ib):
+        mgr = LiveScannerManager(ib, scans=UP_ONLY)
+        up = mgr.sides["up"]
+        first = [item(0, "LSA", 101), item(1, "LSB", 102), item(2, "LSX"), item(3, "LSY")]
+        second = [item(0, "LSB", 102), item(1, "LSC", 103)]
+        # Overlapping updates: the second waits for the first (which is
+        # mid-qualify) instead of interleaving with it.
+        await asyncio.gather(
+            mgr._handle_scan_update(up, first),
+            mgr._handle_scan_update(up, second),
+        )
+        eq(ib.qualify_calls, [["LSX", "LSY"]], hint="scan contracts reused, rest batched")
+        eq(sorted(mgr._tickers), ["LSB", "LSC"])
+        eq(sorted(ib.mktdata), ["LSB", "LSC"], hint="lines of dropped symbols cancelled")
+        eq(up.ranks, {"LSB": 0, "LSC": 1})
+        eq(contract_registry.con_id("LSA"), 101)
+        eq(first[0].contractDetails.contract.exchange, "NASDAQ", hint="IB's scan contract untouched")
+    r.check("scan update: reuse scan contracts, batch the rest, one at a time",
+            with_board(scan_update))
+
+    async def shared_lines(ib):
+        mgr = LiveScannerManager(
+            ib, scans={"up": "live_gap_up_scan", "hot": "high_activity_scan"}, max_lines=2,
+        )
+        up, hot = mgr.sides["up"], mgr.sides["hot"]
+        await mgr._handle_scan_update(up, [item(0, "SLA", 201), item(1, "SLB", 202), item(2, "SLC", 203)])
+        await mgr._handle_scan_update(hot, [item(0, "SLC", 203), item(1, "SLD", 204)])
+        # Best ranks: SLA 0 (up), SLC 0 (hot), SLB 1, SLD 1 -> budget keeps SLA, SLC.
+        eq(sorted(ib.mktdata), ["SLA", "SLC"], hint="one line per symbol, lowest ranks evicted")
+        eq(mgr.status()["evictions"], 1, hint="SLB lost its line to SLC")
+        await mgr._flush_side(up)
+        await mgr._flush_side(hot)
+        eq((sorted(up.sent), sorted(hot.sent)), (["SLA", "SLC"], ["SLC"]))
+
+        # SLD overtakes SLC in the hot scan: SLC is evicted from both tables.
+        await mgr._handle_scan_update(hot, [item(0, "SLD", 204), item(1, "SLC", 203)])
+        eq(sorted(ib.mktdata), ["SLA", "SLD"])
+        await mgr._flush_side(up)
+        await mgr._flush_side(hot)
+        eq((sorted(up.sent), sorted(hot.sent)), (["SLA"], ["SLD"]))
+        await mgr.stop()
+        eq(ib.mktdata, [], hint="stop releases every line")
+    r.check("N scans share ref-counted lines under a line budget", with_board(shared_lines))
+
+    def check_enrichment():
+        from datetime import date as _date, datetime as _dt
+
+        from services.live_enrichment import LiveEnricher
+        from services.volume_profiles import ET, compute_profile, session_position, volume_profiles
+
+        def bars_for(day, high):
+            # 09:30-16:00 ET, 100 shares a 5-min bar, range 10 -> high.
+            out = []
+            for i in range(78):
+                t = _dt(day.year, day.month, day.day, 9, 30, tzinfo=ET) + timedelta(minutes=5 * i)
+                out.append(SimpleNamespace(date=t, volume=100.0, high=high, low=10.0, close=10.0))
+            return out
+
+        today = _date(2026, 3, 10)
+        bars = (bars_for(_date(2026, 3, 5), 11.0) + bars_for(_date(2026, 3, 6), 12.0)
+                + bars_for(_date(2026, 3, 9), 13.0) + bars_for(today, 99.0))
+        base = compute_profile(bars, today.toordinal())
+        eq((base.cum_volume.dtype.name, base.cum_volume.shape), ("float32", (192,)))
+        approx(base.atr, 2.5, hint="TRs 2 and 3; today's bars ignored")
+
+        clock = session_position(_dt(2026, 3, 10, 10, 0, tzinfo=ET))
+        eq(clock, (today.toordinal(), 72.0))
+        approx(base.expected_volume(72.0), 600.0, hint="six 09:30-09:55 bins")
+
+        async def run():
+            class HistIb(StubIb):
+                calls = 0
+
+                async def reqHistoricalDataAsync(self, contract, **_kw):
+                    HistIb.calls += 1
+                    return bars
+
+                async def qualifyContractsAsync(self, *contracts):
+                    for c in contracts:
+                        c.conId = 777
+                    return list(contracts)
+
+            ready = []
+            enricher = LiveEnricher(HistIb(), on_ready=ready.append)
+            ticker = SimpleNamespace(volume=1200.0, high=15.0, low=10.0)
+            eq(enricher.metrics("ENRA", ticker, clock), (None, None), hint="no baseline yet")
+            enricher.request("ENRA", clock[0])
+            enricher.start()
+            try:
+                for _ in range(50):
+                    if ready:
+                        break
+                    await asyncio.sleep(0.01)
+                eq(ready, ["ENRA"])
+                eq(enricher.metrics("ENRA", ticker, clock), (2.0, 2.0))
+                enricher.request("ENRA", clock[0])
+                await asyncio.sleep(0.01)
+                eq(HistIb.calls, 1, hint="one historical request per symbol per day")
+                eq(enricher.stats()["pending"], 0)
+
+                volume_profiles.put("ENRB", base)
+                eq(enricher.metrics("ENRB", ticker, clock), (2.0, 2.0))
+                await asyncio.sleep(0.01)
+                eq(HistIb.calls, 1, hint="a prebuilt profile costs no request")
+            finally:
+                enricher.stop()
+
+        asyncio.run(run())
+    r.check("enrichment: daily baseline, O(1) RVOL / RelATR per row", check_enrichment)
+
+    def check_replay():
+        import tempfile
+        import time as _time
+        from pathlib import Path
+
+        from services.live_scanner_recording import ReplayIB, SessionRecorder, read_session
+
+        with tempfile.TemporaryDirectory() as tmp:
+            rec = SessionRecorder.create(Path(tmp), UP_ONLY)
+            rec.scan("up", [item(0, "LRA", 301), item(1, "LRB", 302)])
+            _time.sleep(0.03)
+            rec.tick("LRA", SimpleNamespace(contract=None, last=11.0, close=10.0,
+                                            bid=10.99, ask=11.01, high=11.5, low=9.5, volume=5e5))
+            rec.tick("LRB", SimpleNamespace(contract=None, last=21.0, close=20.0, volume=None))
+            rec.scan("up", [item(0, "LRB", 302), item(1, "LRA", 301)])
+            rec.close()
+            (path,) = Path(tmp).glob("*.lsr")
+
+            meta, records = read_session(path)
+            records = list(records)
+            eq((meta["scans"], [(k, key) for k, _t, key, _p in records]),
+               (UP_ONLY, [("scan", "up"), ("tick", "LRA"), ("tick", "LRB"), ("scan", "up")]))
+            eq(records[0][3], [(0, "LRA", 301), (1, "LRB", 302)])
+            approx(records[1][3]["bid"], 10.99, tol=1e-5, hint="f32 prices")
+            eq((records[1][3]["volume"], records[2][3]["bid"] != records[2][3]["bid"]),
+               (5e5, True), hint="missing fields come back NaN")
+
+            async def run(ib):
+                mgr = LiveScannerManager(ib, scans=UP_ONLY)
+                await mgr.start()
+                await ib.run(speed=1.0)
+                await asyncio.sleep(0.01)
+                up = mgr.sides["up"]
+                await mgr._flush_side(up)
+                eq(up.ranks, {"LRB": 0, "LRA": 1})
+                eq(sorted((sym, row.price, row.volume) for sym, row in up.sent.items()),
+                   [("LRA", 11.0, 5e5), ("LRB", 21.0, None)])
+                eq(contract_registry.con_id("LRB"), 302)
+                await mgr.stop()
+
+            async def wrapped():
+                ib = ReplayIB(path)
+                saved = live_scanner_mod.quote_board
+                board = QuoteBoard()
+                board.bind(ib)
+                live_scanner_mod.quote_board = board
+                try:
+                    await run(ib)
+                finally:
+                    board.close()
+                    live_scanner_mod.quote_board = saved
+
+            asyncio.run(wrapped())
+    r.check("recorded session replays through the manager", check_replay)
+
+
+def test_bar_store(r: Runner):
+    section("BarStore: incremental intraday bars")
+
+    from datetime import timezone as _tz
+    from types import SimpleNamespace
+
+    from ib_async import Contract
+
+    import services.bar_store as bar_store_mod
+    import services.historical_data as historical_data_mod
+    from services.bar_store import BarStore, window_start
+    from services.contracts import contract_registry
+
+    contract_registry.remember(Contract(symbol="BSA", secType="STK", exchange="SMART",
+                                        currency="USD", conId=4242))
+
+    class BarsIb:
+        # Serves 2-minute bars over the requested span up to `now`; the
+        # newest bar's volume grows with every request (still forming).
+        def __init__(self):
+            self.now = None
+            self.durations = []
+
+        async def reqHistoricalDataAsync(self, contract, durationStr, **_kw):
+            self.durations.append(durationStr)
+            n, unit = durationStr.split()
+            span = int(n) * (1 if unit == "S" else 86400)
+            end = int(self.now.timestamp()) // 120 * 120
+            out = []
+            for t in range(end - span // 120 * 120, end + 1, 120):
+                out.append(SimpleNamespace(
+                    date=datetime.fromtimestamp(t, _tz.utc),
+                    open=10.0, high=10.0, low=10.0, close=10.0, volume=100.0,
+                ))
+            out[-1].volume = 100.0 + len(self.durations)
+            return out
+
+    def check_incremental():
+        async def run():
+            store, ib = BarStore(), BarsIb()
+            t0 = datetime(2026, 3, 10, 15, 1, tzinfo=_tz.utc)     # Tue
+            eq(window_start(t0, 5), datetime(2026, 3, 4, tzinfo=bar_store_mod.ET))
+
+            async def get(now):
+                ib.now = now
+                return (await store.get_bars(ib, "BSA", now=now)).bars()
+
+            first = await get(t0)
+            eq((ib.durations, first[0].date >= window_start(t0, 5)), (["5 D"], True))
+
+            await get(t0 + timedelta(seconds=10))
+            eq(len(ib.durations), 1, hint="refreshed moments ago: no request")
+
+            later = await get(t0 + timedelta(minutes=6))
+            eq(ib.durations[-1], "480 S", hint="from the forming bar to now")
+            eq(len(later) - len(first), 3)
+            eq(len({b.date for b in later}), len(later), hint="no duplicate bars")
+            eq([b.volume for b in later if b.date == first[-1].date], [100.0],
+               hint="the bar that was forming is replaced")
+
+            # Three days offline: the tail request spans and fills the gap.
+            after_gap = await get(t0 + timedelta(days=3))
+            eq(ib.durations[-1], "4 D")
+            steps = {(b2.date - b1.date).total_seconds() for b1, b2 in zip(after_gap, after_gap[1:])}
+            eq(steps, {120.0}, hint="contiguous across the gap")
+
+            # Coverage no longer reaches the window: full download.
+            await get(t0 + timedelta(days=14))
+            eq(ib.durations[-1], "5 D")
+            eq(store.stats()["full"], 2)
+
+        # Simulated days apart, but the same wall-clock second: not the
+        # identical request the scheduler would answer from its cache.
+        saved = historical_data_mod.IDENTICAL_REQUEST_SECONDS
+        historical_data_mod.IDENTICAL_REQUEST_SECONDS = 0
+        try:
+            asyncio.run(run())
+        finally:
+            historical_data_mod.IDENTICAL_REQUEST_SECONDS = saved
+    r.check("re-scan fetches only the tail, gaps backfill", check_incremental)
+
+
+def test_scanner_pipeline(r: Runner):
+    section("Scanner pipeline: columnar bars -> scanner rows")
+
+    from datetime import time as _time_of_day
+    from zoneinfo import ZoneInfo
+
+    from services.bar_store import Bar, BarColumns
+    from services.scanner import compute_datapipeline
+
+    hel = ZoneInfo("Europe/Helsinki")
+    today = datetime.today().date()
+    yesterday = today - timedelta(days=1)
+
+    def at(day, hh, mm):
+        return datetime(day.year, day.month, day.day, hh, mm, tzinfo=hel)
+
+    def bar(t, open_, close, volume):
+        return Bar(t, open_, max(open_, close), min(open_, close), close, volume)
+
+    ppa = [
+        bar(at(yesterday, 10, 58), 7.0, 7.0, 999.0),        # before 11:00: ignored
+        bar(at(yesterday, 11, 0), 7.0, 7.5, 100.0),
+        bar(at(yesterday, 11, 2), 7.5, 7.8, 300.0),
+        bar(at(yesterday, 22, 58), 8.2, 8.0, 50.0),
+        bar(at(today, 11, 0), 10.0, 10.5, 200.0),
+        bar(at(today, 11, 2), 10.5, 11.0, 300.0),
+    ]
+    ppb = [
+        bar(at(yesterday, 11, 0), 20.0, 20.0, 0.0),
+        bar(at(yesterday, 22, 58), 20.0, 20.0, 10.0),
+        bar(at(today, 11, 0), 20.0, 21.0, 50.0),
+        bar(at(today, 11, 4), 21.0, 22.0, 50.0),              # no average for 11:04
+    ]
+    dataset = [
+        {"symbol": "PPB", "intraday_bars": BarColumns.from_bars(ppb)},
+        {"symbol": "PPA", "intraday_bars": BarColumns.from_bars(ppa)},
+        {"symbol": "PPX", "intraday_bars": None},
+    ]
+
+    def check_values():
+        def run(hh):
+            out = asyncio.run(compute_datapipeline(dataset, now=datetime.combine(today, _time_of_day(hh))))
+            return [(x.symbol, str(x.time), x.close, x.volume, x.rvol, x.change) for x in out]
+
+        eq(run(17), [("PPA", "11:02:00", 11.0, 300, 1.25, 10.0),
+                     ("PPB", "11:04:00", 22.0, 50, 0.0, 10.0)],
+           hint="after 16:30: anchored on today's 11:00 open")
+        eq([row[-1] for row in run(9)], [37.5, 10.0],
+           hint="before 16:30: anchored on the last 22:58 close")
+    r.check("RVOL, anchor price and last bar per symbol", check_values)
+
+    def check_matches_rows():
+        # Full rows as the original row-at-a-time pipeline (now in
+        # scripts/bench_scanner_pipeline.py) produced them for this fixture.
+        def run(hh):
+            out = asyncio.run(compute_datapipeline(dataset, now=datetime.combine(today, _time_of_day(hh))))
+            return [tuple(x.model_dump().values()) for x in out]
+
+        ppa = ("PPA", today, _time_of_day(11, 2), 10.5, 11.0, 10.5, 11.0, 300, 1.25)
+        ppb = ("PPB", today, _time_of_day(11, 4), 21.0, 22.0, 21.0, 22.0, 50, 0.0, 10.0)
+        eq(run(9), [ppa + (37.5,), ppb])
+        eq(run(17), [ppa + (10.0,), ppb])
+    r.check("same rows as the row-at-a-time pipeline", check_matches_rows)
+
+    def check_profile_rvol():
+        import numpy as np
+
+        from services.volume_profiles import N_BINS, VolumeProfile, VolumeProfiles, session_position
+
+        session, pos = session_position(at(today, 11, 4))     # PPA's last bar end
+        profiles = VolumeProfiles()
+        profiles.put("PPA", VolumeProfile.from_bins(session, np.full(N_BINS, 100.0), None))
+        out = asyncio.run(compute_datapipeline(
+            dataset, now=datetime.combine(today, _time_of_day(17)), profiles=profiles,
+        ))
+        eq([(x.symbol, x.rvol) for x in out],
+           [("PPA", round(500 / (pos * 100), 2)), ("PPB", 0.0)],
+           hint="profiled symbol: volume / expected at bar end; others unchanged")
+    r.check("RVOL from a precomputed volume profile", check_profile_rvol)
+
+    def check_stream():
+        from types import SimpleNamespace
+
+        from ib_async import Stock
+
+        from helpers.scanner_presets import SCANNER_PRESETS
+        from services.scanner import stream_scanner_logic
+
+        bars_of = {"STA": ppa, "STB": ppb}
+
+        class ScanIb:
+            async def reqScannerDataAsync(self, sub):
+                out = []
+                for rank, (sym, con_id) in enumerate((("STA", 9501), ("STB", 9502))):
+                    contract = Stock(sym, "SMART", "USD")
+                    contract.conId = con_id
+                    out.append(SimpleNamespace(rank=rank, contractDetails=SimpleNamespace(contract=contract)))
+                return out
+
+            async def reqHistoricalDataAsync(self, contract, **_kw):
+                await asyncio.sleep(0.05 if contract.symbol == "STA" else 0)
+                return bars_of[contract.symbol]
+
+        async def run():
+            return [e async for e in stream_scanner_logic(next(iter(SCANNER_PRESETS)), ScanIb())]
+
+        events = asyncio.run(run())
+        eq([e for e, _ in events], ["scan", "row", "row", "done"])
+        eq(events[0][1], [{"rank": 0, "symbol": "STA"}, {"rank": 1, "symbol": "STB"}])
+        eq([p.symbol for _, p in events[1:3]], ["STB", "STA"], hint="fastest symbol first")
+        eq([p.symbol for p in events[3][1]], ["STA", "STB"], hint="final frame in rank order")
+
+        want = asyncio.run(compute_datapipeline([
+            {"symbol": "STA", "intraday_bars": BarColumns.from_bars(ppa)},
+            {"symbol": "STB", "intraday_bars": BarColumns.from_bars(ppb)},
+        ]))
+        eq([g.model_dump() for g in events[3][1]], [w.model_dump() for w in want],
+           hint="same rows as the batch pipeline")
+    r.check("streamed rows: scan, per-symbol rows, ranked final frame", check_stream)
+
+
+def test_volume_profiles(r: Runner):
+    section("Volume profiles: compact per-symbol RVOL baselines")
+
+    import numpy as np
+
+    import services.volume_profiles as vp
+    from datetime import date as _date
+    from types import SimpleNamespace
+
+    def check_dates():
+        et = vp.ET
+        eq(vp.profile_day(datetime(2026, 3, 10, 19, 0, tzinfo=et)), _date(2026, 3, 10))
+        eq(vp.profile_day(datetime(2026, 3, 13, 20, 30, tzinfo=et)), _date(2026, 3, 16),
+           hint="Friday night builds Monday's")
+        eq(vp.next_build_time(datetime(2026, 3, 13, 21, 0, tzinfo=et)),
+           datetime(2026, 3, 16, 20, 30, tzinfo=et))
+    r.check("session day and nightly schedule", check_dates)
+
+    def check_bytes():
+        p = vp.VolumeProfile.from_bins(1, np.arange(vp.N_BINS, dtype=np.float64), 1.5)
+        raw = p.bin_volume.astype("<f4").tobytes()
+        eq(len(raw), vp.N_BINS * 4)
+        back = vp.VolumeProfile.from_bins(1, np.frombuffer(raw, dtype="<f4"), 1.5)
+        eq(back.cum_volume.tolist(), p.cum_volume.tolist())
+        approx(back.expected_volume(2.5), 0 + 1 + 0.5 * 2)
+    r.check("one float32 array per symbol round-trips", check_bytes)
+
+    def check_rebuild():
+        class HistIb:
+            calls = 0
+
+            async def reqHistoricalDataAsync(self, contract, **_kw):
+                HistIb.calls += 1
+                await asyncio.sleep(0.01)
+                if contract.symbol == "VPBAD":
+                    return []
+                t = datetime(2026, 3, 9, 10, 0, tzinfo=vp.ET)
+                return [SimpleNamespace(date=t, volume=100.0, high=11.0, low=10.0, close=10.5)]
+
+            async def qualifyContractsAsync(self, *contracts):
+                for c in contracts:
+                    c.conId = {"VPA": 881, "VPB": 882, "VPBAD": 883}[c.symbol]
+                return list(contracts)
+
+        async def run():
+            cache = vp.VolumeProfiles()
+            ib = HistIb()
+            day = _date(2026, 3, 10)
+            a, b = await asyncio.gather(
+                cache.build(ib, "VPA", day.toordinal()),
+                cache.build(ib, "VPA", day.toordinal()),
+            )
+            eq((a is b, HistIb.calls), (True, 1), hint="concurrent builds share one request")
+
+            cache.note_hits(["VPA", "VPB", "VPBAD"])
+            summary = await cache.rebuild(ib, day, symbols=await cache.universe())
+            eq((summary["cached"], summary["built"], summary["failed"]), (1, 1, ["VPBAD"]))
+            eq(HistIb.calls, 3)
+            eq(cache.get("VPB", day.toordinal()).expected_volume(73), 100.0, hint="10:00-10:05 bin")
+            eq(cache.get("VPB", day.toordinal() + 1), None, hint="one session per profile")
+
+        asyncio.run(run())
+    r.check("rebuild: universe, dedupe, failures", check_rebuild)
+
+
+def test_historical_data(r: Runner):
+    section("Historical data: pacing, dedupe, priorities, backoff")
+
+    import time
+
+    from eventkit import Event
+    from ib_async import Contract
+
+    import services.historical_data as hd
+
+    def contract(con_id):
+        return Contract(symbol=f"H{con_id}", secType="STK", conId=con_id)
+
+    class Bars(list):
+        reqId = 0
+
+    class HistIb:
+        def __init__(self, violations=0):
+            self.errorEvent = Event("errorEvent")
+            self.calls = []
+            self.violations = violations
+
+        async def reqHistoricalDataAsync(self, contract, durationStr, **_kw):
+            self.calls.append(contract.conId)
+            await asyncio.sleep(0.01)
+            bars = Bars() if self.violations else Bars([contract.conId])
+            bars.reqId = len(self.calls)
+            if self.violations:
+                self.violations -= 1
+                self.errorEvent.emit(bars.reqId, 162, "Historical Market Data Service "
+                                     "error message:API historical data query cancelled: "
+                                     "pacing violation", contract)
+            return bars
+
+    def patched(**values):
+        saved = {k: getattr(hd, k) for k in values}
+
+        def restore():
+            for k, v in saved.items():
+                setattr(hd, k, v)
+        for k, v in values.items():
+            setattr(hd, k, v)
+        return restore
+
+    def get(sched, ib, con_id, priority=hd.INTERACTIVE, duration="1 D"):
+        return sched.request(ib, contract(con_id), priority, durationStr=duration, barSizeSetting="5 mins")
+
+    def check_bucket():
+        restore = patched(PACING_REQUESTS=3, PACING_WINDOW=0.3)
+        try:
+            async def run():
+                sched, ib = hd.HistoricalDataScheduler(), HistIb()
+                start = time.monotonic()
+                done = {}
+
+                async def one(i):
+                    await get(sched, ib, 100 + i)
+                    done[i] = time.monotonic() - start
+                await asyncio.gather(*(one(i) for i in range(5)))
+                eq(sorted(i for i, t in done.items() if t < 0.2), [0, 1, 2], hint="burst of 3")
+                eq(all(done[i] >= 0.3 for i in (3, 4)), True, hint="rest wait for tokens")
+                st = sched.stats()["interactive"]
+                eq((st["requests"], st["dispatched"]), (5, 5))
+                eq(st["wait_ms_max"] >= 300, True)
+            asyncio.run(run())
+        finally:
+            restore()
+    r.check("token bucket: never more than N per window", check_bucket)
+
+    def check_dedupe():
+        async def run():
+            sched, ib = hd.HistoricalDataScheduler(), HistIb()
+            a, b = await asyncio.gather(get(sched, ib, 200), get(sched, ib, 200))
+            eq((a is b, ib.calls), (True, [200]), hint="identical in flight: one request")
+            c = await get(sched, ib, 200)
+            eq((c is a, ib.calls), (True, [200]), hint="identical within 15 s: cached")
+            await get(sched, ib, 200, duration="2 D")
+            eq(ib.calls, [200, 200], hint="different request goes out")
+            st = sched.stats()["interactive"]
+            eq((st["deduped"], st["cached"]), (1, 1))
+        asyncio.run(run())
+    r.check("identical requests share one IB request", check_dedupe)
+
+    def check_priorities():
+        restore = patched(PACING_REQUESTS=4, INTERACTIVE_RESERVE=2, PACING_WINDOW=0.3)
+        try:
+            async def run():
+                sched, ib = hd.HistoricalDataScheduler(), HistIb()
+                background = [asyncio.ensure_future(get(sched, ib, 300 + i, hd.BACKGROUND))
+                              for i in range(3)]
+                await asyncio.sleep(0.05)
+                eq(ib.calls, [300, 301], hint="background leaves the reserve")
+                await get(sched, ib, 400)
+                eq(ib.calls, [300, 301, 400], hint="interactive goes straight through")
+                await asyncio.gather(*background)
+                eq(ib.calls[-1], 302)
+            asyncio.run(run())
+        finally:
+            restore()
+    r.check("interactive preempts queued background requests", check_priorities)
+
+    def check_backoff():
+        restore = patched(BACKOFF_SECONDS=0.05, MAX_RETRIES=2)
+        try:
+            async def run():
+                sched, ib = hd.HistoricalDataScheduler(), HistIb(violations=2)
+                start = time.monotonic()
+                bars = await get(sched, ib, 500)
+                eq((list(bars), ib.calls), ([500], [500, 500, 500]))
+                eq(time.monotonic() - start >= 0.15, True, hint="0.05 s then 0.1 s pauses")
+                st = sched.stats()["interactive"]
+                eq((st["pacing_violations"], st["retries"]), (2, 2))
+
+                ib.violations = 99
+                eq(list(await get(sched, ib, 501)), [], hint="gives up: IB's empty result")
+            asyncio.run(run())
+        finally:
+            restore()
+    r.check("pacing violation (162): back off and retry", check_backoff)
+
+
+def test_pending_approvals_stream(r: Runner):
+    section("pending-approvals SSE route")
+    from fastapi import FastAPI
+
+    from routers import portfolio as portfolio_router
+    from services.portfolio.pending_approvals_hub import PendingApprovalsHub
+
+    path = "/api/portfolio/entry-request/pending/stream"
+
+    async def first_frame(app, headers=()):
+        """Drive the route over ASGI until the first body chunk, then
+        disconnect the way a closing browser tab would."""
+        got = asyncio.Event()
+        chunks = []
+
+        async def receive():
+            await got.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                eq(message["status"], 200)
+            elif message["type"] == "http.response.body" and message.get("body"):
+                chunks.append(message["body"])
+                got.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "server": ("test", 80), "client": ("test", 1),
+            "headers": [(k.encode(), v.encode()) for k, v in headers],
+        }
+        await asyncio.wait_for(app(scope, receive, send), 2.0)
+        return chunks[0]
+
+    def data_of(frame):
+        line = next(l for l in frame.split(b"\n") if l.startswith(b"data: "))
+        return json.loads(line[len(b"data: "):])
+
+    def id_of(frame):
+        line = next(l for l in frame.split(b"\n") if l.startswith(b"id: "))
+        return line[len(b"id: "):].decode()
+
+    def check_stream():
+        async def run():
+            hub = PendingApprovalsHub()
+            app = FastAPI()
+            app.include_router(portfolio_router.router)
+            app.state.pending_approvals_hub = hub
+
+            row = await hub.add_pending(
+                symbol="AAPL", contract_type="STK",
+                entry_price=100.0, stop_price=99.0, position_size=10,
+            )
+            frame = await first_frame(app)
+            snap = data_of(frame)
+            eq(snap["type"], "snapshot")
+            eq([p["approval_id"] for p in snap["pending"]], [row.approval_id])
+
+            # Reconnect with the snapshot's id after one more park: the
+            # missed "add" is replayed instead of a fresh snapshot.
+            second = await hub.add_pending(
+                symbol="MSFT", contract_type="STK",
+                entry_price=50.0, stop_price=49.0, position_size=20,
+            )
+            resumed = data_of(await first_frame(app, [("last-event-id", id_of(frame))]))
+            eq((resumed["type"], resumed["pending"]["approval_id"]), ("add", second.approval_id))
+
+            await hub.pop_pending(row.approval_id)
+            await hub.pop_pending(second.approval_id)
+
+        asyncio.run(run())
+    r.check("GET opens with a snapshot; Last-Event-ID resumes", check_stream)
+
+
+def test_realtime(r: Runner):
+    section("Realtime: multiplexed topics on one connection")
+
+    def check_mux():
+        async def run():
+            b = Broker()
+            b.topic("a", policy=LOSSLESS, maxsize=2)
+            b.topic("b", policy=CONFLATE)
+
+            def source(name):
+                async def subscribe(after):
+                    return b.subscribe(name, after=after)
+
+                async def unsubscribe(sub):
+                    b.unsubscribe(sub)
+
+                async def snapshot():
+                    return [{"snap": name}]
+
+                return TopicSource(subscribe, unsubscribe, snapshot)
+
+            def frame(topic, n, body):
+                return b"event: %s\nid: %s\ndata: %s\n\n" % (
+                    topic.encode(), format_event_id(n).encode(), body)
+
+            mux = RealtimeMux({"a": source("a"), "b": source("b")})
+            eq(mux.unknown(["a", "zz"]), ["zz"])
+            conn = mux.open(["a", "b"])
+
+            async def frames(n, c=None):
+                c = c or conn
+                return sorted([await asyncio.wait_for(c.next_frame(), 1.0) for _ in range(n)])
+
+            eq(await frames(2), [frame("a", 0, b'{"snap":"a"}'), frame("b", 0, b'{"snap":"b"}')])
+            b.publish("a", {"v": 1})
+            b.publish("b", {"v": 2})
+            eq(await frames(2), [frame("a", 1, b'{"v":1}'), frame("b", 1, b'{"v":2}')])
+
+            await conn.resync(["b"])
+            eq(await frames(1), [frame("b", 1, b'{"snap":"b"}')], hint="resync re-snapshots one topic")
+            eq(b.subscriber_count("b"), 1)
+
+            # Overflow "a" while the client isn't reading: its pump is
+            # closed by the broker, and the gap (20) is too big to replay
+            # into a 2-deep queue, so it comes back with a fresh snapshot.
+            await asyncio.sleep(0)
+            for i in range(20):
+                b.publish("a", {"v": i})
+            eq(await frames(1), [frame("a", 21, b'{"snap":"a"}')], hint="lossless overflow re-snapshots")
+            eq(b.subscriber_count("a"), 1)
+
+            await mux.close(conn)
+            eq((b.subscriber_count("a"), b.subscriber_count("b")), (0, 0))
+            eq(mux.stats()["connections"], 0)
+
+            # Reconnect with per-topic resume: "a" replays the one message
+            # it missed, "b" (no id given) starts from a snapshot.
+            b.publish("a", {"v": 99})
+            conn2 = mux.open(["a", "b"], {"a": format_event_id(21)})
+            eq(await frames(2, conn2), [frame("a", 22, b'{"v":99}'), frame("b", 1, b'{"snap":"b"}')])
+            await mux.close(conn2)
+
+        asyncio.run(run())
+    r.check("tagged frames, per-topic resync, overflow resubscribe", check_mux)
+
+    def check_pump_failure():
+        async def run():
+            b = Broker()
+            b.topic("a", policy=LOSSLESS)
+            b.topic("b", policy=LOSSLESS)
+            failures = [RuntimeError("db down"), RuntimeError("db down")]
+
+            def source(name, flaky=False):
+                async def subscribe(after):
+                    return b.subscribe(name, after=after)
+
+                async def unsubscribe(sub):
+                    b.unsubscribe(sub)
+
+                async def snapshot():
+                    if flaky and failures:
+                        raise failures.pop(0)
+                    return [{"snap": name}]
+
+                return TopicSource(subscribe, unsubscribe, snapshot)
+
+            mux = RealtimeMux({"a": source("a", flaky=True), "b": source("b")})
+            conn = mux.open(["a", "b"])
+
+            async def frame():
+                return await asyncio.wait_for(conn.next_frame(), 1.0)
+
+            error = b'event: topic_error\ndata: {"type":"error","topic":"a","detail":"db down"}\n\n'
+            got = sorted([await frame() for _ in range(2)])
+            eq(got, sorted([error, b'event: b\nid: %s\ndata: {"snap":"b"}\n\n'
+                            % format_event_id(0).encode()]), hint="other topics unaffected")
+            eq(b.subscriber_count("a"), 0, hint="failed subscription released")
+            eq(await frame(), error, hint="retried, failed again")
+            eq(await frame(), b'event: a\nid: %s\ndata: {"snap":"a"}\n\n'
+               % format_event_id(0).encode(), hint="recovered with a snapshot")
+            eq(conn.topics, ["a", "b"])
+            b.publish("a", {"v": 1})
+            eq(await frame(), b'event: a\nid: %s\ndata: {"v":1}\n\n' % format_event_id(1).encode())
+            await mux.close(conn)
+            eq(b.subscriber_count("a"), 0)
+
+        saved = (_realtime_mod.PUMP_RETRY_SECONDS, _realtime_mod.PUMP_RETRY_MAX_SECONDS)
+        _realtime_mod.PUMP_RETRY_SECONDS, _realtime_mod.PUMP_RETRY_MAX_SECONDS = 0.01, 0.02
+        try:
+            asyncio.run(run())
+        finally:
+            _realtime_mod.PUMP_RETRY_SECONDS, _realtime_mod.PUMP_RETRY_MAX_SECONDS = saved
+    r.check("failed snapshot: topic_error frame, backoff, re-snapshot", check_pump_failure)
+
+
 # ---- Main -----------------------------------------------------------
 
 def main():
@@ -598,6 +2590,22 @@ def main():
     test_build_trade_log(r)
     test_build_entry_attempts(r)
     test_snapshot_cache(r)
+    test_vectorized_builder(r)
+    test_trades_engine(r)
+    test_executions_ledger(r)
+    test_lockout_hub(r)
+    test_openrisk_hub(r)
+    test_broker(r)
+    test_contract_registry(r)
+    test_ib_state(r)
+    test_quote_board(r)
+    test_live_scanner(r)
+    test_bar_store(r)
+    test_scanner_pipeline(r)
+    test_volume_profiles(r)
+    test_historical_data(r)
+    test_pending_approvals_stream(r)
+    test_realtime(r)
 
     print()
     print("=" * 50)
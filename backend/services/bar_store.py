@@ -0,0 +1,345 @@
+"""
+Intraday bar store.
+
+The batch scanner (services.scanner) works on several trading days of
+intraday bars per symbol. It used to download the whole window from IB
+for every scanned symbol on every scan, although all of it but the
+newest few minutes is unchanged since the previous scan.
+
+The store keeps each series -- (conId, bar size) -- with the span it is
+known to be complete over ("coverage"), in memory and in Postgres
+(db.bars), and asks IB only for what the coverage is missing:
+
+  - no coverage, or coverage that doesn't reach back to the window start
+    (first scan of a symbol, history pruned, a day or more offline past
+    the window): one full-window request, as before;
+  - otherwise the tail from the start of the newest stored bar (it may
+    have still been forming) to now, sized in seconds, or in days when
+    the store was offline for longer -- a re-scan costs a few minutes of
+    bars per symbol, and a gap after downtime is backfilled by the same
+    request;
+  - nothing at all when the series was refreshed MIN_REFRESH_SECONDS ago.
+
+Series are held as columns (BarColumns: int64 start times plus float64
+OHLCV arrays), so a refresh is a slice-and-concatenate and the scanner
+builds its frame without touching individual bars.
+
+Coverage only moves when IB returned bars, so a failed or empty request
+is simply retried by the next scan. The window is `days` weekdays back
+to midnight ET (a holiday in the window shortens it by a day, where IB's
+"N D" would reach one day further back).
+
+Concurrent scans of the same symbol share one refresh (per-series lock).
+Requests are paced by services.historical_data, at the caller's
+priority (INTERACTIVE for scans by default).
+Wired at startup via core.startup.bar_store_setup; without a DB pool the
+store is memory-only (scripts, tests). Callers use the module-level
+`bar_store` singleton.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from ib_async import IB
+
+from db.bars import fetch_bars, fetch_coverage, prune_bars, store_bars
+from services.contracts import contract_registry
+from services.historical_data import INTERACTIVE, historical_data
+
+logger = logging.getLogger(__name__)
+
+
+ET = ZoneInfo("America/New_York")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+DEFAULT_BAR_SIZE = "2 mins"
+DEFAULT_DAYS = 5
+
+BAR_SECONDS = {
+    "1 min": 60,
+    "2 mins": 120,
+    "3 mins": 180,
+    "5 mins": 300,
+    "15 mins": 900,
+    "30 mins": 1800,
+    "1 hour": 3600,
+}
+
+# A series refreshed this recently is served as-is (also keeps clear of
+# IB's "identical request within 15 s" pacing rule).
+MIN_REFRESH_SECONDS = 15
+
+# Stored bars older than this are pruned at startup.
+BAR_RETENTION_DAYS = 10
+
+
+class Bar(NamedTuple):
+    date: datetime          # bar start, tz-aware
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+_PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _to_us(dt: datetime) -> int:
+    return round(dt.timestamp() * 1_000_000)
+
+
+class BarColumns:
+    """
+    One series as parallel arrays, oldest first: `t_us` (int64, bar start
+    in microseconds since the Unix epoch) and float64 open / high / low /
+    close / volume. What get_bars returns -- the scanner concatenates
+    these straight into its frame.
+    """
+
+    __slots__ = ("t_us",) + _PRICE_FIELDS
+
+    def __init__(self, t_us: np.ndarray, open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> None:
+        self.t_us = t_us
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_bars(cls, bars: Sequence[Any]) -> "BarColumns":
+        """From anything with date / open / ... / volume (IB BarData, Bar)."""
+        n = len(bars)
+        t_us = np.fromiter((_to_us(b.date) for b in bars), dtype=np.int64, count=n)
+        return cls(t_us, *(
+            np.fromiter((getattr(b, f) for b in bars), dtype=np.float64, count=n)
+            for f in _PRICE_FIELDS
+        ))
+
+    @classmethod
+    def empty(cls) -> "BarColumns":
+        return cls.from_bars([])
+
+    def __len__(self) -> int:
+        return len(self.t_us)
+
+    def _take(self, sl: slice) -> "BarColumns":
+        return BarColumns(self.t_us[sl], *(getattr(self, f)[sl] for f in _PRICE_FIELDS))
+
+    def since(self, dt: datetime) -> "BarColumns":
+        """Bars starting at or after `dt`."""
+        return self._take(slice(int(np.searchsorted(self.t_us, _to_us(dt))), None))
+
+    def merge(self, newer: "BarColumns") -> "BarColumns":
+        """These bars up to where `newer` starts, then `newer` -- a
+        re-fetched bar replaces the stored one."""
+        if not len(newer):
+            return self
+        cut = int(np.searchsorted(self.t_us, newer.t_us[0]))
+        return BarColumns(*(
+            np.concatenate((getattr(self, f)[:cut], getattr(newer, f)))
+            for f in ("t_us",) + _PRICE_FIELDS
+        ))
+
+    def last_time(self) -> Optional[datetime]:
+        if not len(self):
+            return None
+        return _EPOCH + timedelta(microseconds=int(self.t_us[-1]))
+
+    def bars(self) -> List[Bar]:
+        """Row view, oldest first (tz-aware UTC dates)."""
+        return [
+            Bar(_EPOCH + timedelta(microseconds=t), *values)
+            for t, *values in zip(self.t_us.tolist(), *(getattr(self, f).tolist() for f in _PRICE_FIELDS))
+        ]
+
+
+SeriesKey = Tuple[int, str]     # (conId, bar size)
+
+
+class _Series:
+    __slots__ = ("bars", "covered_from", "covered_to", "loaded", "lock")
+
+    def __init__(self) -> None:
+        self.bars = BarColumns.empty()
+        self.covered_from: Optional[datetime] = None
+        self.covered_to: Optional[datetime] = None
+        self.loaded = False
+        self.lock = asyncio.Lock()
+
+
+def window_start(now: datetime, days: int) -> datetime:
+    """Midnight ET of the `days`-th most recent weekday (today included)."""
+    d = now.astimezone(ET).date()
+    counted = 0
+    while True:
+        if d.weekday() < 5:
+            counted += 1
+            if counted >= days:
+                break
+        d -= timedelta(days=1)
+    return datetime(d.year, d.month, d.day, tzinfo=ET)
+
+
+def _duration(seconds: float) -> str:
+    """IB durationStr covering at least `seconds` back from now."""
+    if seconds <= 86400:
+        return f"{max(math.ceil(seconds), 60)} S"
+    # "N D" counts trading days from the start of a session; one extra
+    # day makes sure the span reaches back far enough.
+    return f"{math.ceil(seconds / 86400) + 1} D"
+
+
+class BarStore:
+    """
+    Public surface:
+      - set_db_pool(pool) / prune()          : persistence wiring + retention
+      - get_bars(ib, symbol, bar_size, days) : the window's bars, oldest first
+      - stats()
+    """
+
+    def __init__(self) -> None:
+        self._series: Dict[SeriesKey, _Series] = {}
+        # Set at startup via set_db_pool(); when None the store is
+        # memory-only.
+        self._db_pool = None
+        self._stats: Dict[str, int] = {
+            "cached": 0,
+            "incremental": 0,
+            "full": 0,
+            "bars_fetched": 0,
+        }
+
+    def set_db_pool(self, pool) -> None:
+        self._db_pool = pool
+
+    async def prune(self, now: Optional[datetime] = None) -> None:
+        if self._db_pool is None:
+            return
+        before = (now or datetime.now(timezone.utc)) - timedelta(days=BAR_RETENTION_DAYS)
+        async with self._db_pool.acquire() as conn:
+            await prune_bars(conn, before)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "series": len(self._series)}
+
+    # ----- reads ----------------------------------------------------------
+    async def get_bars(
+        self,
+        ib: IB,
+        symbol: str,
+        bar_size: str = DEFAULT_BAR_SIZE,
+        days: int = DEFAULT_DAYS,
+        now: Optional[datetime] = None,
+        priority: int = INTERACTIVE,
+    ) -> BarColumns:
+        """Bars of the last `days` trading days up to now, oldest first,
+        fetching from IB only what the store doesn't have."""
+        contract = await contract_registry.resolve(ib, symbol, "STK")
+        key = (contract.conId, bar_size)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+
+        async with series.lock:
+            now = now or datetime.now(timezone.utc)
+            start = window_start(now, days)
+            if not series.loaded:
+                await self._load(key, series, start)
+            await self._refresh(ib, contract, key, series, start, now, days, priority)
+            series.bars = series.bars.since(start)
+            return series.bars
+
+    async def _load(self, key: SeriesKey, series: _Series, start: datetime) -> None:
+        series.loaded = True
+        if self._db_pool is None:
+            return
+        try:
+            async with self._db_pool.acquire() as conn:
+                coverage = await fetch_coverage(conn, *key)
+                if coverage is None:
+                    return
+                rows = await fetch_bars(conn, *key, since=start)
+        except Exception:
+            logger.exception("Bar store load failed for %s", key)
+            return
+        series.covered_from, series.covered_to = coverage
+        series.bars = BarColumns.from_bars([
+            Bar(r["ts"], r["open"], r["high"], r["low"], r["close"], r["volume"]) for r in rows
+        ])
+
+    # ----- IB -------------------------------------------------------------
+    async def _refresh(self, ib: IB, contract, key: SeriesKey, series: _Series,
+                       start: datetime, now: datetime, days: int, priority: int) -> None:
+        bar_size = key[1]
+        full = (
+            series.covered_to is None
+            or series.covered_from > start
+            or series.covered_to < start
+        )
+        if full:
+            duration = f"{days} D"
+            since = start
+        else:
+            if (now - series.covered_to).total_seconds() < MIN_REFRESH_SECONDS:
+                self._stats["cached"] += 1
+                return
+            since = series.covered_to - timedelta(seconds=BAR_SECONDS.get(bar_size, 60))
+            newest = series.bars.last_time()
+            if newest is not None:
+                since = min(since, newest)
+            duration = _duration((now - since).total_seconds())
+
+        bars = await historical_data.request(
+            ib,
+            contract,
+            priority,
+            endDateTime="",
+            durationStr=duration,
+            barSizeSetting=bar_size,
+            whatToShow="TRADES",
+            useRTH=False,
+            formatDate=2,       # tz-aware UTC
+        )
+        if full:
+            self._stats["full"] += 1
+        else:
+            self._stats["incremental"] += 1
+        if not bars:
+            logger.warning("No %s bars returned for %s (%s)", bar_size, contract.symbol, duration)
+            return
+
+        fetched = BarColumns.from_bars([b for b in bars if isinstance(b.date, datetime)])
+        self._stats["bars_fetched"] += len(fetched)
+        if full:
+            series.bars = fetched
+            series.covered_from = start
+        else:
+            series.bars = series.bars.merge(fetched)
+        series.covered_to = now
+        await self._persist(key, series, fetched)
+
+    async def _persist(self, key: SeriesKey, series: _Series, bars: BarColumns) -> None:
+        if self._db_pool is None:
+            return
+        try:
+            async with self._db_pool.acquire() as conn:
+                await store_bars(
+                    conn, *key, [b._asdict() | {"ts": b.date} for b in bars.bars()],
+                    series.covered_from, series.covered_to,
+                )
+        except Exception:
+            # The in-memory copy is still good; a restart just refetches.
+            logger.exception("Bar store write failed for %s", key)
+
+
+# Module-level singleton -- one store per process.
+bar_store = BarStore()
@@ -0,0 +1,307 @@
+"""
+Contract registry.
+
+Every IB order, quote and historical request needs a qualified Contract,
+and qualifying one is an IB round trip (reqContractDetails). Before this
+module, every entry / add / exit / scanner symbol paid that round trip
+again for a symbol IB had already resolved minutes earlier.
+
+The registry resolves each (symbol, secType, exchange, currency) key to a
+qualified Contract once and reuses it for the life of the process:
+
+  - in memory: one dict lookup on the hot path;
+  - in Postgres (db.contracts): loaded at startup so a restart doesn't
+    re-qualify every symbol;
+  - single-flight: concurrent misses for the same key share one IB call;
+  - batch: resolve_many() sends every miss in one qualifyContractsAsync.
+
+Contracts that arrive already qualified inside an IB payload (open
+orders, scanner results) are learned via remember() for free.
+
+Wired at startup via core.startup.contract_registry_setup; callers use
+the module-level `contract_registry` singleton.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ib_async import CFD, IB, Contract, Stock
+
+from db.contracts import fetch_all_contracts, upsert_contracts
+
+logger = logging.getLogger(__name__)
+
+
+ContractKey = Tuple[str, str, str, str]   # (symbol, secType, exchange, currency)
+
+
+def _norm_sec_type(contract_type: str) -> str:
+    """Map the app's contract_type vocabulary onto IB's secType."""
+    if contract_type in ("stock", "STK"):
+        return "STK"
+    if contract_type == "CFD":
+        return "CFD"
+    raise ValueError(f"Unsupported contract_type: {contract_type!r}")
+
+
+def contract_key(
+    symbol: str,
+    contract_type: str = "STK",
+    exchange: str = "SMART",
+    currency: str = "USD",
+) -> ContractKey:
+    return (
+        (symbol or "").strip().upper(),
+        _norm_sec_type(contract_type),
+        exchange,
+        currency,
+    )
+
+
+def build_contract(symbol: str, contract_type: str = "STK") -> Contract:
+    """Unqualified SMART/USD contract for a symbol."""
+    sec_type = _norm_sec_type(contract_type)
+    if sec_type == "CFD":
+        return CFD(symbol=symbol, exchange="SMART", currency="USD")
+    return Stock(symbol=symbol, exchange="SMART", currency="USD")
+
+
+def _key_of(contract: Contract) -> ContractKey:
+    return (
+        (contract.symbol or "").upper(),
+        contract.secType,
+        contract.exchange or "SMART",
+        contract.currency or "USD",
+    )
+
+
+def _row_of(key: ContractKey, contract: Contract) -> Dict:
+    symbol, sec_type, exchange, currency = key
+    return {
+        "symbol": symbol,
+        "sec_type": sec_type,
+        "exchange": exchange,
+        "currency": currency,
+        "con_id": contract.conId,
+        "primary_exchange": contract.primaryExchange,
+        "local_symbol": contract.localSymbol,
+        "trading_class": contract.tradingClass,
+    }
+
+
+def _contract_of(row: Dict) -> Contract:
+    return Contract.create(
+        secType=row["sec_type"],
+        conId=int(row["con_id"]),
+        symbol=row["symbol"],
+        exchange=row["exchange"],
+        currency=row["currency"],
+        primaryExchange=row.get("primary_exchange") or "",
+        localSymbol=row.get("local_symbol") or "",
+        tradingClass=row.get("trading_class") or "",
+    )
+
+
+class ContractRegistry:
+    """
+    Process-wide cache of qualified contracts.
+
+    Public surface:
+      - set_db_pool(pool) / load()     : persistence wiring + startup load
+      - resolve(ib, symbol, type)      : one qualified Contract
+      - resolve_many(ib, symbols, type): batch, one IB call for all misses
+      - qualify(ib, contract)          : drop-in for qualifyContractsAsync
+      - remember(contract)             : learn an already-qualified contract
+      - get(symbol, type) / con_id(...) : cache-only lookups
+    """
+
+    def __init__(self) -> None:
+        self._by_key: Dict[ContractKey, Contract] = {}
+        self._in_flight: Dict[ContractKey, asyncio.Future] = {}
+        # Set at startup via set_db_pool(); when None the registry is a
+        # pure in-memory cache (scripts, tests).
+        self._db_pool = None
+
+    # ------------------------------------------------------------------
+    # Persistence wiring
+    # ------------------------------------------------------------------
+    def set_db_pool(self, pool) -> None:
+        self._db_pool = pool
+
+    async def load(self) -> int:
+        """Pull every persisted contract into memory. Returns the count."""
+        if self._db_pool is None:
+            return 0
+        async with self._db_pool.acquire() as conn:
+            rows = await fetch_all_contracts(conn)
+        for row in rows:
+            try:
+                contract = _contract_of(row)
+            except Exception:
+                logger.exception("Skipping unreadable contract row %s", row)
+                continue
+            self._by_key[_key_of(contract)] = contract
+        return len(rows)
+
+    def _persist(self, items: List[Tuple[ContractKey, Contract]]) -> None:
+        """Fire-and-forget upsert so a DB hiccup never delays an order."""
+        pool = self._db_pool
+        if pool is None or not items:
+            return
+
+        async def _write():
+            try:
+                async with pool.acquire() as conn:
+                    await upsert_contracts(conn, [_row_of(k, c) for k, c in items])
+            except Exception:
+                logger.exception("Failed to persist %d contract(s)", len(items))
+
+        asyncio.get_running_loop().create_task(_write())
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get(self, symbol: str, contract_type: str = "STK") -> Optional[Contract]:
+        return self._by_key.get(contract_key(symbol, contract_type))
+
+    def con_id(self, symbol: str, contract_type: str = "STK") -> Optional[int]:
+        contract = self.get(symbol, contract_type)
+        return contract.conId if contract is not None else None
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def remember(self, contract: Contract) -> Contract:
+        """
+        Learn a contract IB has already qualified (open-order and scanner
+        payloads carry full contracts). No IB call. Returns the cached
+        instance so every caller shares one object per key.
+
+        Position and trade contracts carry the listing exchange (NASDAQ,
+        NYSE, ...) while lookups by symbol go through the SMART key, so a
+        stock is also filed under SMART as a SMART-routed copy. The
+        contract passed in is never modified: open-order contracts go
+        straight back into placeOrder.
+        """
+        if not contract or not contract.conId:
+            return contract
+        learned: List[Tuple[ContractKey, Contract]] = []
+        key = _key_of(contract)
+        cached = self._by_key.get(key)
+        if cached is None or cached.conId != contract.conId:
+            self._by_key[key] = cached = contract
+            learned.append((key, contract))
+
+        if key[1] == "STK" and key[2] != "SMART":
+            smart_key = (key[0], key[1], "SMART", key[3])
+            smart = self._by_key.get(smart_key)
+            if smart is None or smart.conId != contract.conId:
+                smart = copy.copy(contract)
+                smart.exchange = "SMART"
+                smart.primaryExchange = contract.primaryExchange or contract.exchange
+                self._by_key[smart_key] = smart
+                learned.append((smart_key, smart))
+
+        self._persist(learned)
+        return cached
+
+    async def resolve(
+        self, ib: IB, symbol: str, contract_type: str = "STK",
+    ) -> Contract:
+        """
+        Qualified contract for `symbol`. Only the first call per key goes
+        to IB; concurrent first calls share that one request. Raises
+        ValueError if IB can't qualify the symbol.
+        """
+        key = contract_key(symbol, contract_type)
+        cached = self._by_key.get(key)
+        if cached is not None:
+            return cached
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await in_flight
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._in_flight[key] = fut
+        try:
+            contract = build_contract(key[0], contract_type)
+            qualified = await ib.qualifyContractsAsync(contract)
+            if not qualified or qualified[0] is None or not contract.conId:
+                raise ValueError(f"Could not qualify contract for {key[0]} ({key[1]})")
+            self._by_key[key] = contract
+            self._persist([(key, contract)])
+            logger.info("Contract qualified: %s conId=%s", key[0], contract.conId)
+            fut.set_result(contract)
+            return contract
+        except Exception as e:
+            fut.set_exception(e)
+            # Nobody else may be awaiting; mark retrieved so asyncio
+            # doesn't warn about an unobserved exception.
+            fut.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def resolve_many(
+        self, ib: IB, symbols: Iterable[str], contract_type: str = "STK",
+    ) -> Dict[str, Contract]:
+        """
+        Batch resolve. Cache misses go to IB in a single
+        qualifyContractsAsync call. Symbols IB can't qualify are logged
+        and left out of the result rather than failing the batch.
+        """
+        result: Dict[str, Contract] = {}
+        misses: List[Tuple[ContractKey, Contract]] = []
+        for symbol in symbols:
+            key = contract_key(symbol, contract_type)
+            if not key[0] or key[0] in result:
+                continue
+            cached = self._by_key.get(key)
+            if cached is not None:
+                result[key[0]] = cached
+            elif all(k != key for k, _ in misses):
+                misses.append((key, build_contract(key[0], contract_type)))
+
+        if not misses:
+            return result
+
+        try:
+            await ib.qualifyContractsAsync(*(c for _, c in misses))
+        except Exception:
+            logger.exception("Batch qualify failed for %d symbol(s)", len(misses))
+            return result
+
+        resolved: List[Tuple[ContractKey, Contract]] = []
+        for key, contract in misses:
+            if not contract.conId:
+                logger.warning("Could not qualify contract for %s", key[0])
+                continue
+            self._by_key[key] = contract
+            result[key[0]] = contract
+            resolved.append((key, contract))
+        self._persist(resolved)
+        logger.info("Batch qualified %d/%d contract(s)", len(resolved), len(misses))
+        return result
+
+    async def qualify(self, ib: IB, contract: Contract) -> Contract:
+        """
+        Drop-in replacement for `await ib.qualifyContractsAsync(contract)`
+        on a single contract. Already-qualified contracts are remembered
+        and returned as-is; bare ones resolve through the cache.
+        """
+        if contract.conId:
+            return self.remember(contract)
+        return await self.resolve(ib, contract.symbol, contract.secType or "STK")
+
+
+# Module-level singleton -- one cache for the whole process. conIds are
+# global to IB, so the cache is not tied to a particular connection.
+contract_registry = ContractRegistry()
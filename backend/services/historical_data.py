@@ -0,0 +1,372 @@
+"""
+Historical-data request scheduler.
+
+Every reqHistoricalDataAsync in the app -- the bar store behind the
+batch scanner, volume-profile builds, live enrichment -- goes through
+here instead of straight to IB, where nothing used to coordinate them
+against IB's historical-data pacing rules:
+
+  - at most 60 requests in any 10 minutes: a token bucket of
+    PACING_REQUESTS tokens, each spent token returning PACING_WINDOW
+    seconds after it was spent (so the bucket can never let more than
+    60 through in any window, however bursty);
+  - no six requests for the same contract within two seconds
+    (SAME_CONTRACT_LIMIT per SAME_CONTRACT_SECONDS);
+  - no identical request within 15 seconds: identical requests in
+    flight share one IB request, and one that completed less than
+    IDENTICAL_REQUEST_SECONDS ago is answered with its result.
+
+Waiting requests are served by priority, then arrival: INTERACTIVE
+(scans a user is waiting on) before BACKGROUND (profile builds,
+enrichment). Background requests also leave INTERACTIVE_RESERVE tokens
+untouched, so a scan started in the middle of a nightly rebuild doesn't
+wait for the bucket to refill. Running requests are never cancelled.
+
+IB answers a pacing violation with error 162 and an empty result
+(ib_async doesn't raise). The scheduler watches errorEvent for it,
+pauses all dispatching for BACKOFF_SECONDS (doubling per retry of the
+same request) and re-queues the request, up to MAX_RETRIES times; any
+other outcome -- empty or not -- goes back to the caller as before.
+
+A single dispatcher task is started on first use (and restarted on a
+new event loop, for scripts). Callers use the module-level
+`historical_data` singleton.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time as _time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ib_async import IB, Contract
+
+logger = logging.getLogger(__name__)
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# IB: no more than 60 historical requests within any ten minutes.
+PACING_REQUESTS = 60
+PACING_WINDOW = 600.0
+
+# Tokens background requests may not take.
+INTERACTIVE_RESERVE = 10
+
+# IB: no six or more requests for the same contract within two seconds.
+SAME_CONTRACT_LIMIT = 5
+SAME_CONTRACT_SECONDS = 2.0
+
+# IB: no identical requests within 15 seconds.
+IDENTICAL_REQUEST_SECONDS = 15.0
+
+# IB allows 50 simultaneous open historical requests.
+MAX_IN_FLIGHT = 50
+
+# Pacing violation: pause, then retry; the pause doubles per retry.
+PACING_ERROR_CODE = 162
+BACKOFF_SECONDS = 15.0
+MAX_RETRIES = 4
+
+RequestKey = Tuple
+
+
+class _Request:
+    __slots__ = (
+        "key", "ib", "contract", "kwargs", "priority", "seq",
+        "future", "waiters", "started", "attempt", "enqueued",
+    )
+
+    def __init__(self, key: RequestKey, ib: IB, contract: Contract,
+                 kwargs: Dict[str, Any], priority: int, seq: int) -> None:
+        self.key = key
+        self.ib = ib
+        self.contract = contract
+        self.kwargs = kwargs
+        self.priority = priority
+        self.seq = seq
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+        self.started = False
+        self.attempt = 0
+        self.enqueued = _time.monotonic()
+
+    def __lt__(self, other: "_Request") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _contract_id(contract: Contract) -> Any:
+    return contract.conId or (contract.symbol, contract.secType, contract.currency)
+
+
+class HistoricalDataScheduler:
+    """
+    Public surface:
+      - request(ib, contract, priority=..., **reqHistoricalData kwargs)
+      - stats()
+    """
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._queue: List[_Request] = []
+        self._by_key: Dict[RequestKey, _Request] = {}
+        self._recent: Dict[RequestKey, Tuple[float, Any]] = {}
+        self._spent: Deque[float] = deque()
+        self._per_contract: Dict[Any, Deque[float]] = {}
+        self._paused_until = 0.0
+        self._running = 0
+        self._seq = itertools.count()
+        self._bound: "weakref.WeakSet" = weakref.WeakSet()
+        self._pacing_errors: Dict[int, str] = {}
+        self._stats: Dict[int, Dict[str, float]] = {
+            p: {
+                "requests": 0,
+                "dispatched": 0,
+                "deduped": 0,
+                "cached": 0,
+                "retries": 0,
+                "pacing_violations": 0,
+                "errors": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0,
+            }
+            for p in PRIORITY_NAMES
+        }
+
+    # ----- requests -------------------------------------------------------
+    async def request(
+        self,
+        ib: IB,
+        contract: Contract,
+        priority: int = INTERACTIVE,
+        *,
+        endDateTime: str = "",
+        durationStr: str,
+        barSizeSetting: str,
+        whatToShow: str = "TRADES",
+        useRTH: bool = False,
+        formatDate: int = 2,
+    ) -> Any:
+        """reqHistoricalDataAsync's result, once pacing allows. Returns
+        exactly what IB returned (possibly empty); raises what it raised."""
+        self._ensure_loop()
+        self._bind(ib)
+        kwargs = dict(
+            endDateTime=endDateTime, durationStr=durationStr,
+            barSizeSetting=barSizeSetting, whatToShow=whatToShow,
+            useRTH=useRTH, formatDate=formatDate,
+        )
+        key = (_contract_id(contract), *kwargs.values())
+        stats = self._stats[priority]
+
+        now = _time.monotonic()
+        while self._recent:
+            oldest = next(iter(self._recent))
+            if now - self._recent[oldest][0] < IDENTICAL_REQUEST_SECONDS:
+                break
+            del self._recent[oldest]
+        if key in self._recent:
+            stats["cached"] += 1
+            return self._recent[key][1]
+
+        entry = self._by_key.get(key)
+        if entry is None:
+            entry = self._by_key[key] = _Request(key, ib, contract, kwargs, priority, next(self._seq))
+            stats["requests"] += 1
+            self._push(entry)
+        else:
+            stats["deduped"] += 1
+            if priority < entry.priority and not entry.started:
+                # An interactive caller joined a queued background request.
+                entry.priority = priority
+                heapq.heapify(self._queue)
+                self._wake.set()
+
+        entry.waiters += 1
+        try:
+            # Shielded: one caller giving up doesn't fail the others.
+            return await asyncio.shield(entry.future)
+        finally:
+            entry.waiters -= 1
+            if not entry.waiters and not entry.started and not entry.future.done():
+                # Nobody wants it any more; the dispatcher drops it.
+                entry.future.cancel()
+                self._by_key.pop(key, None)
+
+    def _push(self, entry: _Request) -> None:
+        heapq.heappush(self._queue, entry)
+        self._wake.set()
+
+    # ----- dispatch -------------------------------------------------------
+    def _ensure_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (scripts): the old loop's
+            # queue and dispatcher are gone with it.
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._queue = []
+            self._by_key = {}
+            self._running = 0
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _bind(self, ib: IB) -> None:
+        event = getattr(ib, "errorEvent", None)
+        if event is not None and ib not in self._bound:
+            event += self._on_error
+            self._bound.add(ib)
+
+    def _on_error(self, reqId: int, errorCode: int, errorString: str, contract) -> None:
+        # Emitted right after ib_async ended the request with an empty
+        # result -- before the awaiting request resumes and looks it up.
+        if errorCode == PACING_ERROR_CODE and "pacing violation" in errorString.lower():
+            if len(self._pacing_errors) > 1000:
+                self._pacing_errors.clear()
+            self._pacing_errors[reqId] = errorString
+
+    def _delay(self, entry: _Request, now: float) -> Optional[float]:
+        """Seconds until `entry` may go (0: now; None: when woken)."""
+        if self._running >= MAX_IN_FLIGHT:
+            return None
+        if self._paused_until > now:
+            return self._paused_until - now
+
+        while self._spent and now - self._spent[0] >= PACING_WINDOW:
+            self._spent.popleft()
+        need = 1 if entry.priority == INTERACTIVE else INTERACTIVE_RESERVE + 1
+        tokens = PACING_REQUESTS - len(self._spent)
+        if tokens < need:
+            # Enough tokens once the (need - tokens) oldest are back.
+            return self._spent[need - tokens - 1] + PACING_WINDOW - now
+
+        recent = self._per_contract.get(entry.key[0])
+        if recent:
+            while recent and now - recent[0] >= SAME_CONTRACT_SECONDS:
+                recent.popleft()
+            if len(recent) >= SAME_CONTRACT_LIMIT:
+                return recent[-SAME_CONTRACT_LIMIT] + SAME_CONTRACT_SECONDS - now
+        return 0.0
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wake.clear()
+            while self._queue and self._queue[0].future.done():
+                heapq.heappop(self._queue)      # abandoned by its callers
+            if not self._queue:
+                await self._wake.wait()
+                continue
+
+            entry = self._queue[0]
+            now = _time.monotonic()
+            delay = self._delay(entry, now)
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            self._spent.append(now)
+            self._per_contract.setdefault(entry.key[0], deque()).append(now)
+            if len(self._per_contract) > 1000:
+                self._per_contract = {
+                    k: v for k, v in self._per_contract.items()
+                    if v and now - v[-1] < SAME_CONTRACT_SECONDS
+                }
+            if not entry.attempt:
+                wait_ms = (now - entry.enqueued) * 1000
+                stats = self._stats[entry.priority]
+                stats["dispatched"] += 1
+                stats["wait_ms_total"] += wait_ms
+                stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+            entry.started = True
+            self._running += 1
+            asyncio.ensure_future(self._run(entry))
+
+    async def _run(self, entry: _Request) -> None:
+        stats = self._stats[entry.priority]
+        try:
+            bars = await entry.ib.reqHistoricalDataAsync(entry.contract, **entry.kwargs)
+        except Exception as e:
+            stats["errors"] += 1
+            self._finish(entry, exception=e)
+            return
+        finally:
+            self._running -= 1
+            self._wake.set()
+
+        violation = self._pacing_errors.pop(getattr(bars, "reqId", None), None)
+        if violation is None:
+            if bars:
+                self._recent.pop(entry.key, None)
+                self._recent[entry.key] = (_time.monotonic(), bars)
+            self._finish(entry, result=bars)
+            return
+
+        stats["pacing_violations"] += 1
+        backoff = BACKOFF_SECONDS * 2 ** entry.attempt
+        self._paused_until = max(self._paused_until, _time.monotonic() + backoff)
+        if entry.attempt >= MAX_RETRIES or entry.future.done():
+            logger.warning(
+                "Historical data for %s: pacing violation, giving up after %d retries",
+                entry.contract.symbol, entry.attempt,
+            )
+            self._finish(entry, result=bars)
+            return
+        logger.warning(
+            "Historical data for %s: pacing violation, retrying in %.0f s",
+            entry.contract.symbol, backoff,
+        )
+        stats["retries"] += 1
+        entry.attempt += 1
+        entry.started = False
+        self._push(entry)
+
+    def _finish(self, entry: _Request, result: Any = None,
+                exception: Optional[BaseException] = None) -> None:
+        if self._by_key.get(entry.key) is entry:
+            del self._by_key[entry.key]
+        if entry.future.done():
+            return
+        if exception is not None:
+            entry.future.set_exception(exception)
+            # Retrieved here too, in case every caller has gone.
+            entry.future.exception()
+        else:
+            entry.future.set_result(result)
+
+    # ----- metrics --------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        now = _time.monotonic()
+        spent = sum(1 for t in self._spent if now - t < PACING_WINDOW)
+        out: Dict[str, Any] = {
+            "queued": sum(1 for e in self._queue if not e.future.done()),
+            "in_flight": self._running,
+            "tokens": PACING_REQUESTS - spent,
+            "paused_s": round(max(self._paused_until - now, 0.0), 1),
+        }
+        for priority, name in PRIORITY_NAMES.items():
+            s = self._stats[priority]
+            dispatched = s["dispatched"]
+            out[name] = {
+                **{k: int(v) for k, v in s.items() if not k.startswith("wait_ms")},
+                "wait_ms_avg": round(s["wait_ms_total"] / dispatched, 1) if dispatched else 0.0,
+                "wait_ms_max": round(s["wait_ms_max"], 1),
+            }
+        return out
+
+
+# Module-level singleton -- one scheduler per process (IB's limits are
+# per connection / account).
+historical_data = HistoricalDataScheduler()
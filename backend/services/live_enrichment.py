@@ -0,0 +1,152 @@
+"""
+Live scanner enrichment: RVOL and RelATR.
+
+The live scanner rows carry price / change / volume straight off each
+symbol's market-data line. RVOL and RelATR also need history -- what a
+normal day's volume looks like by this time of day, and how far the
+stock normally moves in a day. Both come from the symbol's volume
+profile (services.volume_profiles), so live values are O(1) per row
+build, from the streaming ticker only:
+
+  RVOL   = session volume / expected cumulative volume at this minute
+           (the current bin interpolated)
+  RelATR = today's high - low / ATR
+
+Symbols the nightly job profiled cost no IB request. For the others a
+profile is built once per symbol per trading day, off the render path,
+through a small worker pool (ENRICH_CONCURRENCY), as background
+requests to the historical-data scheduler (services.historical_data) --
+a scan full of new names never delays a batch scan. When a profile lands,
+`on_ready` is called with the symbol so the scanner re-renders its rows;
+until then the columns are None. Every symbol enriched here is also
+noted as a scanner hit, so the next nightly build includes it.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ib_async import IB, Ticker
+
+from services.volume_profiles import session_position, volume_profiles
+
+logger = logging.getLogger(__name__)
+
+
+# Profile builds in flight at once.
+ENRICH_CONCURRENCY = 2
+
+
+class LiveEnricher:
+    """
+    Public surface:
+      - start() / stop()                : worker pool lifecycle
+      - request(symbol)                 : queue a profile build (deduped)
+      - metrics(symbol, ticker, clock)  : (rvol, rel_atr) for one row
+      - stats()
+    """
+
+    def __init__(
+        self,
+        ib: IB,
+        on_ready: Callable[[str], None],
+        concurrency: int = ENRICH_CONCURRENCY,
+    ) -> None:
+        self.ib = ib
+        self.on_ready = on_ready
+        self.concurrency = concurrency
+        self._pending: Set[str] = set()
+        self._failed: Dict[str, int] = {}      # symbol -> day it failed on
+        self._queue: asyncio.Queue[Tuple[str, int]] = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._stats: Dict[str, int] = {
+            "requests": 0,
+            "built": 0,
+            "failed": 0,
+        }
+
+    # ----- lifecycle ------------------------------------------------------
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+            ]
+
+    def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+
+    # ----- requests ---------------------------------------------------------
+    def request(self, symbol: str, today: Optional[int] = None) -> None:
+        """Queue a profile build unless one for today exists, is queued,
+        or already failed today."""
+        today = today if today is not None else session_position()[0]
+        if volume_profiles.get(symbol, today) is not None:
+            return
+        if symbol in self._pending or self._failed.get(symbol) == today:
+            return
+        self._pending.add(symbol)
+        volume_profiles.note_hits((symbol,))
+        self._queue.put_nowait((symbol, today))
+
+    async def _worker(self) -> None:
+        while True:
+            symbol, today = await self._queue.get()
+            try:
+                await self._build(symbol, today)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["failed"] += 1
+                self._failed[symbol] = today
+                logger.warning("Live enrichment failed for %s: %s", symbol, e)
+            finally:
+                self._pending.discard(symbol)
+
+    async def _build(self, symbol: str, today: int) -> None:
+        self._stats["requests"] += 1
+        await volume_profiles.build(self.ib, symbol, today)
+        self._stats["built"] += 1
+        self.on_ready(symbol)
+
+    # ----- live values --------------------------------------------------
+    def metrics(
+        self, symbol: str, ticker: Ticker, clock: Tuple[int, Optional[float]],
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """(rvol, rel_atr) from the ticker's session volume / range and the
+        symbol's profile. None where either side isn't known yet."""
+        today, pos = clock
+        profile = volume_profiles.get(symbol, today)
+        if profile is None:
+            self.request(symbol, today)
+            return None, None
+
+        rvol: Optional[float] = None
+        volume = _finite(getattr(ticker, "volume", None))
+        if pos is not None and volume is not None:
+            expected = profile.expected_volume(pos)
+            if expected > 0:
+                rvol = round(volume / expected, 2)
+
+        rel_atr: Optional[float] = None
+        high = _finite(getattr(ticker, "high", None))
+        low = _finite(getattr(ticker, "low", None))
+        if profile.atr and high is not None and low is not None and high >= low:
+            rel_atr = round((high - low) / profile.atr, 2)
+        return rvol, rel_atr
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._stats,
+            "pending": len(self._pending),
+        }
+
+
+def _finite(v) -> Optional[float]:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if f == f and f not in (float("inf"), float("-inf")) else None
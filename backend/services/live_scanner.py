@@ -1,18 +1,54 @@
 """
 Live streaming market scanner service.
 
-Maintains two long-lived IB scanner subscriptions (+5% gap up and -5% gap
-down). Whenever IB pushes a ranking update, this service:
+Runs every scan in LIVE_SCANS (helpers.scanner_presets: table name ->
+SCANNER_PRESETS entry, e.g. gap up / gap down / hot by volume / small
+caps) as a long-lived IB scanner subscription. Whenever IB pushes a
+ranking update for one of them, this service:
 
   1. Diffs the new symbol list against the cached one.
-  2. For *new* symbols, requests streaming market data (price/volume/change).
-   3. Drops mkt-data for symbols that left the scan.
-  4. Builds a fresh snapshot and broadcasts it over per-connection SSE
-     queues to every subscribed frontend client.
-
-Phase-1 (MVP) columns only: symbol, rank, price, change, change_percent,
-volume, time_added. Heavier fields (Bid/Ask, IV, MarketCap, RVOL, RelATR)
-will be wired up in a later phase with their own enrichment pipeline.
+  2. Learns the contract IB already qualified inside each scan result
+     (contract registry; any without one resolve in a single batch).
+  3. Re-allocates market-data lines across all scans (see below).
+  4. Marks the symbols whose row may have changed (new, re-ranked, gone).
+
+Scan updates for one side run one at a time (`_SideState.lock`) so an
+overlapping update can't interleave its subscribes with the previous
+one's unsubscribes.
+
+Market-data lines: one per symbol, however many scans list it, held
+through the shared quote board (ref-counted, so a symbol the open-risk
+table or an order ticket already streams costs no extra line). The
+manager holds at most `max_lines` (LIVE_SCANNER_MAX_LINES, under IB's
+account-wide line allowance so quotes and open risk keep theirs). When
+the scans list more symbols than that, symbols are ranked by their best
+rank in any scan and the lowest-ranked ones are evicted -- their line is
+cancelled right away and their rows leave the tables until they rank
+high enough again.
+
+Ticks only mark their symbol dirty too. A per-side render loop wakes on
+the first mark and emits at most `frame_hz` frames a second
+(SCANNER_FRAME_HZ): it rebuilds just the dirty rows, keeps the ones that
+differ from what it last sent, and publishes a "delta" LiveScannerUpdate
+with those rows plus the symbols that left the table. A busy tape of 50
+symbols a side is conflated into a few small frames a second instead of
+a full rebuild and push per tick. New subscribers start from a
+"snapshot" built from the rows already sent, so the deltas that follow
+apply cleanly.
+
+Rows are never Pydantic models on this path: each table keeps one
+`_Row` (__slots__) per symbol, updated in place from its ticker, which
+re-renders its own JSON fragment only when a value actually changed.
+Frames (`_Frame`) splice those cached fragments into the wire JSON, so a
+snapshot for a new client is a join, not a rebuild. LiveScannerRow /
+LiveScannerUpdate (schemas.api_schemas) remain the documented contract
+of that JSON.
+
+Columns: symbol, rank, price, change, change_percent, volume, bid, ask,
+spread -- straight off the line -- and rvol / rel_atr, computed per row
+from the line plus a once-a-day historical baseline that
+services.live_enrichment builds off the render path (None until it
+lands; its arrival re-marks the symbol). IV and MarketCap are not wired.
 """
 
 from __future__ import annotations
@@ -20,108 +56,224 @@ from __future__ import annotations
 import asyncio
 import logging
 import time as _time
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Mapping, Optional, Set
 
-from ib_async import IB, ScannerSubscription, Stock, Ticker
+from ib_async import IB, ScannerSubscription, Ticker
 
-from helpers.scanner_presets import SCANNER_PRESETS
-from schemas.api_schemas import LiveScannerRow, LiveScannerUpdate
+from helpers.broker import LOSSLESS, Subscription, broker, encode_json
+from helpers.scanner_presets import LIVE_SCANS, SCANNER_PRESETS
+from services.contracts import contract_registry
+from services.live_enrichment import LiveEnricher, session_position
+from services.live_scanner_recording import SessionRecorder
+from services.quote_board import quote_board
 
 
 logger = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
-# Subscriber registry — one asyncio.Queue per connected SSE client.
-# Push is fan-out: every queue receives every update.
+# Subscriber registry — a thin adapter over the broker's "live_scanner"
+# topic. LOSSLESS: a delta only carries the rows that changed, so none may
+# be skipped; a client that falls a whole queue behind is closed and
+# resumes (or re-snapshots) on reconnect.
 # ---------------------------------------------------------------------------
+TOPIC = "live_scanner"
+
+# Render-loop cap: at most this many delta frames per side per second.
+SCANNER_FRAME_HZ = 4.0
+
+# Market-data lines the live scanner may hold at once, across all scans.
+# IB's default allowance is 100 per account; the rest is left for the
+# quote board's other holders (open risk, order tickets).
+LIVE_SCANNER_MAX_LINES = 80
+
+
 class _SubscriberHub:
     def __init__(self) -> None:
-        self._subscribers: List[asyncio.Queue[LiveScannerUpdate]] = []
-        self._lock = asyncio.Lock()
-
-    async def add(self) -> asyncio.Queue[LiveScannerUpdate]:
-        q: asyncio.Queue[LiveScannerUpdate] = asyncio.Queue(maxsize=64)
-        async with self._lock:
-            self._subscribers.append(q)
-        logger.info("LiveScanner SSE client connected (n=%d)", len(self._subscribers))
-        return q
-
-    async def remove(self, q: asyncio.Queue) -> None:
-        async with self._lock:
-            if q in self._subscribers:
-                self._subscribers.remove(q)
-        logger.info("LiveScanner SSE client disconnected (n=%d)", len(self._subscribers))
-
-    async def broadcast(self, update: LiveScannerUpdate) -> None:
-        # Snapshot under lock to avoid mutation during iteration.
-        async with self._lock:
-            targets = list(self._subscribers)
-        for q in targets:
-            try:
-                q.put_nowait(update)
-            except asyncio.QueueFull:
-                # Slow consumer — drop the oldest and try again so we
-                # keep current data flowing instead of stalling.
-                try:
-                    q.get_nowait()
-                    q.put_nowait(update)
-                except Exception:
-                    logger.warning("Dropping update for slow SSE consumer")
+        broker.topic(TOPIC, policy=LOSSLESS, maxsize=64)
+
+    async def add(self, after: Optional[str] = None) -> Subscription:
+        sub = broker.subscribe(TOPIC, after=after)
+        logger.info("LiveScanner SSE client connected (n=%d)", self.count())
+        return sub
+
+    async def remove(self, sub: Subscription) -> None:
+        broker.unsubscribe(sub)
+        logger.info("LiveScanner SSE client disconnected (n=%d)", self.count())
+
+    async def broadcast(self, update: "_Frame") -> None:
+        broker.publish(TOPIC, update)
 
     def count(self) -> int:
-        return len(self._subscribers)
+        return broker.subscriber_count(TOPIC)
 
 
 # ---------------------------------------------------------------------------
-# Per-side state: subscription handle + symbol -> Ticker map + last snapshot.
+# Rows and frames -- the wire shape of schemas.api_schemas.LiveScannerRow /
+# LiveScannerUpdate, without building a model per row per frame.
+# ---------------------------------------------------------------------------
+class _Row:
+    """One table row, updated in place. `json` is the rendered
+    LiveScannerRow object as of the last change."""
+
+    __slots__ = ("symbol", "time_added", "rank", "price", "change", "change_percent",
+                 "volume", "bid", "ask", "spread", "rvol", "rel_atr", "json")
+
+    def __init__(self, symbol: str, time_added: str) -> None:
+        self.symbol = symbol
+        self.time_added = time_added
+        # No real rank is negative, so the first update() always renders
+        # and the row goes out in the next delta even before it ticks.
+        self.rank = -1
+        self.price = self.change = self.change_percent = None
+        self.volume = None
+        self.bid = self.ask = self.spread = None
+        self.rvol = self.rel_atr = None
+        self.json = self._render()
+
+    def update(self, values: tuple) -> bool:
+        """Set (rank, price, change, change_percent, volume, bid, ask,
+        spread, rvol, rel_atr); re-render and return True if any moved."""
+        if values == (self.rank, self.price, self.change, self.change_percent, self.volume,
+                      self.bid, self.ask, self.spread, self.rvol, self.rel_atr):
+            return False
+        (self.rank, self.price, self.change, self.change_percent, self.volume,
+         self.bid, self.ask, self.spread, self.rvol, self.rel_atr) = values
+        self.json = self._render()
+        return True
+
+    def _render(self) -> bytes:
+        return encode_json({
+            "symbol": self.symbol,
+            "rank": self.rank,
+            "price": self.price,
+            "change": self.change,
+            "change_percent": self.change_percent,
+            "volume": self.volume,
+            "bid": self.bid,
+            "ask": self.ask,
+            "spread": self.spread,
+            "rvol": self.rvol,
+            "rel_atr": self.rel_atr,
+            "time_added": self.time_added,
+        })
+
+
+class _Frame:
+    """One LiveScannerUpdate. Holds the row fragments as rendered when the
+    frame was cut (rows keep changing after it is queued); the broker
+    encodes it through to_json()."""
+
+    __slots__ = ("side", "kind", "rows", "removed", "connected", "ts")
+
+    def __init__(
+        self, side: str, kind: str, rows: List[bytes], removed: List[str],
+        connected: bool, ts: float,
+    ) -> None:
+        self.side = side
+        self.kind = kind
+        self.rows = rows
+        self.removed = removed
+        self.connected = connected
+        self.ts = ts
+
+    def to_json(self) -> bytes:
+        return b"".join((
+            b'{"side":', encode_json(self.side),
+            b',"kind":', encode_json(self.kind),
+            b',"rows":[', b",".join(self.rows),
+            b'],"removed":', encode_json(self.removed),
+            b',"connected":', b"true" if self.connected else b"false",
+            b',"ts":', encode_json(self.ts),
+            b"}",
+        ))
+
+
+# ---------------------------------------------------------------------------
+# Per-side state: one per live scan -- subscription handle, ranking, last
+# rows sent. Tickers live on the manager, shared across sides.
 # ---------------------------------------------------------------------------
 class _SideState:
     def __init__(self, side: str, preset_name: str) -> None:
-        self.side = side                                # "up" or "down"
+        self.side = side                                # LIVE_SCANS key, e.g. "up"
         self.preset_name = preset_name
         self.subscription = None                        # the ScannerSubscription handle from IB
-        self.tickers: Dict[str, Ticker] = {}            # symbol -> streaming Ticker
         self.first_seen: Dict[str, str] = {}            # symbol -> ISO timestamp
         self.ranks: Dict[str, int] = {}                 # symbol -> rank
+        self.sent: Dict[str, _Row] = {}                 # symbol -> row as last published
+        self.dirty: Set[str] = set()                    # symbols to rebuild next frame
+        self.wake = asyncio.Event()                     # set on first mark after a frame
+        self.render_task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()                      # serializes scan updates
 
 
 # ---------------------------------------------------------------------------
 # Manager — singleton wired up in main.py lifespan.
 # ---------------------------------------------------------------------------
 class LiveScannerManager:
-    def __init__(self, ib: IB) -> None:
+    def __init__(
+        self,
+        ib: IB,
+        frame_hz: float = SCANNER_FRAME_HZ,
+        scans: Mapping[str, str] = LIVE_SCANS,
+        max_lines: int = LIVE_SCANNER_MAX_LINES,
+        recorder: Optional[SessionRecorder] = None,
+    ) -> None:
         self.ib = ib
+        # Optional session log of every scan update and scanner-line tick
+        # (services.live_scanner_recording).
+        self.recorder = recorder
+        self.frame_hz = frame_hz
+        self.max_lines = max_lines
         self.hub = _SubscriberHub()
-        self.up = _SideState("up", "live_gap_up_scan")
-        self.down = _SideState("down", "live_gap_down_scan")
+        self.sides: Dict[str, _SideState] = {
+            name: _SideState(name, preset) for name, preset in scans.items()
+        }
+        # symbol -> Ticker for every line held (one per symbol across all
+        # sides), plus the updateEvent handler attached to it.
+        self._tickers: Dict[str, Ticker] = {}
+        self._tick_handlers: Dict[str, Callable] = {}
+        self._lines_lock = asyncio.Lock()
+        self.enricher = LiveEnricher(ib, on_ready=self._mark_all)
         self._started = False
         self._stopping = False
+        self._stats: Dict[str, int] = {
+            "ticks_received": 0,
+            "frames_sent": 0,
+            "rows_sent": 0,
+            "evictions": 0,
+        }
 
     # ----- lifecycle ------------------------------------------------------
     async def start(self) -> None:
         if self._started:
             return
-        logger.info("Starting LiveScannerManager")
-        await self._start_side(self.up)
-        await self._start_side(self.down)
+        logger.info("Starting LiveScannerManager (%s)", ", ".join(self.sides))
+        self.enricher.start()
+        for side in self.sides.values():
+            side.render_task = asyncio.create_task(self._render_loop(side))
+        for side in self.sides.values():
+            await self._start_side(side)
         self._started = True
 
     async def stop(self) -> None:
         self._stopping = True
         logger.info("Stopping LiveScannerManager")
-        for side in (self.up, self.down):
+        for side in self.sides.values():
+            if side.render_task is not None:
+                side.render_task.cancel()
+                side.render_task = None
             try:
                 if side.subscription is not None:
                     self.ib.cancelScannerSubscription(side.subscription)
             except Exception:
                 logger.exception("Failed to cancel scanner subscription for %s", side.side)
-            for sym, ticker in list(side.tickers.items()):
-                try:
-                    self.ib.cancelMktData(ticker.contract)
-                except Exception:
-                    logger.exception("Failed to cancel mkt data for %s", sym)
-            side.tickers.clear()
+            side.dirty.clear()
+        for sym in list(self._tickers):
+            self._release_line(sym)
+        self.enricher.stop()
+        if self.recorder is not None:
+            self.recorder.close()
         self._started = False
 
     # ----- subscription wiring -------------------------------------------
@@ -140,113 +292,210 @@ class LiveScannerManager:
 
         def _on_update(items=handle):
             # Schedule async handler — updateEvent fires synchronously.
-            asyncio.create_task(self._handle_scan_update(side, list(items)))
+            items = list(items)
+            if self.recorder is not None:
+                self.recorder.scan(side.side, items)
+            asyncio.create_task(self._handle_scan_update(side, items))
 
         handle.updateEvent += _on_update
         logger.info("Subscribed to %s (%s)", side.side, side.preset_name)
 
     async def _handle_scan_update(self, side: _SideState, items: list) -> None:
+        async with side.lock:
+            await self._apply_scan_update(side, items)
+
+    async def _apply_scan_update(self, side: _SideState, items: list) -> None:
         try:
-            # Extract qualifying symbols + rank order.
+            # Extract qualifying symbols + rank order, and learn the
+            # contract IB already qualified for each.
             new_ranks: Dict[str, int] = {}
+            bare: List[str] = []
             for it in items:
                 try:
-                    sym = it.contractDetails.contract.symbol
+                    contract = it.contractDetails.contract
+                    sym = contract.symbol
                     new_ranks[sym] = int(it.rank)
                 except Exception:
                     continue
+                if contract.conId:
+                    contract_registry.remember(contract)
+                elif contract_registry.get(sym) is None:
+                    bare.append(sym)
+            # Only the ones the scan didn't carry a contract for go to IB,
+            # in one call.
+            if bare:
+                await contract_registry.resolve_many(self.ib, bare, "STK")
 
-            # Add new symbols (start mkt data subscription each).
             for sym, rank in new_ranks.items():
-                if sym not in side.tickers:
-                    await self._subscribe_mktdata(side, sym)
-                side.ranks[sym] = rank
+                if side.ranks.get(sym) != rank:
+                    side.ranks[sym] = rank
+                    self._mark(side, sym)
                 side.first_seen.setdefault(
                     sym,
                     _iso_now(),
                 )
 
             # Drop symbols that left the scan.
-            for sym in list(side.tickers.keys()):
+            for sym in list(side.ranks):
                 if sym not in new_ranks:
-                    await self._unsubscribe_mktdata(side, sym)
                     side.ranks.pop(sym, None)
                     side.first_seen.pop(sym, None)
+                    self._mark(side, sym)
 
-            await self._broadcast_side(side)
+            await self._sync_lines()
         except Exception:
             logger.exception("Error handling scan update for %s", side.side)
 
-    async def _subscribe_mktdata(self, side: _SideState, symbol: str) -> None:
+    # ----- market-data lines ----------------------------------------------
+    def _wanted_symbols(self) -> List[str]:
+        """Symbols that get a line: every scanned symbol by its best rank
+        in any scan (ties: scan order), cut at the line budget."""
+        best: Dict[str, tuple] = {}
+        for order, side in enumerate(self.sides.values()):
+            for sym, rank in side.ranks.items():
+                key = (rank, order)
+                if sym not in best or key < best[sym]:
+                    best[sym] = key
+        ranked = sorted(best, key=best.__getitem__)
+        return ranked[: self.max_lines]
+
+    async def _sync_lines(self) -> None:
+        """Hold a line for exactly the wanted symbols: release the rest
+        first (freeing budget), then acquire the new ones concurrently."""
+        async with self._lines_lock:
+            if self._stopping:
+                return
+            wanted = self._wanted_symbols()
+            wanted_set = set(wanted)
+            for sym in [s for s in self._tickers if s not in wanted_set]:
+                if any(sym in side.ranks for side in self.sides.values()):
+                    self._stats["evictions"] += 1
+                    logger.info("Live scanner line budget: evicting %s", sym)
+                self._release_line(sym)
+                self._mark_all(sym)
+            new = [sym for sym in wanted if sym not in self._tickers]
+            if new:
+                await asyncio.gather(*(self._acquire_line(sym) for sym in new))
+
+    async def _acquire_line(self, symbol: str) -> None:
         try:
-            contract = Stock(symbol, "SMART", "USD")
-            await self.ib.qualifyContractsAsync(contract)
-            # genericTickList "" gives default fields incl. last, volume.
-            # Streaming (snapshot=False) so we get continuous updates.
-            ticker = self.ib.reqMktData(contract, "", False, False)
-            side.tickers[symbol] = ticker
-
-            def _on_tick(t=ticker, s=side):
-                # On any tick update, broadcast a fresh snapshot for this side.
-                # Cheap because we just read cached ticker fields and push.
-                asyncio.create_task(self._broadcast_side(s))
-
-            ticker.updateEvent += _on_tick
-            logger.debug("Subscribed mkt data: %s (%s)", symbol, side.side)
+            ticker = await quote_board.acquire(symbol)
         except Exception:
             logger.exception("Failed to subscribe mkt data for %s", symbol)
+            return
+        if self._stopping:
+            quote_board.release(symbol, linger=False)
+            return
 
-    async def _unsubscribe_mktdata(self, side: _SideState, symbol: str) -> None:
-        ticker = side.tickers.pop(symbol, None)
+        def _on_tick(t, sym=symbol):
+            # Just mark the row in every scan listing it; each side's
+            # render loop picks it up on its next frame.
+            self._stats["ticks_received"] += 1
+            if self.recorder is not None:
+                self.recorder.tick(sym, t)
+            self._mark_all(sym)
+
+        ticker.updateEvent += _on_tick
+        self._tickers[symbol] = ticker
+        self._tick_handlers[symbol] = _on_tick
+        self._mark_all(symbol)
+        self.enricher.request(symbol)
+        logger.debug("Subscribed mkt data: %s", symbol)
+
+    def _release_line(self, symbol: str) -> None:
+        ticker = self._tickers.pop(symbol, None)
+        handler = self._tick_handlers.pop(symbol, None)
         if ticker is None:
             return
-        try:
-            self.ib.cancelMktData(ticker.contract)
-        except Exception:
-            logger.exception("Failed to cancel mkt data for %s", symbol)
+        if handler is not None:
+            ticker.updateEvent -= handler
+        # No linger: the budget counts this line as freed.
+        quote_board.release(symbol, linger=False)
+
+    # ----- dirty marking + render loop ------------------------------------
+    def _mark(self, side: _SideState, symbol: str) -> None:
+        side.dirty.add(symbol)
+        side.wake.set()
+
+    def _mark_all(self, symbol: str) -> None:
+        for side in self.sides.values():
+            if symbol in side.ranks or symbol in side.sent:
+                self._mark(side, symbol)
+
+    async def _render_loop(self, side: _SideState) -> None:
+        """Emit at most frame_hz frames a second, and only when something
+        was marked since the last one."""
+        interval = 1.0 / self.frame_hz
+        while not self._stopping:
+            await side.wake.wait()
+            side.wake.clear()
+            try:
+                await self._flush_side(side)
+            except Exception:
+                logger.exception("Live scanner frame failed for %s", side.side)
+            await asyncio.sleep(interval)
 
-    # ----- snapshot build + push -----------------------------------------
-    async def _broadcast_side(self, side: _SideState) -> None:
+    async def _flush_side(self, side: _SideState) -> None:
+        """One delta frame: dirty rows that differ from what was last sent,
+        plus the symbols that left the table (left the scan, or evicted)."""
         if self._stopping:
             return
-        rows = self._build_rows(side)
-        update = LiveScannerUpdate(
-            side=side.side,
-            rows=rows,
-            connected=self.ib.isConnected(),
-            ts=_time.time(),
-        )
-        await self.hub.broadcast(update)
-
-    def _build_rows(self, side: _SideState) -> List[LiveScannerRow]:
-        rows: List[LiveScannerRow] = []
-        for symbol, ticker in side.tickers.items():
-            price = _safe_num(getattr(ticker, "last", None)) \
-                or _safe_num(getattr(ticker, "marketPrice", lambda: None)() if callable(getattr(ticker, "marketPrice", None)) else None) \
-                or _safe_num(getattr(ticker, "close", None))
-            close = _safe_num(getattr(ticker, "close", None))
-            change_abs: Optional[float] = None
-            change_pct: Optional[float] = None
-            if price is not None and close not in (None, 0):
-                change_abs = round(price - close, 4)
-                change_pct = round((price - close) / close * 100, 2)
-            volume = _safe_int(getattr(ticker, "volume", None))
-
-            rows.append(LiveScannerRow(
-                symbol=symbol,
-                rank=side.ranks.get(symbol, 0),
-                price=price,
-                change=change_abs,
-                change_percent=change_pct,
-                volume=volume,
-                time_added=side.first_seen.get(symbol, _iso_now()),
-            ))
+        dirty, side.dirty = side.dirty, set()
+        clock = session_position()
+        changed: List[bytes] = []
+        removed: List[str] = []
+        for symbol in dirty:
+            ticker = self._tickers.get(symbol)
+            if ticker is None or symbol not in side.ranks:
+                if side.sent.pop(symbol, None) is not None:
+                    removed.append(symbol)
+                continue
+            row = side.sent.get(symbol)
+            if row is None:
+                row = side.sent[symbol] = _Row(symbol, side.first_seen.get(symbol) or _iso_now())
+            if row.update(self._row_values(side, symbol, ticker, clock)):
+                changed.append(row.json)
+        if not changed and not removed:
+            return
+        self._stats["frames_sent"] += 1
+        self._stats["rows_sent"] += len(changed)
+        await self.hub.broadcast(_Frame(
+            side.side, "delta", changed, sorted(removed), self.ib.isConnected(), _time.time(),
+        ))
+
+    def _row_values(
+        self, side: _SideState, symbol: str, ticker: Ticker, clock: tuple,
+    ) -> tuple:
+        """The row's columns off its ticker, in _Row.update order."""
+        price = _safe_num(getattr(ticker, "last", None)) \
+            or _safe_num(getattr(ticker, "marketPrice", lambda: None)() if callable(getattr(ticker, "marketPrice", None)) else None) \
+            or _safe_num(getattr(ticker, "close", None))
+        close = _safe_num(getattr(ticker, "close", None))
+        change_abs: Optional[float] = None
+        change_pct: Optional[float] = None
+        if price is not None and close not in (None, 0):
+            change_abs = round(price - close, 4)
+            change_pct = round((price - close) / close * 100, 2)
+        volume = _safe_int(getattr(ticker, "volume", None))
+        bid = _safe_num(getattr(ticker, "bid", None))
+        ask = _safe_num(getattr(ticker, "ask", None))
+        spread: Optional[float] = None
+        if bid is not None and ask is not None and 0 < bid <= ask:
+            spread = round(ask - bid, 4)
+        rvol, rel_atr = self.enricher.metrics(symbol, ticker, clock)
+        return (side.ranks.get(symbol, 0), price, change_abs, change_pct, volume,
+                bid, ask, spread, rvol, rel_atr)
+
+    def _snapshot_side(self, side: _SideState) -> _Frame:
+        rows = list(side.sent.values())
         # Stable ordering by absolute %change so biggest movers are on top.
         rows.sort(
             key=lambda r: abs(r.change_percent) if r.change_percent is not None else 0,
             reverse=True,
         )
-        return rows
+        return _Frame(
+            side.side, "snapshot", [r.json for r in rows], [], self.ib.isConnected(), _time.time(),
+        )
 
     # ----- public snapshot for HTTP status --------------------------------
     def status(self) -> dict:
@@ -254,28 +503,20 @@ class LiveScannerManager:
             "connected": self.ib.isConnected(),
             "started": self._started,
             "subscribers": self.hub.count(),
-            "up_symbols": len(self.up.tickers),
-            "down_symbols": len(self.down.tickers),
+            "symbols": {name: len(side.ranks) for name, side in self.sides.items()},
+            "lines": len(self._tickers),
+            "max_lines": self.max_lines,
+            "frame_hz": self.frame_hz,
+            **self._stats,
+            "enrichment": self.enricher.stats(),
         }
 
-    def current_snapshot(self) -> List[LiveScannerUpdate]:
-        """Build a current snapshot for both sides — used to bootstrap a
-        freshly connected SSE client without waiting for the next IB update.
+    def current_snapshot(self) -> List[_Frame]:
+        """Snapshot of every side as of the last frames sent — used to
+        bootstrap a freshly connected SSE client without waiting for the
+        next IB update. Rows still marked dirty follow in the next delta.
         """
-        return [
-            LiveScannerUpdate(
-                side="up",
-                rows=self._build_rows(self.up),
-                connected=self.ib.isConnected(),
-                ts=_time.time(),
-            ),
-            LiveScannerUpdate(
-                side="down",
-                rows=self._build_rows(self.down),
-                connected=self.ib.isConnected(),
-                ts=_time.time(),
-            ),
-        ]
+        return [self._snapshot_side(side) for side in self.sides.values()]
 
 
 # ---------------------------------------------------------------------------
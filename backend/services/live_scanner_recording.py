@@ -0,0 +1,320 @@
+"""
+Live scanner session recording and replay.
+
+SessionRecorder writes what IB fed the live scanner -- every scan
+ranking update and every ticker update on a scanner line -- to a compact
+append-only binary log, one file per session. ReplayIB reads one back
+and stands in for the IB connection on the surface the scanner path
+uses (reqScannerSubscription, reqMktData, qualifyContractsAsync, ...),
+so a LiveScannerManager built on it sees the session again at 1x or
+faster than realtime. That reproduces a session after the fact and lets
+the render loop / broker fan-out be benchmarked without a gateway
+(scripts/bench_live_scanner_replay.py).
+
+File format (little-endian):
+
+  header   b"LSR1", u32 length, JSON {"version", "started", "scans"}
+  records  u8 kind, f64 seconds since `started`, then by kind:
+    SYMBOL  u16 id, i32 conId, u8 length, utf-8 symbol
+            (written once, before the first record that uses the id)
+    SCAN    u8 scan index (order of "scans"), u16 n, n x (u16 rank, u16 id)
+    TICK    u16 id, 6 x f32 (last, close, bid, ask, high, low), f64 volume
+
+A tick is 43 bytes. Missing ticker fields are NaN, as in ib_async.
+Writes are buffered; the file is flushed on every scan update and on
+close, so a crash loses at most the ticks since the last ranking change.
+
+Recording is off unless settings.LIVE_SCANNER_RECORD_DIR is set (see
+core.startup.live_scanner).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from ib_async import ContractDetails, ScanData, ScanDataList, ScannerSubscription, Stock, Ticker
+
+from helpers.scanner_presets import SCANNER_PRESETS
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"LSR1"
+VERSION = 1
+
+KIND_SYMBOL = 1
+KIND_SCAN = 2
+KIND_TICK = 3
+
+_U32 = struct.Struct("<I")
+_RECORD = struct.Struct("<Bd")
+_SYMBOL = struct.Struct("<HiB")
+_SCAN = struct.Struct("<BH")
+_SCAN_ITEM = struct.Struct("<HH")
+_TICK = struct.Struct("<H6fd")
+
+TICK_FIELDS = ("last", "close", "bid", "ask", "high", "low")
+
+WRITE_BUFFER_BYTES = 64 * 1024
+
+NAN = float("nan")
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return NAN
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+class SessionRecorder:
+    """Append-only writer for one scanner session."""
+
+    def __init__(self, path: Path, scans: Mapping[str, str]) -> None:
+        self.path = Path(path)
+        self.started = time.time()
+        self._scan_index = {name: i for i, name in enumerate(scans)}
+        self._ids: Dict[str, int] = {}
+        self._file: Optional[BinaryIO] = open(self.path, "ab", buffering=WRITE_BUFFER_BYTES)
+        meta = json.dumps({
+            "version": VERSION,
+            "started": self.started,
+            "scans": dict(scans),
+        }).encode()
+        self._file.write(MAGIC + _U32.pack(len(meta)) + meta)
+        self.records = 0
+
+    @classmethod
+    def create(cls, directory: Path, scans: Mapping[str, str]) -> "SessionRecorder":
+        """New session file in `directory`, named by start time (UTC)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        recorder = cls(directory / f"live_scanner_{stamp}.lsr", scans)
+        logger.info("Recording live scanner session to %s", recorder.path)
+        return recorder
+
+    def _t(self) -> float:
+        return time.time() - self.started
+
+    def _id(self, symbol: str, con_id: int, t: float) -> int:
+        sid = self._ids.get(symbol)
+        if sid is None:
+            sid = len(self._ids)
+            self._ids[symbol] = sid
+            raw = symbol.encode()
+            self._file.write(_RECORD.pack(KIND_SYMBOL, t) + _SYMBOL.pack(sid, con_id or 0, len(raw)) + raw)
+            self.records += 1
+        return sid
+
+    def scan(self, side: str, items: List[Any]) -> None:
+        """One ranking update (IB ScanData items) for scan `side`."""
+        if self._file is None:
+            return
+        t = self._t()
+        entries = []
+        for it in items:
+            try:
+                contract = it.contractDetails.contract
+                entries.append((int(it.rank), self._id(contract.symbol, contract.conId, t)))
+            except Exception:
+                continue
+        parts = [_RECORD.pack(KIND_SCAN, t), _SCAN.pack(self._scan_index[side], len(entries))]
+        parts.extend(_SCAN_ITEM.pack(rank, sid) for rank, sid in entries)
+        self._file.write(b"".join(parts))
+        self.records += 1
+        self._file.flush()
+
+    def tick(self, symbol: str, ticker: Any) -> None:
+        """One ticker update on a scanner line."""
+        if self._file is None:
+            return
+        t = self._t()
+        contract = getattr(ticker, "contract", None)
+        sid = self._id(symbol, getattr(contract, "conId", 0), t)
+        self._file.write(
+            _RECORD.pack(KIND_TICK, t)
+            + _TICK.pack(sid, *(_num(getattr(ticker, f, None)) for f in TICK_FIELDS),
+                         _num(getattr(ticker, "volume", None)))
+        )
+        self.records += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info("Closed live scanner recording %s (%d records)", self.path, self.records)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+# Decoded records:
+#   ("scan", t, side, [(rank, symbol, conId), ...])
+#   ("tick", t, symbol, {"last": .., "close": .., ..., "volume": ..})
+Record = Tuple[str, float, str, Any]
+
+
+def read_session(path: Path) -> Tuple[Dict[str, Any], Iterator[Record]]:
+    """(header, record iterator). A truncated tail record is ignored."""
+    data = Path(path).read_bytes()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a live scanner recording")
+    (meta_len,) = _U32.unpack_from(data, 4)
+    meta = json.loads(data[8:8 + meta_len])
+    if meta.get("version") != VERSION:
+        raise ValueError(f"Unsupported recording version {meta.get('version')!r}")
+    return meta, _records(data, 8 + meta_len, list(meta["scans"]))
+
+
+def _records(data: bytes, off: int, sides: List[str]) -> Iterator[Record]:
+    symbols: Dict[int, Tuple[str, int]] = {}
+    end = len(data)
+    try:
+        while off < end:
+            kind, t = _RECORD.unpack_from(data, off)
+            off += _RECORD.size
+            if kind == KIND_SYMBOL:
+                sid, con_id, n = _SYMBOL.unpack_from(data, off)
+                off += _SYMBOL.size
+                symbols[sid] = (data[off:off + n].decode(), con_id)
+                off += n
+            elif kind == KIND_SCAN:
+                side_idx, n = _SCAN.unpack_from(data, off)
+                off += _SCAN.size
+                items = []
+                for _ in range(n):
+                    rank, sid = _SCAN_ITEM.unpack_from(data, off)
+                    off += _SCAN_ITEM.size
+                    items.append((rank, *symbols[sid]))
+                yield ("scan", t, sides[side_idx], items)
+            elif kind == KIND_TICK:
+                sid, *values = _TICK.unpack_from(data, off)
+                off += _TICK.size
+                fields = dict(zip(TICK_FIELDS + ("volume",), values))
+                yield ("tick", t, symbols[sid][0], fields)
+            else:
+                raise ValueError(f"Unknown record kind {kind} at offset {off}")
+    except struct.error:
+        logger.warning("Recording ends with a truncated record; ignoring it")
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+class ReplayIB:
+    """
+    Replays a recording in place of the IB connection. Covers what the
+    live scanner path calls on IB -- scanner subscriptions, market-data
+    lines (through the quote board), contract qualification -- and
+    returns no history, so RVOL / RelATR stay empty on replay.
+
+    Usage: build the manager on it (bind the quote board to it too),
+    start the manager, then `await replay.run(speed)`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.meta, records = read_session(self.path)
+        self.records: List[Record] = list(records)
+        self._scans: Dict[str, ScanDataList] = {}
+        self._tickers: Dict[str, Ticker] = {}
+        self._con_ids: Dict[str, int] = {
+            sym: con_id
+            for kind, _t, _side, items in self.records if kind == "scan"
+            for _rank, sym, con_id in items
+        }
+        # ScannerSubscription -> scan name, by the presets in the header.
+        self._sides_by_sub = [
+            (ScannerSubscription(**SCANNER_PRESETS[preset]), side)
+            for side, preset in self.meta["scans"].items()
+            if preset in SCANNER_PRESETS
+        ]
+        self.replayed = 0
+
+    # ----- the IB surface ---------------------------------------------------
+    def isConnected(self) -> bool:
+        return True
+
+    def reqScannerSubscription(self, subscription: ScannerSubscription, *_args, **_kw) -> ScanDataList:
+        handle = ScanDataList()
+        handle.subscription = subscription
+        side = next((s for sub, s in self._sides_by_sub if sub == subscription), None)
+        if side is None:
+            logger.warning("Replay has no recorded scan for %s", subscription.scanCode)
+        else:
+            self._scans[side] = handle
+        return handle
+
+    def cancelScannerSubscription(self, handle: ScanDataList) -> None:
+        for side, h in list(self._scans.items()):
+            if h is handle:
+                del self._scans[side]
+
+    def reqMktData(self, contract, *_args, **_kw) -> Ticker:
+        ticker = self._tickers.get(contract.symbol)
+        if ticker is None:
+            ticker = Ticker(contract=contract)
+            self._tickers[contract.symbol] = ticker
+        return ticker
+
+    def cancelMktData(self, contract) -> None:
+        self._tickers.pop(contract.symbol, None)
+
+    async def qualifyContractsAsync(self, *contracts):
+        for c in contracts:
+            c.conId = self._con_ids.get(c.symbol, 0)
+        return list(contracts)
+
+    async def reqHistoricalDataAsync(self, *_args, **_kw) -> list:
+        return []
+
+    # ----- playback -------------------------------------------------------
+    async def run(self, speed: float = 1.0) -> None:
+        """Play every record. speed=1 is realtime, 10 is ten times
+        faster, 0 (or less) as fast as possible."""
+        t0 = time.monotonic()
+        for i, (kind, t, key, payload) in enumerate(self.records):
+            if speed > 0:
+                delay = t / speed - (time.monotonic() - t0)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 256 == 0:
+                await asyncio.sleep(0)      # let the render loops run
+            if kind == "scan":
+                self._emit_scan(key, payload)
+            else:
+                self._emit_tick(key, payload)
+            self.replayed += 1
+        await asyncio.sleep(0)
+
+    def _emit_scan(self, side: str, items: List[Tuple[int, str, int]]) -> None:
+        handle = self._scans.get(side)
+        if handle is None:
+            return
+        handle[:] = [
+            ScanData(
+                rank=rank,
+                contractDetails=ContractDetails(contract=Stock(symbol, "SMART", "USD", conId=con_id)),
+                distance="", benchmark="", projection="", legsStr="",
+            )
+            for rank, symbol, con_id in items
+        ]
+        handle.updateEvent.emit(handle)
+
+    def _emit_tick(self, symbol: str, fields: Dict[str, float]) -> None:
+        ticker = self._tickers.get(symbol)
+        if ticker is None:
+            return          # line not held (evicted, or not subscribed yet)
+        for name, value in fields.items():
+            setattr(ticker, name, value)
+        ticker.updateEvent.emit(ticker)
@@ -10,6 +10,8 @@ class BidAsk:
     symbol: str
     bid: float
     ask: float
+    # Epoch seconds of the tick the quote came from (0.0 = unknown).
+    ts: float = 0.0
 
 
 @dataclass
@@ -148,7 +148,9 @@ async def process_add_request(
         # get_bid_ask_price now guarantees a valid dict or raises
         # ValueError; the outer handler in this flow surfaces that as
         # a clean AddRequestResponse.allowed=False.
-        bid_ask = await client.get_bid_ask_price(symbol)
+        bid_ask = await client.get_bid_ask_price(
+            symbol, max_age=settings.QUOTE_MAX_AGE_SECONDS,
+        )
 
         # Pure guards over the fetched data.
         ok, message = check_not_losing(position, bid_ask)
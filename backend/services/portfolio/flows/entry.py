@@ -159,7 +159,9 @@ async def process_manual_entry(
     symbol = payload.symbol
     stop_price = payload.stop_price
 
-    bid_ask = await client.get_bid_ask_price(symbol)
+    bid_ask = await client.get_bid_ask_price(
+        symbol, max_age=settings.QUOTE_MAX_AGE_SECONDS,
+    )
     entry_price = calculate_entry_price(bid_ask, stop_price)
     position_size = calculate_position_size(
         entry_price=entry_price,
@@ -269,7 +271,9 @@ async def place_approved_entry(
 
     try:
 
-        bid_ask = await client.get_bid_ask_price(symbol)
+        bid_ask = await client.get_bid_ask_price(
+            symbol, max_age=settings.QUOTE_MAX_AGE_SECONDS,
+        )
         fresh_entry_price = calculate_entry_price(bid_ask, approval.stop_price)
 
         position_size = calculate_position_size(
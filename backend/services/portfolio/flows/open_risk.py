@@ -14,7 +14,7 @@ position — same O(N) → O(1) collapse.
 
 import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 
 from services.portfolio.ib_client import IbClient, OpenOrder
 from db.exits import fetch_strategies_grouped_by_symbols
@@ -23,19 +23,61 @@ from schemas.api_schemas import OpenPosition
 logger = logging.getLogger(__name__)
 
 
+# Order types whose auxPrice is the position's stop.
+STOP_ORDER_TYPES = ("STP", "STP LMT")
+
+
 def _index_stp_orders_by_symbol(orders: list[OpenOrder]) -> dict[str, OpenOrder]:
     """Build {SYMBOL: order} for every open STP / STP LMT order."""
     index: dict[str, OpenOrder] = {}
     for o in orders:
         sym = o.symbol
         otype = (o.ordertype or "").upper()
-        if not sym or otype not in ("STP", "STP LMT"):
+        if not sym or otype not in STOP_ORDER_TYPES:
             continue
         # First STP per symbol wins, matching get_stp_order_by_symbol semantics.
         index.setdefault(sym.upper(), o)
     return index
 
 
+def build_open_position(
+    pos,
+    netliq: float,
+    stop_order: Optional[OpenOrder],
+    exit_strategies: List[str],
+) -> OpenPosition:
+    """One open-risk row. Pure -- shared by the full table build and the
+    OpenRiskHub's per-symbol recompute."""
+    position = float(pos.position)
+    avgcost = float(pos.avgcost)
+
+    size = round(abs(position * avgcost), 2)
+    allocation = (
+        round((size / netliq) * 100, 2)
+        if netliq > 0
+        else None
+    )
+
+    if stop_order and stop_order.auxprice is not None:
+        aux_price = float(stop_order.auxprice)
+        open_risk = round(abs(position * (aux_price - avgcost)), 2)
+    else:
+        aux_price = 0.0
+        open_risk = 999_999_999  # no stop = unbounded risk
+
+    return OpenPosition(
+        exit_strategies=exit_strategies,
+        symbol=pos.symbol,
+        contract_type=pos.sectype,
+        allocation=allocation,
+        size=size,
+        avgcost=avgcost,
+        auxprice=aux_price,
+        position=position,
+        openrisk=open_risk,
+    )
+
+
 async def process_openrisktable(client: IbClient, db_conn) -> List[OpenPosition]:
     """
     Build the open-risk table. One IB call each for positions, account
@@ -69,46 +111,18 @@ async def process_openrisktable(client: IbClient, db_conn) -> List[OpenPosition]
     portfolio_positions: List[OpenPosition] = []
 
     for pos in positions:
-        symbol = pos.symbol
+        symbol_u = (pos.symbol or "").upper()
         try:
-            contract_type = pos.sectype
-            position = float(pos.position)
-            avgcost = float(pos.avgcost)
-
-            size = round(abs(position * avgcost), 2)
-            allocation = (
-                round((size / netliq) * 100, 2)
-                if netliq > 0
-                else None
-            )
-
-            symbol_u = (symbol or "").upper()
-            stop_order = stp_by_symbol.get(symbol_u)
-            exit_strategies = strategies_by_symbol.get(symbol_u, [])
-
-            if stop_order and stop_order.auxprice is not None:
-                aux_price = float(stop_order.auxprice)
-                open_risk = round(abs(position * (aux_price - avgcost)), 2)
-            else:
-                aux_price = 0.0
-                open_risk = 999_999_999  # no stop = unbounded risk
-
             portfolio_positions.append(
-                OpenPosition(
-                    exit_strategies=exit_strategies,
-                    symbol=symbol,
-                    contract_type=contract_type,
-                    allocation=allocation,
-                    size=size,
-                    avgcost=avgcost,
-                    auxprice=aux_price,
-                    position=position,
-                    openrisk=open_risk,
+                build_open_position(
+                    pos,
+                    netliq,
+                    stp_by_symbol.get(symbol_u),
+                    strategies_by_symbol.get(symbol_u, []),
                 )
             )
-
         except Exception:
-            logger.exception("Error processing %s", symbol)
+            logger.exception("Error processing %s", pos.symbol)
             continue
 
     logger.info(
@@ -1,13 +1,17 @@
 import asyncio
 import logging
+import time as _time
 
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 import pytz
-from ib_async import IB, Stock, CFD, LimitOrder, StopOrder, MarketOrder
+from ib_async import IB, LimitOrder, StopOrder, MarketOrder
 from core.config import settings
+from services.contracts import contract_registry
 from services.orders import BidAsk, Order
+from services.quote_board import quote_board
+from services.portfolio.ib_state import ib_state
 from services.portfolio.order_tracker import OrderTracker, TERMINAL_STATUSES
 
 logger = logging.getLogger(__name__)
@@ -58,6 +62,7 @@ class Fill:
     price: float
     time: datetime
     exchange: str
+    execid: str = ""       # IB execId; unique per execution, used for dedupe
 
 
 @dataclass(frozen=True)
@@ -135,13 +140,47 @@ class OrderNotFoundError(Exception):
         super().__init__(message or f"No open order found with permId={order_id}")
 
 
-def _build_contract(symbol: str, contract_type: str):
-
-    if contract_type == "CFD":
-        return CFD(symbol=symbol, exchange="SMART", currency="USD")
-    if contract_type in ("stock", "STK"):
-        return Stock(symbol=symbol, exchange="SMART", currency="USD")
-    raise ValueError(f"Unsupported contract_type: {contract_type!r}")
+def _to_position(p) -> Position:
+    return Position(
+        account=p.account,
+        symbol=p.contract.symbol,
+        sectype=p.contract.secType,
+        currency=p.contract.currency,
+        position=p.position,
+        avgcost=round(p.avgCost, 2),
+    )
+
+
+def _to_fill(fill, tz) -> Fill:
+    """Map an ib_async Fill onto ours, with time converted to `tz`."""
+    return Fill(
+        tradeid=fill.execution.permId,
+        symbol=fill.contract.symbol,
+        conid=fill.contract.conId,
+        sectype=fill.contract.secType,
+        action=fill.execution.side,
+        quantity=fill.execution.shares,
+        price=fill.execution.price,
+        time=fill.execution.time.astimezone(tz),
+        exchange=fill.execution.exchange,
+        execid=fill.execution.execId,
+    )
+
+
+def _to_open_order(t) -> OpenOrder:
+    return OpenOrder(
+        orderid=t.order.permId,
+        symbol=t.contract.symbol,
+        action=t.order.action,
+        ordertype=t.order.orderType,
+        totalqty=t.order.totalQuantity,
+        lmtprice=t.order.lmtPrice,
+        auxprice=t.order.auxPrice,
+        orderref=t.order.orderRef,
+        status=t.orderStatus.status,
+        filled=t.orderStatus.filled,
+        remaining=t.orderStatus.remaining,
+    )
 
 
 class IbClient:
@@ -160,23 +199,26 @@ class IbClient:
     # ------------------------------------------------------------------
     # Reads
     # ------------------------------------------------------------------
-    async def get_positions(self) -> list[Position]:
-        """Fetch all non-zero positions."""
+    def _use_mirror(self) -> bool:
+        """Reads are served from the event-maintained IbStateMirror when it
+        is seeded for this IB connection; otherwise they hit IB directly."""
+        return ib_state.is_bound_to(self.ib)
+
+    async def get_positions(self, refresh: bool = False) -> list[Position]:
+        """Fetch all non-zero positions.
+
+        Served from the state mirror; `refresh=True` forces an IB round
+        trip (and re-seeds the mirror) for reconciliation.
+        """
         try:
-            positions = await self.ib.reqPositionsAsync()
-
-            result = [
-                Position(
-                    account=p.account,
-                    symbol=p.contract.symbol,
-                    sectype=p.contract.secType,
-                    currency=p.contract.currency,
-                    position=p.position,
-                    avgcost=round(p.avgCost, 2),
-                )
-                for p in positions
-                if p.position != 0
-            ]
+            if self._use_mirror():
+                if refresh:
+                    await ib_state.refresh_positions()
+                positions = ib_state.positions()
+            else:
+                positions = await self.ib.reqPositionsAsync()
+
+            result = [_to_position(p) for p in positions if p.position != 0]
 
             logger.debug(f"Fetched positions: {result}")
             return result
@@ -185,27 +227,17 @@ class IbClient:
             logger.error(f"Error fetching positions: {e}")
             return []
 
-    async def get_orders(self) -> list[OpenOrder]:
-        """Fetch all open orders."""
+    async def get_orders(self, refresh: bool = False) -> list[OpenOrder]:
+        """Fetch all open orders (mirror by default, see get_positions)."""
         try:
-            trades = await self.ib.reqAllOpenOrdersAsync()
-
-            orders = [
-                OpenOrder(
-                    orderid=t.order.permId,
-                    symbol=t.contract.symbol,
-                    action=t.order.action,
-                    ordertype=t.order.orderType,
-                    totalqty=t.order.totalQuantity,
-                    lmtprice=t.order.lmtPrice,
-                    auxprice=t.order.auxPrice,
-                    orderref=t.order.orderRef,
-                    status=t.orderStatus.status,
-                    filled=t.orderStatus.filled,
-                    remaining=t.orderStatus.remaining,
-                )
-                for t in trades
-            ]
+            if self._use_mirror():
+                if refresh:
+                    await ib_state.refresh_orders()
+                trades = ib_state.open_trades()
+            else:
+                trades = await self.ib.reqAllOpenOrdersAsync()
+
+            orders = [_to_open_order(t) for t in trades]
 
             logger.debug(f"Fetched orders: {orders}")
             return orders
@@ -214,10 +246,15 @@ class IbClient:
             logger.error(f"Error fetching orders: {e}")
             return []
 
-    async def get_account_summary(self) -> AccountSummary:
-        """Fetch account summary."""
+    async def get_account_summary(self, refresh: bool = False) -> AccountSummary:
+        """Fetch account summary (mirror by default, see get_positions)."""
         try:
-            summary = await self.ib.accountSummaryAsync()
+            if self._use_mirror():
+                if refresh:
+                    await ib_state.refresh_account()
+                summary = ib_state.account_values()
+            else:
+                summary = await self.ib.accountSummaryAsync()
             return AccountSummary(tags={item.tag: item.value for item in summary})
         except Exception as e:
             logger.error(f"Error fetching account summary: {e}")
@@ -239,19 +276,7 @@ class IbClient:
                 if not fill.execution:
                     continue
 
-                time_helsinki = fill.execution.time.astimezone(TIMEZONE)
-                executed.append(Fill(
-                    tradeid=fill.execution.permId,
-                    symbol=fill.contract.symbol,
-                    conid=fill.contract.conId,
-                    sectype=fill.contract.secType,
-                    action=fill.execution.side,
-                    quantity=fill.execution.shares,
-                    price=fill.execution.price,
-                    time=time_helsinki,
-                    exchange=fill.execution.exchange,
-
-                ))
+                executed.append(_to_fill(fill, TIMEZONE))
 
             for t in executed:
                 logging.info(
@@ -267,10 +292,22 @@ class IbClient:
             logging.error(f"Error fetching executed trades: {e}")
             return []
 
-    async def get_bid_ask_price(self, symbol: str) -> BidAsk:
+    async def get_bid_ask_price(
+        self, symbol: str, max_age: Optional[float] = None,
+    ) -> BidAsk:
+        """
+        Current bid/ask. Served from the shared streaming QuoteBoard when
+        it is bound to this IB connection (microseconds for recently used
+        symbols); otherwise falls back to a one-shot subscription.
+
+        `max_age` (seconds) rejects quotes whose last tick is older.
+        """
+        if quote_board.is_bound_to(self.ib):
+            quote = await quote_board.get_quote(symbol, max_age=max_age)
+            logger.info(f"Quote for {symbol}: bid={quote.bid} ask={quote.ask}")
+            return quote
 
-        contract = Stock(symbol=symbol, exchange="SMART", currency="USD")
-        await self.ib.qualifyContractsAsync(contract)
+        contract = await contract_registry.resolve(self.ib, symbol, "STK")
 
         ticker = self.ib.reqMktData(contract, "", False, False)
         try:
@@ -295,16 +332,23 @@ class IbClient:
 
         logger.info(f"Quote for {symbol}: bid={bid} ask={ask})")
         
-        return BidAsk(symbol=symbol, bid=bid, ask=ask)
+        return BidAsk(symbol=symbol, bid=bid, ask=ask, ts=_time.time())
 
 # Helpers filtering functions and order placement logic
-    async def get_stp_order_by_symbol(self, symbol: str) -> OpenOrder | None:
+    async def _orders_for_symbol(self, symbol: str, refresh: bool) -> list[OpenOrder]:
+        if self._use_mirror() and not refresh:
+            return [_to_open_order(t) for t in ib_state.trades_for(symbol)]
+        return await self.get_orders(refresh=refresh)
+
+    async def get_stp_order_by_symbol(
+        self, symbol: str, refresh: bool = False,
+    ) -> OpenOrder | None:
         """
         Return the first open STP (Stop) order for the given symbol.
         Returns None if not found.
         """
         try:
-            orders = await self.get_orders()
+            orders = await self._orders_for_symbol(symbol, refresh)
             wanted = symbol.upper()
             return next(
                 (
@@ -318,13 +362,15 @@ class IbClient:
             logger.error(f"Error fetching STP order for {symbol}: {e}")
             return None
 
-    async def get_mkt_order_by_symbol(self, symbol: str) -> OpenOrder | None:
+    async def get_mkt_order_by_symbol(
+        self, symbol: str, refresh: bool = False,
+    ) -> OpenOrder | None:
         """
         Return the first open MKT (Market) order for the given symbol.
         Returns None if not found.
         """
         try:
-            orders = await self.get_orders()
+            orders = await self._orders_for_symbol(symbol, refresh)
             wanted = symbol.upper()
             return next(
                 (
@@ -338,13 +384,21 @@ class IbClient:
             logger.error(f"Error fetching MKT order for {symbol}: {e}")
             return None
 
-    async def get_position_by_symbol(self, symbol: str) -> Position | None:
+    async def get_position_by_symbol(
+        self, symbol: str, refresh: bool = False,
+    ) -> Position | None:
         """
         Return the non-zero Position for the given symbol.
         Returns None if not found.
         """
         try:
-            positions = await self.get_positions()
+            if self._use_mirror() and not refresh:
+                positions = [
+                    _to_position(p) for p in ib_state.positions_for(symbol)
+                    if p.position != 0
+                ]
+            else:
+                positions = await self.get_positions(refresh=refresh)
             wanted = symbol.upper()
             return next(
                 (p for p in positions if p.symbol and p.symbol.upper() == wanted),
@@ -356,6 +410,22 @@ class IbClient:
 
 
 
+    async def _find_open_trade(self, perm_id: int):
+        """
+        Live Trade for an open order by permId. Mirror hit first; on a
+        miss (e.g. an order placed from TWS since the last reconcile)
+        falls back to one reqAllOpenOrdersAsync.
+        """
+        if self._use_mirror():
+            trade = ib_state.trade_by_perm_id(perm_id)
+            if trade is not None:
+                return trade
+        open_trades = await self.ib.reqAllOpenOrdersAsync()
+        return next(
+            (t for t in open_trades or [] if t.order and t.order.permId == perm_id),
+            None,
+        )
+
     # ------------------------------------------------------------------
     # Writes — order placement
     # ------------------------------------------------------------------
@@ -363,10 +433,10 @@ class IbClient:
     async def place_bracket_order(self, order: Order):
 
         try:
-            contract = _build_contract(order.symbol,order.contract_type)
-
-            # Properly await qualification
-            await self.ib.qualifyContractsAsync(contract)
+            # Qualified once per symbol, then served from the registry.
+            contract = await contract_registry.resolve(
+                self.ib, order.symbol, order.contract_type,
+            )
 
             reverse_action = "SELL" if order.action.upper() == "BUY" else "BUY"
 
@@ -425,10 +495,10 @@ class IbClient:
     async def place_limit_order(self, order: Order):
         """Place a simple limit order asynchronously."""
         try:
-            contract = _build_contract(order.symbol,order.contract_type)
-
-            # Properly await qualification
-            await self.ib.qualifyContractsAsync(contract)
+            # Qualified once per symbol, then served from the registry.
+            contract = await contract_registry.resolve(
+                self.ib, order.symbol, order.contract_type,
+            )
 
             limit_order = LimitOrder(
                 action=order.action,
@@ -474,9 +544,10 @@ class IbClient:
     async def place_market_order(self, order: Order):
         """Place a market order asynchronously."""
         try:
-            contract = _build_contract(order.symbol,order.contract_type)
-
-            await self.ib.qualifyContractsAsync(contract)
+            # Qualified once per symbol, then served from the registry.
+            contract = await contract_registry.resolve(
+                self.ib, order.symbol, order.contract_type,
+            )
 
             market_order = MarketOrder(
                 action=order.action,
@@ -507,17 +578,7 @@ class IbClient:
         Modify the quantity of an open IB order using its permId.
         """
         try:
-            #  Fetch all open orders
-            open_orders = await self.ib.reqAllOpenOrdersAsync()
-
-            #  Find order matching permId
-            target_trade = next(
-                (
-                    t for t in open_orders
-                    if t.order and t.order.permId == order_id
-                ),
-                None
-            )
+            target_trade = await self._find_open_trade(order_id)
 
             if not target_trade:
                 logger.warning(f"No open order found with permId {order_id}")
@@ -537,8 +598,9 @@ class IbClient:
             # Modify quantity
             order.totalQuantity = new_qty
 
-            # Qualify contract (required by IB)
-            await self.ib.qualifyContractsAsync(contract)
+            # Open-order contracts arrive qualified; the registry just
+            # remembers them instead of re-asking IB.
+            contract = await contract_registry.qualify(self.ib, contract)
 
             # Place order again (same orderId updates the existing order).
             # Wait for IB to fire the Trade's statusEvent as the ack that
@@ -577,17 +639,7 @@ class IbClient:
         Uses permId to locate the order.
         """
         try:
-            #  Fetch all open orders
-            open_orders = await self.ib.reqAllOpenOrdersAsync()
-
-            # 2️⃣ Find order matching permId
-            target_trade = next(
-                (
-                    t for t in open_orders
-                    if t.order and t.order.permId == order_id
-                ),
-                None
-            )
+            target_trade = await self._find_open_trade(order_id)
 
             if not target_trade:
                 logger.warning(f"No open order found with permId {order_id}")
@@ -599,8 +651,9 @@ class IbClient:
             # Modify auxPrice (stop price)
             order.auxPrice = float(new_auxprice)
 
-            # Qualify contract (required by IB)
-            await self.ib.qualifyContractsAsync(contract)
+            # Open-order contracts arrive qualified; the registry just
+            # remembers them instead of re-asking IB.
+            contract = await contract_registry.qualify(self.ib, contract)
 
             # Same orderId => modification. Wait for IB's Trade.statusEvent
             # ack (cap at 1s to match the old sleep budget); timing out just
@@ -692,13 +745,8 @@ class IbClient:
           }
         """
         try:
-            # Fetch the live Trade. reqAllOpenOrdersAsync returns Trade
-            # objects with a live orderStatus we can poll.
-            open_trades = await self.ib.reqAllOpenOrdersAsync()
-            target = next(
-                (t for t in open_trades if t.order and t.order.permId == order_id),
-                None,
-            )
+            # Fetch the live Trade -- it carries an orderStatus we can poll.
+            target = await self._find_open_trade(order_id)
 
             if not target:
                 # Maybe already terminal — check tracker before giving up.
@@ -0,0 +1,277 @@
+"""
+Event-maintained mirror of IB portfolio state.
+
+IbClient's reads (positions, open orders, account summary and the
+by-symbol helpers built on them) each used to issue a fresh
+reqPositionsAsync / reqAllOpenOrdersAsync / accountSummaryAsync, so a
+single exit or add paid three or four IB round trips before doing any
+work. The mirror is seeded once at startup and then kept current from
+ib_async's push events:
+
+  - positionEvent              -> positions (zero rows dropped)
+  - newOrderEvent /
+    openOrderEvent /
+    orderStatusEvent           -> open trades (terminal ones dropped)
+  - accountValueEvent /
+    accountSummaryEvent        -> account tags seeded from the summary
+
+Every mutation bumps `version`, a monotonically increasing counter that
+consumers can compare to skip work when nothing changed. Positions and
+trades are also indexed by symbol so by-symbol reads are a dict lookup.
+
+Orders placed from another client (e.g. manually in TWS) are only
+reported to this client on an explicit reqAllOpenOrders, so a slow
+background reconcile (RECONCILE_SECONDS) re-seeds open orders, and every
+IbClient read takes `refresh=True` to force one on demand.
+
+Stored values are the live ib_async objects (Position namedtuples,
+Trade instances); IbClient maps them onto its own dataclasses exactly as
+it did for the round-trip results.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from ib_async import IB, AccountValue, OrderStatus, Trade
+from ib_async import Position as IbPosition
+
+logger = logging.getLogger(__name__)
+
+
+# Background open-order reconcile interval. Catches orders placed or
+# cancelled from other IB clients, which never reach our event stream.
+RECONCILE_SECONDS = 30.0
+
+TradeKey = Tuple
+PositionKey = Tuple[str, int]   # (account, conId)
+
+
+def _trade_key(trade: Trade) -> TradeKey:
+    """permId once IB has assigned one; (clientId, orderId) before that."""
+    order = trade.order
+    if order.permId:
+        return ("perm", order.permId)
+    return ("oid", order.clientId, order.orderId)
+
+
+def _symbol_of(contract) -> str:
+    return (getattr(contract, "symbol", "") or "").upper()
+
+
+class IbStateMirror:
+    """
+    In-memory positions / open trades / account tags for one IB connection.
+
+    Public surface:
+      - bind(ib) / seed() / start() / stop() : lifecycle
+      - is_bound_to(ib)                      : IbClient only trusts its own IB
+      - refresh_positions/orders/account()   : forced reconciliation
+      - positions() / positions_for(symbol)
+      - open_trades() / trades_for(symbol) / trade_by_perm_id(perm_id)
+      - account_values()
+      - version
+    """
+
+    def __init__(self, reconcile_seconds: float = RECONCILE_SECONDS) -> None:
+        self.reconcile_seconds = reconcile_seconds
+        self.version = 0
+        self._ib: Optional[IB] = None
+        self._seeded = False
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+        self._positions: Dict[PositionKey, IbPosition] = {}
+        # symbol -> ordered key set (dict keys keep IB's arrival order,
+        # so "first STP for symbol" stays deterministic).
+        self._positions_by_symbol: Dict[str, Dict[PositionKey, None]] = {}
+
+        self._trades: Dict[TradeKey, Trade] = {}
+        self._trades_by_symbol: Dict[str, Dict[TradeKey, None]] = {}
+        # Reverse map so a trade re-keyed on permId assignment (or removed)
+        # can find its old key without a scan.
+        self._key_of_trade: Dict[int, TradeKey] = {}
+
+        # tag -> AccountValue, limited to tags the seed summary returned.
+        self._account: Dict[str, AccountValue] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def bind(self, ib: IB) -> None:
+        """Wire ib_async events. Safe to call once at startup."""
+        self._ib = ib
+        ib.positionEvent += self._on_position
+        ib.newOrderEvent += self._on_trade
+        ib.openOrderEvent += self._on_trade
+        ib.orderStatusEvent += self._on_trade
+        ib.accountValueEvent += self._on_account_value
+        ib.accountSummaryEvent += self._on_account_value
+        logger.info("IbStateMirror bound to ib_async events")
+
+    def is_bound_to(self, ib: IB) -> bool:
+        return self._seeded and self._ib is not None and self._ib is ib
+
+    async def seed(self) -> None:
+        await asyncio.gather(
+            self.refresh_positions(),
+            self.refresh_orders(),
+            self.refresh_account(),
+        )
+        self._seeded = True
+        logger.info(
+            "IbStateMirror seeded: %d position(s), %d open order(s), %d account tag(s)",
+            len(self._positions), len(self._trades), len(self._account),
+        )
+
+    def start(self) -> None:
+        if self._reconcile_task is None and self.reconcile_seconds > 0:
+            self._reconcile_task = asyncio.get_running_loop().create_task(
+                self._reconcile_loop()
+            )
+
+    async def stop(self) -> None:
+        task, self._reconcile_task = self._reconcile_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_seconds)
+            try:
+                await self.refresh_orders()
+            except Exception:
+                logger.exception("IbStateMirror reconcile failed")
+
+    # ------------------------------------------------------------------
+    # Forced refresh (one IB round trip each)
+    # ------------------------------------------------------------------
+    async def refresh_positions(self) -> None:
+        positions = await self._ib.reqPositionsAsync()
+        self._positions.clear()
+        self._positions_by_symbol.clear()
+        for p in positions or []:
+            self._put_position(p)
+        self.version += 1
+
+    async def refresh_orders(self) -> None:
+        trades = await self._ib.reqAllOpenOrdersAsync()
+        self._trades.clear()
+        self._trades_by_symbol.clear()
+        self._key_of_trade.clear()
+        for t in trades or []:
+            if t.orderStatus.status not in OrderStatus.DoneStates:
+                self._put_trade(t)
+        self.version += 1
+
+    async def refresh_account(self) -> None:
+        summary = await self._ib.accountSummaryAsync()
+        self._account = {v.tag: v for v in summary or []}
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Event handlers (sync, called from the ib_async socket callback)
+    # ------------------------------------------------------------------
+    def _on_position(self, position: IbPosition) -> None:
+        try:
+            self._put_position(position)
+            self.version += 1
+        except Exception:
+            logger.exception("IbStateMirror positionEvent handler failed")
+
+    def _on_trade(self, trade: Trade) -> None:
+        try:
+            if trade.orderStatus.status in OrderStatus.DoneStates:
+                self._drop_trade(trade)
+            else:
+                self._put_trade(trade)
+            self.version += 1
+        except Exception:
+            logger.exception("IbStateMirror order event handler failed")
+
+    def _on_account_value(self, value: AccountValue) -> None:
+        # reqAccountUpdates streams every tag in every currency; keep only
+        # the tags (and currency) the summary seeded so the mirror answers
+        # exactly what get_account_summary used to.
+        current = self._account.get(value.tag)
+        if current is None or current.currency != value.currency:
+            return
+        if current.value == value.value:
+            return
+        self._account[value.tag] = current._replace(value=value.value)
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+    def _put_position(self, position: IbPosition) -> None:
+        key = (position.account, position.contract.conId)
+        symbol = _symbol_of(position.contract)
+        if position.position == 0:
+            self._positions.pop(key, None)
+            keys = self._positions_by_symbol.get(symbol)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._positions_by_symbol[symbol]
+            return
+        self._positions[key] = position
+        self._positions_by_symbol.setdefault(symbol, {})[key] = None
+
+    def _put_trade(self, trade: Trade) -> None:
+        key = _trade_key(trade)
+        old = self._key_of_trade.get(id(trade))
+        if old is not None and old != key:
+            # permId just arrived for an order we placed.
+            self._unindex_trade(old, trade)
+        self._trades[key] = trade
+        self._key_of_trade[id(trade)] = key
+        self._trades_by_symbol.setdefault(_symbol_of(trade.contract), {})[key] = None
+
+    def _drop_trade(self, trade: Trade) -> None:
+        key = self._key_of_trade.pop(id(trade), None) or _trade_key(trade)
+        self._unindex_trade(key, trade)
+
+    def _unindex_trade(self, key: TradeKey, trade: Trade) -> None:
+        self._trades.pop(key, None)
+        symbol = _symbol_of(trade.contract)
+        keys = self._trades_by_symbol.get(symbol)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._trades_by_symbol[symbol]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def positions(self) -> List[IbPosition]:
+        return list(self._positions.values())
+
+    def positions_for(self, symbol: str) -> List[IbPosition]:
+        keys = self._positions_by_symbol.get(symbol.upper(), ())
+        return [self._positions[k] for k in keys]
+
+    def open_trades(self) -> List[Trade]:
+        return list(self._trades.values())
+
+    def trades_for(self, symbol: str) -> List[Trade]:
+        keys = self._trades_by_symbol.get(symbol.upper(), ())
+        return [self._trades[k] for k in keys]
+
+    def trade_by_perm_id(self, perm_id: int) -> Optional[Trade]:
+        if not perm_id:
+            return None
+        return self._trades.get(("perm", perm_id))
+
+    def account_values(self) -> List[AccountValue]:
+        return list(self._account.values())
+
+
+# Module-level singleton -- one mirror per process, bound to app.state.ib
+# at startup. Requests reach it through IbClient.
+ib_state = IbStateMirror()
@@ -0,0 +1,168 @@
+"""
+Push-based lockout status for the UI banner.
+
+LockoutBanner used to poll /lockout-status, and every poll re-ran
+check_consecutive_losses / check_loss_cooldown over a fresh snapshot even
+though the answer only changes at two kinds of moment:
+
+  - a fill lands that closes a trade (streak / last loss move), and
+  - the wall clock crosses the active cooldown_until.
+
+The hub listens to the TradesEngine for the first (add_listener, called
+after each batch of new fills) and schedules exactly one loop timer for
+the second (loop.call_at at cooldown_until), so the unlock event fires on
+time with nobody polling. Each re-evaluation is compared against the last
+broadcast state and only a real change is pushed.
+
+Event shapes on the SSE stream:
+  data: {"type": "snapshot", "status": LockoutStatus}
+  data: {"type": "ping"}                                       (every 15s)
+
+Shape mirrors PendingApprovalsHub -- same subscribe / unsubscribe /
+broadcast pattern -- but the broker topic is CONFLATE: each message is
+the full status, so a slow tab only ever holds the newest one.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from helpers.broker import CONFLATE, Subscription, broker
+from services.portfolio.risk_limits import LockoutStatus, compute_lockout_state
+from services.portfolio.trades.trades_engine import TIMEZONE, TradesEngine
+
+logger = logging.getLogger(__name__)
+
+
+TOPIC = "lockout"
+
+
+# Fire the expiry re-evaluation this long after cooldown_until, so the
+# guards (which compare now >= cooldown_until) see the window as elapsed.
+EXPIRY_SLACK_SECONDS = 0.05
+
+
+def _state_key(status: LockoutStatus) -> tuple:
+    """Fields that define a state change. `message` is excluded: it
+    embeds the remaining time, which differs on every evaluation."""
+    return (status.locked, status.reason, status.cooldown_until, status.streak)
+
+
+class LockoutHub:
+    """
+    Single-instance broadcaster for lockout state.
+
+    Owns:
+      - the "lockout" broker topic (CONFLATE, latest status only)
+      - `_status`: the last evaluated LockoutStatus
+      - `_expiry`: the loop timer armed for the active cooldown_until
+    """
+
+    def __init__(self, engine: TradesEngine) -> None:
+        self.engine = engine
+        broker.topic(TOPIC, policy=CONFLATE, maxsize=1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._status: Optional[LockoutStatus] = None
+        self._expiry: Optional[asyncio.TimerHandle] = None
+        self._expiry_at: Optional[str] = None
+        self._refresh_pending = False
+
+    # ------------------------------------------------------------------
+    # Wiring
+    # ------------------------------------------------------------------
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Capture the FastAPI loop, follow the engine's fills and take
+        the initial evaluation (which also arms the expiry timer)."""
+        self._loop = loop
+        self.engine.add_listener(self.notify)
+        self.refresh()
+
+    def close(self) -> None:
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+            self._expiry_at = None
+
+    # ------------------------------------------------------------------
+    # SSE subscription plumbing
+    # ------------------------------------------------------------------
+    def subscribe(self, after: Optional[str] = None) -> Subscription:
+        sub = broker.subscribe(TOPIC, after=after)
+        logger.info("LockoutHub SSE client connected (n=%d)", broker.subscriber_count(TOPIC))
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        broker.unsubscribe(sub)
+        logger.info("LockoutHub SSE client disconnected (n=%d)", broker.subscriber_count(TOPIC))
+
+    def snapshot_now(self) -> Dict[str, Any]:
+        """Initial payload for a newly-connected SSE client."""
+        return {"type": "snapshot", "status": asdict(self.current())}
+
+    def current(self) -> LockoutStatus:
+        """Fresh evaluation (cheap: the engine snapshot is cached per
+        version). Does not broadcast."""
+        now = datetime.now(TIMEZONE)
+        return compute_lockout_state(self.engine.snapshot(), now)
+
+    # ------------------------------------------------------------------
+    # Triggers
+    # ------------------------------------------------------------------
+    def notify(self, *_args: Any) -> None:
+        """Engine listener. Called synchronously from inside ingest, so
+        the re-evaluation is deferred to the loop (and coalesced) rather
+        than re-entering the engine mid-fold."""
+        if self._refresh_pending or self._loop is None:
+            return
+        self._refresh_pending = True
+        self._loop.call_soon(self.refresh)
+
+    def refresh(self) -> None:
+        """Re-evaluate, broadcast on change, and re-arm the expiry timer."""
+        self._refresh_pending = False
+        try:
+            status = self.current()
+        except Exception:
+            logger.exception("LockoutHub evaluation failed")
+            return
+
+        changed = self._status is None or _state_key(status) != _state_key(self._status)
+        self._status = status
+        self._arm_expiry(status)
+        if changed:
+            logger.info(
+                "Lockout state: locked=%s streak=%d until=%s",
+                status.locked, status.streak, status.cooldown_until,
+            )
+            self._broadcast({"type": "snapshot", "status": asdict(status)})
+
+    def _arm_expiry(self, status: LockoutStatus) -> None:
+        """One timer at most, for the active cooldown_until."""
+        until = status.cooldown_until if status.locked else None
+        if until == self._expiry_at:
+            return
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        self._expiry_at = until
+        if until is None or self._loop is None:
+            return
+        delay = (datetime.fromisoformat(until) - datetime.now(TIMEZONE)).total_seconds()
+        self._expiry = self._loop.call_at(
+            self._loop.time() + max(delay, 0.0) + EXPIRY_SLACK_SECONDS,
+            self._on_expiry,
+        )
+
+    def _on_expiry(self) -> None:
+        self._expiry = None
+        self._expiry_at = None
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # Internal fanout -- conflation lives in the broker topic.
+    # ------------------------------------------------------------------
+    def _broadcast(self, payload: Dict[str, Any]) -> None:
+        broker.publish(TOPIC, payload)
@@ -2,17 +2,58 @@
 Event-driven broadcaster for the open-risk table.
 
 Instead of the frontend polling /open-risk-table, subscribers connect once
-via SSE and the hub pushes a fresh snapshot whenever anything that could
-change the table happens:
+via SSE and the hub pushes changes whenever anything that could change the
+table happens:
 
-  - IB fill (execDetailsEvent) → position size / avg cost changed
-  - IB order update (openOrderEvent) → STP resize / price move / new bracket
-  - IB account value tick (accountValueEvent) → NetLiq shifts the allocation column
-  - User arms or disarms an exit_request (called from the exits router)
+  - IB fill / position update (execDetailsEvent, positionEvent)
+        -> that symbol's size / avg cost changed
+  - IB order update (openOrderEvent, orderStatusEvent)
+        -> that symbol's STP resize / price move / cancel
+  - IB NetLiquidation tick (accountValueEvent)
+        -> every row's allocation column
+  - User arms or disarms an exit_request (notify_exits from the exits router)
+
+The hub keeps the last row per symbol and, on each trigger, recomputes
+only the affected symbols from locally held state (IbClient reads are
+served by the IbStateMirror, and exit strategies are cached here and only
+re-read from the DB for new symbols or after an arm/disarm). Only rows
+that actually changed go out, as a sequenced patch. A full snapshot is
+sent on connect, after a full resync (notify()), and -- via the broker
+topic's resync hook -- to a consumer whose queue overflowed, so a gap in
+`seq` never goes unrepaired.
+
+Triggers are filtered on their payload before anything is scheduled:
+order events only for stop orders (the only order type the table reads),
+position events only when size / avg cost actually moved, account values
+only for a NetLiquidation that changed. Everything else is counted and
+dropped.
 
 Debounced ~100ms so a bracket placement (which fires openOrderEvent for
 parent and child, plus execDetailsEvent when the parent fills) collapses
-into one rebuild rather than three.
+into one recompute rather than three. On top of that an adaptive rate
+cap spaces recomputes at least `interval` apart; the interval doubles
+(up to MAX_REBUILD_INTERVAL_SECONDS) while recomputes keep landing back
+to back and drops back to MIN_REBUILD_INTERVAL_SECONDS once it's quiet.
+stats() exposes the trigger / rebuild counters.
+
+Live columns (last, unrealized_pnl, r_multiple): the hub holds one
+QuoteBoard line per held symbol -- acquired when the symbol's row first
+appears, released when the position goes flat (or the last subscriber
+leaves). Ticks only mark the symbol; a frame timer flushes them at most
+`frame_hz` times a second (LIVE_FRAME_HZ), so a fast tape is conflated
+into one patch per frame carrying just the rows whose live values moved.
+R is unrealized PnL over the current open risk (position x distance to
+the STP); None without a stop or once the stop is at/through cost.
+
+Event shapes on the SSE stream:
+  data: {"type": "snapshot", "seq": N, "rows": [OpenPosition, ...]}
+  data: {"type": "patch",    "seq": N, "rows": [OpenPosition, ...],
+         "removed": [symbol, ...]}
+  data: {"type": "ping"}                                       (every 15s)
+
+A client applies a patch only when its seq is exactly last_seq + 1 and
+ignores ones at or below last_seq (already folded into its snapshot); any
+other seq means it missed one and should reconnect for a fresh snapshot.
 
 Wired at startup via core.startup.openrisk_hub_setup.wire_openrisk_hub.
 """
@@ -20,83 +61,225 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
-from ib_async import IB
+from ib_async import IB, Ticker
 from asyncpg import Pool
 
-from services.portfolio.flows.open_risk import process_openrisktable
+from db.exits import fetch_strategies_grouped_by_symbols
+from services.portfolio.flows.open_risk import (
+    STOP_ORDER_TYPES,
+    _index_stp_orders_by_symbol,
+    build_open_position,
+)
+from helpers.broker import LOSSLESS, Subscription, broker
 from services.portfolio.ib_client import IbClient
+from services.quote_board import quote_board
 
 logger = logging.getLogger(__name__)
 
 
-# Coalesce bursts of triggers within this window into one rebuild.
+TOPIC = "openrisk"
+
+
+# Coalesce bursts of triggers within this window into one recompute.
 DEBOUNCE_SECONDS = 0.1
 
+# Adaptive cap on recompute rate: minimum spacing between recomputes,
+# doubled per back-to-back recompute up to the max.
+MIN_REBUILD_INTERVAL_SECONDS = 0.25
+MAX_REBUILD_INTERVAL_SECONDS = 2.0
+
+# Live-price conflation: at most this many live patches per second.
+LIVE_FRAME_HZ = 4.0
+
+
+def _symbol_of(obj: Any) -> str:
+    contract = getattr(obj, "contract", None)
+    return (getattr(contract, "symbol", "") or "").upper()
+
 
 class OpenRiskHub:
     """
     Single-instance broadcaster. Owns:
-      - `_subscribers`: one asyncio.Queue per connected SSE client
-      - `_notify_pending`: debounce flag so bursts of events fire ONE rebuild
-      - a rebuild coroutine that reads positions/orders/summary via IbClient
-        and pushes the resulting snapshot to every subscriber
+      - the "openrisk" broker topic (LOSSLESS, resync = full snapshot)
+      - `_rows`: last broadcast row per symbol, in IB position order
+      - `_dirty` / `_dirty_all`: what the next debounced recompute covers
+      - `_seq`: bumped once per broadcast patch
     """
 
-    def __init__(self, ib: IB, db_pool: Pool) -> None:
+    def __init__(self, ib: IB, db_pool: Pool, frame_hz: float = LIVE_FRAME_HZ) -> None:
         self.ib = ib
         self.db_pool = db_pool
-        self._subscribers: List[asyncio.Queue] = []
+        self.frame_hz = frame_hz
+        broker.topic(TOPIC, policy=LOSSLESS, maxsize=64, resync=self._full_payload)
         self._notify_pending = False
         self._loop: Optional[asyncio.AbstractEventLoop] = None
 
+        self._rows: Dict[str, dict] = {}
+        self._strategies: Dict[str, List[str]] = {}
+        self._seq = 0
+        # False until the first full build, and again once the last
+        # subscriber leaves (triggers are dropped while nobody listens).
+        self._warm = False
+        self._dirty: Set[str] = set()
+        self._dirty_all = False
+        self._strategies_dirty: Set[str] = set()
+        self._strategies_dirty_all = False
+        self._lock = asyncio.Lock()
+
+        # Trigger filter state: last size / avg cost per (account, conId)
+        # and last NetLiquidation (currency, value) seen.
+        self._last_position: Dict[tuple, tuple] = {}
+        self._last_netliq: Optional[tuple] = None
+
+        # Rate cap.
+        self._interval = MIN_REBUILD_INTERVAL_SECONDS
+        self._last_rebuild_at = float("-inf")
+
+        # Live quotes: symbol -> held Ticker (+ its updateEvent handler),
+        # pending acquires, and symbols ticked since the last frame.
+        self._tickers: Dict[str, Ticker] = {}
+        self._tick_handlers: Dict[str, Callable] = {}
+        self._acquiring: Dict[str, asyncio.Task] = {}
+        self._ticked: Set[str] = set()
+        self._frame_handle: Optional[asyncio.TimerHandle] = None
+        self._last_frame_at = float("-inf")
+
+        self._stats: Dict[str, int] = {
+            "triggers_received": 0,
+            "triggers_dropped": 0,
+            "triggers_coalesced": 0,
+            "rebuilds_run": 0,
+            "patches_sent": 0,
+            "rows_sent": 0,
+            "ticks_received": 0,
+            "live_frames": 0,
+        }
+
     # ------------------------------------------------------------------
     # SSE subscription plumbing
     # ------------------------------------------------------------------
-    def subscribe(self) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue(maxsize=64)
-        self._subscribers.append(q)
-        logger.info("OpenRiskHub SSE client connected (n=%d)", len(self._subscribers))
-        return q
+    def subscribe(self, after: Optional[str] = None) -> Subscription:
+        sub = broker.subscribe(TOPIC, after=after)
+        if sub.resumed and not self._warm:
+            # Triggers are dropped while nobody listens, so a cold hub's
+            # ring can't vouch for the gap -- send a snapshot instead.
+            sub.resumed = False
+        logger.info("OpenRiskHub SSE client connected (n=%d)", self.subscriber_count())
+        return sub
 
-    def unsubscribe(self, q: asyncio.Queue) -> None:
-        try:
-            self._subscribers.remove(q)
-        except ValueError:
-            pass
+    def unsubscribe(self, sub: Subscription) -> None:
+        broker.unsubscribe(sub)
+        if not self.subscriber_count():
+            self._warm = False
+            self._sync_quotes()
         logger.info(
-            "OpenRiskHub SSE client disconnected (n=%d)", len(self._subscribers)
+            "OpenRiskHub SSE client disconnected (n=%d)", self.subscriber_count()
         )
 
     def subscriber_count(self) -> int:
-        return len(self._subscribers)
+        return broker.subscriber_count(TOPIC)
 
     # ------------------------------------------------------------------
-    # Trigger — safe to call from sync ib_async callbacks or async code
+    # Triggers — safe to call from sync ib_async callbacks or async code
     # ------------------------------------------------------------------
     def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
         """Capture the FastAPI loop so sync IB callbacks can schedule the rebuild."""
         self._loop = loop
 
+    def on_exec(self, trade: Any, _fill: Any = None) -> None:
+        """execDetailsEvent(trade, fill). Always relevant: a fill moves
+        the position even if positionEvent hasn't arrived yet."""
+        self._mark([_symbol_of(trade)])
+
+    def on_order(self, trade: Any) -> None:
+        """openOrderEvent / orderStatusEvent(trade). Only stop orders feed
+        the table (auxprice / openrisk columns)."""
+        order_type = (getattr(trade.order, "orderType", "") or "").upper()
+        if order_type not in STOP_ORDER_TYPES:
+            self._drop()
+            return
+        self._mark([_symbol_of(trade)])
+
+    def on_position(self, position: Any) -> None:
+        """positionEvent(position). IB re-sends unchanged positions on
+        every portfolio update; only a size / avg cost move counts."""
+        key = (position.account, position.contract.conId)
+        state = (position.position, position.avgCost)
+        if self._last_position.get(key) == state:
+            self._drop()
+            return
+        self._last_position[key] = state
+        self._mark([_symbol_of(position)])
+
+    def notify_symbol(self, symbol: Optional[str]) -> None:
+        """One symbol's row may have changed (e.g. OrderTracker fill)."""
+        self._mark([(symbol or "").upper()])
+
+    def on_account_value(self, value: Any) -> None:
+        """accountValueEvent(value). Only NetLiquidation feeds the table
+        (the allocation column), and a change touches every row."""
+        if getattr(value, "tag", None) != "NetLiquidation":
+            self._drop()
+            return
+        state = (value.currency, value.value)
+        if state == self._last_netliq:
+            self._drop()
+            return
+        self._last_netliq = state
+        self._mark(None)
+
+    def notify_exits(self, symbol: Optional[str] = None) -> None:
+        """An exit_request was armed / disarmed. Without `symbol` (bulk
+        reconcile) every symbol's strategies are re-read."""
+        if symbol:
+            self._strategies_dirty.add(symbol.upper())
+            self._mark([symbol.upper()])
+        else:
+            self._strategies_dirty_all = True
+            self._mark(None)
+
     def notify(self, *_args: Any, **_kwargs: Any) -> None:
         """
-        Cheap sync trigger. Debounces multiple calls within DEBOUNCE_SECONDS
-        into one broadcast. Accepts *args so it can be attached directly to
-        ib_async events without adapter lambdas.
+        Catch-all trigger: recompute every row (strategies included).
+        Accepts *args so it can be attached directly to any event or
+        handler without adapter lambdas.
         """
-        # Skip if no one's listening -- rebuild would be wasted work.
-        if not self._subscribers:
+        self._strategies_dirty_all = True
+        self._mark(None)
+
+    def _drop(self) -> None:
+        self._stats["triggers_received"] += 1
+        self._stats["triggers_dropped"] += 1
+
+    def _mark(self, symbols: Optional[Iterable[str]]) -> None:
+        self._stats["triggers_received"] += 1
+        # Skip if no one's listening -- the cache goes cold instead and
+        # the next subscriber gets a full build.
+        if not self.subscriber_count():
+            self._stats["triggers_dropped"] += 1
             return
+        if symbols is None:
+            self._dirty_all = True
+        else:
+            self._dirty.update(s for s in symbols if s)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Debounce: one recompute per DEBOUNCE_SECONDS window, and no
+        sooner than `interval` after the previous one."""
         if self._notify_pending:
+            self._stats["triggers_coalesced"] += 1
             return
         loop = self._loop
         if loop is None:
             return
         self._notify_pending = True
+        delay = max(DEBOUNCE_SECONDS, self._last_rebuild_at + self._interval - loop.time())
         try:
             loop.call_later(
-                DEBOUNCE_SECONDS,
+                delay,
                 lambda: asyncio.ensure_future(self._rebuild_and_broadcast(), loop=loop),
             )
         except Exception:
@@ -104,48 +287,258 @@ class OpenRiskHub:
             logger.exception("OpenRiskHub notify scheduling failed")
 
     # ------------------------------------------------------------------
-    # Rebuild + fanout
+    # Recompute + fanout
     # ------------------------------------------------------------------
     async def _rebuild_and_broadcast(self) -> None:
         self._notify_pending = False
-        if not self._subscribers:
+        if not self.subscriber_count():
+            return
+        async with self._lock:
+            if not self._warm:
+                return   # snapshot_now does the full build, then reschedules
+            symbols = None if self._dirty_all else set(self._dirty)
+            self._dirty.clear()
+            self._dirty_all = False
+            if symbols is not None and not symbols:
+                return
+            self._note_rebuild()
+            try:
+                changed, removed = await self._recompute(symbols)
+            except Exception:
+                logger.exception("OpenRiskHub rebuild failed")
+                return
+            if not changed and not removed:
+                return
+            self._stats["patches_sent"] += 1
+            self._stats["rows_sent"] += len(changed)
+            self._seq += 1
+            payload = {
+                "type": "patch",
+                "seq": self._seq,
+                "rows": changed,
+                "removed": removed,
+            }
+        self._broadcast(payload)
+
+    def _note_rebuild(self) -> None:
+        """Count a recompute and adapt the rate cap: back-to-back
+        recomputes (within two intervals) double it, a quiet gap resets."""
+        self._stats["rebuilds_run"] += 1
+        now = self._loop.time() if self._loop is not None else 0.0
+        if now - self._last_rebuild_at < 2 * self._interval:
+            self._interval = min(self._interval * 2, MAX_REBUILD_INTERVAL_SECONDS)
+        else:
+            self._interval = MIN_REBUILD_INTERVAL_SECONDS
+        self._last_rebuild_at = now
+
+    def stats(self) -> Dict[str, Any]:
+        """Trigger / rebuild counters since startup, plus the current
+        rate-cap interval."""
+        return {
+            **self._stats,
+            "rebuild_interval_seconds": self._interval,
+            "subscribers": self.subscriber_count(),
+            "seq": self._seq,
+        }
+
+    async def _recompute(
+        self, symbols: Optional[Set[str]],
+    ) -> tuple[List[dict], List[str]]:
+        """
+        Recompute rows for `symbols` (None = all held symbols) and fold
+        them into `_rows`. Returns (changed rows, removed symbols).
+        """
+        client = IbClient(self.ib)
+        positions, account_summary, all_orders = await asyncio.gather(
+            client.get_positions(),
+            client.get_account_summary(),
+            client.get_orders(),
+        )
+        netliq = account_summary.net_liquidation
+        stp_by_symbol = _index_stp_orders_by_symbol(all_orders or [])
+
+        held = [p for p in positions or [] if p.symbol]
+        if symbols is not None:
+            held = [p for p in held if p.symbol.upper() in symbols]
+        await self._load_strategies({p.symbol.upper() for p in held})
+
+        fresh: Dict[str, dict] = {}
+        for pos in held:
+            sym = pos.symbol.upper()
+            try:
+                fresh[sym] = self._with_live(sym, build_open_position(
+                    pos,
+                    netliq,
+                    stp_by_symbol.get(sym),
+                    self._strategies.get(sym, []),
+                ).model_dump())
+            except Exception:
+                logger.exception("Error processing %s", pos.symbol)
+
+        scope = set(self._rows) if symbols is None else symbols
+        removed = [s for s in scope if s in self._rows and s not in fresh]
+        for s in removed:
+            del self._rows[s]
+            self._strategies.pop(s, None)
+
+        changed = [row for sym, row in fresh.items() if self._rows.get(sym) != row]
+        self._rows.update(fresh)
+        if symbols is None:
+            # Full pass: adopt IB's position order.
+            self._rows = {s: self._rows[s] for s in fresh}
+        if self._warm:
+            self._sync_quotes()
+        return changed, removed
+
+    async def _load_strategies(self, held: Set[str]) -> None:
+        """Fetch exit strategies for held symbols we have none cached for,
+        or that were armed / disarmed since. One DB query, often none."""
+        if self._strategies_dirty_all:
+            need = set(held)
+            self._strategies_dirty_all = False
+        else:
+            need = {s for s in held if s not in self._strategies}
+        need |= self._strategies_dirty & held
+        self._strategies_dirty -= need
+        if not need:
             return
+        async with self.db_pool.acquire() as conn:
+            fetched = await fetch_strategies_grouped_by_symbols(conn, sorted(need))
+        self._strategies.update(fetched)
+
+    # ------------------------------------------------------------------
+    # Live columns
+    # ------------------------------------------------------------------
+    def _sync_quotes(self) -> None:
+        """Hold a quote line for exactly the symbols with a row (none
+        while cold, or without a quote board on this IB)."""
+        if self._warm and quote_board.is_bound_to(self.ib):
+            wanted = set(self._rows)
+        else:
+            wanted = set()
+        held = set(self._tickers) | set(self._acquiring)
+        for sym in wanted - held:
+            self._acquiring[sym] = asyncio.ensure_future(self._watch(sym))
+        for sym in held - wanted:
+            self._unwatch(sym)
+
+    async def _watch(self, sym: str) -> None:
         try:
-            async with self.db_pool.acquire() as conn:
-                rows = await process_openrisktable(IbClient(self.ib), conn)
-        except Exception:
-            logger.exception("OpenRiskHub rebuild failed")
+            ticker = await quote_board.acquire(sym)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.warning("OpenRiskHub: no live quote for %s: %s", sym, e)
+            self._acquiring.pop(sym, None)
+            return
+        self._acquiring.pop(sym, None)
+        if sym not in self._rows or not self._warm:
+            # Went flat (or cold) while the subscribe was in flight.
+            quote_board.release(sym)
+            return
+        handler = lambda _t, s=sym: self._on_tick(s)  # noqa: E731
+        ticker.updateEvent += handler
+        self._tickers[sym] = ticker
+        self._tick_handlers[sym] = handler
+        self._on_tick(sym)
+
+    def _unwatch(self, sym: str) -> None:
+        task = self._acquiring.pop(sym, None)
+        if task is not None:
+            task.cancel()       # acquire() undoes its own hold
+            return
+        ticker = self._tickers.pop(sym, None)
+        handler = self._tick_handlers.pop(sym, None)
+        if ticker is not None:
+            if handler is not None:
+                ticker.updateEvent -= handler
+            quote_board.release(sym)
+        self._ticked.discard(sym)
+
+    def _on_tick(self, sym: str) -> None:
+        """Ticker update: mark the symbol, arm one frame timer."""
+        self._stats["ticks_received"] += 1
+        self._ticked.add(sym)
+        if self._frame_handle is not None or self._loop is None:
+            return
+        delay = max(0.0, self._last_frame_at + 1.0 / self.frame_hz - self._loop.time())
+        self._frame_handle = self._loop.call_later(delay, self._flush_frame)
+
+    def _flush_frame(self) -> None:
+        """One conflated live patch for every symbol ticked since the
+        last frame whose live values actually moved."""
+        self._frame_handle = None
+        self._last_frame_at = self._loop.time()
+        ticked, self._ticked = self._ticked, set()
+        if not self._warm or not self.subscriber_count():
+            return
+        changed: List[dict] = []
+        for sym in ticked:
+            row = self._rows.get(sym)
+            if row is None:
+                continue
+            live = self._with_live(sym, row)
+            if live != row:
+                self._rows[sym] = live
+                changed.append(live)
+        if not changed:
             return
+        self._stats["live_frames"] += 1
+        self._stats["rows_sent"] += len(changed)
+        self._seq += 1
+        self._broadcast({
+            "type": "patch",
+            "seq": self._seq,
+            "rows": changed,
+            "removed": [],
+        })
 
-        payload = {
-            "type": "snapshot",
-            "rows": [r.model_dump() for r in rows],
+    def _with_live(self, sym: str, row: dict) -> dict:
+        """Row with last / unrealized_pnl / r_multiple from the held
+        ticker. Unchanged when there's no usable price yet."""
+        ticker = self._tickers.get(sym)
+        if ticker is None:
+            return row
+        price = ticker.marketPrice()
+        if price != price or price <= 0:    # NaN / no market
+            return row
+        position, avgcost = row["position"], row["avgcost"]
+        pnl = (price - avgcost) * position
+        risk = row["openrisk"] if row["auxprice"] else 0.0
+        # Sign of the stop's side: a stop at/through cost means no risk.
+        at_risk = (avgcost - row["auxprice"]) * position > 0
+        return {
+            **row,
+            "last": round(price, 4),
+            "unrealized_pnl": round(pnl, 2),
+            "r_multiple": round(pnl / risk, 2) if risk and at_risk else None,
         }
-        self._broadcast(payload)
+
+    def _full_payload(self) -> dict:
+        return {"type": "snapshot", "seq": self._seq, "rows": list(self._rows.values())}
 
     def _broadcast(self, payload: dict) -> None:
-        dead: List[asyncio.Queue] = []
-        for q in list(self._subscribers):
-            try:
-                q.put_nowait(payload)
-            except asyncio.QueueFull:
-                # Slow consumer -- drop the oldest and try again so we keep
-                # current data flowing instead of stalling.
-                try:
-                    q.get_nowait()
-                    q.put_nowait(payload)
-                except Exception:
-                    logger.warning("Dropping update for slow SSE consumer")
-                    dead.append(q)
-        for q in dead:
-            self.unsubscribe(q)
+        # A slow consumer's backlog is replaced with _full_payload() by the
+        # topic's resync hook -- dropping a patch would break its seq chain.
+        broker.publish(TOPIC, payload)
 
     async def snapshot_now(self) -> dict:
         """
-        One-off, non-broadcast build. Used by the SSE endpoint to send the
-        initial payload to a freshly-connected client without waiting for
-        the next event.
+        Initial payload for a freshly-connected client: the cached rows
+        when warm, else one full build. Not broadcast.
         """
-        async with self.db_pool.acquire() as conn:
-            rows = await process_openrisktable(IbClient(self.ib), conn)
-        return {"type": "snapshot", "rows": [r.model_dump() for r in rows]}
+        async with self._lock:
+            if not self._warm:
+                self._strategies_dirty_all = True
+                self._dirty.clear()
+                self._dirty_all = False
+                self._rows = {}
+                self._strategies = {}
+                await self._recompute(None)
+                self._seq += 1
+                self._warm = True
+                self._sync_quotes()
+                if self._dirty or self._dirty_all:
+                    # Triggers that landed mid-build.
+                    self._schedule()
+            return self._full_payload()
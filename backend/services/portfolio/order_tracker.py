@@ -8,6 +8,13 @@ in main.py's lifespan and by IbClient when it places orders.
 State is keyed by IB's permId where available, and orderId for not-yet-
 acknowledged orders (the first orderStatusEvent typically carries the
 permId, at which point the row is re-keyed).
+
+SSE fanout goes through the shared broker's "orders" topic, CONFLATE
+keyed by order: each update carries the order's full current state, so a
+slow tab that falls behind a burst keeps just the newest row per order
+instead of being disconnected. One that falls behind on more orders than
+the queue holds is closed rather than losing an order's update, and
+re-snapshots when it reconnects.
 """
 
 import asyncio
@@ -18,6 +25,7 @@ from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
 from ib_async import IB, Trade
 
 from db.order_log import insert_order_log_event
+from helpers.broker import CONFLATE, Subscription, broker
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +45,14 @@ ACTIVE_STATUSES: Set[str] = {
     "ApiPending",
 }
 
+TOPIC = "orders"
+
+
+def _order_key(msg: Dict[str, Any]) -> Any:
+    """Conflation key: permId once acknowledged, else the orderId."""
+    order = msg.get("order") or {}
+    return order.get("perm_id") or ("oid", order.get("order_id"))
+
 
 def _trade_snapshot(trade: Trade) -> Dict[str, Any]:
     """Flatten a Trade into the JSON-serializable shape the UI consumes."""
@@ -75,7 +91,7 @@ class OrderTracker:
     Public surface:
       - register_trade(trade)          : called after every placeOrder
       - snapshot()                     : full list for GET /order-status
-      - subscribe()/unsubscribe(q)     : SSE plumbing
+      - subscribe()/unsubscribe(sub)   : SSE plumbing (broker "orders")
       - is_terminal(perm_id)/state(p)  : used by awaitable cancel
       - bind_events(ib)                : wire ib_async events once at startup
       - seed(ib)                       : pull existing open orders at boot
@@ -87,7 +103,7 @@ class OrderTracker:
         self._by_perm: Dict[int, Dict[str, Any]] = {}
         self._by_order: Dict[int, Dict[str, Any]] = {}
         self._lock = asyncio.Lock()
-        self._subscribers: List[asyncio.Queue] = []
+        broker.topic(TOPIC, policy=CONFLATE, maxsize=256, key=_order_key)
         self._loop: Optional[asyncio.AbstractEventLoop] = None
 
         # Append-only event log. Every status transition produces one entry
@@ -152,27 +168,14 @@ class OrderTracker:
     # ------------------------------------------------------------------
     # Subscription plumbing for SSE
     # ------------------------------------------------------------------
-    def subscribe(self) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue(maxsize=256)
-        self._subscribers.append(q)
-        return q
+    def subscribe(self, after: Optional[str] = None) -> Subscription:
+        return broker.subscribe(TOPIC, after=after)
 
-    def unsubscribe(self, q: asyncio.Queue) -> None:
-        try:
-            self._subscribers.remove(q)
-        except ValueError:
-            pass
+    def unsubscribe(self, sub: Subscription) -> None:
+        broker.unsubscribe(sub)
 
     def _broadcast(self, payload: Dict[str, Any]) -> None:
-        dead: List[asyncio.Queue] = []
-        for q in self._subscribers:
-            try:
-                q.put_nowait(payload)
-            except asyncio.QueueFull:
-                logger.warning("SSE subscriber queue full, dropping client")
-                dead.append(q)
-        for q in dead:
-            self.unsubscribe(q)
+        broker.publish(TOPIC, payload)
 
     # ------------------------------------------------------------------
     # Reads
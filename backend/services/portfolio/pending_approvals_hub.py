@@ -10,8 +10,10 @@ through POST /entry-request/approve, which either places the bracket
 order or discards the pending row.
 
 Shape mirrors OpenRiskHub deliberately -- same subscribe / unsubscribe
-/ broadcast pattern -- but there is no debounce here: approvals are
-low-frequency and the user needs to see every single one.
+/ broadcast pattern over the shared broker -- but there is no debounce
+here: approvals are low-frequency and the user needs to see every single
+one, so the topic is LOSSLESS. A subscriber that falls 64 events behind
+is closed and reconnects to a fresh snapshot.
 
 Event shapes on the SSE stream:
   data: {"type": "snapshot", "pending": [PendingApproval, ...]}
@@ -25,11 +27,16 @@ import asyncio
 import logging
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
+
+from helpers.broker import LOSSLESS, Subscription, broker
 
 logger = logging.getLogger(__name__)
 
 
+TOPIC = "pending_approvals"
+
+
 class PendingApproval:
     """
     Plain container -- the API layer converts to the Pydantic schema.
@@ -94,7 +101,7 @@ class PendingApprovalsHub:
 
     def __init__(self) -> None:
         self._pending: Dict[str, PendingApproval] = {}
-        self._subscribers: List[asyncio.Queue] = []
+        broker.topic(TOPIC, policy=LOSSLESS, maxsize=64)
         # Protects mutations to _pending. Broadcasts are best-effort and
         # tolerate reorderings, but we don't want two accept clicks to both
         # pop the same row.
@@ -103,23 +110,19 @@ class PendingApprovalsHub:
     # ------------------------------------------------------------------
     # SSE subscription plumbing
     # ------------------------------------------------------------------
-    def subscribe(self) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue(maxsize=64)
-        self._subscribers.append(q)
+    def subscribe(self, after: Optional[str] = None) -> Subscription:
+        sub = broker.subscribe(TOPIC, after=after)
         logger.info(
             "PendingApprovalsHub SSE client connected (n=%d)",
-            len(self._subscribers),
+            broker.subscriber_count(TOPIC),
         )
-        return q
+        return sub
 
-    def unsubscribe(self, q: asyncio.Queue) -> None:
-        try:
-            self._subscribers.remove(q)
-        except ValueError:
-            pass
+    def unsubscribe(self, sub: Subscription) -> None:
+        broker.unsubscribe(sub)
         logger.info(
             "PendingApprovalsHub SSE client disconnected (n=%d)",
-            len(self._subscribers),
+            broker.subscriber_count(TOPIC),
         )
 
     def snapshot_now(self) -> Dict[str, Any]:
@@ -182,21 +185,7 @@ class PendingApprovalsHub:
         return self._pending.get(approval_id)
 
     # ------------------------------------------------------------------
-    # Internal fanout -- same slow-consumer policy as OpenRiskHub.
+    # Internal fanout -- backpressure policy lives in the broker topic.
     # ------------------------------------------------------------------
     def _broadcast(self, payload: Dict[str, Any]) -> None:
-        dead: List[asyncio.Queue] = []
-        for q in list(self._subscribers):
-            try:
-                q.put_nowait(payload)
-            except asyncio.QueueFull:
-                try:
-                    q.get_nowait()
-                    q.put_nowait(payload)
-                except Exception:
-                    logger.warning(
-                        "PendingApprovalsHub: dropping slow SSE consumer"
-                    )
-                    dead.append(q)
-        for q in dead:
-            self.unsubscribe(q)
+        broker.publish(TOPIC, payload)
@@ -0,0 +1,146 @@
+"""
+Executions ledger -- batched writer + reader over db.executions.
+
+The TradesEngine enqueues every new fill here. Writes are coalesced: the
+first enqueue arms a FLUSH_DELAY_SECONDS timer and everything that lands
+before it fires goes out in one executemany (ON CONFLICT DO NOTHING on
+execId), so a burst of partial fills is one DB round trip, and the IB
+callback that produced them never waits on Postgres.
+
+Reads map rows back onto the same Fill dataclass IbClient produces, so
+trade_builder works unchanged over persisted history.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional
+
+import pytz
+
+from core.config import settings
+from db.executions import fetch_executions, insert_executions
+from services.portfolio.ib_client import Fill
+
+logger = logging.getLogger(__name__)
+
+
+TIMEZONE = pytz.timezone(settings.TIMEZONE)
+
+# Coalescing window for fill writes.
+FLUSH_DELAY_SECONDS = 0.5
+
+
+def fill_to_row(fill: Fill) -> dict:
+    return {
+        "exec_id": fill.execid,
+        "perm_id": fill.tradeid,
+        "symbol": fill.symbol,
+        "con_id": fill.conid,
+        "sec_type": fill.sectype,
+        "action": fill.action,
+        "quantity": fill.quantity,
+        "price": fill.price,
+        "time": fill.time,
+        "exchange": fill.exchange,
+    }
+
+
+def row_to_fill(row: dict) -> Fill:
+    return Fill(
+        tradeid=row["perm_id"],
+        symbol=row["symbol"],
+        conid=row["con_id"],
+        sectype=row["sec_type"],
+        action=row["action"],
+        quantity=row["quantity"],
+        price=row["price"],
+        time=row["time"].astimezone(TIMEZONE),
+        exchange=row["exchange"],
+        execid=row["exec_id"],
+    )
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    """[start, end) of a local trading day in settings.TIMEZONE."""
+    start = TIMEZONE.localize(datetime.combine(day, time.min))
+    end = TIMEZONE.localize(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+class ExecutionsLedger:
+
+    def __init__(self) -> None:
+        self._db_pool = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Fill] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+
+    def set_db_pool(self, pool) -> None:
+        self._db_pool = pool
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def enqueue(self, fills: Iterable[Fill]) -> None:
+        """Queue fills for the next batched write. Sync-safe (called from
+        ib_async callbacks). No-op without a pool (scripts, tests)."""
+        if self._db_pool is None or self._loop is None:
+            return
+        self._pending.extend(f for f in fills if f.execid)
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                FLUSH_DELAY_SECONDS, self._start_flush,
+            )
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flushing = self._loop.create_task(self.flush())
+
+    async def flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            async with self._db_pool.acquire() as conn:
+                await insert_executions(conn, [fill_to_row(f) for f in batch])
+            logger.debug("Persisted %d execution(s)", len(batch))
+        except Exception:
+            logger.exception("Failed to persist %d execution(s)", len(batch))
+
+    async def close(self) -> None:
+        """Flush whatever is queued. Called on shutdown before the pool
+        closes."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flushing is not None and not self._flushing.done():
+            await self._flushing
+        await self.flush()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    async def load(
+        self,
+        start: datetime,
+        end: datetime,
+        symbol: Optional[str] = None,
+    ) -> List[Fill]:
+        if self._db_pool is None:
+            return []
+        async with self._db_pool.acquire() as conn:
+            rows = await fetch_executions(conn, start, end, symbol=symbol)
+        return [row_to_fill(r) for r in rows]
+
+    async def load_day(self, day: date) -> List[Fill]:
+        return await self.load(*day_bounds(day))
+
+
+# Module-level singleton -- pool attached at startup.
+executions_ledger = ExecutionsLedger()
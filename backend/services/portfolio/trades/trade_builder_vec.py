@@ -0,0 +1,255 @@
+"""
+Columnar trade builder -- NumPy twin of trade_builder for large fill sets.
+
+trade_builder walks fills one at a time in Python, which is right for one
+day's few hundred fills and far too slow for a year of them. This module
+computes the same flat-to-flat cycles over parallel arrays:
+
+    code    int32    symbol code (index into `symbols`)
+    signed  int64    _signed_qty(action, quantity): +BOT / -SLD / 0
+    qty     float64  fill quantity
+    price   float64  fill price
+    t_us    int64    fill time, microseconds since the Unix epoch
+
+  1. one stable lexsort by (symbol, time) -- same order as the per-symbol
+     time sort in trades_snapshot/_split_into_cycles;
+  2. a cumulative-sum pass over `signed` per symbol; a fill where the
+     running net returns to zero closes a cycle, and the next fill (or
+     the symbol's first) starts one;
+  3. grouped sums (np.add.at over per-fill cycle ids) for entry/exit
+     value and quantity per cycle.
+
+Results are identical to build_completed_trades, not just close.
+np.add.at is unbuffered: it applies `acc[id] += x` element by element in
+input order, which is exactly the Python loop's float rounding. Neither
+np.add.reduceat nor a plain sum does that, because both switch to
+pairwise summation inside long groups. The final 4dp rounding uses
+Python's round(). Exactness matters for scratch trades, where pnl sits
+at 0 +- 1e-13 and the sign decides is_loss. scripts/dev_snapshot_smoke.py
+checks equality case by case; scripts/bench_trade_builder.py times both
+at 1k / 100k / 1M fills.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.portfolio.ib_client import Fill
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_us_array(times: Sequence[datetime]) -> np.ndarray:
+    """Exact epoch microseconds, converted in C by pandas (float
+    timestamp() would lose precision). Aware times in any offset count
+    from the UTC epoch; naive ones are read as UTC."""
+    return pd.to_datetime(list(times), utc=True).as_unit("us").asi8.astype(np.int64, copy=False)
+
+
+# Fast path for IB's canonical sides; _side() handles everything else.
+_SIDES = {"BOT": 1, "SLD": -1}
+
+
+def _side(action: str) -> int:
+    a = (action or "").upper()
+    if a in ("BOT", "BUY"):
+        return 1
+    if a in ("SLD", "SELL"):
+        return -1
+    return 0
+
+
+@dataclass(frozen=True)
+class FillColumns:
+    """Fills as parallel arrays. `times` keeps the original datetime
+    objects (when built from Fills) so output rows carry them verbatim."""
+    symbols: list[str]
+    code: np.ndarray
+    signed: np.ndarray
+    qty: np.ndarray
+    price: np.ndarray
+    t_us: np.ndarray
+    times: Optional[Sequence[datetime]] = None
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    @classmethod
+    def from_fills_by_symbol(cls, fills_by_symbol: dict[str, list[Fill]]) -> "FillColumns":
+        """Symbol codes follow the dict's key order, which is what fixes
+        the tie order of equal exit times in build_completed_trades."""
+        symbols = list(fills_by_symbol)
+        flat: list[Fill] = []
+        for sym in symbols:
+            flat.extend(fills_by_symbol[sym])
+        codes = np.repeat(
+            np.arange(len(symbols), dtype=np.int32),
+            [len(fills_by_symbol[sym]) for sym in symbols],
+        )
+        return cls._build(symbols, codes, flat)
+
+    @classmethod
+    def from_fills(cls, fills: Iterable[Fill]) -> "FillColumns":
+        """Group by uppercase symbol in first-appearance order (the order
+        trades_snapshot._group_fills_by_symbol produces)."""
+        index: dict[str, int] = {}
+        flat: list[Fill] = []
+        codes: list[int] = []
+        for f in fills:
+            sym = f.symbol.upper()
+            if not sym:
+                continue
+            codes.append(index.setdefault(sym, len(index)))
+            flat.append(f)
+        return cls._build(list(index), np.array(codes, dtype=np.int32), flat)
+
+    @classmethod
+    def _build(cls, symbols: list[str], codes: np.ndarray, fills: list[Fill]) -> "FillColumns":
+        n = len(fills)
+        qty = np.fromiter([f.quantity for f in fills], dtype=np.float64, count=n)
+        side = np.fromiter(
+            [_SIDES.get(f.action) or _side(f.action) for f in fills], dtype=np.int64, count=n,
+        )
+        times = [f.time for f in fills]
+        return cls(
+            symbols=symbols,
+            code=codes,
+            # astype truncates toward zero, like int() in _signed_qty.
+            signed=side * qty.astype(np.int64),
+            qty=qty,
+            price=np.fromiter([f.price for f in fills], dtype=np.float64, count=n),
+            t_us=_to_us_array(times),
+            times=times,
+        )
+
+
+@dataclass(frozen=True)
+class _Cycles:
+    """Per-fill cycle labelling over the (symbol, time)-sorted, non-zero
+    fills. `order` maps back into the FillColumns arrays."""
+    order: np.ndarray        # indices of the kept fills, sorted
+    ids: np.ndarray          # per kept fill: its cycle number
+    closed: np.ndarray       # per cycle: did net return to zero
+    starts: np.ndarray       # per cycle: first position in `order`
+    lengths: np.ndarray      # per cycle: number of fills
+    opens: np.ndarray        # per kept fill: opened from flat (an entry)
+
+
+def _label_cycles(cols: FillColumns) -> _Cycles:
+    order = np.lexsort((cols.t_us, cols.code))     # stable: ties keep input order
+    order = order[cols.signed[order] != 0]
+    code = cols.code[order]
+    signed = cols.signed[order]
+    n = len(order)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return _Cycles(order, empty, empty.astype(bool), empty, empty, empty.astype(bool))
+
+    # Running net per symbol: global cumsum minus the total at the end of
+    # the previous symbol. Integer arithmetic, so exact.
+    net = np.cumsum(signed)
+    first = np.empty(n, dtype=bool)
+    first[0] = True
+    first[1:] = code[1:] != code[:-1]
+    base = np.where(first, net - signed, 0)
+    net = net - _carry(base, first)
+
+    closes = net == 0
+    seg_start = first.copy()
+    seg_start[1:] |= closes[:-1]
+    starts = np.flatnonzero(seg_start)
+    ends = np.append(starts[1:], n) - 1
+    lengths = ends - starts + 1
+    opens = (net - signed) == 0
+    ids = np.cumsum(seg_start) - 1
+    return _Cycles(order, ids, closes[ends], starts, lengths, opens)
+
+
+def _carry(base: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Forward-fill each group's starting offset across the group."""
+    idx = np.where(first, np.arange(len(first)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return base[idx]
+
+
+def count_entries_vec(cols: FillColumns) -> dict[str, int]:
+    """Entries (flat -> non-flat fills) per symbol; zero counts omitted.
+    Same numbers as count_entries_from_fills applied per symbol."""
+    cyc = _label_cycles(cols)
+    counts = np.bincount(cols.code[cyc.order][cyc.opens], minlength=len(cols.symbols))
+    return {cols.symbols[i]: int(c) for i, c in enumerate(counts) if c > 0}
+
+
+def build_completed_trades_vec(cols: FillColumns) -> list[dict]:
+    """Columnar build_completed_trades. Same rows, same order."""
+    cyc = _label_cycles(cols)
+    keep = np.flatnonzero(cyc.closed)
+    if len(keep) == 0:
+        return []
+    starts, lengths = cyc.starts[keep], cyc.lengths[keep]
+    n_cycles = len(cyc.starts)
+
+    order = cyc.order
+    signed = cols.signed[order]
+    qty = cols.qty[order]
+    value = qty * cols.price[order]
+
+    # Direction from each cycle's first fill; entry-side = same sign.
+    is_entry = (signed > 0) == (signed[cyc.starts] > 0)[cyc.ids]
+    # Entry fills go to slot id, exit fills to slot n_cycles + id, so one
+    # ordered add.at per column sums both sides of every cycle.
+    slots = np.where(is_entry, cyc.ids, cyc.ids + n_cycles)
+    values = np.zeros(2 * n_cycles)
+    qtys = np.zeros(2 * n_cycles)
+    np.add.at(values, slots, value)
+    np.add.at(qtys, slots, qty)
+    entry_value, exit_value = values[:n_cycles][keep], values[n_cycles:][keep]
+    entry_qty, exit_qty = qtys[:n_cycles][keep], qtys[n_cycles:][keep]
+
+    long_ = signed[starts] > 0
+    pnl = np.where(long_, exit_value - entry_value, entry_value - exit_value)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_entry = np.where(entry_qty != 0, entry_value / entry_qty, 0.0)
+        avg_exit = np.where(exit_qty != 0, exit_value / exit_qty, 0.0)
+
+    first_pos = order[starts]
+    last_pos = order[starts + lengths - 1]
+    # Stable sort by exit time; ties keep (symbol, cycle) order.
+    by_exit = np.lexsort((np.arange(len(keep)), cols.t_us[last_pos]))
+    first_pos, last_pos = first_pos[by_exit], last_pos[by_exit]
+
+    if cols.times is None:
+        def times_at(positions):
+            return [_EPOCH + timedelta(microseconds=us) for us in cols.t_us[positions].tolist()]
+    else:
+        def times_at(positions):
+            times = cols.times
+            return [times[i] for i in positions.tolist()]
+
+    symbols = cols.symbols
+    pnl = pnl[by_exit].tolist()
+    return [
+        {
+            "symbol":      symbols[c],
+            "entry_time":  t_in,
+            "exit_time":   t_out,
+            "entry_price": round(a_in, 4),
+            "exit_price":  round(a_out, 4),
+            "quantity":    q,
+            "pnl":         round(p, 4),
+            "is_loss":     p < 0,
+        }
+        for c, t_in, t_out, a_in, a_out, q, p in zip(
+            cols.code[first_pos].tolist(),
+            times_at(first_pos),
+            times_at(last_pos),
+            avg_entry[by_exit].tolist(),
+            avg_exit[by_exit].tolist(),
+            exit_qty[by_exit].tolist(),
+            pnl,
+        )
+    ]
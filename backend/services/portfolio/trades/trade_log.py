@@ -18,16 +18,29 @@ already computes for the entry/risk flow) is:
 If a swing-trade mode is ever added, reintroduce a persistent reqPnLSingle
 registry (subscribe once per symbol at first fill, keep it alive until
 session close) rather than the per-request pattern this replaces.
+
+History beyond today (build_trade_log_history) never touches IB: fills
+come from the Postgres executions ledger by indexed range scan and run
+through the same trade_builder cycle logic as the live snapshot.
 """
 
 from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
 
 from services.portfolio.ib_client import IbClient
-from services.portfolio.trades.trades_snapshot import build_today_snapshot
+from services.portfolio.trades.executions_ledger import day_bounds, executions_ledger
+from services.portfolio.trades.trade_builder import (
+    aggregate_realized_pnl,
+    build_completed_trades,
+)
+from services.portfolio.trades.trades_snapshot import (
+    _group_fills_by_symbol,
+    _latest_fill_time,
+    build_today_snapshot,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -86,3 +99,59 @@ async def build_trade_log(client: IbClient) -> TradeLog:
         realized_pnl=snapshot.realized_pnl,
         symbol_count=len(rows),
     )
+
+
+@dataclass(frozen=True)
+class TradeLogHistory:
+    """
+    Trade log over a date range, from the executions ledger. `rows` are
+    per-symbol totals (newest-fill-first, same shape as today's log);
+    `trades` are the individual flat-to-flat cycles, sorted by exit_time.
+    """
+    start: date
+    end: date
+    rows: list[TradeLogEntry]
+    trades: list[dict]
+    realized_pnl: float
+    symbol_count: int
+
+
+async def build_trade_log_history(
+    start: date,
+    end: date,
+    symbol: str | None = None,
+) -> TradeLogHistory:
+    """Trade log for local days start..end inclusive (settings.TIMEZONE)."""
+    if end < start:
+        raise ValueError(f"end ({end}) is before start ({start})")
+
+    fills = await executions_ledger.load(
+        day_bounds(start)[0], day_bounds(end)[1], symbol=symbol,
+    )
+    fills_by_symbol = _group_fills_by_symbol(fills)
+    trades = build_completed_trades(fills_by_symbol)
+    realized, realized_by_symbol = aggregate_realized_pnl(trades)
+
+    rows = sorted(
+        (
+            TradeLogEntry(
+                symbol=sym,
+                realized_pnl=round(realized_by_symbol.get(sym, 0.0), 4),
+                fills=len(sym_fills),
+                last_fill_time=_latest_fill_time(sym_fills),
+                is_loss=realized_by_symbol.get(sym, 0.0) < 0,
+            )
+            for sym, sym_fills in fills_by_symbol.items()
+        ),
+        key=lambda e: e.last_fill_time or datetime.min,
+        reverse=True,
+    )
+
+    return TradeLogHistory(
+        start=start,
+        end=end,
+        rows=rows,
+        trades=trades,
+        realized_pnl=realized,
+        symbol_count=len(rows),
+    )
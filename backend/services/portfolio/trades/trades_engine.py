@@ -0,0 +1,298 @@
+"""
+Incremental trades engine.
+
+build_today_snapshot used to pay a full reqExecutionsAsync round trip
+every SNAPSHOT_TTL_SECONDS and rebuild every derived view from scratch,
+so a fill could stay invisible to the lockout guards for up to 5 s. The
+engine instead folds each fill in as it arrives from execDetailsEvent:
+
+  - per symbol: time-ordered fills, net position, the open cycle's fills,
+    entry count, realized PnL;
+  - globally: completed trades (kept sorted by exit_time), the running
+    consecutive-loss streak, and a `version` bumped on every new fill.
+
+Appending a fill is O(1) per fill: one signed-qty step on its symbol's
+book, and a _cycle_row when that step returns the symbol to flat. A fill
+that arrives out of time order (IB doesn't promise ordering across
+executions) rebuilds just that symbol's book with the same trade_builder
+functions the batch path uses, so both paths always agree.
+
+snapshot() returns an immutable TradesSnapshot, built at most once per
+version and shared by every reader until the next fill.
+
+Fills are deduplicated on execId. execDetailsEvent only fires for fills
+whose order this client knows, so manual TWS fills are picked up by a
+cheap reconcile against ib_async's own fill store (ib.wrapper.fills) on
+every event and every snapshot read.
+
+The day rolls over at local midnight in settings.TIMEZONE, matching the
+"today" IB's reqExecutions returns for a TWS in the same zone.
+
+With an ExecutionsLedger attached (set_ledger), every new fill is also
+queued for the Postgres executions table, and startup hydrates today's
+fills from there before IB's own fill store is reconciled on top.
+
+Listeners (add_listener) are called synchronously after every batch of
+new fills -- the LockoutHub uses this to push lockout changes.
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import logging
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import pytz
+from ib_async import IB
+
+from core.config import settings
+from services.portfolio.ib_client import Fill, _to_fill
+from services.portfolio.trades.trade_builder import (
+    _cycle_row,
+    _signed_qty,
+    aggregate_realized_pnl,
+    build_completed_trades,
+)
+from services.portfolio.trades.trades_snapshot import TradesSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+TIMEZONE = pytz.timezone(settings.TIMEZONE)
+
+
+class _SymbolBook:
+    """Running cycle state for one symbol."""
+
+    __slots__ = ("fills", "net", "cycle", "entries", "completed")
+
+    def __init__(self) -> None:
+        self.fills: List[Fill] = []       # time-ordered
+        self.net = 0
+        self.cycle: List[Fill] = []       # fills of the open cycle
+        self.entries = 0
+        self.completed: List[dict] = []   # this symbol's closed cycles
+
+    def step(self, symbol: str, fill: Fill) -> Optional[dict]:
+        """Fold one in-order fill in. Returns the cycle row if it closed one."""
+        self.fills.append(fill)
+        signed = _signed_qty(fill.action, fill.quantity)
+        if signed == 0:
+            return None
+        if self.net == 0:
+            self.entries += 1
+        self.cycle.append(fill)
+        self.net += signed
+        if self.net != 0:
+            return None
+        row = _cycle_row(symbol, self.cycle)
+        self.cycle = []
+        self.completed.append(row)
+        return row
+
+
+class TradesEngine:
+    """
+    Today's fills, folded incrementally.
+
+    Public surface:
+      - set_ledger(ledger)  : persist new fills to the executions table
+      - add_listener(cb)    : cb() after every batch of new fills
+      - bind(ib)            : seed from ib.fills() and subscribe to fills
+      - is_bound_to(ib)     : build_today_snapshot only trusts its own IB
+      - ingest(fills)       : fold fills in (deduped on execId)
+      - hydrate(fills)      : ingest already-persisted fills (no write-back)
+      - snapshot()          : immutable TradesSnapshot, cached per version
+      - version / loss_streak / realized_pnl
+    """
+
+    def __init__(self) -> None:
+        self._ib: Optional[IB] = None
+        self._day: Optional[date] = None
+        self._books: Dict[str, _SymbolBook] = {}
+        self._fills: List[Fill] = []
+        self._completed: List[dict] = []          # sorted by exit_time
+        self._seen: Set[str] = set()
+        self._ib_fills_seen = 0                    # len(ib.wrapper.fills) reconciled
+        self.version = 0
+        self.loss_streak = 0
+        self.realized_pnl = 0.0
+        self._snapshot: Optional[TradesSnapshot] = None
+        self._snapshot_version = -1
+        self._ledger = None
+        self._listeners: List[Callable[[], None]] = []
+
+    # ------------------------------------------------------------------
+    # Wiring
+    # ------------------------------------------------------------------
+    def set_ledger(self, ledger) -> None:
+        self._ledger = ledger
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        self._listeners.append(callback)
+
+    def bind(self, ib: IB) -> None:
+        """Seed from the fills ib_async synced at connect, then follow
+        execDetailsEvent. No IB round trip."""
+        self._ib = ib
+        self._reconcile()
+        ib.execDetailsEvent += self._on_exec
+        logger.info(
+            "TradesEngine bound: %d fill(s) today, %d completed trade(s)",
+            len(self._fills), len(self._completed),
+        )
+
+    def is_bound_to(self, ib) -> bool:
+        return self._ib is not None and self._ib is ib
+
+    def _on_exec(self, _trade, ib_fill) -> None:
+        try:
+            self.ingest([_to_fill(ib_fill, TIMEZONE)])
+            # Fills for orders this client doesn't know never reach the
+            # event; sweep them up while we're here.
+            self._reconcile()
+        except Exception:
+            logger.exception("TradesEngine execDetailsEvent handler failed")
+
+    def _reconcile(self) -> None:
+        """Fold in any fill ib_async stored that we haven't seen yet.
+        O(1) when nothing is new (length check on IB's execId dict)."""
+        if self._ib is None:
+            return
+        store = self._ib.wrapper.fills
+        if len(store) == self._ib_fills_seen:
+            return
+        new = itertools.islice(store.values(), self._ib_fills_seen, None)
+        self._ib_fills_seen = len(store)
+        self.ingest(_to_fill(f, TIMEZONE) for f in new if f.execution)
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+    def _roll_day(self, today: date) -> None:
+        if self._day == today:
+            return
+        if self._day is not None:
+            logger.info("TradesEngine day rollover %s -> %s", self._day, today)
+        self._day = today
+        self._books.clear()
+        self._fills.clear()
+        self._completed.clear()
+        self._seen.clear()
+        self.loss_streak = 0
+        self.realized_pnl = 0.0
+        self.version += 1
+
+    def hydrate(self, fills: Iterable[Fill]) -> int:
+        """Fold in fills loaded from the ledger without writing them back."""
+        return self.ingest(fills, persist=False)
+
+    def ingest(self, fills: Iterable[Fill], persist: bool = True) -> int:
+        """Fold fills in. Duplicates (same execId) and other days' fills
+        are ignored. New fills are queued to the ledger unless `persist`
+        is False. Returns how many were new."""
+        self._roll_day(datetime.now(TIMEZONE).date())
+        new: List[Fill] = []
+        for fill in fills:
+            sym = (fill.symbol or "").upper()
+            if not sym or fill.time.astimezone(TIMEZONE).date() != self._day:
+                continue
+            if fill.execid:
+                if fill.execid in self._seen:
+                    continue
+                self._seen.add(fill.execid)
+            self._add(sym, fill)
+            new.append(fill)
+        if new:
+            self.version += 1
+            if persist and self._ledger is not None:
+                self._ledger.enqueue(new)
+            for callback in self._listeners:
+                try:
+                    callback()
+                except Exception:
+                    logger.exception("TradesEngine listener failed")
+        return len(new)
+
+    def _add(self, sym: str, fill: Fill) -> None:
+        self._fills.append(fill)
+        book = self._books.get(sym)
+        if book is None:
+            book = self._books[sym] = _SymbolBook()
+
+        if book.fills and fill.time < book.fills[-1].time:
+            self._rebuild_symbol(sym, book, fill)
+            return
+
+        row = book.step(sym, fill)
+        if row is not None:
+            self._add_completed(row)
+
+    def _add_completed(self, row: dict) -> None:
+        if self._completed and row["exit_time"] < self._completed[-1]["exit_time"]:
+            bisect.insort_right(self._completed, row, key=lambda t: t["exit_time"])
+            self._recount()
+            return
+        self._completed.append(row)
+        self.realized_pnl += row["pnl"]
+        self.loss_streak = self.loss_streak + 1 if row["is_loss"] else 0
+
+    def _rebuild_symbol(self, sym: str, book: _SymbolBook, fill: Fill) -> None:
+        """Out-of-order fill: replay this symbol's book in time order."""
+        ordered = sorted(book.fills + [fill], key=lambda x: x.time)
+        stale = {id(r) for r in book.completed}
+        self._completed = [r for r in self._completed if id(r) not in stale]
+        fresh = _SymbolBook()
+        for f in ordered:
+            fresh.step(sym, f)
+        self._books[sym] = fresh
+        self._completed.extend(fresh.completed)
+        self._completed.sort(key=lambda t: t["exit_time"])
+        self._recount()
+
+    def _recount(self) -> None:
+        self.realized_pnl = sum(t["pnl"] for t in self._completed)
+        streak = 0
+        for t in reversed(self._completed):
+            if not t["is_loss"]:
+                break
+            streak += 1
+        self.loss_streak = streak
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+    def snapshot(self) -> TradesSnapshot:
+        """Immutable view of today, rebuilt only when a fill has landed
+        since the last call."""
+        self._reconcile()
+        self._roll_day(datetime.now(TIMEZONE).date())
+        if self._snapshot is not None and self._snapshot_version == self.version:
+            return self._snapshot
+
+        completed = list(self._completed)
+        realized, realized_by_symbol = aggregate_realized_pnl(completed)
+        snap = TradesSnapshot(
+            today_fills=list(self._fills),
+            fills_by_symbol={s: list(b.fills) for s, b in self._books.items()},
+            completed_trades=completed,
+            entry_counts={s: b.entries for s, b in self._books.items() if b.entries},
+            realized_pnl_by_symbol=realized_by_symbol,
+            realized_pnl=realized,
+        )
+        self._snapshot = snap
+        self._snapshot_version = self.version
+        return snap
+
+    def check_consistency(self) -> bool:
+        """Debug aid: compare against the batch trade_builder path."""
+        expected = build_completed_trades(
+            {s: sorted(b.fills, key=lambda x: x.time) for s, b in self._books.items()}
+        )
+        return expected == self._completed
+
+
+# Module-level singleton -- bound to app.state.ib at startup; read through
+# trades_snapshot.build_today_snapshot.
+trades_engine = TradesEngine()
@@ -13,7 +13,13 @@ view.
 
 Public surface:
     TradesSnapshot          - immutable view of today's fills + derived data
-    build_today_snapshot()  - call IB once and build a snapshot
+    build_today_snapshot()  - today's snapshot (engine, else one IB call)
+    set_trades_engine()     - route build_today_snapshot to the live engine
+
+In production the incremental TradesEngine (trades_engine) is registered
+at startup and build_today_snapshot just returns its current view -- no
+TTL, no IB round trip. The TTL'd fetch path below remains for scripts
+and any client not on the engine's IB connection.
 """
 
 from __future__ import annotations
@@ -195,6 +201,17 @@ def _count_entries_per_symbol(fills_by_symbol: dict[str, list[Fill]]) -> dict[st
 _snapshot_cache: dict[int, tuple["TradesSnapshot", float]] = {}
 _snapshot_in_flight: dict[int, asyncio.Future] = {}
 
+# Incremental engine registered at startup (see trades_engine). Typed
+# loosely to avoid an import cycle -- the engine module builds
+# TradesSnapshot instances from this one.
+_engine = None
+
+
+def set_trades_engine(engine) -> None:
+    """Serve build_today_snapshot from `engine` for clients on its IB."""
+    global _engine
+    _engine = engine
+
 
 def _cache_key(client: IbClient) -> int:
     return id(getattr(client, "ib", client))
@@ -210,10 +227,16 @@ def invalidate_snapshot_cache(client: IbClient | None = None) -> None:
 
 async def build_today_snapshot(client: IbClient) -> TradesSnapshot:
     """
-    Build today's snapshot, cached for SNAPSHOT_TTL_SECONDS. Concurrent
-    callers with a cache miss share one in-flight IB fetch (single-flight),
-    so a Trade Manager page load's fanout collapses to one round trip.
+    Today's snapshot. With the incremental engine bound to this client's
+    IB connection, it's the engine's current view (every fill already
+    folded in). Otherwise: cached for SNAPSHOT_TTL_SECONDS, and
+    concurrent callers with a cache miss share one in-flight IB fetch
+    (single-flight), so a Trade Manager page load's fanout collapses to
+    one round trip.
     """
+    if _engine is not None and _engine.is_bound_to(getattr(client, "ib", None)):
+        return _engine.snapshot()
+
     key = _cache_key(client)
     cached = _snapshot_cache.get(key)
     if cached is not None and _time.monotonic() < cached[1]:
@@ -0,0 +1,290 @@
+"""
+Process-wide streaming quote board.
+
+IbClient.get_bid_ask_price used to open a reqMktData line, wait for the
+first bid/ask tick (100 ms .. 2 s), then cancel it -- on every manual
+entry, add, approval Accept and every pending-order row. The board keeps
+one streaming line per symbol instead:
+
+  - ref-counted: acquire()/release() pairs share one IB subscription;
+  - single-flight: concurrent first requests for a symbol wait on the
+    same subscribe, never open a second line;
+  - idle TTL: when the last holder releases, the line lingers for
+    settings.QUOTE_IDLE_TTL_SECONDS so the next quote for a recently used symbol
+    is a dict lookup, then it is cancelled to free the IB data line;
+  - freshness: every quote carries `ts` (epoch seconds of the last
+    bid/ask tick) and get_quote(max_age=...) rejects stale ones; the
+    order flows pass settings.QUOTE_MAX_AGE_SECONDS.
+
+Bound to the IB connection at startup via core.startup.quote_board_setup;
+callers use the module-level `quote_board` singleton.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from ib_async import IB, Ticker
+
+from core.config import settings
+from services.contracts import contract_registry
+from services.orders import BidAsk
+
+logger = logging.getLogger(__name__)
+
+
+# Default for how long a line with no holders stays subscribed before it
+# is cancelled; the singleton uses settings.QUOTE_IDLE_TTL_SECONDS.
+QUOTE_IDLE_TTL_SECONDS = 30.0
+
+# How long get_quote waits for the first usable bid/ask on a fresh line.
+QUOTE_WAIT_SECONDS = 2.0
+
+
+def _usable(bid, ask) -> bool:
+    return bid is not None and ask is not None and bid > 0 and ask > 0
+
+
+class _Line:
+    """One streaming reqMktData subscription and its holders."""
+
+    __slots__ = ("symbol", "refs", "ticker", "ready", "idle_handle",
+                 "bid", "ask", "ts", "waiters")
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.refs = 0
+        self.ticker: Optional[Ticker] = None
+        self.ready: Optional[asyncio.Task] = None
+        self.idle_handle: Optional[asyncio.TimerHandle] = None
+        self.bid: Optional[float] = None
+        self.ask: Optional[float] = None
+        self.ts: float = 0.0
+        # Futures resolved on the next usable bid/ask tick.
+        self.waiters: List[asyncio.Future] = []
+
+    def quote(self) -> Optional[BidAsk]:
+        if not _usable(self.bid, self.ask):
+            return None
+        return BidAsk(symbol=self.symbol, bid=self.bid, ask=self.ask, ts=self.ts)
+
+
+class QuoteBoard:
+    """
+    Shared streaming quotes, one IB line per symbol.
+
+    Public surface:
+      - bind(ib) / close()          : lifecycle
+      - is_bound_to(ib)             : IbClient uses the board only for its own IB
+      - acquire(symbol) / release(symbol, linger)
+                                    : hold a line open (streaming consumers)
+      - get_quote(symbol, max_age)  : one BidAsk, served from the live line
+      - peek(symbol)                : cache-only read, never subscribes
+    """
+
+    def __init__(self, idle_ttl: float = QUOTE_IDLE_TTL_SECONDS) -> None:
+        self.idle_ttl = idle_ttl
+        self._ib: Optional[IB] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lines: Dict[str, _Line] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def bind(self, ib: IB, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self._ib = ib
+        self._loop = loop or asyncio.get_running_loop()
+
+    def is_bound_to(self, ib: IB) -> bool:
+        return self._ib is not None and self._ib is ib
+
+    def close(self) -> None:
+        """Cancel every line. Called on shutdown while IB is still up."""
+        for line in list(self._lines.values()):
+            self._drop(line)
+        self._lines.clear()
+
+    # ------------------------------------------------------------------
+    # Subscription management
+    # ------------------------------------------------------------------
+    async def acquire(self, symbol: str) -> Ticker:
+        """
+        Hold the line for `symbol` open and return its Ticker. Every
+        acquire must be paired with a release. The first acquire per
+        symbol subscribes; concurrent ones share that subscribe.
+        """
+        if self._ib is None:
+            raise RuntimeError("QuoteBoard is not bound to an IB connection")
+
+        sym = symbol.strip().upper()
+        line = self._lines.get(sym)
+        if line is None:
+            line = _Line(sym)
+            self._lines[sym] = line
+            line.ready = self._loop.create_task(self._open(line))
+
+        line.refs += 1
+        if line.idle_handle is not None:
+            line.idle_handle.cancel()
+            line.idle_handle = None
+
+        try:
+            # Shield: one caller being cancelled must not abort the
+            # subscribe the others are waiting on.
+            await asyncio.shield(line.ready)
+        except BaseException:
+            line.refs -= 1
+            if line.ready.done() and line.ready.exception() is not None:
+                # Failed subscribe -- forget the line so the next caller
+                # retries instead of inheriting the error.
+                if self._lines.get(sym) is line:
+                    self._lines.pop(sym, None)
+            elif line.refs == 0:
+                self._schedule_idle(line)
+            raise
+        return line.ticker
+
+    def release(self, symbol: str, linger: bool = True) -> None:
+        """Drop one hold. The line lingers idle_ttl before cancelling, or
+        is cancelled right away with linger=False (a caller working to a
+        line budget, e.g. the live scanner evicting a symbol)."""
+        line = self._lines.get(symbol.strip().upper())
+        if line is None or line.refs <= 0:
+            return
+        line.refs -= 1
+        if line.refs == 0:
+            if linger:
+                self._schedule_idle(line)
+            else:
+                self._expire(line)
+
+    async def _open(self, line: _Line) -> None:
+        contract = await contract_registry.resolve(self._ib, line.symbol, "STK")
+        # genericTickList "" is enough for bid/ask/last; streaming so the
+        # line stays current for as long as it is held.
+        ticker = self._ib.reqMktData(contract, "", False, False)
+        line.ticker = ticker
+        ticker.updateEvent += lambda t, ln=line: self._on_tick(ln, t)
+        # The ticker may already carry a quote if another consumer holds
+        # the same contract.
+        self._on_tick(line, ticker)
+        logger.debug("QuoteBoard subscribed %s", line.symbol)
+
+    def _on_tick(self, line: _Line, ticker: Ticker) -> None:
+        bid, ask = ticker.bid, ticker.ask
+        if not _usable(bid, ask):
+            return
+        line.bid, line.ask = bid, ask
+        line.ts = time.time()
+        if line.waiters:
+            waiters, line.waiters = line.waiters, []
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(None)
+
+    def _schedule_idle(self, line: _Line) -> None:
+        if self._loop is None:
+            return
+        if line.idle_handle is not None:
+            line.idle_handle.cancel()
+        line.idle_handle = self._loop.call_later(self.idle_ttl, self._expire, line)
+
+    def _expire(self, line: _Line) -> None:
+        line.idle_handle = None
+        if line.refs > 0 or self._lines.get(line.symbol) is not line:
+            return
+        if line.ready is not None and not line.ready.done():
+            # Subscribe still in flight; check again once it has landed.
+            self._schedule_idle(line)
+            return
+        self._lines.pop(line.symbol, None)
+        self._drop(line)
+
+    def _drop(self, line: _Line) -> None:
+        if line.idle_handle is not None:
+            line.idle_handle.cancel()
+            line.idle_handle = None
+        for fut in line.waiters:
+            if not fut.done():
+                fut.cancel()
+        line.waiters = []
+        if line.ticker is not None and self._ib is not None:
+            try:
+                self._ib.cancelMktData(line.ticker.contract)
+            except Exception:
+                logger.exception("QuoteBoard failed to cancel %s", line.symbol)
+        logger.debug("QuoteBoard released %s", line.symbol)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def peek(self, symbol: str) -> Optional[BidAsk]:
+        line = self._lines.get(symbol.strip().upper())
+        return line.quote() if line is not None else None
+
+    async def get_quote(
+        self,
+        symbol: str,
+        max_age: Optional[float] = None,
+        timeout: float = QUOTE_WAIT_SECONDS,
+    ) -> BidAsk:
+        """
+        Current bid/ask for `symbol`. Served straight from the live line
+        when it already has a usable quote no older than `max_age`
+        seconds; otherwise waits up to `timeout` for the next tick.
+
+        Raises ValueError when no usable (or fresh enough) quote arrives,
+        matching the old one-shot get_bid_ask_price contract.
+        """
+        sym = symbol.strip().upper()
+        await self.acquire(sym)
+        try:
+            line = self._lines[sym]
+            quote = line.quote()
+            if quote is not None and not self._stale(quote, max_age):
+                return quote
+
+            fut = self._loop.create_future()
+            line.waiters.append(fut)
+            try:
+                await asyncio.wait_for(fut, timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            quote = line.quote()
+            if quote is None:
+                raise ValueError(
+                    f"No usable bid/ask for {sym}: bid={line.bid} ask={line.ask}"
+                    f" (no live quote within {timeout:g}s)"
+                )
+            if self._stale(quote, max_age):
+                raise ValueError(
+                    f"Stale quote for {sym}: last tick "
+                    f"{time.time() - quote.ts:.1f}s ago (max_age={max_age:g}s)"
+                )
+            return quote
+        finally:
+            self.release(sym)
+
+    @staticmethod
+    def _stale(quote: BidAsk, max_age: Optional[float]) -> bool:
+        return max_age is not None and time.time() - quote.ts > max_age
+
+    def stats(self) -> Dict[str, Dict]:
+        now = time.time()
+        return {
+            sym: {
+                "refs": line.refs,
+                "bid": line.bid,
+                "ask": line.ask,
+                "age": round(now - line.ts, 3) if line.ts else None,
+            }
+            for sym, line in self._lines.items()
+        }
+
+
+# Module-level singleton -- one board per process, bound to app.state.ib
+# at startup.
+quote_board = QuoteBoard(idle_ttl=settings.QUOTE_IDLE_TTL_SECONDS)
@@ -0,0 +1,191 @@
+"""
+Multiplexed realtime stream: every browser topic over one connection.
+
+The UI used to hold one EventSource per feed (order status, open risk,
+pending approvals, lockout, streamer status, alarms, live scanner). Under
+HTTP/1.1 that is most of the browser's six connections per host, and
+ordinary fetches queue behind them. GET /api/stream carries all of them:
+
+  - the client names the topics it wants (`?topics=orders,openrisk`);
+  - the connection opens with a `hello` frame carrying its id;
+  - each topic's frames are tagged `event: <topic>` -- the same payloads
+    the per-feed endpoints send, snapshot first -- and carry that topic's
+    broker event id;
+  - `?resume=<topic>=<id>,...` (the last id the client saw per topic)
+    replays just the missed messages for every topic the broker's replay
+    ring still covers; the rest start from a snapshot;
+  - one shared keepalive (`data: {"type": "ping"}`) every 15s;
+  - POST /api/stream/{cid} adds / drops topics on the live connection and
+    resyncs individual topics (fresh snapshot for that topic only, e.g.
+    after an open-risk seq gap) without touching the others.
+
+Per topic the connection runs one pump task: subscribe on the broker
+(resuming when it can), send the topic's snapshot if it didn't, then
+relay envelopes (`Envelope.tagged`, so the frame is still encoded once
+for every client). A pump whose subscription the broker closes (slow
+consumer on a lossless topic) resubscribes from the last id it relayed
+-- a replay when the ring allows, else a snapshot of just that topic.
+Any other failure (a snapshot or broker call raising) sends a
+`topic_error` frame for that topic and retries with a fresh subscription
+and snapshot, backing off from PUMP_RETRY_SECONDS up to
+PUMP_RETRY_MAX_SECONDS, so one bad feed neither dies silently nor takes
+the connection's other topics down.
+Pumps feed a small shared queue; when the client is slow the backlog
+stays in the broker subscriptions, where each topic's conflate /
+lossless policy applies.
+
+Wired at startup via core.startup.realtime_setup.wire_realtime.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
+
+from helpers.broker import Subscription, SubscriptionClosed, sse_frame
+
+logger = logging.getLogger(__name__)
+
+
+# Frames buffered between the topic pumps and the HTTP response.
+OUT_QUEUE_SIZE = 16
+
+# A pump that fails (snapshot or broker error) reports it and retries
+# with a fresh subscription + snapshot, backing off between attempts.
+PUMP_RETRY_SECONDS = 1.0
+PUMP_RETRY_MAX_SECONDS = 30.0
+
+# Event name of a pump failure frame. Not `error`: EventSource routes that
+# name to its onerror handler, which the client treats as a dropped
+# connection.
+TOPIC_ERROR_EVENT = "topic_error"
+
+
+@dataclass(frozen=True)
+class TopicSource:
+    """How to join one topic: subscribe / unsubscribe through the owning
+    hub (so hub-side bookkeeping like OpenRiskHub's warm cache still
+    runs) and the snapshot payloads a new subscriber starts from."""
+    subscribe: Callable[[Optional[str]], Awaitable[Subscription]]
+    unsubscribe: Callable[[Subscription], Awaitable[None]]
+    snapshot: Callable[[], Awaitable[List[Any]]]
+
+
+class RealtimeConnection:
+    """One multiplexed client connection."""
+
+    def __init__(self, mux: "RealtimeMux") -> None:
+        self.cid = uuid.uuid4().hex
+        self._mux = mux
+        self._out: asyncio.Queue[bytes] = asyncio.Queue(maxsize=OUT_QUEUE_SIZE)
+        self._pumps: Dict[str, asyncio.Task] = {}
+
+    @property
+    def topics(self) -> List[str]:
+        return sorted(self._pumps)
+
+    def add(self, topics: Iterable[str], resume: Optional[Mapping[str, str]] = None) -> None:
+        resume = resume or {}
+        for name in topics:
+            if name not in self._pumps:
+                self._pumps[name] = asyncio.create_task(self._pump(name, resume.get(name)))
+
+    async def drop(self, topics: Iterable[str]) -> None:
+        tasks = [self._pumps.pop(name) for name in topics if name in self._pumps]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def resync(self, topics: Iterable[str]) -> None:
+        """Restart the given topics: fresh subscription + snapshot."""
+        names = [name for name in topics if name in self._pumps]
+        await self.drop(names)
+        self.add(names)
+
+    async def close(self) -> None:
+        await self.drop(list(self._pumps))
+
+    async def next_frame(self) -> bytes:
+        return await self._out.get()
+
+    async def _pump(self, name: str, last_id: Optional[str]) -> None:
+        source = self._mux.sources[name]
+        delay = PUMP_RETRY_SECONDS
+        while True:
+            sub: Optional[Subscription] = None
+            try:
+                sub = await source.subscribe(last_id)
+                if not sub.resumed:
+                    msgs = await source.snapshot()
+                    last_id = sub.snapshot_cursor()
+                    for msg in msgs:
+                        await self._out.put(sse_frame(msg, event=name, event_id=last_id))
+                delay = PUMP_RETRY_SECONDS
+                while True:
+                    env = await sub.get_envelope()
+                    last_id = env.event_id
+                    await self._out.put(env.tagged)
+            except SubscriptionClosed:
+                logger.info("Realtime %s: %s fell behind, resyncing", self.cid[:8], name)
+                continue
+            except Exception as e:
+                logger.exception(
+                    "Realtime %s: %s pump failed, retrying in %.1fs",
+                    self.cid[:8], name, delay,
+                )
+                error = {"type": "error", "topic": name, "detail": str(e) or type(e).__name__}
+                await self._out.put(sse_frame(error, event=TOPIC_ERROR_EVENT))
+            finally:
+                if sub is not None:
+                    await source.unsubscribe(sub)
+            # Whatever the client held for this topic may be stale now --
+            # start over from a snapshot.
+            last_id = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PUMP_RETRY_MAX_SECONDS)
+
+
+class RealtimeMux:
+    """
+    Public surface:
+      - sources                 : topic name -> TopicSource
+      - open(topics, resume)    : new connection, pumps started
+      - get(cid) / close(conn)  : lookup for the control endpoint / teardown
+    """
+
+    def __init__(self, sources: Dict[str, TopicSource]) -> None:
+        self.sources = sources
+        self._connections: Dict[str, RealtimeConnection] = {}
+
+    def unknown(self, topics: Iterable[str]) -> List[str]:
+        return [t for t in topics if t not in self.sources]
+
+    def open(
+        self, topics: Iterable[str], resume: Optional[Mapping[str, str]] = None,
+    ) -> RealtimeConnection:
+        conn = RealtimeConnection(self)
+        self._connections[conn.cid] = conn
+        conn.add(topics, resume)
+        logger.info(
+            "Realtime client connected %s topics=%s (n=%d)",
+            conn.cid[:8], conn.topics, len(self._connections),
+        )
+        return conn
+
+    def get(self, cid: str) -> RealtimeConnection | None:
+        return self._connections.get(cid)
+
+    async def close(self, conn: RealtimeConnection) -> None:
+        self._connections.pop(conn.cid, None)
+        await conn.close()
+        logger.info(
+            "Realtime client disconnected %s (n=%d)", conn.cid[:8], len(self._connections)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._connections),
+            "topics": sorted(self.sources),
+        }
@@ -1,293 +1,55 @@
 from helpers.scanner_presets import SCANNER_PRESETS
 from schemas.api_schemas import ScannerResponse
-from ib_async import IB,ScannerSubscription,ScanData,Contract,Stock
-from typing import List,Dict,DefaultDict,Tuple
-from collections import defaultdict
+from ib_async import IB,ScannerSubscription,ScanData,Contract
+from typing import Any,AsyncIterator,List,Dict,Tuple
 import asyncio
 import pandas as pd
 
 import logging
 import numpy as np
+
+from services.bar_store import bar_store
+from services.contracts import contract_registry
+from services.volume_profiles import VolumeProfiles, session_position, volume_profiles
+
 logger = logging.getLogger(__name__)
 
 
-from dataclasses import dataclass
 from datetime import datetime,time
 from typing import Optional
 from zoneinfo import ZoneInfo
 
-@dataclass
-class IncomingBar:
-    date: datetime
-    open: float
-    high: float
-    low: float
-    close: float
-    volume: float
-    average: Optional[float] = None
-    barCount: Optional[int] = None
-
-def handle_incoming_bars_intraday(bars: List[IncomingBar], symbol: str, time_zone: str = "Europe/Helsinki") -> List[dict]:
-
-    tz = ZoneInfo(time_zone)
-    
-    return [
-        {
-            "symbol": symbol,
-            "date": bar.date.astimezone(tz).date().isoformat(),
-            "time": bar.date.astimezone(tz).time().isoformat(),
-            "open": bar.open,
-            "high": bar.high,
-            "low": bar.low,
-            "close": bar.close,
-            "volume": bar.volume
-        }
-        for bar in bars
-    ]
-
-# Tällä haetaan ankkurihinta changen laskemiselle kun markkina ei vielä ole auki
-def get_yesterday_anchorprice(past_bars) -> List[Dict[str, str]]:
-    result = []
-
-    # Iterate through each symbol in past5days
-    for symbol, bars in past_bars.items():
-        # Filter out bars where Time is '23:00:00'
-        relevant_bars = [bar for bar in bars if bar.get('time') == '22:58:00']
-        
-        if relevant_bars:
-            # Find the most recent date by comparing the Date values
-            most_recent_bar = max(relevant_bars, key=lambda b: datetime.strptime(b['date'], '%Y-%m-%d').date())
-
-            result.append({
-                'symbol': most_recent_bar.get('symbol'),
-                'date': most_recent_bar.get('date'),
-                'time': most_recent_bar.get('time'),
-                'anchorprice': most_recent_bar.get('close')
-            })
-
-    return result
-
-def get_today_anchorprice(today_bars) -> List[Dict[str, str]]:
-    result = []
-
-    # Iterate through each symbol in today's bars
-    for symbol, bars in today_bars.items():
-        # Filter bars where Time is '16:30:00' and Date is today
-        relevant_bars = [bar for bar in bars if bar.get('time') == '11:00:00']
-        
-        if relevant_bars:
-            # Since we are filtering by '16:30:00', we can just take the first (or only) bar
-            most_recent_bar = relevant_bars[0]
-
-            result.append({
-                'symbol': most_recent_bar.get('symbol'),
-                'date': most_recent_bar.get('date'),
-                'time': most_recent_bar.get('time'),
-                'anchorprice': most_recent_bar.get('open')
-            })
-
-    return result
-
-
-# Calculations
-
-def calculate_percentage_change(rvol_df: pd.DataFrame, close_prices_df: pd.DataFrame) -> pd.DataFrame:
-
-    # Merge the rvol_df with the close_prices_df based on 'Symbol'
-    merged_df = pd.merge(rvol_df, close_prices_df, on='symbol', how='left')
-
-    # Rename columns to remove the '_x' suffix and use the correct names
-    merged_df.rename(columns={
-        'date_x': 'date',    # Rename 'Date_x' to 'Date'
-        'time_x': 'time',    # Rename 'Time_x' to 'Time'
-        'close_x': 'close'   # Rename 'Close_x' to 'Close'
-    }, inplace=True)
-
-    # Calculate the percentage change in close prices
-    merged_df['change'] = ((merged_df['close'] - merged_df['anchorprice']) / merged_df['anchorprice']) * 100
-
-    # Round the percentage change to 2 decimal places
-    merged_df['change'] = merged_df['change'].round(2)
-
-    return merged_df
-
-def calculate_avg_volume_model(past_bars: Dict[str, List[dict]]) -> List[dict]:
-
-    # Flatten grouped bars
-    all_data = []
-    for bars in past_bars.values():
-        all_data.extend(bars)
-
-    df = pd.DataFrame(all_data)
-
-    # Compute average volume per symbol per time
-    avg_volume_df = (
-        df.groupby(['symbol', 'time'], as_index=False)['volume']
-        .mean()
-        .rename(columns={'volume': 'avgvolume'})
-    )
-
-    avg_volume_df['avgvolume'] = avg_volume_df['avgvolume'].round(2)
-
-    # Convert back to bars
-    avg_volume_bars = avg_volume_df.to_dict(orient="records")
-
-    return avg_volume_bars
-
-def calculate_rvol(today_df: pd.DataFrame, avg_volume_df: pd.DataFrame) -> pd.DataFrame:
-
-    # Merge today's bars with historical average volume
-    df = today_df.merge(avg_volume_df, on=['symbol', 'time'], how='left')
-
-    # Prepare empty list for processed data
-    processed_list = []
-
-    # Calculate cumulative sums and Rvol per symbol
-    for symbol, group in df.groupby('symbol', sort=False):
-        group = group.sort_values('time').copy()  # ensure proper time order
-        group['cumvolume'] = group['volume'].cumsum()
-        group['cumavgvolume'] = group['avgvolume'].cumsum()
-        group['rvol'] = np.where(
-            (group['cumavgvolume'] == 0) | group['cumavgvolume'].isna(),
-            0.0,
-            group['cumvolume'] / group['cumavgvolume']
-        )
-        group['rvol'] = group['rvol'].round(2)
-        processed_list.append(group)
-
-    # Combine all symbols back
-    result_df = pd.concat(processed_list, ignore_index=True)
-    return result_df
-
 # IB data fetch
 
 async def fetch_intraday_data(ib: IB, symbol: str):
 
     logger.info(f"Requesting 5days intraday data for {symbol}")
 
-    # Create contract inline
-    contract = Stock(symbol, "SMART", "USD")
-    
-    # Qualify the contract (blocking is usually fine once)
-    await ib.qualifyContractsAsync(contract)
-
-    # Async historical request
-    bars = await ib.reqHistoricalDataAsync(
-        contract,
-        endDateTime="",
-        durationStr="5 D",
-        barSizeSetting="2 mins",
-        whatToShow="TRADES",
-        useRTH=False
-    )
-    await asyncio.sleep(2)
+    # Served from the bar store; IB is only asked for bars newer than
+    # what it already holds (the full 5 days on a symbol's first scan).
+    bars = await bar_store.get_bars(ib, symbol, bar_size="2 mins", days=5)
 
     if not bars:
         logger.warning(f"No 5-day historical data returned for {symbol}")
         return None
-    
-    processed_bars = handle_incoming_bars_intraday(bars,symbol)
-
-    return processed_bars
-
-
-# Data pipeline
-def group_dataset_by_symbol(dataset: List[dict]) -> DefaultDict[str, list]:
 
-    symbol_groups: DefaultDict[str, list] = defaultdict(list)
+    # Columns (BarColumns); compute_datapipeline concatenates them.
+    return bars
 
-    for row in dataset:
-        symbol_groups[row["symbol"]].extend(row.get("intraday_bars") or [])
 
-    return symbol_groups
-
-def split_symbol_groups(symbol_groups: DefaultDict[str, list]) -> Tuple[DefaultDict[str, list], DefaultDict[str, list]]:
-    
-    today_str = datetime.today().strftime("%Y-%m-%d")
-
-    today_bars: DefaultDict[str, list] = defaultdict(list)
-    past_bars: DefaultDict[str, list] = defaultdict(list)
-
-    for symbol, bars in symbol_groups.items():
-        # Sort bars by date and time
-        bars_sorted = sorted(bars, key=lambda b: (b.get("date"), b.get("time")))
-
-        # Split today's vs historical
-        for bar in bars_sorted:
-            if bar.get("date") == today_str:
-                today_bars[symbol].append(bar)
-            else:
-                past_bars[symbol].append(bar)
-
-    return today_bars, past_bars
-
-def filter_bars_by_time(today_bars: DefaultDict[str, list]) -> DefaultDict[str, list]:
-    
-    cutoff_time: str = "11:00:00"
-    
-    filtered_bars: DefaultDict[str, list] = defaultdict(list)
-
-    for symbol, bars in today_bars.items():
-        for bar in bars:
-            if bar.get("time") >= cutoff_time:
-                filtered_bars[symbol].append(bar)
+# end of datapipeline
 
-    return filtered_bars
+def scan_dataset(scan_data: List[ScanData]) -> List[dict]:
+    """One row per scan result: rank, symbol, conId (as a string)."""
 
-def filter_avgvolume_list(bars: List[Dict]) -> List[Dict]:
-    
-    cutoff_time = "11:00:00"
+    # Scan results carry fully qualified contracts -- teach the registry
+    # so the bar fetch never re-qualifies them.
+    for item in scan_data:
+        contract_registry.remember(item.contractDetails.contract)
+    # Scanner hits join the nightly volume-profile build.
+    volume_profiles.note_hits(item.contractDetails.contract.symbol for item in scan_data)
 
     return [
-        bar
-        for bar in bars
-        if bar.get("time") >= cutoff_time
-    ]
-
-def bars_to_dataframe(today_bars: DefaultDict[str, list]) -> pd.DataFrame:
-    """Flatten symbol->bars dictionary into a pandas DataFrame."""
-    
-    all_bars = [
-        bar
-        for bars in today_bars.values()
-        for bar in bars
-    ]
-
-    return pd.DataFrame(all_bars)
-
-def return_last_row_per_symbol(df: pd.DataFrame) -> List[ScannerResponse]:
-
-    if df.empty:
-        return []
-
-    # Group by 'symbol' and take the last row for each group
-    last_rows = df.groupby('symbol', as_index=False).last()
-
-    # Convert each row to a ScannerResponse instance
-    responses = [
-        ScannerResponse(
-            symbol=row['symbol'],
-            date=row['date'],
-            time=row['time'],
-            open=row['open'],
-            high=row['high'],
-            low=row['low'],
-            close=row['close'],
-            volume=int(row['volume']),
-            rvol=float(row['rvol']),
-            change=float(row['change'])
-        )
-        for _, row in last_rows.iterrows()
-    ]
-
-    return responses
-
-# end of datapipeline
-
-async def scan_datapipeline(scan_data: List[ScanData], ib: IB) -> List[dict]:
-
-    # Step 1 & 2: Build dataset and fetch intraday bars concurrently
-    dataset = [
         {
             "rank": item.rank,
             "symbol": item.contractDetails.contract.symbol,
@@ -296,87 +58,217 @@ async def scan_datapipeline(scan_data: List[ScanData], ib: IB) -> List[dict]:
         for item in scan_data
     ]
 
-    # Fetch all 5day intrabars concurrently
-    intraday_results = await asyncio.gather(
-        *(fetch_intraday_data(ib, row["symbol"]) for row in dataset),
-        return_exceptions=True
-    )
-
 
-    # Step 3: Merge intraday bars
-    for row, bars in zip(dataset, intraday_results):
-        symbol = row["symbol"]
-        if isinstance(bars, Exception):
-            logger.error(f"Error fetching intraday bars for {symbol}: {bars}")
-            row["intraday_bars"] = None
-        else:
-            row["intraday_bars"] = bars
+async def fetch_row_bars(ib: IB, row: dict) -> dict:
+    """Fill in row["intraday_bars"] (None if the fetch failed)."""
+    try:
+        row["intraday_bars"] = await fetch_intraday_data(ib, row["symbol"])
+    except Exception as e:
+        logger.error(f"Error fetching intraday bars for {row['symbol']}: {e}")
+        row["intraday_bars"] = None
+    return row
 
-    return dataset
 
-async def compute_datapipeline(dataset: List[dict]) -> List[ScannerResponse]:
-    
-    
-    # Step 1: Group rows by symbol
-    symbol_groups = group_dataset_by_symbol(dataset = dataset)
+async def scan_datapipeline(scan_data: List[ScanData], ib: IB) -> List[dict]:
 
-    # Step 2: Split into today and past bars
-    today_bars, past_bars = split_symbol_groups(symbol_groups)
+    # Step 1 & 2: Build dataset and fetch intraday bars concurrently
+    dataset = scan_dataset(scan_data)
 
-    # Step 3: Filter today bars to start from 11:00
-    today_bars = filter_bars_by_time(today_bars)
+    # Fetch all 5day intrabars concurrently, merged into the rows
+    await asyncio.gather(*(fetch_row_bars(ib, row) for row in dataset))
 
-    # Step 4: Calculate average volume using historical data
-    avg_volume_bars = calculate_avg_volume_model(past_bars)
+    return dataset
 
-    # Step 5: Filter avg volume bars starting from 11:00
-    avg_volume_bars = filter_avgvolume_list(avg_volume_bars)
+# Columnar pipeline
 
-    if not today_bars or not avg_volume_bars:
-        logger.warning("No data bars data coming in")
-        return [] 
+# Bars are bucketed by Helsinki wall clock, as the scanner always has.
+PIPELINE_TIME_ZONE = "Europe/Helsinki"
+TODAY_CUTOFF = np.timedelta64(11 * 3600, "s")           # 11:00, i.e. 04:00 ET
+YESTERDAY_ANCHOR_TOD = np.timedelta64(22 * 3600 + 58 * 60, "s")    # last RTH bar
+TODAY_ANCHOR_TOD = np.timedelta64(11 * 3600, "s")
+MARKET_OPEN = time(hour=16, minute=30)
+SCANNER_BAR_SECONDS = 120       # fetch_intraday_data's "2 mins" bars
 
 
-    current_time = datetime.now().time()
-    market_open = time(hour=16, minute=30)
+def bars_frame(dataset: List[dict], time_zone: str = PIPELINE_TIME_ZONE) -> pd.DataFrame:
+    """
+    Every row's intraday bars (BarColumns) as one frame: symbol
+    (categorical), day (datetime64[D], local) and tod (timedelta64, local
+    time of day), then open / high / low / close / volume. Bars keep their
+    input order. Pure array concatenation -- no per-bar Python.
+    """
+    rows = [row for row in dataset if row.get("intraday_bars") is not None and len(row["intraday_bars"])]
+    if not rows:
+        return pd.DataFrame(columns=["symbol", "day", "tod", "open", "high", "low", "close", "volume"])
+
+    def cat(field: str) -> np.ndarray:
+        return np.concatenate([getattr(row["intraday_bars"], field) for row in rows])
+
+    local = (
+        pd.DatetimeIndex(cat("t_us").astype("datetime64[us]"), tz="UTC")
+        .tz_convert(time_zone)
+        .tz_localize(None)
+        .values
+    )
+    day = local.astype("datetime64[D]")
+    # Symbol codes index the sorted symbol list, so sorting by code sorts
+    # by symbol.
+    categories = sorted({row["symbol"] for row in rows})
+    code_of = {sym: i for i, sym in enumerate(categories)}
+    codes = np.repeat(
+        np.array([code_of[row["symbol"]] for row in rows], dtype=np.int32),
+        [len(row["intraday_bars"]) for row in rows],
+    )
 
-    if current_time < market_open:
-        # before 16:30 → use yesterday's close
-        close_prices = get_yesterday_anchorprice(past_bars)
+    return pd.DataFrame({
+        "symbol": pd.Categorical.from_codes(codes, categories=categories),
+        "day": day,
+        "tod": local - day,
+        "open": cat("open"),
+        "high": cat("high"),
+        "low": cat("low"),
+        "close": cat("close"),
+        "volume": cat("volume"),
+    })
+
+
+def compute_columnar(
+    df: pd.DataFrame, now: datetime, profiles: Optional[VolumeProfiles] = None,
+) -> List[ScannerResponse]:
+    """
+    The scanner pipeline over bars_frame output, vectorized end to end:
+    today's bars from 11:00 on, RVOL against the same symbol's average
+    volume per time of day over the past days, % change against the
+    anchor price, last bar per symbol. Works on the frame's arrays --
+    pandas' per-call overhead would dominate at scanner sizes.
+
+    With `profiles`, a symbol that has a volume profile for today's
+    session gets its RVOL from that instead: today's volume over the
+    profile's expected cumulative volume at the end of its last bar.
+    """
+    code = df["symbol"].cat.codes.to_numpy().astype(np.int64)
+    categories = df["symbol"].cat.categories
+    day = df["day"].to_numpy()
+    tod = df["tod"].to_numpy().astype("timedelta64[s]").astype(np.int64)
+    volume = df["volume"].to_numpy()
+
+    is_today = day == np.datetime64(now.date(), "D")
+    late = tod >= TODAY_CUTOFF.astype(np.int64)
+    today_rows = np.flatnonzero(is_today & late)
+
+    # Average volume per (symbol, time of day) over the past days, keyed
+    # code * 86400 + seconds so both sides can be matched by searchsorted.
+    past = ~is_today & late
+    past_keys, inverse = np.unique(code[past] * 86400 + tod[past], return_inverse=True)
+    if not len(today_rows) or not len(past_keys):
+        logger.warning("No data bars data coming in")
+        return []
+    avg_volume = np.round(np.bincount(inverse, weights=volume[past]) / np.bincount(inverse), 2)
+
+    # Today's bars in (symbol, time) order, each with its average.
+    rows = today_rows[np.lexsort((tod[today_rows], code[today_rows]))]
+    c = code[rows]
+    keys = c * 86400 + tod[rows]
+    pos = np.minimum(np.searchsorted(past_keys, keys), len(past_keys) - 1)
+    has_avg = past_keys[pos] == keys
+
+    # One grouped cumulative sum: running totals over the whole sorted
+    # array, each symbol's total = its last running value minus the one
+    # before its first bar. Average volumes are 2-dp, so they run as
+    # integer cents and the totals are exact.
+    starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+    ends = np.r_[starts[1:], len(c)] - 1
+    cum_volume = np.cumsum(volume[rows])
+    cum_cents = np.cumsum(np.where(has_avg, np.rint(avg_volume[pos] * 100), 0).astype(np.int64))
+    total_volume = cum_volume[ends] - np.r_[0.0, cum_volume[starts[1:] - 1]]
+    total_avg = (cum_cents[ends] - np.r_[0, cum_cents[starts[1:] - 1]]) / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rvol = np.where(has_avg[ends] & (total_avg != 0), total_volume / total_avg, 0.0)
+
+    last = rows[ends]
+    if profiles is not None:
+        tz = ZoneInfo(PIPELINE_TIME_ZONE)
+        bar_end = (
+            day[last].astype("datetime64[s]")
+            + (tod[last] + SCANNER_BAR_SECONDS).astype("timedelta64[s]")
+        )
+        for i, (sym, end) in enumerate(zip(categories[code[last]], bar_end.astype(object).tolist())):
+            session, pos = session_position(end.replace(tzinfo=tz))
+            profile = profiles.get(sym, session)
+            if profile is None or pos is None:
+                continue
+            expected = profile.expected_volume(pos)
+            rvol[i] = total_volume[i] / expected if expected > 0 else 0.0
+
+    # Anchor price per symbol code: before 16:30, the latest past day's
+    # 22:58 close; after, the open of today's first 11:00 bar.
+    anchor = np.full(len(categories), np.nan)
+    if now.time() < MARKET_OPEN:
+        sel = np.flatnonzero(~is_today & (tod == YESTERDAY_ANCHOR_TOD.astype(np.int64)))
+        sel = sel[np.lexsort((day[sel], code[sel]))]
+        latest = sel[np.r_[code[sel][1:] != code[sel][:-1], True]]
+        anchor[code[latest]] = df["close"].to_numpy()[latest]
     else:
-        # 16:30 or later → use today's close
-        close_prices = get_today_anchorprice(today_bars)
+        sel = today_rows[tod[today_rows] == TODAY_ANCHOR_TOD.astype(np.int64)]
+        _, first = np.unique(code[sel], return_index=True)
+        anchor[code[sel[first]]] = df["open"].to_numpy()[sel[first]]
 
-    # Step 6 — Convert bars → pandas
-    today_df = bars_to_dataframe(today_bars)
-    avg_volume_df = pd.DataFrame(avg_volume_bars)
-    close_prices_df = pd.DataFrame(close_prices)
-
-    # Step 4: Calculate RVol for today's bars
-    today_rvol_df = calculate_rvol(today_df, avg_volume_df)
-
-
-    change_df = calculate_percentage_change(today_rvol_df,close_prices_df)
-    logger.info(change_df)
-    # ScannerResponse made here
-    last_rows_responses = return_last_row_per_symbol(change_df)
+    close = df["close"].to_numpy()[last]
+    anchor_price = anchor[code[last]]
+    change = np.round((close - anchor_price) / anchor_price * 100, 2)
+    tod_last = tod[last]
 
+    return [
+        ScannerResponse(
+            symbol=sym,
+            date=d,
+            time=time(s // 3600, s % 3600 // 60, s % 60),
+            open=o,
+            high=h,
+            low=lo,
+            close=cl,
+            volume=int(v),
+            rvol=r,
+            change=ch,
+        )
+        for sym, d, s, o, h, lo, cl, v, r, ch in zip(
+            categories[code[last]].tolist(),
+            day[last].astype("datetime64[D]").astype(object).tolist(),
+            tod_last.tolist(),
+            df["open"].to_numpy()[last].tolist(),
+            df["high"].to_numpy()[last].tolist(),
+            df["low"].to_numpy()[last].tolist(),
+            close.tolist(),
+            volume[last].tolist(),
+            np.round(rvol, 2).tolist(),
+            change.tolist(),
+        )
+    ]
 
-    return last_rows_responses
 
+async def compute_datapipeline(
+    dataset: List[dict],
+    now: Optional[datetime] = None,
+    profiles: Optional[VolumeProfiles] = None,
+) -> List[ScannerResponse]:
+    """Scanner rows from scan_datapipeline output (raw bars per symbol)."""
+    return compute_columnar(bars_frame(dataset), now or datetime.now(), profiles)
 
 
+def get_preset(preset_name: str) -> dict:
+    preset = SCANNER_PRESETS.get(preset_name)
+    if not preset:
+        raise ValueError(
+            f"Invalid preset_name. Available presets: {list(SCANNER_PRESETS.keys())}"
+        )
+    return preset
 
 
 async def run_scanner_logic(preset_name: str, ib: IB) -> List[dict]:
     """
     Fetch scanner data from IB asynchronously, then push it to the data pipeline.
     """
-    preset = SCANNER_PRESETS.get(preset_name)
-    if not preset:
-        raise ValueError(
-            f"Invalid preset_name. Available presets: {list(SCANNER_PRESETS.keys())}"
-        )
+    preset = get_preset(preset_name)
     logger.info(f"Scanning the market with {preset}")
     sub = ScannerSubscription(**preset)
 
@@ -388,7 +280,51 @@ async def run_scanner_logic(preset_name: str, ib: IB) -> List[dict]:
     
     # Push scan data to pipeline and await results
     data_from_scanning = await scan_datapipeline(scan_data,ib)
-    final_data = await compute_datapipeline(data_from_scanning)
+    final_data = await compute_datapipeline(data_from_scanning, profiles=volume_profiles)
+
 
+    return final_data
 
-    return final_data
\ No newline at end of file
+
+async def stream_scanner_logic(
+    preset_name: str, ib: IB,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    run_scanner_logic, progressively. Yields
+
+      ("scan", [{"rank", "symbol"}, ...])  once IB's scan is back,
+      ("row", ScannerResponse)             per symbol, as soon as its bars
+                                           are in and processed,
+      ("done", [ScannerResponse, ...])     every row, in scan rank order.
+
+    The pipeline never mixes symbols, so each streamed row is exactly the
+    one run_scanner_logic returns for it. Closing the generator early
+    cancels the fetches still running.
+    """
+    preset = get_preset(preset_name)
+    logger.info(f"Streaming a market scan with {preset}")
+    scan_data: List[ScanData] = await ib.reqScannerDataAsync(ScannerSubscription(**preset))
+    if not scan_data:
+        logger.warning("No scan data coming back from IB")
+        yield "done", []
+        return
+
+    dataset = scan_dataset(scan_data)
+    yield "scan", [{"rank": row["rank"], "symbol": row["symbol"]} for row in dataset]
+
+    now = datetime.now()
+    results: Dict[str, ScannerResponse] = {}
+    fetches = [asyncio.ensure_future(fetch_row_bars(ib, row)) for row in dataset]
+    try:
+        for next_row in asyncio.as_completed(fetches):
+            row = await next_row
+            if row["intraday_bars"] is None:
+                continue
+            for response in compute_columnar(bars_frame([row]), now, volume_profiles):
+                results[response.symbol] = response
+                yield "row", response
+    finally:
+        for fetch in fetches:
+            fetch.cancel()
+
+    yield "done", [results[row["symbol"]] for row in dataset if row["symbol"] in results]
@@ -0,0 +1,445 @@
+"""
+Precomputed time-of-day volume profiles.
+
+RVOL needs to know what a normal day's volume looks like by this time of
+day. The batch scanner used to work that out from the past days' raw
+bars on every scan, and the live scanner's enrichment downloaded 20
+days of history per symbol the first time the symbol showed up. This
+module builds the answer once per symbol per session and keeps it:
+
+  - `bin_volume` / `cum_volume`: float32 arrays, one entry per
+    BIN_MINUTES bin of the 04:00-20:00 ET session -- the average volume
+    of that bin, and the average cumulative volume at its end, over the
+    PROFILE_LOOKBACK days;
+  - `atr`: the ATR_PERIOD-day average true range of the regular
+    session, for the live scanner's RelATR.
+
+A profile is built from one historical request (5-minute bars: the
+finest IB serves 20 days of in one go, so the curve has 5-minute
+resolution and is interpolated within a bin) and is valid for one ET
+session; bars of that session itself are never part of it.
+
+Profiles live in an in-memory cache keyed (symbol, session) and in
+Postgres (db.volume_profiles), and are built:
+
+  - nightly, at NIGHTLY_BUILD_TIME ET on weekdays, for the next session,
+    over the universe: watchlist, held positions and the symbols either
+    scanner returned in the last RECENT_HIT_DAYS;
+  - on demand, for the same universe (POST /api/scanner/volume-profiles/rebuild);
+  - on first use, for a symbol the live scanner meets that has none.
+
+Builds go through services.historical_data as background requests, so
+a rebuild is paced and never holds up an interactive scan. Concurrent
+builds of the same profile share one request. Readers --
+services.live_enrichment and the batch scanner's RVOL -- only ever look
+up the cache, so a profiled symbol costs no IB request at all.
+
+Wired at startup via core.startup.volume_profiles_setup; without a DB
+pool the cache is memory-only (scripts, tests). Callers use the
+module-level `volume_profiles` singleton.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time as _time
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from ib_async import IB
+
+from db.volume_profiles import (
+    fetch_volume_profiles,
+    prune_volume_profiles,
+    store_volume_profiles,
+)
+from db.watchlist import list_watchlist
+from services.contracts import contract_registry
+from services.historical_data import BACKGROUND, historical_data
+from services.portfolio.ib_state import ib_state
+
+logger = logging.getLogger(__name__)
+
+
+ET = ZoneInfo("America/New_York")
+
+# Volume curve: BIN_MINUTES bins over the extended session, 04:00-20:00 ET.
+BIN_MINUTES = 5
+SESSION_START_MINUTE = 4 * 60
+SESSION_END_MINUTE = 20 * 60
+N_BINS = (SESSION_END_MINUTE - SESSION_START_MINUTE) // BIN_MINUTES
+
+# Regular session, for the daily ranges behind ATR.
+RTH_START_MINUTE = 9 * 60 + 30
+RTH_END_MINUTE = 16 * 60
+
+ATR_PERIOD = 14
+
+# One request covers both: ATR_PERIOD past sessions need ATR_PERIOD + 1
+# closes, with room for holidays.
+PROFILE_LOOKBACK = "20 D"
+PROFILE_BAR_SIZE = f"{BIN_MINUTES} mins"
+
+# Nightly build, for the next session, once the extended session is over.
+NIGHTLY_BUILD_TIME = time(20, 30)
+
+# Scanner hits this recent are part of the build universe.
+RECENT_HIT_DAYS = 5
+MAX_RECENT_HITS = 500
+
+
+class VolumeProfile:
+    """One symbol's history for one session, reduced to what RVOL and
+    RelATR need."""
+
+    __slots__ = ("day", "cum_volume", "bin_volume", "atr")
+
+    def __init__(
+        self,
+        day: int,
+        cum_volume: np.ndarray,
+        bin_volume: np.ndarray,
+        atr: Optional[float],
+    ) -> None:
+        self.day = day                  # ET date ordinal of the session
+        self.cum_volume = cum_volume    # float32[N_BINS]
+        self.bin_volume = bin_volume    # float32[N_BINS]
+        self.atr = atr
+
+    @classmethod
+    def from_bins(cls, day: int, bin_volume: np.ndarray, atr: Optional[float]) -> "VolumeProfile":
+        bin_volume = np.asarray(bin_volume, dtype=np.float32)
+        cum_volume = np.cumsum(bin_volume, dtype=np.float64).astype(np.float32)
+        return cls(day, cum_volume, bin_volume, atr)
+
+    def expected_volume(self, pos: float) -> float:
+        """Average cumulative volume at session position `pos` (bins
+        since 04:00 ET, fractional)."""
+        b = min(int(pos), N_BINS - 1)
+        frac = min(pos - b, 1.0)
+        before = float(self.cum_volume[b - 1]) if b else 0.0
+        return before + frac * float(self.bin_volume[b])
+
+
+def session_position(now: Optional[datetime] = None) -> Tuple[int, Optional[float]]:
+    """(ET date ordinal, bins since 04:00 ET) -- position None before the
+    session opens."""
+    et = (now or datetime.now(timezone.utc)).astimezone(ET)
+    minute = et.hour * 60 + et.minute + et.second / 60.0
+    if minute < SESSION_START_MINUTE:
+        return et.toordinal(), None
+    minute = min(minute, SESSION_END_MINUTE)
+    return et.toordinal(), (minute - SESSION_START_MINUTE) / BIN_MINUTES
+
+
+def profile_day(now: Optional[datetime] = None) -> date:
+    """The session a profile built now is for: today's until the extended
+    session ends, the next weekday's after that and on weekends."""
+    et = (now or datetime.now(timezone.utc)).astimezone(ET)
+    d = et.date()
+    if d.weekday() < 5 and et.hour * 60 + et.minute < SESSION_END_MINUTE:
+        return d
+    d += timedelta(days=1)
+    while d.weekday() >= 5:
+        d += timedelta(days=1)
+    return d
+
+
+def next_build_time(now: datetime) -> datetime:
+    """The next weekday NIGHTLY_BUILD_TIME ET after `now`."""
+    et = now.astimezone(ET)
+    d = et.date()
+    while True:
+        at = datetime.combine(d, NIGHTLY_BUILD_TIME, tzinfo=ET)
+        if d.weekday() < 5 and at > et:
+            return at
+        d += timedelta(days=1)
+
+
+def compute_profile(bars: List, day: int) -> VolumeProfile:
+    """
+    Reduce intraday bars (ib_async BarData, tz-aware `date`) to the
+    profile for session `day`. Bars of that session or later are
+    ignored; everything else is vectorized.
+    """
+    n = len(bars)
+    stamps = [b.date.astimezone(ET) for b in bars]
+    bar_day = np.fromiter((d.toordinal() for d in stamps), dtype=np.int64, count=n)
+    minute = np.fromiter((d.hour * 60 + d.minute for d in stamps), dtype=np.int32, count=n)
+    volume = np.fromiter((max(b.volume, 0.0) for b in bars), dtype=np.float64, count=n)
+    high = np.fromiter((b.high for b in bars), dtype=np.float64, count=n)
+    low = np.fromiter((b.low for b in bars), dtype=np.float64, count=n)
+    close = np.fromiter((b.close for b in bars), dtype=np.float64, count=n)
+
+    past = bar_day < day
+
+    # Volume curve: sum per (day, bin), average over the days seen.
+    in_session = past & (minute >= SESSION_START_MINUTE) & (minute < SESSION_END_MINUTE)
+    days, day_idx = np.unique(bar_day[in_session], return_inverse=True)
+    sums = np.zeros((max(len(days), 1), N_BINS), dtype=np.float64)
+    bins = (minute[in_session] - SESSION_START_MINUTE) // BIN_MINUTES
+    np.add.at(sums, (day_idx, bins), volume[in_session])
+
+    # ATR over regular-session daily ranges (bars arrive time-ordered).
+    rth = past & (minute >= RTH_START_MINUTE) & (minute < RTH_END_MINUTE)
+    atr: Optional[float] = None
+    if rth.any():
+        d = bar_day[rth]
+        starts = np.flatnonzero(np.r_[True, d[1:] != d[:-1]])
+        ends = np.r_[starts[1:], len(d)] - 1
+        day_high = np.maximum.reduceat(high[rth], starts)
+        day_low = np.minimum.reduceat(low[rth], starts)
+        day_close = close[rth][ends]
+        if len(starts) >= 2:
+            prev_close = day_close[:-1]
+            h, lo = day_high[1:], day_low[1:]
+            tr = np.maximum(h - lo, np.maximum(np.abs(h - prev_close), np.abs(lo - prev_close)))
+            atr = float(tr[-ATR_PERIOD:].mean())
+
+    return VolumeProfile.from_bins(day, sums.mean(axis=0), atr if atr and atr > 0 else None)
+
+
+ProfileKey = Tuple[str, int]    # (symbol, ET date ordinal)
+
+
+class VolumeProfiles:
+    """
+    Public surface:
+      - set_db_pool(pool) / load() / prune() : persistence wiring
+      - get(symbol, day) / put(symbol, p)    : the in-memory cache
+      - build(ib, symbol, day)               : one profile (cached, shared)
+      - note_hits(symbols)                   : scanner results, for the universe
+      - universe()                           : watchlist + held + recent hits
+      - rebuild(ib, day) / start_rebuild(ib) : the whole universe
+      - start_nightly(ib) / stop()           : nightly job lifecycle
+      - stats()
+    """
+
+    def __init__(self) -> None:
+        self._profiles: Dict[ProfileKey, VolumeProfile] = {}
+        self._inflight: Dict[ProfileKey, asyncio.Future] = {}
+        self._hits: Dict[str, float] = {}      # symbol -> time.time() last seen
+        # Set at startup via set_db_pool(); when None the cache is
+        # memory-only.
+        self._db_pool = None
+        self._job: Optional[asyncio.Task] = None
+        self._nightly: Optional[asyncio.Task] = None
+        self._last_rebuild: Optional[Dict[str, Any]] = None
+        self._stats: Dict[str, int] = {
+            "loaded": 0,
+            "requests": 0,
+            "built": 0,
+            "failed": 0,
+        }
+
+    def set_db_pool(self, pool) -> None:
+        self._db_pool = pool
+
+    async def load(self, now: Optional[datetime] = None) -> int:
+        """Warm the cache with every stored profile from today's session on."""
+        if self._db_pool is None:
+            return 0
+        today = (now or datetime.now(timezone.utc)).astimezone(ET).date()
+        async with self._db_pool.acquire() as conn:
+            rows = await fetch_volume_profiles(conn, today)
+        for r in rows:
+            self.put(r["symbol"], VolumeProfile.from_bins(
+                r["day"].toordinal(), np.frombuffer(r["bin_volume"], dtype="<f4"), r["atr"],
+            ))
+        self._stats["loaded"] += len(rows)
+        return len(rows)
+
+    async def prune(self, now: Optional[datetime] = None) -> None:
+        """Drop profiles of past sessions, cached and stored."""
+        today = (now or datetime.now(timezone.utc)).astimezone(ET).date()
+        for key in [k for k in self._profiles if k[1] < today.toordinal()]:
+            del self._profiles[key]
+        if self._db_pool is None:
+            return
+        async with self._db_pool.acquire() as conn:
+            await prune_volume_profiles(conn, today)
+
+    # ----- cache ----------------------------------------------------------
+    def get(self, symbol: str, day: int) -> Optional[VolumeProfile]:
+        return self._profiles.get((symbol, day))
+
+    def put(self, symbol: str, profile: VolumeProfile) -> None:
+        self._profiles[(symbol, profile.day)] = profile
+
+    # ----- builds ---------------------------------------------------------
+    async def build(self, ib: IB, symbol: str, day: int, priority: int = BACKGROUND) -> VolumeProfile:
+        """The profile for (symbol, day): cached, or one historical
+        request shared by every concurrent caller. Raises if IB has no
+        history for the symbol."""
+        key = (symbol, day)
+        profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = self._inflight[key] = asyncio.ensure_future(self._build(ib, symbol, day, priority))
+            fut.add_done_callback(lambda f: self._build_done(key, f))
+        # Shielded: a cancelled caller doesn't cancel the others' build.
+        return await asyncio.shield(fut)
+
+    def _build_done(self, key: ProfileKey, fut: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not fut.cancelled() and fut.exception() is not None:
+            self._stats["failed"] += 1
+
+    async def _build(self, ib: IB, symbol: str, day: int, priority: int) -> VolumeProfile:
+        contract = await contract_registry.resolve(ib, symbol, "STK")
+        self._stats["requests"] += 1
+        bars = await historical_data.request(
+            ib,
+            contract,
+            priority,
+            endDateTime="",
+            durationStr=PROFILE_LOOKBACK,
+            barSizeSetting=PROFILE_BAR_SIZE,
+            whatToShow="TRADES",
+            useRTH=False,
+            formatDate=2,       # UTC timestamps; bucketed in ET
+        )
+        if not bars:
+            raise ValueError("no historical bars")
+        profile = await asyncio.to_thread(compute_profile, list(bars), day)
+        self.put(symbol, profile)
+        self._stats["built"] += 1
+        await self._persist([(symbol, profile)])
+        return profile
+
+    async def _persist(self, profiles: Iterable[Tuple[str, VolumeProfile]]) -> None:
+        if self._db_pool is None:
+            return
+        try:
+            async with self._db_pool.acquire() as conn:
+                await store_volume_profiles(conn, [
+                    {
+                        "symbol": symbol,
+                        "day": date.fromordinal(p.day),
+                        "bin_volume": p.bin_volume.astype("<f4").tobytes(),
+                        "atr": p.atr,
+                    }
+                    for symbol, p in profiles
+                ])
+        except Exception:
+            # The cached copy is still good; a restart just rebuilds.
+            logger.exception("Volume profile write failed")
+
+    # ----- universe -------------------------------------------------------
+    def note_hits(self, symbols: Iterable[str]) -> None:
+        """Remember scanner results; the next rebuild profiles them."""
+        now = _time.time()
+        for symbol in symbols:
+            self._hits.pop(symbol, None)
+            self._hits[symbol] = now
+        # Oldest first (re-hits move to the end): trim from the front.
+        horizon = now - RECENT_HIT_DAYS * 86400
+        while self._hits:
+            symbol, seen = next(iter(self._hits.items()))
+            if seen >= horizon and len(self._hits) <= MAX_RECENT_HITS:
+                break
+            del self._hits[symbol]
+
+    async def universe(self) -> List[str]:
+        """Watchlist, held stock positions and recent scanner hits."""
+        symbols = set(self._hits)
+        for pos in ib_state.positions():
+            if pos.contract.secType == "STK" and pos.position:
+                symbols.add(pos.contract.symbol.upper())
+        if self._db_pool is not None:
+            try:
+                async with self._db_pool.acquire() as conn:
+                    symbols.update(row["symbol"] for row in await list_watchlist(conn))
+            except Exception:
+                logger.exception("Volume profiles: watchlist read failed")
+        return sorted(symbols)
+
+    async def rebuild(
+        self,
+        ib: IB,
+        day: Optional[date] = None,
+        symbols: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Profile every universe symbol (or `symbols`) for session `day`
+        (default: profile_day()); already cached ones are skipped."""
+        day = day or profile_day()
+        symbols = sorted(set(symbols)) if symbols is not None else await self.universe()
+        todo = [s for s in symbols if (s, day.toordinal()) not in self._profiles]
+        failed: List[str] = []
+
+        async def one(symbol: str) -> None:
+            try:
+                await self.build(ib, symbol, day.toordinal())
+            except Exception as e:
+                failed.append(symbol)
+                logger.warning("Volume profile failed for %s: %s", symbol, e)
+
+        started = _time.monotonic()
+        await asyncio.gather(*(one(s) for s in todo))
+        summary = {
+            "day": day.isoformat(),
+            "symbols": len(symbols),
+            "cached": len(symbols) - len(todo),
+            "built": len(todo) - len(failed),
+            "failed": sorted(failed),
+            "seconds": round(_time.monotonic() - started, 1),
+        }
+        self._last_rebuild = summary
+        logger.info(
+            "Volume profiles for %s: %d symbols, %d built, %d cached, %d failed",
+            summary["day"], summary["symbols"], summary["built"], summary["cached"], len(failed),
+        )
+        return summary
+
+    def start_rebuild(self, ib: IB, day: Optional[date] = None) -> bool:
+        """Run rebuild() in the background. False if one is running."""
+        if self._job is not None and not self._job.done():
+            return False
+        self._job = asyncio.create_task(self.rebuild(ib, day))
+        return True
+
+    # ----- nightly job ----------------------------------------------------
+    def start_nightly(self, ib: IB) -> None:
+        if self._nightly is None:
+            self._nightly = asyncio.create_task(self._run_nightly(ib))
+
+    async def stop(self) -> None:
+        for task in (self._nightly, self._job):
+            if task is None or task.done():
+                continue
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._nightly = self._job = None
+
+    async def _run_nightly(self, ib: IB) -> None:
+        while True:
+            now = datetime.now(timezone.utc)
+            await asyncio.sleep((next_build_time(now) - now).total_seconds())
+            try:
+                await self.prune()
+                if self.start_rebuild(ib):
+                    await self._job
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Nightly volume profile build failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "profiles": len(self._profiles),
+            "recent_hits": len(self._hits),
+            "rebuilding": self._job is not None and not self._job.done(),
+            "last_rebuild": self._last_rebuild,
+        }
+
+
+# Module-level singleton -- one cache per process.
+volume_profiles = VolumeProfiles()
@@ -6,6 +6,7 @@ import RightSidebar from "@/components/RightSideBar";
 import LockoutBanner from "@/components/trade-manager/LockoutBanner";
 import AutomaticEntryApprovalDialog from "@/components/trade-manager/AutomaticEntryApprovalDialog";
 import { API_PREFIX } from '@/lib/api_prefix';
+import { subscribeTopic } from '@/lib/realtime';
 import { components } from "@/generated/api"; // generated type from OpenAPI
 
 type AlarmResponse = components["schemas"]["AlarmResponse"];
@@ -31,30 +32,10 @@ export default function RootLayout({ children }: { children: React.ReactNode })
 
     fetchAlarms();
 
-    const eventSource = new EventSource(`${API_PREFIX}/alarms/stream`);
-
-    eventSource.onmessage = (event) => {
-      try {
-        const newAlarm: AlarmResponse = JSON.parse(event.data);
-        console.log(newAlarm)
-        // Always prepend new alarm
-        setAlarms(prev => [newAlarm, ...prev]);
-
-      } catch (err) {
-        console.error("Failed to parse SSE alarm:", err);
-      }
-    };
-
-    eventSource.onerror = () => {
-      // Browser auto-reconnects — only log if permanently closed
-      if (eventSource.readyState === EventSource.CLOSED) {
-        setError("SSE stream closed unexpectedly.");
-      }
-    };
-
-    return () => {
-      eventSource.close();
-    };
+    // New alarms arrive on the shared realtime connection; always prepend.
+    return subscribeTopic("alarms", (newAlarm: AlarmResponse) => {
+      setAlarms(prev => [newAlarm, ...prev]);
+    });
   }, []);
 
   return (
@@ -7,17 +7,48 @@ import LiveScannerTable, {
   setExtensionStatusListener,
 } from '@/components/live-scanner/LiveScannerTable';
 import ConnectionStatus from '@/components/live-scanner/ConnectionStatus';
-import { API_PREFIX } from '@/lib/api_prefix';
+import { subscribeTopic } from '@/lib/realtime';
 
-// Wire shape pushed by /api/live-scanner/stream. Mirrors
+// Wire shape pushed on the "live_scanner" topic (and by
+// /api/live-scanner/stream). Mirrors
 // backend.schemas.api_schemas.LiveScannerUpdate.
 type LiveScannerUpdate = {
-  side: 'up' | 'down';
+  side: string; // LIVE_SCANS key: 'up' | 'down' | 'hot' | 'smallcaps' | ...
+  // "snapshot": every row for the side. "delta": only the rows that
+  // changed since the previous frame, plus the symbols that left.
+  kind: 'snapshot' | 'delta';
   rows: LiveScannerRow[];
+  removed: string[];
   connected: boolean;
   ts: number;
 };
 
+// Biggest absolute movers on top, same order the backend snapshots use.
+const byAbsChange = (a: LiveScannerRow, b: LiveScannerRow) =>
+  Math.abs(b.change_percent ?? 0) - Math.abs(a.change_percent ?? 0);
+
+function applyUpdate(
+  prev: LiveScannerRow[],
+  update: LiveScannerUpdate,
+): LiveScannerRow[] {
+  if (update.kind !== 'delta') return update.rows;
+  const bySymbol = new Map(prev.map((r) => [r.symbol, r]));
+  for (const sym of update.removed) bySymbol.delete(sym);
+  for (const row of update.rows) bySymbol.set(row.symbol, row);
+  return [...bySymbol.values()].sort(byAbsChange);
+}
+
+// Table titles per live scan; scans not listed here get their key as title.
+const SCAN_TITLES: Record<string, string> = {
+  up: 'Gap Ups (+5%)',
+  down: 'Gap Downs (-5%)',
+  hot: 'Hot by Volume',
+  smallcaps: 'Hot Small Caps',
+};
+// The gap-% filter only makes sense for the gap scans.
+const GAP_SIDES = new Set(['up', 'down']);
+const SIDE_ORDER = Object.keys(SCAN_TITLES);
+
 const DEFAULT_MAX_ROWS = 25;
 const ROW_LIMIT_OPTIONS = [10, 25, 50, 100];
 // Default minimum absolute gap percent. The user's spec is to only see
@@ -25,8 +56,10 @@ const ROW_LIMIT_OPTIONS = [10, 25, 50, 100];
 const DEFAULT_MIN_ABS_CHANGE_PCT = 5;
 
 const LiveScannerPage = () => {
-  const [upRows, setUpRows] = React.useState<LiveScannerRow[]>([]);
-  const [downRows, setDownRows] = React.useState<LiveScannerRow[]>([]);
+  const [rowsBySide, setRowsBySide] = React.useState<Record<string, LiveScannerRow[]>>({
+    up: [],
+    down: [],
+  });
   const [sseConnected, setSseConnected] = React.useState<boolean>(false);
   const [ibConnected, setIbConnected] = React.useState<boolean>(false);
   const [lastTs, setLastTs] = React.useState<number | null>(null);
@@ -38,6 +71,12 @@ const LiveScannerPage = () => {
   const [error, setError] = React.useState<string | null>(null);
 
   const minAbsChangePct = gapFilterEnabled ? DEFAULT_MIN_ABS_CHANGE_PCT : 0;
+  // Known scans first in their usual order, then any others the backend runs.
+  const sides = React.useMemo(() => {
+    const rank = (s: string) =>
+      SIDE_ORDER.includes(s) ? SIDE_ORDER.indexOf(s) : SIDE_ORDER.length;
+    return Object.keys(rowsBySide).sort((a, b) => rank(a) - rank(b) || a.localeCompare(b));
+  }, [rowsBySide]);
 
   // Subscribe to extension status updates from the row-click module so
   // we can render a small indicator next to the connection dots.
@@ -46,49 +85,26 @@ const LiveScannerPage = () => {
     return () => setExtensionStatusListener(null);
   }, []);
 
-  // Open the SSE stream on mount; close on unmount. Browser auto-reconnects
-  // on transient drops, we only flag disconnected after explicit CLOSED state.
+  // Follow the "live_scanner" topic on the shared realtime connection
+  // (lib/realtime), which reconnects on transient drops by itself.
   React.useEffect(() => {
-    const url = `${API_PREFIX}/live-scanner/stream`;
-    const es = new EventSource(url);
-
-    const handleUpdate = (event: MessageEvent) => {
-      try {
-        const payload: LiveScannerUpdate = JSON.parse(event.data);
-        if (payload.side === 'up') setUpRows(payload.rows);
-        else if (payload.side === 'down') setDownRows(payload.rows);
+    return subscribeTopic(
+      'live_scanner',
+      (payload: LiveScannerUpdate) => {
+        setRowsBySide((prev) => ({
+          ...prev,
+          [payload.side]: applyUpdate(prev[payload.side] ?? [], payload),
+        }));
         setIbConnected(Boolean(payload.connected));
         setLastTs(payload.ts);
         setSseConnected(true);
         setError(null);
-      } catch (err) {
-        console.error('Failed to parse live-scanner update', err);
-      }
-    };
-
-    // Server emits explicit `event: update` frames.
-    es.addEventListener('update', handleUpdate as EventListener);
-    // sse-starlette pings as `event: ping` (no state change needed; just
-    // confirms stream is alive — handled implicitly by EventSource state).
-    es.addEventListener('ping', () => setSseConnected(true));
-
-    es.onopen = () => {
-      setSseConnected(true);
-      setError(null);
-    };
-    es.onerror = () => {
-      if (es.readyState === EventSource.CLOSED) {
-        setSseConnected(false);
-        setError('Stream closed. Refresh the page to reconnect.');
-      } else {
-        // CONNECTING — browser is retrying. Reflect that visually.
-        setSseConnected(false);
-      }
-    };
-
-    return () => {
-      es.close();
-    };
+      },
+      (connected) => {
+        setSseConnected(connected);
+        if (connected) setError(null);
+      },
+    );
   }, []);
 
   return (
@@ -98,7 +114,7 @@ const LiveScannerPage = () => {
           <HeaderBox
             type="title"
             title="Live Scanner"
-            subtext="Real-time +5% gap ups and -5% gap downs from Interactive Brokers."
+            subtext="Real-time gap ups, gap downs and hot-by-volume scans from Interactive Brokers."
           />
         </header>
 
@@ -165,20 +181,16 @@ const LiveScannerPage = () => {
 
         <main className="home-main mt-4">
           <div className="grid grid-cols-1 lg:grid-cols-2 gap-4">
-            <LiveScannerTable
-              title="Gap Ups (+5%)"
-              side="up"
-              rows={upRows}
-              maxRows={maxRows}
-              minAbsChangePct={minAbsChangePct}
-            />
-            <LiveScannerTable
-              title="Gap Downs (-5%)"
-              side="down"
-              rows={downRows}
-              maxRows={maxRows}
-              minAbsChangePct={minAbsChangePct}
-            />
+            {sides.map((side) => (
+              <LiveScannerTable
+                key={side}
+                title={SCAN_TITLES[side] ?? side}
+                side={side}
+                rows={rowsBySide[side]}
+                maxRows={maxRows}
+                minAbsChangePct={GAP_SIDES.has(side) ? minAbsChangePct : 0}
+              />
+            ))}
           </div>
         </main>
       </div>
@@ -2,6 +2,7 @@
 import React, { useState } from "react";
 import { paths } from "@/generated/api";
 import { API_PREFIX } from "@/lib/api_prefix"; // import your API prefix
+import { resyncTopic, subscribeTopic } from "@/lib/realtime";
 import { useRouter } from "next/navigation";
 import {
   Table,
@@ -58,8 +59,9 @@ const RightSidebar: React.FC<RightSidebarProps> = ({ pageSpecific, alarms }) =>
   const router = useRouter();
 
   // Streamer status is now push-based. We seed once from /streamer-status
-  // so the dot paints immediately, then open an SSE stream that emits a
-  // message on every state transition (the backend's heartbeat watchdog
+  // so the dot paints immediately, then follow the "streamer_status" topic
+  // on the shared realtime connection, which emits a message on every
+  // state transition (the backend's heartbeat watchdog
   // flips to "offline" when the streamer goes silent past the threshold).
   React.useEffect(() => {
     let cancelled = false;
@@ -87,10 +89,9 @@ const RightSidebar: React.FC<RightSidebarProps> = ({ pageSpecific, alarms }) =>
       }
     })();
 
-    const es = new EventSource(`${API_PREFIX}/streamer-status/stream`);
-    es.onmessage = (e) => {
-      try {
-        const data = JSON.parse(e.data) as { status?: StreamerState };
+    const unsubscribe = subscribeTopic(
+      "streamer_status",
+      (data: { status?: StreamerState }) => {
         if (
           data.status === "running" ||
           data.status === "offline" ||
@@ -98,19 +99,21 @@ const RightSidebar: React.FC<RightSidebarProps> = ({ pageSpecific, alarms }) =>
         ) {
           setStreamerState(data.status);
         }
-      } catch {
-        // Ignore malformed payloads
-      }
-    };
-    es.onerror = () => {
-      // EventSource auto-reconnects. While disconnected we don't know
-      // the streamer's state — surface that with the red dot.
-      if (!cancelled) setStreamerState("error");
-    };
+      },
+      (connected) => {
+        // While disconnected we don't know the streamer's state — surface
+        // that with the red dot, and drop the resume point so the
+        // reconnect sends a snapshot that repaints it.
+        if (!connected && !cancelled) {
+          setStreamerState("error");
+          resyncTopic("streamer_status");
+        }
+      },
+    );
 
     return () => {
       cancelled = true;
-      es.close();
+      unsubscribe();
     };
   }, []);
 
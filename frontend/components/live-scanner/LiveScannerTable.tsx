@@ -20,10 +20,18 @@ export type LiveScannerRow = {
   change: number | null;
   change_percent: number | null;
   volume: number | null;
+  bid: number | null;
+  ask: number | null;
+  spread: number | null;
+  // null until the backend's daily enrichment baseline has landed.
+  rvol: number | null;
+  rel_atr: number | null;
   time_added: string;
 };
 
-type Side = 'up' | 'down';
+// LIVE_SCANS key on the backend (helpers/scanner_presets.py): 'up' and
+// 'down' are the gap scans, anything else is an extra live scan.
+type Side = string;
 
 type Props = {
   title: string;
@@ -220,7 +228,9 @@ const LiveScannerTable: React.FC<Props> = ({
   const headerAccent =
     side === 'up'
       ? 'bg-success-50 border-success-100 text-success-900'
-      : 'bg-pink-25 border-pink-100 text-pink-900';
+      : side === 'down'
+        ? 'bg-pink-25 border-pink-100 text-pink-900'
+        : 'bg-gray-25 border-gray-200 text-gray-900';
 
   return (
     <div className="flex-1 min-w-0 border rounded-md bg-white shadow-sm">
@@ -244,14 +254,19 @@ const LiveScannerTable: React.FC<Props> = ({
               <TableHead className="text-right">Gap %</TableHead>
               <TableHead className="text-right">Change $</TableHead>
               <TableHead className="text-right">Volume</TableHead>
+              <TableHead className="text-right">RVOL</TableHead>
+              <TableHead className="text-right">RelATR</TableHead>
+              <TableHead className="text-right">Bid</TableHead>
+              <TableHead className="text-right">Ask</TableHead>
+              <TableHead className="text-right">Spread</TableHead>
               <TableHead>Time</TableHead>
             </TableRow>
           </TableHeader>
           <TableBody>
             {display.length === 0 && (
               <TableRow>
-                <TableCell colSpan={7} className="text-center text-xs py-6 text-gray-400">
-                  Waiting for first {side === 'up' ? 'gap up' : 'gap down'} update…
+                <TableCell colSpan={12} className="text-center text-xs py-6 text-gray-400">
+                  Waiting for first {title} update…
                 </TableCell>
               </TableRow>
             )}
@@ -280,6 +295,11 @@ const LiveScannerTable: React.FC<Props> = ({
                     {fmtNum(row.change)}
                   </TableCell>
                   <TableCell className="text-right">{fmtVol(row.volume)}</TableCell>
+                  <TableCell className="text-right">{fmtNum(row.rvol)}</TableCell>
+                  <TableCell className="text-right">{fmtNum(row.rel_atr)}</TableCell>
+                  <TableCell className="text-right">{fmtNum(row.bid)}</TableCell>
+                  <TableCell className="text-right">{fmtNum(row.ask)}</TableCell>
+                  <TableCell className="text-right text-gray-500">{fmtNum(row.spread)}</TableCell>
                   <TableCell className="text-gray-500">{fmtTime(row.time_added)}</TableCell>
                 </TableRow>
               );
@@ -68,29 +68,55 @@ const ScannerTable: React.FC<ScannerTableProps> = ({
 
   const contextMenuRef = React.useRef<HTMLDivElement>(null);
 
-  const fetchData = React.useCallback(async () => {
-    setLoading(true);
-    setError(null);
-    try {
-      const res = await fetch(`${API_PREFIX}/scanner?preset_name=${scan}`);
-      if (!res.ok) throw new Error("Failed to fetch scanner data");
-      const json: ScannerResponse[] = await res.json();
-      const rows = json
+  // Rows stream in over SSE as each symbol's bars are processed; the
+  // final `done` frame replaces them with the complete ranked result.
+  const sourceRef = React.useRef<EventSource | null>(null);
+
+  const prepare = React.useCallback(
+    (rows: ScannerResponse[]) =>
+      rows
         .filter((row) => row.rvol === null || row.rvol >= 1)
         .sort((a, b) => {
           const aVal = a.change ?? 0;
           const bVal = b.change ?? 0;
           return sortOrder === "desc" ? bVal - aVal : aVal - bVal;
-        });
-      setData(rows);
+        }),
+    [sortOrder],
+  );
+
+  const fetchData = React.useCallback(() => {
+    sourceRef.current?.close();
+    setLoading(true);
+    setError(null);
+    setData([]);
+
+    const source = new EventSource(
+      `${API_PREFIX}/scanner/stream?preset_name=${encodeURIComponent(scan)}`,
+    );
+    sourceRef.current = source;
+    const received: ScannerResponse[] = [];
+
+    source.addEventListener("row", (ev) => {
+      received.push(JSON.parse((ev as MessageEvent).data));
+      setData(prepare(received));
+    });
+    source.addEventListener("done", (ev) => {
+      source.close();
+      setData(prepare(JSON.parse((ev as MessageEvent).data)));
+      setLoading(false);
       onFetched?.();
-    } catch (err: unknown) {
-      setError(err instanceof Error ? err.message : String(err));
-    } finally {
+    });
+    // Both the server's `error` event and a dropped connection: stop here
+    // rather than let EventSource reconnect and re-run the scan.
+    source.addEventListener("error", (ev) => {
+      source.close();
+      const data = (ev as MessageEvent).data;
+      setError(data ? JSON.parse(data).detail : "Failed to fetch scanner data");
       setLoading(false);
-    }
-  }, [scan, onFetched, sortOrder]);
+    });
+  }, [scan, onFetched, prepare]);
 
+  React.useEffect(() => () => sourceRef.current?.close(), []);
 
   React.useEffect(() => {
     if (fetchTrigger) fetchData();
@@ -2,6 +2,7 @@
 
 import * as React from "react";
 import { API_PREFIX } from "@/lib/api_prefix";
+import { subscribeTopic } from "@/lib/realtime";
 import {
   readAutoApprove,
   subscribeAutoApprove,
@@ -10,9 +11,10 @@ import {
 /**
  * Global approval dialog for request_type="automatic" entry requests.
  *
- * Mounted once from the root layout so it works on every page. Opens a
- * single long-lived EventSource against
- *   GET  /api/portfolio/entry-request/pending/stream
+ * Mounted once from the root layout so it works on every page. Follows
+ * the "pending_approvals" topic on the shared realtime connection
+ * (lib/realtime; same payloads as
+ *   GET  /api/portfolio/entry-request/pending/stream)
  * and keeps a local queue of pending rows. Whenever the queue is non-empty
  * we render a modal for the head row with Accept / Decline buttons.
  *
@@ -26,8 +28,9 @@ import {
  * elsewhere or the backend expired it), so we drop matching queue entries
  * to avoid stale prompts.
  *
- * Reconnect: mirrors LiveOrders.tsx — small delay + auto-reconnect on
- * onerror. No exponential backoff needed since the endpoint is local.
+ * Reconnect: handled by lib/realtime — small delay + auto-reconnect on
+ * onerror, after which the snapshot is replayed. No exponential backoff
+ * needed since the endpoint is local.
  */
 
 type PendingApproval = {
@@ -53,7 +56,6 @@ export default function AutomaticEntryApprovalDialog() {
   const [queue, setQueue] = React.useState<PendingApproval[]>([]);
   const [busy, setBusy] = React.useState(false);
   const [lastResult, setLastResult] = React.useState<LastResult | null>(null);
-  const esRef = React.useRef<EventSource | null>(null);
 
   // Auto-approve toggle (Off by default). Kept in a ref so the SSE
   // callback closure always reads the current value without needing
@@ -68,65 +70,35 @@ export default function AutomaticEntryApprovalDialog() {
 
   // --- SSE plumbing -------------------------------------------------------
   React.useEffect(() => {
-    let cancelled = false;
-    let retryTimer: ReturnType<typeof setTimeout> | null = null;
-
-    const connect = () => {
-      if (cancelled) return;
-      const es = new EventSource(
-        `${API_PREFIX}/portfolio/entry-request/pending/stream`
-      );
-      esRef.current = es;
-
-      es.onmessage = (ev) => {
-        try {
-          const payload = JSON.parse(ev.data);
-          if (payload.type === "snapshot") {
-            // On (re)connect the backend replays every pending row so the
-            // dialog can't miss one just because the tab was closed.
-            const rows = payload.pending as PendingApproval[];
-            if (autoApproveRef.current) {
-              // Fire-and-forget accept for every parked row; don't queue.
-              rows.forEach((r) => autoAcceptRef.current(r));
-            } else {
-              setQueue(rows);
-            }
-          } else if (payload.type === "add") {
-            const row = payload.pending as PendingApproval;
-            if (autoApproveRef.current) {
-              autoAcceptRef.current(row);
-            } else {
-              setQueue((prev) =>
-                // Dedup by approval_id — snapshot might race with an add on
-                // reconnect if the backend just parked a new one.
-                prev.some((p) => p.approval_id === row.approval_id)
-                  ? prev
-                  : [...prev, row]
-              );
-            }
-          } else if (payload.type === "remove") {
-            const id = payload.approval_id as string;
-            setQueue((prev) => prev.filter((p) => p.approval_id !== id));
-          }
-          // ping -> ignore
-        } catch (err) {
-          console.error("[AutoEntryApproval] SSE parse error:", err);
+    return subscribeTopic("pending_approvals", (payload) => {
+      if (payload.type === "snapshot") {
+        // On (re)connect the backend replays every pending row so the
+        // dialog can't miss one just because the tab was closed.
+        const rows = payload.pending as PendingApproval[];
+        if (autoApproveRef.current) {
+          // Fire-and-forget accept for every parked row; don't queue.
+          rows.forEach((r) => autoAcceptRef.current(r));
+        } else {
+          setQueue(rows);
         }
-      };
-
-      es.onerror = () => {
-        es.close();
-        if (cancelled) return;
-        retryTimer = setTimeout(connect, 2000);
-      };
-    };
-
-    connect();
-    return () => {
-      cancelled = true;
-      if (retryTimer) clearTimeout(retryTimer);
-      esRef.current?.close();
-    };
+      } else if (payload.type === "add") {
+        const row = payload.pending as PendingApproval;
+        if (autoApproveRef.current) {
+          autoAcceptRef.current(row);
+        } else {
+          setQueue((prev) =>
+            // Dedup by approval_id — snapshot might race with an add on
+            // reconnect if the backend just parked a new one.
+            prev.some((p) => p.approval_id === row.approval_id)
+              ? prev
+              : [...prev, row]
+          );
+        }
+      } else if (payload.type === "remove") {
+        const id = payload.approval_id as string;
+        setQueue((prev) => prev.filter((p) => p.approval_id !== id));
+      }
+    });
   }, []);
 
   // --- Decision dispatch --------------------------------------------------
@@ -1,7 +1,8 @@
 "use client";
 
-import React, { useState, useEffect, useCallback, useRef } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import { API_PREFIX } from "@/lib/api_prefix";
+import { subscribeTopic } from "@/lib/realtime";
 
 import {
   Table,
@@ -112,11 +113,10 @@ const LiveOrders = () => {
   const [message, setMessage] = useState<string | null>(null);
   const [busyId, setBusyId] = useState<number | null>(null);
   const [bulkBusy, setBulkBusy] = useState(false);
-  const esRef = useRef<EventSource | null>(null);
 
   // ----------------------------------------------------------------------
-  // SSE wiring — single long-lived connection. Reconnect with backoff if the
-  // browser/network drops it.
+  // SSE wiring — the "orders" topic on the shared /api/stream connection
+  // (lib/realtime), which reconnects if the browser/network drops it.
   // ----------------------------------------------------------------------
   const upsertOrder = useCallback((incoming: LiveOrder) => {
     setOrders((prev) => {
@@ -155,59 +155,29 @@ const LiveOrders = () => {
   }, []);
 
   useEffect(() => {
-    let cancelled = false;
-    let retryTimer: ReturnType<typeof setTimeout> | null = null;
-
-    const connect = () => {
-      if (cancelled) return;
-      const es = new EventSource(`${API_PREFIX}/portfolio/order-status/stream`);
-      esRef.current = es;
-
-      es.onopen = () => setConnected(true);
-
-      es.onmessage = (ev) => {
-        try {
-          const payload = JSON.parse(ev.data);
-          if (payload.type === "snapshot") {
-            const all = payload.orders as LiveOrder[];
-            const visible: LiveOrder[] = [];
-            for (const o of all) {
-              if (o.status && HIDDEN_STATUSES.has(o.status)) {
-                console.info(
-                  `[LiveOrders] terminal (snapshot): permId=${o.perm_id} ` +
-                    `symbol=${o.symbol} status=${o.status}`
-                );
-              } else {
-                visible.push(o);
-              }
+    return subscribeTopic(
+      "orders",
+      (payload) => {
+        if (payload.type === "snapshot") {
+          const all = payload.orders as LiveOrder[];
+          const visible: LiveOrder[] = [];
+          for (const o of all) {
+            if (o.status && HIDDEN_STATUSES.has(o.status)) {
+              console.info(
+                `[LiveOrders] terminal (snapshot): permId=${o.perm_id} ` +
+                  `symbol=${o.symbol} status=${o.status}`
+              );
+            } else {
+              visible.push(o);
             }
-            setOrders(visible);
-          } else if (payload.type === "update") {
-            upsertOrder(payload.order as LiveOrder);
           }
-          // ping → ignore
-        } catch (err) {
-          console.error("SSE parse error:", err);
+          setOrders(visible);
+        } else if (payload.type === "update") {
+          upsertOrder(payload.order as LiveOrder);
         }
-      };
-
-      es.onerror = () => {
-        setConnected(false);
-        es.close();
-        if (cancelled) return;
-        // Reconnect with a small delay.
-        retryTimer = setTimeout(connect, 2000);
-      };
-    };
-
-    connect();
-
-    return () => {
-      cancelled = true;
-      if (retryTimer) clearTimeout(retryTimer);
-      esRef.current?.close();
-      esRef.current = null;
-    };
+      },
+      setConnected,
+    );
   }, [upsertOrder]);
 
   // ----------------------------------------------------------------------
@@ -1,7 +1,7 @@
 "use client";
 
 import * as React from "react";
-import { API_PREFIX } from "@/lib/api_prefix";
+import { subscribeTopic } from "@/lib/realtime";
 
 type LockoutStatus = {
   locked: boolean;
@@ -11,8 +11,6 @@ type LockoutStatus = {
   streak: number;
 };
 
-const POLL_MS = 60_000;
-
 function formatRemaining(ms: number): string {
   if (ms <= 0) return "0s";
   const total = Math.floor(ms / 1000);
@@ -27,42 +25,28 @@ function formatRemaining(ms: number): string {
 /**
  * Global loss-cooldown banner.
  *
- * Polls /portfolio/lockout-status on a 15s cadence so the UI reflects the
- * lockout state proactively — the user sees the freeze the moment the 2nd
- * consecutive loss closes, without having to attempt a 3rd entry first.
- *
- * Auto-clears when cooldown_until passes; refetches on tab focus so the
- * state is fresh after the user comes back to the window.
+ * Follows the "lockout" topic on the shared realtime connection
+ * (lib/realtime; same payloads as /portfolio/lockout-status/stream). The
+ * backend pushes a new status the moment a loss-closing fill lands, and
+ * again when the cooldown_until timer fires, so the banner appears and
+ * clears without any polling. The first message on every (re)connect is
+ * the current status, so a dropped connection can't leave a stale banner
+ * behind.
  */
 export default function LockoutBanner() {
   const [status, setStatus] = React.useState<LockoutStatus | null>(null);
   const [now, setNow] = React.useState<number>(Date.now());
 
-  const fetchStatus = React.useCallback(async () => {
-    try {
-      const res = await fetch(`${API_PREFIX}/portfolio/lockout-status`, {
-        cache: "no-store",
-      });
-      if (!res.ok) return;
-      const data: LockoutStatus = await res.json();
-      setStatus(data);
-    } catch {
-      // Network blips are fine — the next poll will catch up. We don't
-      // want a transient fetch failure to drop the banner.
-    }
-  }, []);
-
-  // Poll + refetch on focus.
   React.useEffect(() => {
-    fetchStatus();
-    const id = window.setInterval(fetchStatus, POLL_MS);
-    const onFocus = () => fetchStatus();
-    window.addEventListener("focus", onFocus);
-    return () => {
-      window.clearInterval(id);
-      window.removeEventListener("focus", onFocus);
-    };
-  }, [fetchStatus]);
+    // Keep the last known status on a transient drop — it shouldn't hide
+    // an active lockout. The reconnect snapshot corrects it.
+    return subscribeTopic("lockout", (payload) => {
+      if (payload.type === "snapshot") {
+        setStatus(payload.status as LockoutStatus);
+        setNow(Date.now());
+      }
+    });
+  }, []);
 
   // 1Hz tick while locked so the countdown re-renders.
   React.useEffect(() => {
@@ -77,8 +61,8 @@ export default function LockoutBanner() {
     ? new Date(status.cooldown_until).getTime()
     : null;
 
-  // The cooldown window has elapsed but the next poll hasn't landed yet.
-  // Hide the banner immediately — the next poll will confirm.
+  // The cooldown window has elapsed but the unlock push hasn't landed
+  // yet. Hide the banner immediately — the push will confirm.
   if (untilMs !== null && untilMs <= now) return null;
 
   const remaining = untilMs !== null ? untilMs - now : null;
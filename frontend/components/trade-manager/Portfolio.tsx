@@ -3,6 +3,7 @@
 import React, { useState, useEffect, useCallback, useRef } from "react";
 import { useRouter } from "next/navigation";
 import { API_PREFIX } from "@/lib/api_prefix";
+import { resyncTopic, subscribeTopic } from "@/lib/realtime";
 import { paths } from "@/generated/api";
 import {
   Table,
@@ -22,6 +23,31 @@ type ReconcileResult = {
   deleted_count?: number;
 };
 
+// Live columns: green above zero, red below.
+function pnlClass(v: number | null | undefined): string {
+  if (v == null || v === 0) return "";
+  return v > 0 ? "text-green-700" : "text-red-700";
+}
+
+// Fold an open-risk patch into the current rows: changed rows replace
+// their symbol in place, new symbols are appended, removed ones dropped.
+function applyPatch(
+  prev: OpenPosition[],
+  rows: OpenPosition[],
+  removed: Set<string>,
+): OpenPosition[] {
+  const bySymbol = new Map(rows.map((r) => [r.symbol.toUpperCase(), r]));
+  const next: OpenPosition[] = [];
+  for (const p of prev) {
+    const key = p.symbol.toUpperCase();
+    if (removed.has(key)) continue;
+    const updated = bySymbol.get(key);
+    next.push(updated ?? p);
+    bySymbol.delete(key);
+  }
+  return next.concat(Array.from(bySymbol.values()));
+}
+
 const PortfolioTable = () => {
   const [positions, setPositions] = useState<OpenPosition[]>([]);
   const [connected, setConnected] = useState(false);
@@ -30,7 +56,9 @@ const PortfolioTable = () => {
   // header doesn't stay cluttered.
   const [reconciling, setReconciling] = useState(false);
   const [reconcileMsg, setReconcileMsg] = useState<string | null>(null);
-  const esRef = useRef<EventSource | null>(null);
+  // Last applied snapshot/patch seq from the open-risk stream.
+  const seqRef = useRef<number>(0);
+  const resyncingRef = useRef<boolean>(false);
 
   const handleReconcile = useCallback(async () => {
     setReconciling(true);
@@ -45,7 +73,7 @@ const PortfolioTable = () => {
       setReconcileMsg(
         n === 0 ? "Nothing to clear" : `Cleared ${n} orphan exit${n === 1 ? "" : "s"}`,
       );
-      // Server will notify() the openrisk hub which pushes a fresh snapshot.
+      // Server will notify the openrisk hub which pushes a patch.
     } catch (err) {
       setReconcileMsg(
         `Failed: ${err instanceof Error ? err.message : String(err)}`,
@@ -57,51 +85,43 @@ const PortfolioTable = () => {
   }, []);
 
   // ----------------------------------------------------------------------
-  // SSE wiring — the backend pushes a fresh snapshot whenever a fill lands,
-  // an order changes, NetLiq shifts, or an exit_request is armed/disarmed.
-  // No polling, no Refresh button; reconnects with backoff on network drop.
+  // SSE wiring — the backend sends a snapshot on connect, then a seq'd patch
+  // of just the changed rows whenever a fill lands, an order changes,
+  // NetLiq shifts, or an exit_request is armed/disarmed. Live price / PnL /
+  // R arrive the same way, conflated server-side to a few frames a second.
+  // No polling, no Refresh button. Rides the shared /api/stream connection
+  // (lib/realtime), which reconnects on network drop.
   // ----------------------------------------------------------------------
   useEffect(() => {
-    let cancelled = false;
-    let retryTimer: ReturnType<typeof setTimeout> | null = null;
-
-    const connect = () => {
-      if (cancelled) return;
-      const es = new EventSource(
-        `${API_PREFIX}/portfolio/open-risk-table/stream`,
-      );
-      esRef.current = es;
-
-      es.onopen = () => setConnected(true);
-
-      es.onmessage = (ev) => {
-        try {
-          const payload = JSON.parse(ev.data);
-          if (payload.type === "snapshot") {
-            setPositions((payload.rows ?? []) as OpenPosition[]);
+    return subscribeTopic(
+      "openrisk",
+      (payload) => {
+        if (payload.type === "snapshot") {
+          resyncingRef.current = false;
+          seqRef.current = payload.seq ?? 0;
+          setPositions((payload.rows ?? []) as OpenPosition[]);
+        } else if (payload.type === "patch") {
+          const seq = payload.seq as number;
+          if (seq <= seqRef.current) return; // already in our snapshot
+          if (seq !== seqRef.current + 1) {
+            // Missed a patch — ask for a fresh snapshot of this topic
+            // (once; later patches are ignored until it lands).
+            if (!resyncingRef.current) {
+              resyncingRef.current = true;
+              resyncTopic("openrisk");
+            }
+            return;
           }
-          // ping → ignore
-        } catch (err) {
-          console.error("Portfolio SSE parse error:", err);
+          seqRef.current = seq;
+          const rows = (payload.rows ?? []) as OpenPosition[];
+          const removed = new Set<string>(
+            ((payload.removed ?? []) as string[]).map((s) => s.toUpperCase()),
+          );
+          setPositions((prev) => applyPatch(prev, rows, removed));
         }
-      };
-
-      es.onerror = () => {
-        setConnected(false);
-        es.close();
-        if (cancelled) return;
-        retryTimer = setTimeout(connect, 2000);
-      };
-    };
-
-    connect();
-
-    return () => {
-      cancelled = true;
-      if (retryTimer) clearTimeout(retryTimer);
-      esRef.current?.close();
-      esRef.current = null;
-    };
+      },
+      setConnected,
+    );
   }, []);
 
   const handleManage = (position: OpenPosition) => {
@@ -159,6 +179,9 @@ const PortfolioTable = () => {
             <TableHead>Aux Price</TableHead>
             <TableHead>Position</TableHead>
             <TableHead>Open Risk</TableHead>
+            <TableHead>Last</TableHead>
+            <TableHead>Unrl. PnL</TableHead>
+            <TableHead>R</TableHead>
             <TableHead className="text-center">Action</TableHead>
           </TableRow>
         </TableHeader>
@@ -166,7 +189,7 @@ const PortfolioTable = () => {
         <TableBody>
           {positions.length === 0 ? (
             <TableRow>
-              <TableCell colSpan={9} className="text-gray-500">
+              <TableCell colSpan={12} className="text-gray-500">
                 No open positions.
               </TableCell>
             </TableRow>
@@ -185,6 +208,15 @@ const PortfolioTable = () => {
                 <TableCell>{pos.auxprice}</TableCell>
                 <TableCell>{pos.position}</TableCell>
                 <TableCell>{pos.openrisk}</TableCell>
+                <TableCell className="tabular-nums">{pos.last ?? "—"}</TableCell>
+                <TableCell
+                  className={`tabular-nums ${pnlClass(pos.unrealized_pnl)}`}
+                >
+                  {pos.unrealized_pnl ?? "—"}
+                </TableCell>
+                <TableCell className={`tabular-nums ${pnlClass(pos.r_multiple)}`}>
+                  {pos.r_multiple != null ? `${pos.r_multiple}R` : "—"}
+                </TableCell>
                 <TableCell className="text-center">
                   <Button
                   variant="outline"
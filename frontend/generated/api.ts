@@ -1416,6 +1416,12 @@ export interface components {
             position: number;
             /** Openrisk */
             openrisk: number;
+            /** Last */
+            last?: number | null;
+            /** Unrealized Pnl */
+            unrealized_pnl?: number | null;
+            /** R Multiple */
+            r_multiple?: number | null;
         };
         /** OrderLogEntry */
         OrderLogEntry: {
@@ -0,0 +1,224 @@
+// frontend/lib/realtime.ts
+//
+// One shared EventSource for every realtime feed.
+//
+// Each component used to open its own EventSource (order status, open
+// risk, pending approvals, lockout, streamer status, alarms, live
+// scanner) — enough to exhaust the browser's six HTTP/1.1 connections
+// per host and stall ordinary fetches. Everything now rides one
+// connection to /api/stream (see backend services/realtime.py):
+//
+//   subscribeTopic(topic, onMessage, onStatus?) -> unsubscribe
+//   resyncTopic(topic)  -> fresh snapshot for that topic only
+//
+// The payloads are the same ones the per-feed endpoints send, snapshot
+// first. Topics added or dropped while connected are applied to the live
+// connection (POST /api/stream/{cid}); a dropped connection reconnects
+// after 2s with every current topic. Each topic passes the last event id
+// it saw (`resume=`), so the backend replays just the missed messages
+// when it still has them and sends a fresh snapshot otherwise. A feed that
+// fails server-side sends `topic_error` and comes back with a snapshot.
+
+import { API_PREFIX } from "@/lib/api_prefix";
+
+export type Topic =
+  | "orders"
+  | "openrisk"
+  | "pending_approvals"
+  | "lockout"
+  | "streamer_status"
+  | "alarms"
+  | "live_scanner";
+
+type MessageHandler = (payload: any) => void; // eslint-disable-line @typescript-eslint/no-explicit-any
+type StatusHandler = (connected: boolean) => void;
+
+type Listener = { onMessage: MessageHandler; onStatus?: StatusHandler };
+
+const RECONNECT_DELAY_MS = 2000;
+
+const listeners = new Map<Topic, Set<Listener>>();
+let es: EventSource | null = null;
+let cid: string | null = null;
+let serverTopics = new Set<Topic>();
+let connected = false;
+let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+let syncScheduled = false;
+// Topics resynced or (re)subscribed before the hello frame arrived.
+const pendingResync = new Set<Topic>();
+// Last broker event id seen per topic, sent back as `resume=` on reconnect.
+const lastIds = new Map<Topic, string>();
+
+function wantedTopics(): Topic[] {
+  return [...listeners.keys()].sort();
+}
+
+function setConnected(value: boolean) {
+  connected = value;
+  listeners.forEach((set) => set.forEach((l) => l.onStatus?.(value)));
+}
+
+function dispatch(topic: Topic, ev: MessageEvent) {
+  const set = listeners.get(topic);
+  if (!set) return;
+  if (ev.lastEventId) lastIds.set(topic, ev.lastEventId);
+  const data = ev.data as string;
+  let payload: unknown;
+  try {
+    payload = JSON.parse(data);
+  } catch (err) {
+    console.error(`[realtime] ${topic} parse error:`, err);
+    return;
+  }
+  set.forEach((l) => l.onMessage(payload));
+}
+
+function close() {
+  es?.close();
+  es = null;
+  cid = null;
+  serverTopics = new Set();
+  if (connected) setConnected(false);
+}
+
+function connect() {
+  reconnectTimer = null;
+  const topics = wantedTopics();
+  if (topics.length === 0) return;
+
+  const resume = topics
+    .filter((t) => lastIds.has(t))
+    .map((t) => `${t}=${lastIds.get(t)}`)
+    .join(",");
+  const source = new EventSource(
+    `${API_PREFIX}/stream?topics=${encodeURIComponent(topics.join(","))}` +
+      (resume ? `&resume=${encodeURIComponent(resume)}` : ""),
+  );
+  es = source;
+
+  source.addEventListener("hello", (ev) => {
+    const hello = JSON.parse((ev as MessageEvent).data);
+    cid = hello.cid as string;
+    serverTopics = new Set(hello.topics as Topic[]);
+    // A fresh connection resumes or snapshots every topic it opened with.
+    pendingResync.clear();
+    setConnected(true);
+    scheduleSync();
+  });
+  source.addEventListener("topic_error", (ev) => {
+    // One feed failed server-side; the backend retries it and sends a
+    // fresh snapshot on recovery, so there is nothing to do here.
+    console.error("[realtime] topic error:", (ev as MessageEvent).data);
+  });
+  for (const topic of topics) attachTopic(source, topic);
+
+  source.onerror = () => {
+    if (es !== source) return;
+    close();
+    if (reconnectTimer === null && listeners.size > 0) {
+      reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+    }
+  };
+}
+
+const attached = new WeakMap<EventSource, Set<Topic>>();
+
+function attachTopic(source: EventSource, topic: Topic) {
+  let set = attached.get(source);
+  if (!set) attached.set(source, (set = new Set()));
+  if (set.has(topic)) return;
+  set.add(topic);
+  source.addEventListener(topic, (ev) => dispatch(topic, ev as MessageEvent));
+}
+
+// Coalesce subscribe / unsubscribe calls from one render pass into a
+// single control request (or a single connect, when not connected yet).
+function scheduleSync() {
+  if (syncScheduled) return;
+  syncScheduled = true;
+  queueMicrotask(() => {
+    syncScheduled = false;
+    sync();
+  });
+}
+
+function sync() {
+  const wanted = wantedTopics();
+  if (wanted.length === 0) {
+    if (reconnectTimer) clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+    close();
+    return;
+  }
+  if (!es) {
+    if (reconnectTimer === null) connect();
+    return;
+  }
+  if (!cid) return; // hello pending; it schedules another sync
+
+  const subscribe = wanted.filter((t) => !serverTopics.has(t));
+  const unsubscribe = [...serverTopics].filter((t) => !listeners.has(t));
+  const resync = [...pendingResync].filter((t) => serverTopics.has(t));
+  pendingResync.clear();
+  if (!subscribe.length && !unsubscribe.length && !resync.length) return;
+
+  for (const t of subscribe) attachTopic(es, t);
+  const source = es;
+  fetch(`${API_PREFIX}/stream/${cid}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ subscribe, unsubscribe, resync }),
+  })
+    .then(async (res) => {
+      if (es !== source) return;
+      if (!res.ok) throw new Error(`stream control ${res.status}`);
+      const body = await res.json();
+      serverTopics = new Set(body.topics as Topic[]);
+    })
+    .catch((err) => {
+      // Connection state is unknown — start over with every topic.
+      console.error("[realtime] control request failed:", err);
+      if (es === source) {
+        close();
+        connect();
+      }
+    });
+}
+
+export function subscribeTopic(
+  topic: Topic,
+  onMessage: MessageHandler,
+  onStatus?: StatusHandler,
+): () => void {
+  const listener: Listener = { onMessage, onStatus };
+  let set = listeners.get(topic);
+  const isNew = !set;
+  if (!set) listeners.set(topic, (set = new Set()));
+  set.add(listener);
+  if (connected) onStatus?.(true);
+
+  if (isNew) {
+    scheduleSync();
+  } else {
+    // Another component already holds this topic; this one still needs
+    // the snapshot.
+    resyncTopic(topic);
+  }
+
+  return () => {
+    const current = listeners.get(topic);
+    if (!current) return;
+    current.delete(listener);
+    if (current.size === 0) {
+      listeners.delete(topic);
+      lastIds.delete(topic);
+      scheduleSync();
+    }
+  };
+}
+
+export function resyncTopic(topic: Topic): void {
+  lastIds.delete(topic);
+  pendingResync.add(topic);
+  scheduleSync();
+}